@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from app.core.logger import get_logger
+from app.core.metrics import REGISTRY
+from app.exceptions import AdmissionRejectedError
+
+logger = get_logger(__name__)
+
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram("admission_wait_seconds", "Espera en cola antes de obtener un slot de cómputo pesado.", ("workload",))
+ADMISSION_REJECTIONS = REGISTRY.counter("admission_rejections_total", "Peticiones pesadas rechazadas por control de admisión.", ("workload", "reason"))
+
+
+@dataclass
+class WorkloadClass:
+    """
+    Clase de carga pesada sujeta a control de admisión.
+
+    - max_concurrent: slots simultáneos de la clase (además del límite global del controlador).
+    - max_queue: peticiones en espera; con la cola llena se responde 429.
+    - queue_timeout_s: espera máxima por un slot; al vencer se responde 503.
+    - priority: menor valor = se atiende antes cuando se libera un slot.
+    """
+    name: str
+    max_concurrent: int = 1
+    max_queue: int = 8
+    queue_timeout_s: float = 30.0
+    priority: int = 10
+
+
+class AdmissionController:
+    """
+    Control de admisión para endpoints de cómputo pesado (se usa desde el event loop).
+
+    El total de slots (`capacity`, normalmente los workers del pool de procesos) se reparte
+    entre clases con límite propio. Al liberarse un slot (o al llegar una petición nueva) se
+    concede a la petición en espera de mayor prioridad cuya clase tenga cupo; a igual prioridad,
+    por orden de llegada. Una petición en espera sin cupo en su clase no bloquea a otras clases.
+    """
+
+    def __init__(self, classes: List[WorkloadClass], capacity: int = 1):
+        self.capacity = int(max(1, capacity))
+        self._classes: Dict[str, WorkloadClass] = {c.name: c for c in classes}
+        self._active: Dict[str, int] = {c.name: 0 for c in classes}
+        self._queued: Dict[str, int] = {c.name: 0 for c in classes}
+        self._waiters: List[Tuple[int, int, str, "asyncio.Future[None]"]] = []
+        self._seq = itertools.count()
+        self._admitted: Dict[str, int] = {c.name: 0 for c in classes}
+        self._rejected: Dict[str, int] = {c.name: 0 for c in classes}
+
+    def _workload(self, name: str) -> WorkloadClass:
+        wc = self._classes.get(name)
+        if wc is None:
+            raise ValueError(f"Clase de carga desconocida: {name}. Valores permitidos: {sorted(self._classes)}")
+        return wc
+
+    def _has_slot(self, wc: WorkloadClass) -> bool:
+        return sum(self._active.values()) < self.capacity and self._active[wc.name] < wc.max_concurrent
+
+    def _reject(self, wc: WorkloadClass, reason: str, status_code: int, message: str) -> AdmissionRejectedError:
+        self._rejected[wc.name] += 1
+        ADMISSION_REJECTIONS.labels(wc.name, reason).inc()
+        logger.warning(f"Admission rejected for {wc.name}: {reason}", extra={"workload": wc.name, "reason": reason})
+        return AdmissionRejectedError(
+            message,
+            details=f"{self._active[wc.name]} running, {self._queued[wc.name]} queued (max_concurrent={wc.max_concurrent}, max_queue={wc.max_queue})",
+            status_code=status_code,
+            retry_after_s=max(1, int(round(wc.queue_timeout_s))),
+        )
+
+    def _grant_waiters(self, max_priority: float = float("inf")) -> None:
+        """Concede slot a las peticiones en espera cuya clase tiene cupo, hasta la prioridad dada."""
+        if not self._waiters:
+            return
+        remaining = []
+        for item in sorted(self._waiters):
+            priority, _, name, fut = item
+            if fut.done():
+                continue
+            wc = self._classes[name]
+            if priority <= max_priority and self._has_slot(wc):
+                self._active[name] += 1
+                self._queued[name] -= 1
+                fut.set_result(None)
+            else:
+                remaining.append(item)
+        heapq.heapify(remaining)
+        self._waiters = remaining
+
+    async def acquire(self, name: str) -> None:
+        wc = self._workload(name)
+        start = time.perf_counter()
+        # Primero las peticiones en espera de mayor o igual prioridad que ya podrían entrar; las
+        # que siguen en cola no tienen cupo en su clase y no deben bloquear a otras clases
+        self._grant_waiters(max_priority=wc.priority)
+        if self._has_slot(wc):
+            self._active[name] += 1
+            self._admitted[name] += 1
+            ADMISSION_WAIT_SECONDS.labels(name).observe(0.0)
+            self._grant_waiters()
+            return
+        if self._queued[name] >= wc.max_queue:
+            raise self._reject(wc, "queue_full", 429, f"Too many pending {name} requests")
+
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (wc.priority, next(self._seq), name, fut))
+        self._queued[name] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout=wc.queue_timeout_s)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # Concedido justo al vencer el plazo: se devuelve el slot
+                self.release(name)
+            else:
+                fut.cancel()
+                self._queued[name] -= 1
+            raise self._reject(wc, "queue_timeout", 503, f"Timed out waiting for a {name} slot")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(name)
+            else:
+                fut.cancel()
+                self._queued[name] -= 1
+            raise
+        self._admitted[name] += 1
+        ADMISSION_WAIT_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+    def release(self, name: str) -> None:
+        self._active[name] = max(0, self._active[name] - 1)
+        self._grant_waiters()
+
+    @asynccontextmanager
+    async def slot(self, name: str) -> AsyncIterator[None]:
+        await self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "workloads": {
+                name: {
+                    "active": self._active[name],
+                    "queued": self._queued[name],
+                    "admitted": self._admitted[name],
+                    "rejected": self._rejected[name],
+                    "max_concurrent": wc.max_concurrent,
+                    "max_queue": wc.max_queue,
+                    "queue_timeout_s": wc.queue_timeout_s,
+                    "priority": wc.priority,
+                }
+                for name, wc in self._classes.items()
+            },
+        }
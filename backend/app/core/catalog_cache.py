@@ -0,0 +1,116 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.localdb import catalog_version, fetch_products, fetch_sellers
+from app.core.logger import get_logger
+from app.core.metrics import CACHE_REQUESTS
+from app.schemas import ProductListResponse, SellerListResponse
+
+logger = get_logger(__name__)
+
+_SNAPSHOT_HIT = CACHE_REQUESTS.labels("catalog", "hit")
+_SNAPSHOT_MISS = CACHE_REQUESTS.labels("catalog", "miss")
+_SELLERS_JSON_HIT = CACHE_REQUESTS.labels("catalog_sellers_json", "hit")
+_SELLERS_JSON_MISS = CACHE_REQUESTS.labels("catalog_sellers_json", "miss")
+
+
+class CatalogSnapshot:
+    """
+    Copia en memoria del catálogo (productos y vendedores) para una versión dada.
+
+    Los dicts se comparten entre peticiones y se tratan como de solo lectura. Las respuestas
+    de `/api/products` y `/api/sellers` se serializan una sola vez por versión.
+    """
+
+    __slots__ = (
+        "version",
+        "products",
+        "products_by_id",
+        "sellers",
+        "sellers_by_id",
+        "sellers_by_product",
+        "products_json",
+        "_sellers_json",
+        "_lock",
+    )
+
+    def __init__(self, version: int, products: List[Dict[str, Any]], sellers: List[Dict[str, Any]]):
+        self.version = version
+        self.products: Tuple[Dict[str, Any], ...] = tuple(products)
+        self.products_by_id: Dict[str, Dict[str, Any]] = {p["id"]: p for p in self.products}
+        self.sellers: Tuple[Dict[str, Any], ...] = tuple(sellers)
+        self.sellers_by_id: Dict[str, Dict[str, Any]] = {s["id"]: s for s in self.sellers}
+        by_product: Dict[str, List[Dict[str, Any]]] = {}
+        for s in self.sellers:
+            for pid in s["products"]:
+                by_product.setdefault(pid, []).append(s)
+        self.sellers_by_product: Dict[str, Tuple[Dict[str, Any], ...]] = {k: tuple(v) for k, v in by_product.items()}
+        self.products_json: bytes = ProductListResponse(products=list(self.products)).model_dump_json().encode("utf-8")
+        self._sellers_json: Dict[Optional[str], bytes] = {}
+        self._lock = threading.Lock()
+
+    def sellers_for(self, product_id: Optional[str]) -> Tuple[Dict[str, Any], ...]:
+        if not product_id:
+            return self.sellers
+        return self.sellers_by_product.get(product_id, ())
+
+    def sellers_json(self, product_id: Optional[str]) -> bytes:
+        key = product_id or None
+        body = self._sellers_json.get(key)
+        if body is not None:
+            _SELLERS_JSON_HIT.inc()
+        else:
+            _SELLERS_JSON_MISS.inc()
+            body = SellerListResponse(sellers=list(self.sellers_for(key))).model_dump_json().encode("utf-8")
+            with self._lock:
+                # Solo se guardan productos conocidos: el caché no crece con ids arbitrarios
+                if key is None or key in self.sellers_by_product or key in self.products_by_id:
+                    self._sellers_json[key] = body
+        return body
+
+
+class CatalogCache:
+    """
+    Caché de lectura del catálogo invalidado por versión.
+
+    `snapshot()` compara la versión en memoria de `localdb` (un entero, sin ir a SQLite) con la
+    del snapshot vigente; si cambió, reconstruye el snapshot con una sola lectura de la base.
+    """
+
+    def __init__(self, version_fn: Callable[[], int] = catalog_version):
+        self._version_fn = version_fn
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._rebuilds = 0
+
+    def snapshot(self) -> CatalogSnapshot:
+        version = self._version_fn()
+        snap = self._snapshot
+        if snap is not None and snap.version == version:
+            self._hits += 1
+            _SNAPSHOT_HIT.inc()
+            return snap
+        _SNAPSHOT_MISS.inc()
+        with self._lock:
+            snap = self._snapshot
+            if snap is None or snap.version != version:
+                snap = CatalogSnapshot(version, fetch_products(), fetch_sellers())
+                self._snapshot = snap
+                self._rebuilds += 1
+                logger.info(f"Catalog snapshot v{version}: {len(snap.products)} products, {len(snap.sellers)} sellers")
+            return snap
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            "version": snap.version if snap is not None else None,
+            "products": len(snap.products) if snap is not None else 0,
+            "sellers": len(snap.sellers) if snap is not None else 0,
+            "hits": self._hits,
+            "rebuilds": self._rebuilds,
+        }
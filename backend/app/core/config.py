@@ -19,10 +19,89 @@ class Settings(BaseSettings):
 
     # Database (SQLite local)
     LOCAL_DB_FILENAME: str = "tudistri.sqlite3"
+    DB_CACHE_SIZE_KIB: int = 65536
+    DB_MMAP_SIZE_MB: int = 256
+    DB_BUSY_TIMEOUT_MS: int = 5000
+    DB_CACHED_STATEMENTS: int = 256
+    DB_WRITE_QUEUE_MAX: int = 1024
     
     # Observability
     LOG_LEVEL: str = "INFO"
+    # Logs JSON escritos por un hilo propio (QueueHandler + QueueListener); con la cola llena se descartan
+    LOG_ASYNC: bool = True
+    LOG_QUEUE_MAX: int = 10000
+    LOG_FLUSH_INTERVAL_S: float = 0.05
+    # Fracción de peticiones exitosas (< 400) que dejan log "Request completed"; errores siempre
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
     ENABLE_METRICS: bool = True
+    # Trazas por petición (spans por stage): fracción muestreada; la cabecera X-Trace: 1 fuerza el muestreo
+    TRACE_SAMPLE_RATE: float = 0.01
+    TRACE_ALLOW_FORCE: bool = True
+    TRACE_SERVER_TIMING: bool = True
+    TRACE_LOG_MIN_MS: float = 0.0
+
+    # ML - Impact surrogate (malla precalculada + interpolación bilineal)
+    IMPACT_SURROGATE_ENABLED: bool = False
+    IMPACT_SURROGATE_DISTANCE_STEPS: int = 96
+    IMPACT_SURROGATE_DURATION_STEPS: int = 96
+
+    # Jobs de entrenamiento en segundo plano (pool de procesos)
+    JOBS_MAX_WORKERS: int = 1
+    JOBS_MAX_PENDING: int = 16
+    JOBS_SYNC_WAIT_S: float = 120.0
+
+    # Endpoints pesados (validación, evaluación de modelos): pool de procesos propio + admisión
+    HEAVY_POOL_WORKERS: int = 1
+    HEAVY_POOL_NICE: int = 10
+    # Por clase: slots simultáneos, peticiones en espera (llena -> 429) y espera máxima (-> 503)
+    HEAVY_VALIDATION_MAX_CONCURRENT: int = 1
+    HEAVY_VALIDATION_MAX_QUEUE: int = 2
+    HEAVY_VALIDATION_QUEUE_TIMEOUT_S: float = 30.0
+    HEAVY_EVALUATION_MAX_CONCURRENT: int = 1
+    HEAVY_EVALUATION_MAX_QUEUE: int = 4
+    HEAVY_EVALUATION_QUEUE_TIMEOUT_S: float = 30.0
+
+    # Simulación: solo se enrutan los K vendedores más cercanos en línea recta (R*Tree)
+    SIMULATION_MAX_SELLERS: int = 10
+    SIMULATION_SELLER_RADIUS_KM: Optional[float] = None
+    # Simulate en streaming (/api/routes/simulate/stream): hilos compartidos entre peticiones y
+    # vendedores en curso por petición (más bajo = primera ruta antes)
+    SIMULATION_STREAM_WORKERS: int = 4
+    SIMULATION_STREAM_CONCURRENCY: int = 2
+    # Simulación por lotes (/api/routes/simulate_batch): pedidos por petición, pedidos por bloque
+    # vectorizado y lotes simultáneos (los demás esperan en cola; llena -> 429, espera vencida -> 503)
+    SIMULATION_BATCH_MAX_ITEMS: int = 10000
+    SIMULATION_BATCH_CHUNK_SIZE: int = 256
+    SIMULATION_BATCH_MAX_CONCURRENT: int = 1
+    SIMULATION_BATCH_MAX_QUEUE: int = 2
+    SIMULATION_BATCH_QUEUE_TIMEOUT_S: float = 30.0
+    # Respuestas grandes (simulate, evaluaciones) codificadas directo con orjson, sin revalidar el response_model
+    FAST_JSON_RESPONSES: bool = True
+    # Single-flight: peticiones idénticas concurrentes (simulate / forecast) comparten un solo cálculo;
+    # con TTL > 0 el resultado también se reutiliza durante ese tiempo
+    SINGLEFLIGHT_ENABLED: bool = True
+    SIMULATE_COALESCE_TTL_S: float = 0.0
+    FORECAST_COALESCE_TTL_S: float = 0.0
+
+    # Registro diferido de eventos de simulación (cola en memoria + escritura por lotes)
+    EVENT_SINK_ENABLED: bool = True
+    EVENT_SINK_MAX_QUEUE: int = 10000
+    EVENT_SINK_BATCH_SIZE: int = 500
+    EVENT_SINK_FLUSH_INTERVAL_S: float = 0.5
+    EVENT_SINK_POLICY: str = "drop"  # "drop" | "block"
+    EVENT_SINK_BLOCK_TIMEOUT_S: float = 1.0
+    # Retención: eventos más antiguos pasan a particiones mensuales comprimidas
+    SIMULATION_EVENTS_RETENTION_DAYS: int = 30
+
+    # Exportación columnar (Parquet / Arrow IPC); por defecto app/data/exports
+    EXPORT_DIR: Optional[str] = None
+    EXPORT_KEEP_SNAPSHOTS: int = 3
+
+    # Pronósticos de demanda materializados en SQLite
+    FORECAST_MATERIALIZE_ENABLED: bool = True
+    FORECAST_MAX_HORIZON_DAYS: int = 90
+    FORECAST_REFRESH_INTERVAL_S: float = 3600.0
+    FORECAST_WATCH_INTERVAL_S: float = 30.0
     
     class Config:
         env_file = ".env"
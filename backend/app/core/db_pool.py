@@ -0,0 +1,198 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.logger import get_logger
+from app.core.metrics import SQLITE_WRITE_SECONDS, SQLITE_WRITE_WAIT_SECONDS
+
+logger = get_logger(__name__)
+
+_STATS_WINDOW = 1024
+
+
+def _summary_ms(samples: Deque[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"avg": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    return {
+        "avg": round(sum(ordered) / len(ordered) * 1000.0, 4),
+        "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000.0, 4),
+        "max": round(ordered[-1] * 1000.0, 4),
+    }
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite para un archivo en modo WAL.
+
+    - Lecturas: cada hilo obtiene su propia conexión (threading.local), por lo que las consultas
+      de distintos hilos corren en paralelo sin compartir cursores ni bloqueos de Python.
+    - Escrituras: una única conexión de escritura atendida por un hilo dedicado. `write(fn)`
+      encola `fn(conn, ...)` y espera su resultado; la transacción se confirma al terminar `fn`
+      y se revierte si lanza una excepción. Una escritura llamada desde el propio hilo escritor
+      se ejecuta directamente (escrituras anidadas).
+
+    Todas las conexiones usan el caché de sentencias preparadas de sqlite3 (`cached_statements`),
+    de modo que las consultas con el mismo SQL se compilan una sola vez por conexión.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        init_fn: Optional[Callable[[sqlite3.Connection], None]] = None,
+        cache_size_kib: int = 65536,
+        mmap_size_mb: int = 256,
+        busy_timeout_ms: int = 5000,
+        cached_statements: int = 256,
+        write_queue_max: int = 1024,
+    ):
+        self.path = path
+        self._init_fn = init_fn
+        self.cache_size_kib = int(cache_size_kib)
+        self.mmap_size_mb = int(mmap_size_mb)
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self.cached_statements = int(cached_statements)
+        self._local = threading.local()
+        self._readers: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._readers_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=int(max(1, write_queue_max)))
+        self._writer_conn: Optional[sqlite3.Connection] = None
+        self._writer_thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self._write_waits: Deque[float] = deque(maxlen=_STATS_WINDOW)
+        self._write_execs: Deque[float] = deque(maxlen=_STATS_WINDOW)
+        self._reader_connects: Deque[float] = deque(maxlen=_STATS_WINDOW)
+        self._writes = 0
+        self._write_errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            timeout=self.busy_timeout_ms / 1000.0,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON;")
+        # En WAL, synchronous=NORMAL es seguro ante caídas del proceso
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute(f"PRAGMA cache_size=-{self.cache_size_kib};")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size_mb * 1024 * 1024};")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms};")
+        return conn
+
+    def start(self) -> "ConnectionPool":
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL;")
+        if self._init_fn is not None:
+            self._init_fn(conn)
+            if conn.in_transaction:
+                conn.commit()
+        self._writer_conn = conn
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="sqlite-writer", daemon=True)
+        self._writer_thread.start()
+        return self
+
+    def reader(self) -> sqlite3.Connection:
+        """Conexión propia del hilo actual (se crea en el primer uso)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            start = time.perf_counter()
+            conn = self._connect()
+            with self._readers_lock:
+                # Las conexiones de hilos que ya terminaron se cierran al abrir una nueva
+                stale = [c for t, c in self._readers if not t.is_alive()]
+                self._readers = [(t, c) for t, c in self._readers if t.is_alive()]
+                self._readers.append((threading.current_thread(), conn))
+            for c in stale:
+                c.close()
+            with self._stats_lock:
+                self._reader_connects.append(time.perf_counter() - start)
+            self._local.conn = conn
+        return conn
+
+    def write(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if threading.current_thread() is self._writer_thread:
+            return fn(self._writer_conn, *args, **kwargs)
+        if self._closed or self._writer_thread is None:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        future: Future = Future()
+        self._queue.put((fn, args, kwargs, future, time.perf_counter()))
+        return future.result()
+
+    def _writer_loop(self) -> None:
+        conn = self._writer_conn
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            fn, args, kwargs, future, enqueued = item
+            started = time.perf_counter()
+            try:
+                result = fn(conn, *args, **kwargs)
+                if conn.in_transaction:
+                    conn.commit()
+            except BaseException as e:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    pass
+                with self._stats_lock:
+                    self._write_errors += 1
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finished = time.perf_counter()
+            SQLITE_WRITE_WAIT_SECONDS.observe(started - enqueued)
+            SQLITE_WRITE_SECONDS.observe(finished - started)
+            with self._stats_lock:
+                self._writes += 1
+                self._write_waits.append(started - enqueued)
+                self._write_execs.append(finished - started)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "path": self.path,
+                "readers_open": len(self._readers),
+                "writes": self._writes,
+                "write_errors": self._write_errors,
+                "write_queue_depth": self._queue.qsize(),
+                "write_queue_max": self._queue.maxsize,
+                "write_wait_ms": _summary_ms(self._write_waits),
+                "write_exec_ms": _summary_ms(self._write_execs),
+                "reader_connect_ms": _summary_ms(self._reader_connects),
+                "pragmas": {
+                    "cache_size_kib": self.cache_size_kib,
+                    "mmap_size_mb": self.mmap_size_mb,
+                    "busy_timeout_ms": self.busy_timeout_ms,
+                    "cached_statements": self.cached_statements,
+                },
+            }
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer_thread is not None:
+            self._queue.put(None)
+            self._writer_thread.join(10)
+        if self._writer_conn is not None:
+            self._writer_conn.close()
+            self._writer_conn = None
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for _, conn in readers:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
@@ -0,0 +1,166 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+EVENT_SINK_POLICIES = ("drop", "block")
+
+EventRow = Tuple[Any, ...]
+
+
+class EventSink:
+    """
+    Registro diferido (write-behind) de eventos de simulación.
+
+    `emit` solo encola el evento en memoria; un hilo de fondo agrupa los eventos pendientes y
+    los escribe con `write_batch(rows)` en una sola transacción (un commit por lote) cada
+    `flush_interval_s` o al reunir `batch_size` eventos. Con la cola llena, la política "drop"
+    descarta el evento y "block" espera hasta `block_timeout_s` antes de descartarlo.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[EventRow]], Any],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval_s: float = 0.5,
+        policy: str = "drop",
+        block_timeout_s: float = 1.0,
+    ):
+        if policy not in EVENT_SINK_POLICIES:
+            raise ValueError(f"Política no soportada: {policy}. Valores permitidos: {list(EVENT_SINK_POLICIES)}")
+        self._write_batch = write_batch
+        self.batch_size = int(max(1, batch_size))
+        self.flush_interval_s = float(max(0.001, flush_interval_s))
+        self.policy = policy
+        self.block_timeout_s = float(block_timeout_s)
+        self._queue: "queue.Queue[Optional[EventRow]]" = queue.Queue(maxsize=int(max(1, max_queue)))
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+        self._last_batch_size = 0
+        self._last_flush_ms: Optional[float] = None
+
+    def start(self) -> "EventSink":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-sink", daemon=True)
+            self._thread.start()
+        return self
+
+    def emit(self, row: EventRow) -> bool:
+        """Encola una fila de evento (ver `localdb.simulation_event_row`). Devuelve False si se descartó."""
+        try:
+            if self.policy == "block":
+                self._queue.put(row, timeout=self.block_timeout_s)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._queued += 1
+        return True
+
+    def _drain(self, first: EventRow) -> List[EventRow]:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stop.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _write(self, batch: List[EventRow]) -> None:
+        start = time.perf_counter()
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} simulation events: {e}")
+            with self._lock:
+                self._failed += len(batch)
+            return
+        with self._lock:
+            self._written += len(batch)
+            self._batches += 1
+            self._last_batch_size = len(batch)
+            self._last_flush_ms = round((time.perf_counter() - start) * 1000.0, 3)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                item = self._queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            # Espera breve para agrupar: el commit se paga una vez por lote, no por evento
+            deadline = time.monotonic() + self.flush_interval_s
+            while self._queue.qsize() < self.batch_size - 1 and time.monotonic() < deadline and not self._stop.is_set():
+                time.sleep(min(0.01, self.flush_interval_s))
+            self._write(self._drain(item))
+        # Vaciado final: lo que quede en la cola se escribe antes de terminar
+        pending: List[EventRow] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                pending.append(item)
+        for i in range(0, len(pending), self.batch_size):
+            self._write(pending[i:i + self.batch_size])
+
+    def flush(self, timeout_s: float = 10.0) -> bool:
+        """Espera a que se escriban los eventos encolados hasta ahora."""
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            with self._lock:
+                done = self._written + self._failed >= self._queued
+            if done:
+                return True
+            time.sleep(0.005)
+        return False
+
+    def stop(self, timeout_s: float = 10.0) -> None:
+        """Escribe los eventos pendientes y detiene el hilo de fondo."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        thread.join(timeout_s)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "policy": self.policy,
+                "queued": self._queued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "pending": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "batches": self._batches,
+                "last_batch_size": self._last_batch_size,
+                "last_flush_ms": self._last_flush_ms,
+            }
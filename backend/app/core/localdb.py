@@ -1,36 +1,90 @@
 import json
+import math
 import os
+import random
 import sqlite3
 import threading
+import zlib
 from datetime import datetime, timedelta
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+from app.core.config import settings
+from app.core.db_pool import ConnectionPool
 from app.core.logger import get_logger
+from app.core.metrics import timed_query
 
 logger = get_logger(__name__)
 
 
 _lock = threading.Lock()
-_conn: Optional[sqlite3.Connection] = None
+_pool: Optional[ConnectionPool] = None
+# Versión del catálogo (products/sellers): se incrementa tras cada escritura confirmada
+_catalog_version = 0
+_catalog_version_lock = threading.Lock()
 
 
 def _db_path() -> str:
+    filename = settings.LOCAL_DB_FILENAME
+    if os.path.isabs(filename):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        return filename
     base_dir = os.path.join(os.path.dirname(__file__), "..", "data")
     os.makedirs(base_dir, exist_ok=True)
-    return os.path.abspath(os.path.join(base_dir, "tudistri.sqlite3"))
+    return os.path.abspath(os.path.join(base_dir, filename))
+
+
+def get_db_path() -> str:
+    return _db_path()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                _db_path(),
+                init_fn=_init_schema,
+                cache_size_kib=settings.DB_CACHE_SIZE_KIB,
+                mmap_size_mb=settings.DB_MMAP_SIZE_MB,
+                busy_timeout_ms=settings.DB_BUSY_TIMEOUT_MS,
+                cached_statements=settings.DB_CACHED_STATEMENTS,
+                write_queue_max=settings.DB_WRITE_QUEUE_MAX,
+            ).start()
+        return _pool
 
 
 def get_db() -> sqlite3.Connection:
-    global _conn
+    """Conexión de lectura del hilo actual. Las escrituras de este módulo pasan por `run_write`."""
+    return get_pool().reader()
+
+
+def run_write(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Ejecuta `fn(conn, ...)` en la conexión de escritura única y retorna su resultado."""
+    return get_pool().write(fn, *args, **kwargs)
+
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
+
+
+def close_db() -> None:
+    global _pool
     with _lock:
-        if _conn is None:
-            path = _db_path()
-            _conn = sqlite3.connect(path, check_same_thread=False)
-            _conn.row_factory = sqlite3.Row
-            _conn.execute("PRAGMA journal_mode=WAL;")
-            _conn.execute("PRAGMA foreign_keys=ON;")
-            _init_schema(_conn)
-        return _conn
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    # Otra base (o la misma reabierta): los snapshots del catálogo dejan de ser válidos
+    _bump_catalog_version()
+
+
+def catalog_version() -> int:
+    return _catalog_version
+
+
+def _bump_catalog_version() -> None:
+    global _catalog_version
+    with _catalog_version_lock:
+        _catalog_version += 1
 
 
 def _init_schema(conn: sqlite3.Connection) -> None:
@@ -53,7 +107,24 @@ def _init_schema(conn: sqlite3.Connection) -> None:
             lng REAL NOT NULL,
             rating REAL NOT NULL,
             trips_count INTEGER NOT NULL,
-            seller_type TEXT NOT NULL
+            seller_type TEXT NOT NULL,
+            seller_key INTEGER
+        );
+
+        CREATE TABLE IF NOT EXISTS seller_products (
+            seller_id TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            PRIMARY KEY (seller_id, product_id),
+            FOREIGN KEY(seller_id) REFERENCES sellers(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_seller_products_product ON seller_products(product_id, seller_id);
+
+        -- Espejo espacial de sellers (id = sellers.seller_key); cajas degeneradas en el punto lat/lng
+        CREATE VIRTUAL TABLE IF NOT EXISTS seller_locations USING rtree(
+            id,
+            min_lat, max_lat,
+            min_lng, max_lng
         );
 
         CREATE TABLE IF NOT EXISTS orders (
@@ -66,15 +137,241 @@ def _init_schema(conn: sqlite3.Connection) -> None:
 
         CREATE INDEX IF NOT EXISTS idx_orders_product_created_at ON orders(product_id, created_at);
 
+        CREATE TABLE IF NOT EXISTS daily_demand (
+            product_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            total_kg REAL NOT NULL,
+            n_orders INTEGER NOT NULL,
+            PRIMARY KEY (product_id, day)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS weekly_demand (
+            product_id TEXT NOT NULL,
+            week_start TEXT NOT NULL,
+            total_kg REAL NOT NULL,
+            n_orders INTEGER NOT NULL,
+            PRIMARY KEY (product_id, week_start)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS monthly_demand (
+            product_id TEXT NOT NULL,
+            month TEXT NOT NULL,
+            total_kg REAL NOT NULL,
+            n_orders INTEGER NOT NULL,
+            PRIMARY KEY (product_id, month)
+        ) WITHOUT ROWID;
+
         CREATE TABLE IF NOT EXISTS simulation_events (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             created_at TEXT NOT NULL,
             event_type TEXT NOT NULL,
-            payload_json TEXT NOT NULL
+            payload_json TEXT NOT NULL,
+            simulation_id TEXT,
+            trigger_progress REAL,
+            distance_added_m REAL,
+            new_duration_min REAL
+        );
+
+        CREATE TABLE IF NOT EXISTS simulation_event_daily (
+            day TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            n_events INTEGER NOT NULL,
+            n_impact INTEGER NOT NULL,
+            sum_distance_added_m REAL NOT NULL,
+            sum_new_duration_min REAL NOT NULL,
+            PRIMARY KEY (day, event_type)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS simulation_event_archives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            partition TEXT NOT NULL,
+            first_event_id INTEGER NOT NULL,
+            last_event_id INTEGER NOT NULL,
+            n_events INTEGER NOT NULL,
+            min_created_at TEXT NOT NULL,
+            max_created_at TEXT NOT NULL,
+            codec TEXT NOT NULL,
+            raw_bytes INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            archived_at TEXT NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_simulation_event_archives_partition ON simulation_event_archives(partition);
+
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            params_json TEXT NOT NULL,
+            result_json TEXT,
+            error TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_jobs_status_created_at ON jobs(status, created_at);
+
+        CREATE TABLE IF NOT EXISTS demand_forecasts (
+            product_id TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            day TEXT NOT NULL,
+            forecast REAL NOT NULL,
+            lower_bound REAL NOT NULL,
+            upper_bound REAL NOT NULL,
+            generated_at TEXT NOT NULL,
+            PRIMARY KEY (product_id, model_version, day)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS demand_forecast_runs (
+            product_id TEXT PRIMARY KEY,
+            model_version TEXT NOT NULL,
+            artifact_mtime_ns INTEGER NOT NULL,
+            horizon_days INTEGER NOT NULL,
+            orders_watermark INTEGER NOT NULL,
+            generated_at TEXT NOT NULL
         );
         """
     )
     conn.commit()
+    _migrate_seller_products(conn)
+    _migrate_seller_locations(conn)
+    _migrate_demand_rollups(conn)
+    _migrate_simulation_events(conn)
+
+
+def _migrate_seller_products(conn: sqlite3.Connection) -> None:
+    """Bases creadas antes de `seller_products`: el índice se llena una vez desde `products_json`."""
+    has_index = conn.execute("SELECT 1 FROM seller_products LIMIT 1").fetchone() is not None
+    has_sellers = conn.execute("SELECT 1 FROM sellers LIMIT 1").fetchone() is not None
+    if has_sellers and not has_index:
+        rebuild_seller_products(conn)
+
+
+def _migrate_seller_locations(conn: sqlite3.Connection) -> None:
+    """
+    Bases anteriores a `seller_key` reciben la columna (rellenada con el rowid actual, que no es
+    estable: VACUUM puede renumerarlo). El R*Tree se reconstruye si alguna de sus entradas no
+    coincide, por clave y coordenadas, con `sellers`.
+    """
+    existing = {r["name"] for r in conn.execute("PRAGMA table_info(sellers)")}
+    if "seller_key" not in existing:
+        conn.execute("ALTER TABLE sellers ADD COLUMN seller_key INTEGER")
+        conn.execute("UPDATE sellers SET seller_key = rowid")
+        conn.commit()
+        logger.info("Migrated sellers: seller_key")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sellers_seller_key ON sellers(seller_key)")
+    n_locations = int(conn.execute("SELECT COUNT(1) FROM seller_locations").fetchone()[0])
+    # El R*Tree guarda float32 redondeado hacia afuera: el punto cae dentro de su caja
+    n_mismatched = int(
+        conn.execute(
+            """
+            SELECT COUNT(1) FROM sellers s
+            LEFT JOIN seller_locations loc ON loc.id = s.seller_key
+            WHERE loc.id IS NULL
+               OR s.lat NOT BETWEEN loc.min_lat AND loc.max_lat
+               OR s.lng NOT BETWEEN loc.min_lng AND loc.max_lng
+            """
+        ).fetchone()[0]
+    )
+    if n_mismatched or n_locations != _count(conn, "sellers"):
+        rebuild_seller_locations(conn)
+
+
+def rebuild_seller_locations(conn: Optional[sqlite3.Connection] = None) -> int:
+    """Recalcula el índice espacial `seller_locations` a partir de `sellers`."""
+
+    def _tx(c: sqlite3.Connection) -> int:
+        try:
+            c.execute("DELETE FROM seller_locations")
+            c.execute("INSERT INTO seller_locations (id, min_lat, max_lat, min_lng, max_lng) SELECT seller_key, lat, lat, lng, lng FROM sellers")
+            n = int(c.execute("SELECT COUNT(1) FROM seller_locations").fetchone()[0])
+        except Exception:
+            c.rollback()
+            raise
+        c.commit()
+        logger.info(f"Rebuilt seller_locations: {n} rows")
+        return n
+
+    return _tx(conn) if conn is not None else run_write(_tx)
+
+
+def rebuild_seller_products(conn: Optional[sqlite3.Connection] = None) -> int:
+    """Recalcula `seller_products` a partir de la columna `products_json` de `sellers`."""
+
+    def _tx(c: sqlite3.Connection) -> int:
+        try:
+            c.execute("DELETE FROM seller_products")
+            # json_each expande la lista en SQL, sin pasar cada fila por Python
+            c.execute(
+                """
+                INSERT OR IGNORE INTO seller_products (seller_id, product_id)
+                SELECT s.id, CAST(j.value AS TEXT)
+                FROM sellers s, json_each(CASE WHEN json_valid(s.products_json) THEN s.products_json ELSE '[]' END) j
+                """
+            )
+            n = _count(c, "seller_products")
+        except Exception:
+            c.rollback()
+            raise
+        c.commit()
+        _bump_catalog_version()
+        logger.info(f"Rebuilt seller_products: {n} rows")
+        return n
+
+    return _tx(conn) if conn is not None else run_write(_tx)
+
+
+def _migrate_demand_rollups(conn: sqlite3.Connection) -> None:
+    """Bases creadas antes de las tablas de agregados: se reconstruyen una vez desde `orders`."""
+    has_rollup = conn.execute("SELECT 1 FROM daily_demand LIMIT 1").fetchone() is not None
+    has_orders = conn.execute("SELECT 1 FROM orders LIMIT 1").fetchone() is not None
+    if has_orders and not has_rollup:
+        rebuild_demand_rollups(conn)
+
+
+_SIMULATION_EVENT_COLUMNS = {
+    "simulation_id": "TEXT",
+    "trigger_progress": "REAL",
+    "distance_added_m": "REAL",
+    "new_duration_min": "REAL",
+}
+
+
+def _migrate_simulation_events(conn: sqlite3.Connection) -> None:
+    """
+    Bases anteriores a las columnas tipadas: se agregan las columnas, se rellenan desde
+    `payload_json` con json_extract y se reconstruyen los agregados diarios.
+    """
+    existing = {r["name"] for r in conn.execute("PRAGMA table_info(simulation_events)")}
+    added = [c for c in _SIMULATION_EVENT_COLUMNS if c not in existing]
+    for col in added:
+        conn.execute(f"ALTER TABLE simulation_events ADD COLUMN {col} {_SIMULATION_EVENT_COLUMNS[col]}")
+    if added:
+        conn.execute(
+            """
+            UPDATE simulation_events SET
+                simulation_id = json_extract(payload_json, '$.simulation_id'),
+                trigger_progress = json_extract(payload_json, '$.trigger_progress'),
+                distance_added_m = json_extract(payload_json, '$.impact_metrics.distance_added'),
+                new_duration_min = json_extract(payload_json, '$.impact_metrics.new_duration')
+            WHERE json_valid(payload_json)
+            """
+        )
+        conn.commit()
+        logger.info(f"Migrated simulation_events columns: {added}")
+    conn.executescript(
+        """
+        CREATE INDEX IF NOT EXISTS idx_simulation_events_type_created_at ON simulation_events(event_type, created_at);
+        CREATE INDEX IF NOT EXISTS idx_simulation_events_simulation ON simulation_events(simulation_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_simulation_events_created_at ON simulation_events(created_at);
+        """
+    )
+    has_rollup = conn.execute("SELECT 1 FROM simulation_event_daily LIMIT 1").fetchone() is not None
+    has_events = conn.execute("SELECT 1 FROM simulation_events LIMIT 1").fetchone() is not None
+    if has_events and not has_rollup:
+        rebuild_simulation_event_rollups(conn)
 
 
 def _count(conn: sqlite3.Connection, table: str) -> int:
@@ -84,7 +381,10 @@ def _count(conn: sqlite3.Connection, table: str) -> int:
 
 
 def seed_if_empty(products: List[Dict[str, Any]], sellers: List[Dict[str, Any]]) -> None:
-    conn = get_db()
+    run_write(_seed_if_empty, products, sellers)
+
+
+def _seed_if_empty(conn: sqlite3.Connection, products: List[Dict[str, Any]], sellers: List[Dict[str, Any]]) -> None:
     if _count(conn, "products") == 0:
         _seed_products(conn, products)
     if _count(conn, "sellers") == 0:
@@ -104,6 +404,7 @@ def _ensure_product_images(conn: sqlite3.Connection, products: List[Dict[str, An
         rows.append((url, pid))
     conn.executemany("UPDATE products SET image_url = ? WHERE id = ?", rows)
     conn.commit()
+    _bump_catalog_version()
 
 
 def _seed_products(conn: sqlite3.Connection, products: List[Dict[str, Any]]) -> None:
@@ -123,18 +424,34 @@ def _seed_products(conn: sqlite3.Connection, products: List[Dict[str, Any]]) ->
         rows,
     )
     conn.commit()
+    _bump_catalog_version()
     logger.info(f"Seeded products: {len(rows)}")
 
 
 def _seed_sellers(conn: sqlite3.Connection, sellers: List[Dict[str, Any]]) -> None:
+    n = insert_sellers(sellers, conn=conn)
+    logger.info(f"Seeded sellers: {n}")
+
+
+def insert_sellers(sellers: List[Dict[str, Any]], conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Inserta o actualiza vendedores, sus filas de `seller_products` y su entrada en el índice
+    espacial `seller_locations` en la misma transacción.
+    Es la única vía de escritura de `sellers`; `products_json` se conserva para devolver la
+    lista de productos en el orden original. Cada vendedor nuevo recibe el siguiente `seller_key`
+    (clave del R*Tree), que se mantiene en las actualizaciones.
+    """
     rows = []
+    links: List[Tuple[str, str]] = []
     for s in sellers:
         coords = s.get("coordinates") or {}
+        seller_id = str(s["id"])
+        products = [str(p) for p in (s.get("products") or [])]
         rows.append(
             (
-                str(s["id"]),
+                seller_id,
                 str(s["name"]),
-                json.dumps(list(s.get("products") or []), ensure_ascii=False),
+                json.dumps(products, ensure_ascii=False),
                 float(coords.get("lat")),
                 float(coords.get("lng")),
                 float(s.get("rating") or 0),
@@ -142,12 +459,40 @@ def _seed_sellers(conn: sqlite3.Connection, sellers: List[Dict[str, Any]]) -> No
                 str(s.get("type") or ""),
             )
         )
-    conn.executemany(
-        "INSERT INTO sellers (id, name, products_json, lat, lng, rating, trips_count, seller_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-        rows,
-    )
-    conn.commit()
-    logger.info(f"Seeded sellers: {len(rows)}")
+        links.extend((seller_id, p) for p in products)
+
+    def _tx(c: sqlite3.Connection) -> int:
+        try:
+            c.executemany(
+                """
+                INSERT INTO sellers (id, name, products_json, lat, lng, rating, trips_count, seller_type, seller_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(seller_key), 0) + 1 FROM sellers))
+                ON CONFLICT(id) DO UPDATE SET
+                    name = excluded.name,
+                    products_json = excluded.products_json,
+                    lat = excluded.lat,
+                    lng = excluded.lng,
+                    rating = excluded.rating,
+                    trips_count = excluded.trips_count,
+                    seller_type = excluded.seller_type
+                """,
+                rows,
+            )
+            c.executemany("DELETE FROM seller_products WHERE seller_id = ?", [(r[0],) for r in rows])
+            c.executemany("INSERT OR IGNORE INTO seller_products (seller_id, product_id) VALUES (?, ?)", links)
+            c.executemany(
+                "INSERT OR REPLACE INTO seller_locations (id, min_lat, max_lat, min_lng, max_lng) "
+                "SELECT seller_key, lat, lat, lng, lng FROM sellers WHERE id = ?",
+                [(r[0],) for r in rows],
+            )
+        except Exception:
+            c.rollback()
+            raise
+        c.commit()
+        _bump_catalog_version()
+        return len(rows)
+
+    return _tx(conn) if conn is not None else run_write(_tx)
 
 
 def _seed_orders(conn: sqlite3.Connection, products: List[Dict[str, Any]]) -> None:
@@ -166,24 +511,25 @@ def _seed_orders(conn: sqlite3.Connection, products: List[Dict[str, Any]]) -> No
         for i in range(366):
             d = start + timedelta(days=i)
             week = (d.timetuple().tm_yday / 365.0) * 2.0 * 3.1415926535
-            seasonal = 1.0 + 0.18 * (0.5 * (1.0 + __import__("math").sin(week)))
+            seasonal = 1.0 + 0.18 * (0.5 * (1.0 + math.sin(week)))
             weekday = d.weekday()
             weekly = 1.0 + (0.08 if weekday in (4, 5) else -0.03 if weekday in (0,) else 0.0)
-            noise = max(0.6, min(1.4, 1.0 + __import__("random").uniform(-0.12, 0.12)))
+            noise = max(0.6, min(1.4, 1.0 + random.uniform(-0.12, 0.12)))
             kg = max(1.0, base * seasonal * weekly * noise)
             rows.append((d.isoformat(), product_id, float(round(kg, 3))))
 
-    conn.executemany("INSERT INTO orders (created_at, product_id, weight_kg) VALUES (?, ?, ?)", rows)
-    conn.commit()
+    insert_orders(rows, conn=conn)
     logger.info(f"Seeded orders: {len(rows)}")
 
 
+@timed_query("fetch_products")
 def fetch_products() -> List[Dict[str, Any]]:
     conn = get_db()
     cur = conn.execute("SELECT id, name, icon, image_url, price_per_unit, unit FROM products ORDER BY name ASC")
     return [dict(r) for r in cur.fetchall()]
 
 
+@timed_query("fetch_product_by_id")
 def fetch_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
     conn = get_db()
     cur = conn.execute(
@@ -194,47 +540,719 @@ def fetch_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
     return dict(row) if row else None
 
 
+_SELLER_COLUMNS = "s.id, s.name, s.products_json, s.lat, s.lng, s.rating, s.trips_count, s.seller_type"
+
+
+@timed_query("fetch_sellers")
 def fetch_sellers(product_id: Optional[str] = None) -> List[Dict[str, Any]]:
     conn = get_db()
-    cur = conn.execute("SELECT id, name, products_json, lat, lng, rating, trips_count, seller_type FROM sellers")
-    sellers: List[Dict[str, Any]] = []
-    for r in cur.fetchall():
-        products = json.loads(r["products_json"]) if r["products_json"] else []
-        if product_id and product_id not in products:
-            continue
-        sellers.append(
-            {
-                "id": r["id"],
-                "name": r["name"],
-                "products": products,
-                "coordinates": {"lat": float(r["lat"]), "lng": float(r["lng"])},
-                "rating": float(r["rating"]),
-                "trips_count": int(r["trips_count"]),
-                "type": r["seller_type"],
-            }
+    if product_id:
+        # Solo se leen los vendedores del producto vía idx_seller_products_product (orden de alta)
+        cur = conn.execute(
+            f"""
+            SELECT {_SELLER_COLUMNS}
+            FROM seller_products sp
+            JOIN sellers s ON s.id = sp.seller_id
+            WHERE sp.product_id = ?
+            ORDER BY s.seller_key
+            """,
+            (product_id,),
         )
+    else:
+        cur = conn.execute(f"SELECT {_SELLER_COLUMNS} FROM sellers s ORDER BY s.seller_key")
+    return [_seller_from_row(r) for r in cur.fetchall()]
+
+
+def _seller_from_row(r: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": r["id"],
+        "name": r["name"],
+        "products": json.loads(r["products_json"]) if r["products_json"] else [],
+        "coordinates": {"lat": float(r["lat"]), "lng": float(r["lng"])},
+        "rating": float(r["rating"]),
+        "trips_count": int(r["trips_count"]),
+        "type": r["seller_type"],
+    }
+
+
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEG_LAT = 111.32
+_NEAR_START_RADIUS_KM = 5.0
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2.0) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _bbox(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    dlat = radius_km / _KM_PER_DEG_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(180.0, radius_km / (_KM_PER_DEG_LAT * cos_lat))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+@timed_query("fetch_sellers_near")
+def fetch_sellers_near(
+    product_id: Optional[str],
+    lat: float,
+    lng: float,
+    radius_km: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Vendedores (opcionalmente de un producto) ordenados por distancia en línea recta al punto.
+
+    El R*Tree `seller_locations` filtra por caja envolvente y la distancia exacta (haversine) se
+    calcula solo sobre esos candidatos. Sin `radius_km`, la caja crece desde 5 km hasta reunir
+    `limit` vendedores. Cada resultado incluye `distance_km`.
+    """
+    conn = get_db()
+    sql = f"""
+        SELECT {_SELLER_COLUMNS}
+        FROM seller_locations loc
+        JOIN sellers s ON s.seller_key = loc.id
+        WHERE loc.min_lat <= ? AND loc.max_lat >= ? AND loc.min_lng <= ? AND loc.max_lng >= ?
+    """
+    if product_id:
+        sql += " AND EXISTS (SELECT 1 FROM seller_products sp WHERE sp.seller_id = s.id AND sp.product_id = ?)"
+
+    def _candidates(r_km: float) -> List[Tuple[float, sqlite3.Row]]:
+        lat_min, lat_max, lng_min, lng_max = _bbox(lat, lng, r_km)
+        params: List[Any] = [lat_max, lat_min, lng_max, lng_min]
+        if product_id:
+            params.append(product_id)
+        found = [(haversine_km(lat, lng, float(r["lat"]), float(r["lng"])), r) for r in conn.execute(sql, params)]
+        return [(d, r) for d, r in found if d <= r_km]
+
+    if radius_km is not None:
+        found = _candidates(float(radius_km))
+    else:
+        # Búsqueda incremental: la caja se duplica hasta tener `limit` vendedores dentro del radio
+        want = int(limit) if limit else 1
+        r_km = _NEAR_START_RADIUS_KM
+        while True:
+            found = _candidates(r_km)
+            if len(found) >= want or r_km >= math.pi * EARTH_RADIUS_KM:
+                break
+            r_km *= 2.0
+
+    found.sort(key=lambda x: x[0])
+    if limit is not None:
+        found = found[: int(limit)]
+    sellers = []
+    for d, r in found:
+        seller = _seller_from_row(r)
+        seller["distance_km"] = round(d, 4)
+        sellers.append(seller)
     return sellers
 
 
+def _float_or_none(v: Any) -> Optional[float]:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+def simulation_event_row(event_type: str, payload: Dict[str, Any]) -> Tuple[Any, ...]:
+    """
+    Fila para `insert_simulation_events`: (created_at, event_type, simulation_id, trigger_progress,
+    distance_added_m, new_duration_min, payload_json). Los campos de análisis se copian del payload.
+    """
+    impact = payload.get("impact_metrics") or {}
+    simulation_id = payload.get("simulation_id")
+    return (
+        datetime.utcnow().isoformat(),
+        str(event_type),
+        str(simulation_id) if simulation_id is not None else None,
+        _float_or_none(payload.get("trigger_progress")),
+        _float_or_none(impact.get("distance_added")),
+        _float_or_none(impact.get("new_duration")),
+        json.dumps(payload, ensure_ascii=False),
+    )
+
+
+def _simulation_event_deltas(rows: Iterable[Tuple[Any, ...]]) -> Dict[Tuple[str, str], List[float]]:
+    deltas: Dict[Tuple[str, str], List[float]] = {}
+    for created_at, event_type, _, _, distance, duration, _ in rows:
+        acc = deltas.setdefault((str(created_at)[:10], event_type), [0, 0, 0.0, 0.0])
+        acc[0] += 1
+        if distance is not None or duration is not None:
+            acc[1] += 1
+            acc[2] += distance or 0.0
+            acc[3] += duration or 0.0
+    return deltas
+
+
+def insert_simulation_events(rows: List[Tuple[Any, ...]]) -> int:
+    """
+    Inserta un lote de eventos (filas de `simulation_event_row`) y actualiza el agregado diario
+    `simulation_event_daily` en la misma transacción, con un único commit.
+    """
+    if not rows:
+        return 0
+    deltas = _simulation_event_deltas(rows)
+
+    def _tx(conn: sqlite3.Connection) -> None:
+        conn.executemany(
+            """
+            INSERT INTO simulation_events
+                (created_at, event_type, simulation_id, trigger_progress, distance_added_m, new_duration_min, payload_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        conn.executemany(
+            """
+            INSERT INTO simulation_event_daily (day, event_type, n_events, n_impact, sum_distance_added_m, sum_new_duration_min)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(day, event_type) DO UPDATE SET
+                n_events = n_events + excluded.n_events,
+                n_impact = n_impact + excluded.n_impact,
+                sum_distance_added_m = sum_distance_added_m + excluded.sum_distance_added_m,
+                sum_new_duration_min = sum_new_duration_min + excluded.sum_new_duration_min
+            """,
+            [(day, et, n, ni, d, m) for (day, et), (n, ni, d, m) in deltas.items()],
+        )
+
+    run_write(_tx)
+    return len(rows)
+
+
+def rebuild_simulation_event_rollups(conn: Optional[sqlite3.Connection] = None) -> int:
+    """Recalcula `simulation_event_daily` desde los eventos vivos (no incluye los archivados)."""
+
+    def _tx(c: sqlite3.Connection) -> int:
+        try:
+            c.execute("DELETE FROM simulation_event_daily")
+            c.execute(
+                """
+                INSERT INTO simulation_event_daily (day, event_type, n_events, n_impact, sum_distance_added_m, sum_new_duration_min)
+                SELECT substr(created_at, 1, 10), event_type, COUNT(1),
+                       SUM(CASE WHEN distance_added_m IS NOT NULL OR new_duration_min IS NOT NULL THEN 1 ELSE 0 END),
+                       COALESCE(SUM(distance_added_m), 0.0), COALESCE(SUM(new_duration_min), 0.0)
+                FROM simulation_events
+                GROUP BY substr(created_at, 1, 10), event_type
+                """
+            )
+            n = _count(c, "simulation_event_daily")
+        except Exception:
+            c.rollback()
+            raise
+        c.commit()
+        logger.info(f"Rebuilt simulation_event_daily: {n} rows")
+        return n
+
+    return _tx(conn) if conn is not None else run_write(_tx)
+
+
+def _impact_summary(n_events: int, n_impact: int, sum_distance: float, sum_duration: float) -> Dict[str, Any]:
+    return {
+        "n_events": int(n_events),
+        "n_with_impact": int(n_impact),
+        "avg_distance_added_m": round(sum_distance / n_impact, 3) if n_impact else None,
+        "avg_new_duration_min": round(sum_duration / n_impact, 3) if n_impact else None,
+    }
+
+
+@timed_query("fetch_simulation_event_stats")
+def fetch_simulation_event_stats(
+    since_iso: Optional[str] = None,
+    until_iso: Optional[str] = None,
+    event_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Totales y promedios por tipo de evento y por día, leídos del agregado `simulation_event_daily`."""
+    where, params = [], []
+    if since_iso:
+        where.append("day >= ?")
+        params.append(since_iso[:10])
+    if until_iso:
+        where.append("day <= ?")
+        params.append(until_iso[:10])
+    if event_type:
+        where.append("event_type = ?")
+        params.append(event_type)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    rows = get_db().execute(
+        f"""
+        SELECT day, event_type, n_events, n_impact, sum_distance_added_m, sum_new_duration_min
+        FROM simulation_event_daily {clause}
+        ORDER BY day ASC, event_type ASC
+        """,
+        params,
+    ).fetchall()
+
+    totals: Dict[str, List[float]] = {}
+    daily = []
+    for r in rows:
+        acc = totals.setdefault(r["event_type"], [0, 0, 0.0, 0.0])
+        acc[0] += r["n_events"]
+        acc[1] += r["n_impact"]
+        acc[2] += r["sum_distance_added_m"]
+        acc[3] += r["sum_new_duration_min"]
+        daily.append(
+            {"day": r["day"], "event_type": r["event_type"], **_impact_summary(*tuple(r)[2:])}
+        )
+    return {
+        "by_event_type": {et: _impact_summary(*acc) for et, acc in sorted(totals.items())},
+        "daily": daily,
+    }
+
+
+@timed_query("fetch_simulation_stats")
+def fetch_simulation_stats(simulation_id: str) -> Dict[str, Any]:
+    """Totales por tipo de evento de una simulación (índice idx_simulation_events_simulation)."""
+    rows = get_db().execute(
+        """
+        SELECT event_type, COUNT(1) AS n_events,
+               SUM(CASE WHEN distance_added_m IS NOT NULL OR new_duration_min IS NOT NULL THEN 1 ELSE 0 END) AS n_impact,
+               COALESCE(SUM(distance_added_m), 0.0) AS sum_distance,
+               COALESCE(SUM(new_duration_min), 0.0) AS sum_duration,
+               MAX(trigger_progress) AS max_progress
+        FROM simulation_events
+        WHERE simulation_id = ?
+        GROUP BY event_type
+        ORDER BY event_type ASC
+        """,
+        (simulation_id,),
+    ).fetchall()
+    return {
+        "simulation_id": simulation_id,
+        "by_event_type": {
+            r["event_type"]: {
+                **_impact_summary(r["n_events"], r["n_impact"], r["sum_distance"], r["sum_duration"]),
+                "max_trigger_progress": r["max_progress"],
+            }
+            for r in rows
+        },
+    }
+
+
+_ARCHIVE_COLUMNS = ("id", "created_at", "event_type", "simulation_id", "trigger_progress", "distance_added_m", "new_duration_min", "payload_json")
+
+
+def compact_simulation_events(
+    older_than_days: int = 30,
+    batch_size: int = 20000,
+    now: Optional[datetime] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """
+    Retención de `simulation_events`: los eventos anteriores al corte se agrupan por mes, se
+    guardan comprimidos (zlib, JSON por lotes) en `simulation_event_archives` y se borran de la
+    tabla viva. Cada lote es una transacción; el agregado diario conserva sus totales.
+    `should_stop` se consulta entre lotes (cancelación); lo ya archivado queda confirmado.
+    """
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=int(older_than_days))).isoformat()
+    select_sql = f"SELECT {', '.join(_ARCHIVE_COLUMNS)} FROM simulation_events WHERE created_at < ? ORDER BY id LIMIT ?"
+
+    def _tx(conn: sqlite3.Connection) -> Tuple[int, int, int, List[str]]:
+        rows = conn.execute(select_sql, (cutoff, int(batch_size))).fetchall()
+        if not rows:
+            return 0, 0, 0, []
+        by_partition: Dict[str, List[sqlite3.Row]] = {}
+        for r in rows:
+            by_partition.setdefault(r["created_at"][:7], []).append(r)
+        archived_at = datetime.utcnow().isoformat()
+        raw_total = compressed_total = 0
+        for partition, part_rows in by_partition.items():
+            raw = json.dumps([list(r) for r in part_rows], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            data = zlib.compress(raw, 6)
+            raw_total += len(raw)
+            compressed_total += len(data)
+            conn.execute(
+                """
+                INSERT INTO simulation_event_archives
+                    (partition, first_event_id, last_event_id, n_events, min_created_at, max_created_at, codec, raw_bytes, data, archived_at)
+                VALUES (?, ?, ?, ?, ?, ?, 'zlib', ?, ?, ?)
+                """,
+                (
+                    partition,
+                    part_rows[0]["id"],
+                    part_rows[-1]["id"],
+                    len(part_rows),
+                    min(r["created_at"] for r in part_rows),
+                    max(r["created_at"] for r in part_rows),
+                    len(raw),
+                    sqlite3.Binary(data),
+                    archived_at,
+                ),
+            )
+        conn.execute("DELETE FROM simulation_events WHERE id IN (SELECT id FROM simulation_events WHERE created_at < ? ORDER BY id LIMIT ?)", (cutoff, int(batch_size)))
+        return len(rows), raw_total, compressed_total, sorted(by_partition)
+
+    archived = raw_bytes = compressed_bytes = 0
+    partitions: set = set()
+    while not (should_stop is not None and should_stop()):
+        n, raw, compressed, parts = run_write(_tx)
+        if n == 0:
+            break
+        archived += n
+        raw_bytes += raw
+        compressed_bytes += compressed
+        partitions.update(parts)
+    result = {
+        "cutoff": cutoff,
+        "archived": archived,
+        "partitions": sorted(partitions),
+        "raw_bytes": raw_bytes,
+        "compressed_bytes": compressed_bytes,
+    }
+    if archived:
+        logger.info(f"Compacted {archived} simulation events into {len(partitions)} partitions", extra={"compaction": result})
+    return result
+
+
+def compact_simulation_events_job(
+    artifact_path: Optional[str],
+    older_than_days: int,
+    batch_size: int = 2000,
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Adaptador para el runner de jobs (tipo en proceso): lotes acotados por `run_write`, en cola
+    con el resto de escrituras de la app en vez de competir por el lock de escritura de SQLite.
+    """
+    return compact_simulation_events(
+        older_than_days=older_than_days,
+        batch_size=batch_size,
+        should_stop=cancel_event.is_set if cancel_event is not None else None,
+    )
+
+
+@timed_query("fetch_simulation_event_archives")
+def fetch_simulation_event_archives() -> List[Dict[str, Any]]:
+    rows = get_db().execute(
+        """
+        SELECT partition, COUNT(1) AS chunks, SUM(n_events) AS n_events, MIN(min_created_at) AS min_created_at,
+               MAX(max_created_at) AS max_created_at, SUM(raw_bytes) AS raw_bytes, SUM(length(data)) AS compressed_bytes
+        FROM simulation_event_archives
+        GROUP BY partition
+        ORDER BY partition ASC
+        """
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+@timed_query("fetch_archived_simulation_events")
+def fetch_archived_simulation_events(partition: str) -> List[Dict[str, Any]]:
+    """Descomprime los eventos archivados de un mes ("YYYY-MM")."""
+    events: List[Dict[str, Any]] = []
+    for r in get_db().execute("SELECT codec, data FROM simulation_event_archives WHERE partition = ? ORDER BY id", (partition,)):
+        if r["codec"] != "zlib":
+            raise ValueError(f"Codec no soportado: {r['codec']}")
+        events.extend(dict(zip(_ARCHIVE_COLUMNS, values)) for values in json.loads(zlib.decompress(r["data"])))
+    return events
+
+
 def log_simulation_event(event_type: str, payload: Dict[str, Any]) -> None:
+    insert_simulation_events([simulation_event_row(event_type, payload)])
+
+
+_ROLLUPS: Dict[str, Tuple[str, str]] = {
+    # granularidad -> (tabla, columna de período)
+    "day": ("daily_demand", "day"),
+    "week": ("weekly_demand", "week_start"),
+    "month": ("monthly_demand", "month"),
+}
+
+
+def _week_start(day: str) -> str:
+    d = datetime.strptime(day, "%Y-%m-%d")
+    return (d - timedelta(days=d.weekday())).strftime("%Y-%m-%d")
+
+
+def daily_rollup_deltas(rows: Iterable[Tuple[str, str, float]]) -> Dict[Tuple[str, str], List[float]]:
+    """Agrupa pedidos (created_at, product_id, weight_kg) en deltas {(product_id, day): [kg, n]}."""
+    daily: Dict[Tuple[str, str], List[float]] = {}
+    for created_at, product_id, weight_kg in rows:
+        acc = daily.setdefault((product_id, created_at[:10]), [0.0, 0])
+        acc[0] += weight_kg
+        acc[1] += 1
+    return daily
+
+
+def _apply_rollup_deltas(conn: sqlite3.Connection, daily: Dict[Tuple[str, str], List[float]]) -> None:
+    """Suma los deltas diarios a los agregados diario/semanal/mensual."""
+    weekly: Dict[Tuple[str, str], List[float]] = {}
+    monthly: Dict[Tuple[str, str], List[float]] = {}
+    week_starts: Dict[str, str] = {}
+    for (product_id, day), (kg, n) in daily.items():
+        week = week_starts.get(day)
+        if week is None:
+            week = week_starts[day] = _week_start(day)
+        for bucket, key in ((weekly, (product_id, week)), (monthly, (product_id, day[:7]))):
+            acc = bucket.setdefault(key, [0.0, 0])
+            acc[0] += kg
+            acc[1] += n
+
+    for granularity, deltas in (("day", daily), ("week", weekly), ("month", monthly)):
+        table, period = _ROLLUPS[granularity]
+        conn.executemany(
+            f"INSERT INTO {table} (product_id, {period}, total_kg, n_orders) VALUES (?, ?, ?, ?) "
+            f"ON CONFLICT(product_id, {period}) DO UPDATE SET "
+            "total_kg = total_kg + excluded.total_kg, n_orders = n_orders + excluded.n_orders",
+            [(pid, key, kg, n) for (pid, key), (kg, n) in deltas.items()],
+        )
+
+
+def insert_orders(
+    rows: List[Tuple[str, str, float]],
+    conn: Optional[sqlite3.Connection] = None,
+    commit: bool = True,
+    daily_deltas: Optional[Dict[Tuple[str, str], List[float]]] = None,
+) -> int:
+    """
+    Inserta pedidos (created_at, product_id, weight_kg) y actualiza los agregados de demanda
+    en la misma transacción. Es la única vía de escritura de `orders`. Si el llamador ya
+    agregó el lote (p. ej. con pandas) puede pasar `daily_deltas` para no recorrer las filas.
+    """
+    if daily_deltas is None:
+        daily_deltas = daily_rollup_deltas(rows)
+
+    def _tx(c: sqlite3.Connection) -> int:
+        try:
+            c.executemany("INSERT INTO orders (created_at, product_id, weight_kg) VALUES (?, ?, ?)", rows)
+            _apply_rollup_deltas(c, daily_deltas)
+        except Exception:
+            c.rollback()
+            raise
+        if commit:
+            c.commit()
+        return len(rows)
+
+    return _tx(conn) if conn is not None else run_write(_tx)
+
+
+def rebuild_demand_rollups(conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+    """Recalcula desde cero los agregados diario/semanal/mensual a partir de `orders`."""
+    if conn is None:
+        return run_write(rebuild_demand_rollups)
+    with conn:
+        for table, _ in _ROLLUPS.values():
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute(
+            """
+            INSERT INTO daily_demand (product_id, day, total_kg, n_orders)
+            SELECT product_id, substr(created_at, 1, 10), SUM(weight_kg), COUNT(1)
+            FROM orders
+            GROUP BY product_id, substr(created_at, 1, 10)
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO weekly_demand (product_id, week_start, total_kg, n_orders)
+            SELECT product_id, date(day, 'weekday 0', '-6 days') AS week_start, SUM(total_kg), SUM(n_orders)
+            FROM daily_demand
+            GROUP BY product_id, week_start
+            """
+        )
+        conn.execute(
+            """
+            INSERT INTO monthly_demand (product_id, month, total_kg, n_orders)
+            SELECT product_id, substr(day, 1, 7) AS month, SUM(total_kg), SUM(n_orders)
+            FROM daily_demand
+            GROUP BY product_id, month
+            """
+        )
+    counts = {table: _count(conn, table) for table, _ in _ROLLUPS.values()}
+    logger.info(f"Rebuilt demand rollups: {counts}")
+    return counts
+
+
+@timed_query("fetch_demand_rollup")
+def fetch_demand_rollup(product_id: str, since_iso: str, granularity: str = "day") -> List[Dict[str, Any]]:
+    if granularity not in _ROLLUPS:
+        raise ValueError(f"granularity inválida: {granularity}. Valores permitidos: {sorted(_ROLLUPS)}")
+    table, period = _ROLLUPS[granularity]
+    since = since_iso[:10] if granularity != "month" else since_iso[:7]
+    if granularity == "week":
+        since = _week_start(since)
     conn = get_db()
-    conn.execute(
-        "INSERT INTO simulation_events (created_at, event_type, payload_json) VALUES (?, ?, ?)",
-        (datetime.utcnow().isoformat(), str(event_type), json.dumps(payload, ensure_ascii=False)),
+    cur = conn.execute(
+        f"SELECT {period} AS period, total_kg, n_orders FROM {table} "
+        f"WHERE product_id = ? AND {period} >= ? ORDER BY {period} ASC",
+        (product_id, since),
     )
-    conn.commit()
+    return [{"period": r["period"], "total_kg": float(r["total_kg"]), "n_orders": int(r["n_orders"])} for r in cur.fetchall()]
 
 
+@timed_query("fetch_daily_demand")
 def fetch_daily_demand(product_id: str, since_iso: str) -> List[Tuple[str, float]]:
+    """Serie diaria desde el agregado `daily_demand` (días completos a partir del día de `since_iso`)."""
     conn = get_db()
     cur = conn.execute(
-        """
-        SELECT substr(created_at, 1, 10) AS day, SUM(weight_kg) AS total
-        FROM orders
-        WHERE product_id = ? AND created_at >= ?
-        GROUP BY day
-        ORDER BY day ASC
-        """,
-        (product_id, since_iso),
+        "SELECT day, total_kg FROM daily_demand WHERE product_id = ? AND day >= ? ORDER BY day ASC",
+        (product_id, since_iso[:10]),
+    )
+    return [(str(r["day"]), float(r["total_kg"])) for r in cur.fetchall()]
+
+
+@timed_query("fetch_daily_demand_all")
+def fetch_daily_demand_all(since_iso: str, product_ids: Optional[Iterable[str]] = None) -> Dict[str, List[Tuple[str, float]]]:
+    """Serie diaria de todos los productos en una sola lectura de `daily_demand`."""
+    conn = get_db()
+    cur = conn.execute(
+        "SELECT product_id, day, total_kg FROM daily_demand WHERE day >= ? ORDER BY product_id ASC, day ASC",
+        (since_iso[:10],),
     )
-    return [(str(r["day"]), float(r["total"])) for r in cur.fetchall()]
+    wanted = set(product_ids) if product_ids is not None else None
+    out: Dict[str, List[Tuple[str, float]]] = {pid: [] for pid in wanted} if wanted is not None else {}
+    for r in cur.fetchall():
+        pid = str(r["product_id"])
+        if wanted is not None and pid not in wanted:
+            continue
+        out.setdefault(pid, []).append((str(r["day"]), float(r["total_kg"])))
+    return out
+
+
+_JOB_COLUMNS = ("status", "result_json", "error", "cancel_requested", "started_at", "finished_at")
+
+
+def _job_from_row(r: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": r["id"],
+        "kind": r["kind"],
+        "status": r["status"],
+        "params": json.loads(r["params_json"]) if r["params_json"] else {},
+        "result": json.loads(r["result_json"]) if r["result_json"] else None,
+        "error": r["error"],
+        "cancel_requested": bool(r["cancel_requested"]),
+        "created_at": r["created_at"],
+        "started_at": r["started_at"],
+        "finished_at": r["finished_at"],
+    }
+
+
+def insert_job(job_id: str, kind: str, params: Dict[str, Any], status: str = "queued") -> Dict[str, Any]:
+    row = (job_id, kind, status, json.dumps(params, ensure_ascii=False), datetime.utcnow().isoformat())
+    run_write(lambda conn: conn.execute("INSERT INTO jobs (id, kind, status, params_json, created_at) VALUES (?, ?, ?, ?, ?)", row))
+    return fetch_job(job_id)
+
+
+def update_job(job_id: str, **fields: Any) -> None:
+    if "result" in fields:
+        result = fields.pop("result")
+        fields["result_json"] = json.dumps(result, ensure_ascii=False) if result is not None else None
+    unknown = set(fields) - set(_JOB_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+    if not fields:
+        return
+    assignments = ", ".join(f"{k} = ?" for k in fields)
+    values = (*fields.values(), job_id)
+    run_write(lambda conn: conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", values))
+
+
+@timed_query("fetch_job")
+def fetch_job(job_id: str) -> Optional[Dict[str, Any]]:
+    conn = get_db()
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job_from_row(row) if row else None
+
+
+@timed_query("fetch_jobs")
+def fetch_jobs(limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    conn = get_db()
+    if status:
+        cur = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, int(limit)))
+    else:
+        cur = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (int(limit),))
+    return [_job_from_row(r) for r in cur.fetchall()]
+
+
+def mark_interrupted_jobs() -> int:
+    """Marca como fallidos los jobs que quedaron en curso cuando el proceso anterior se detuvo."""
+    finished_at = datetime.utcnow().isoformat()
+
+    def _tx(conn: sqlite3.Connection) -> int:
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart', finished_at = ? "
+            "WHERE status IN ('queued', 'running')",
+            (finished_at,),
+        )
+        return int(cur.rowcount or 0)
+
+    return run_write(_tx)
+
+
+@timed_query("fetch_orders_watermark")
+def fetch_orders_watermark() -> int:
+    """Id más alto de `orders`; cambia cuando llegan pedidos nuevos."""
+    conn = get_db()
+    row = conn.execute("SELECT COALESCE(MAX(id), 0) AS w FROM orders").fetchone()
+    return int(row["w"]) if row else 0
+
+
+@timed_query("fetch_orders_watermarks")
+def fetch_orders_watermarks(since_id: int = 0) -> Dict[str, int]:
+    """
+    Id más alto de `orders` por producto, solo entre los pedidos con id > `since_id`
+    (rango sobre la clave primaria: con la marca anterior se leen únicamente los pedidos nuevos).
+    """
+    conn = get_db()
+    cur = conn.execute("SELECT product_id, MAX(id) AS w FROM orders WHERE id > ? GROUP BY product_id", (int(since_id),))
+    return {r["product_id"]: int(r["w"]) for r in cur.fetchall()}
+
+
+def replace_demand_forecasts(
+    product_id: str,
+    model_version: str,
+    rows: List[Tuple[str, float, float, float]],
+    artifact_mtime_ns: int,
+    orders_watermark: int,
+) -> None:
+    """
+    Reemplaza en una sola transacción el pronóstico materializado de un producto.
+    `rows` son tuplas (day, forecast, lower_bound, upper_bound).
+    """
+    generated_at = datetime.utcnow().isoformat()
+
+    def _tx(conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM demand_forecasts WHERE product_id = ?", (product_id,))
+        conn.executemany(
+            "INSERT INTO demand_forecasts (product_id, model_version, day, forecast, lower_bound, upper_bound, generated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(product_id, model_version, d, f, lo, up, generated_at) for d, f, lo, up in rows],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO demand_forecast_runs "
+            "(product_id, model_version, artifact_mtime_ns, horizon_days, orders_watermark, generated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (product_id, model_version, int(artifact_mtime_ns), len(rows), int(orders_watermark), generated_at),
+        )
+
+    run_write(_tx)
+
+
+@timed_query("fetch_demand_forecast_run")
+def fetch_demand_forecast_run(product_id: str) -> Optional[Dict[str, Any]]:
+    conn = get_db()
+    row = conn.execute("SELECT * FROM demand_forecast_runs WHERE product_id = ?", (product_id,)).fetchone()
+    return dict(row) if row else None
+
+
+@timed_query("fetch_demand_forecast_runs")
+def fetch_demand_forecast_runs() -> List[Dict[str, Any]]:
+    conn = get_db()
+    cur = conn.execute("SELECT * FROM demand_forecast_runs ORDER BY product_id ASC")
+    return [dict(r) for r in cur.fetchall()]
+
+
+@timed_query("fetch_materialized_forecast")
+def fetch_materialized_forecast(product_id: str, model_version: str, days: int) -> List[Dict[str, Any]]:
+    conn = get_db()
+    cur = conn.execute(
+        "SELECT day, forecast, lower_bound, upper_bound FROM demand_forecasts "
+        "WHERE product_id = ? AND model_version = ? ORDER BY day ASC LIMIT ?",
+        (product_id, model_version, int(days)),
+    )
+    return [
+        {"date": r["day"], "forecast": r["forecast"], "lower_bound": r["lower_bound"], "upper_bound": r["upper_bound"]}
+        for r in cur.fetchall()
+    ]
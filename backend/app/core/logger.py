@@ -1,9 +1,39 @@
-
+import atexit
 import logging
 import json
+import queue
 import sys
+import threading
+import time
 from datetime import datetime
-from typing import Any, Dict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+try:
+    import orjson
+
+    def _dumps(obj: Dict[str, Any]) -> str:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+
+except ImportError:  # pragma: no cover - orjson es opcional
+
+    def _dumps(obj: Dict[str, Any]) -> str:
+        return json.dumps(obj, default=str)
+
+
+# Atributos estándar de LogRecord: no se copian como campos extra
+_RESERVED_ATTRS = frozenset(
+    [
+        "args", "asctime", "created", "exc_info", "exc_text", "filename",
+        "funcName", "levelname", "levelno", "lineno", "module",
+        "msecs", "message", "msg", "name", "pathname", "process",
+        "processName", "relativeCreated", "stack_info", "thread", "threadName",
+        "taskName", "request_id", "path", "method", "duration_ms",
+    ]
+)
+
 
 class JsonFormatter(logging.Formatter):
     """
@@ -19,48 +49,158 @@ class JsonFormatter(logging.Formatter):
             "funcName": record.funcName,
             "lineNo": record.lineno,
         }
-        
+
         # Add extra fields that are not standard LogRecord attributes
-        if hasattr(record, "request_id"):
-            log_record["request_id"] = record.request_id
-            
-        if hasattr(record, "path"):
-             log_record["path"] = record.path
-             
-        if hasattr(record, "method"):
-             log_record["method"] = record.method
-             
-        if hasattr(record, "duration_ms"):
-             log_record["duration_ms"] = record.duration_ms
+        d = record.__dict__
+        for key in ("request_id", "path", "method", "duration_ms"):
+            if key in d:
+                log_record[key] = d[key]
 
         # Include any other extra fields
-        for key, value in record.__dict__.items():
-            if key not in ["args", "asctime", "created", "exc_info", "exc_text", "filename", 
-                           "funcName", "levelname", "levelno", "lineno", "module", 
-                           "msecs", "message", "msg", "name", "pathname", "process", 
-                           "processName", "relativeCreated", "stack_info", "thread", "threadName",
-                           "request_id", "path", "method", "duration_ms"]: # Skip already handled or standard
-                if not key.startswith("_"):
-                    log_record[key] = value
+        for key, value in d.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                log_record[key] = value
 
         if record.exc_info:
             log_record["exception"] = self.formatException(record.exc_info)
-            
-        return json.dumps(log_record)
+        elif record.exc_text:
+            log_record["exception"] = record.exc_text
+
+        return _dumps(log_record)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    Encola el registro sin formatearlo: el JSON se arma y se escribe en el hilo del listener.
+
+    Con la cola llena el registro se descarta (y se cuenta) en lugar de bloquear la petición.
+    """
+
+    def __init__(self, q: "queue.SimpleQueue[logging.LogRecord]", maxsize: int):
+        super().__init__(q)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Solo se resuelve lo que no puede viajar a otro hilo: args del mensaje y la traza
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue (en C, sin Condition) es bastante más barata que queue.Queue; el límite
+        # se aplica leyendo su tamaño
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class _BatchingQueueListener(QueueListener):
+    """
+    QueueListener que escribe por lotes: despierta cada `flush_interval_s`, formatea todo lo
+    pendiente y hace un solo write + flush. Evita despertar al hilo (y pelear por el GIL) en
+    cada registro.
+    """
+
+    def __init__(self, q, handler: logging.StreamHandler, flush_interval_s: float = 0.05, max_batch: int = 1000):
+        super().__init__(q, handler, respect_handler_level=False)
+        self.flush_interval_s = float(max(0.001, flush_interval_s))
+        self.max_batch = int(max(1, max_batch))
+
+    def _write(self, records) -> None:
+        handler = self.handlers[0]
+        lines = []
+        for record in records:
+            try:
+                lines.append(handler.format(record))
+            except Exception:
+                handler.handleError(record)
+        if not lines:
+            return
+        with handler.lock:
+            try:
+                handler.stream.write("\n".join(lines) + "\n")
+                handler.flush()
+            except Exception:
+                handler.handleError(records[-1])
+
+    def _monitor(self) -> None:
+        q = self.queue
+        stopping = False
+        while not stopping:
+            time.sleep(self.flush_interval_s)
+            batch = []
+            while True:
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stopping = True
+                    break
+                batch.append(record)
+                if len(batch) >= self.max_batch:
+                    self._write(batch)
+                    batch = []
+            self._write(batch)
+
+
+_pipeline_lock = threading.Lock()
+_queue_handler: Optional[_DroppingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _shared_handler() -> logging.Handler:
+    """Handler compartido por todos los loggers de la app (cola + listener, o stdout directo)."""
+    global _queue_handler, _listener
+    if not settings.LOG_ASYNC:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        return handler
+    with _pipeline_lock:
+        if _queue_handler is None:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(JsonFormatter())
+            q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            _queue_handler = _DroppingQueueHandler(q, max(1, settings.LOG_QUEUE_MAX))
+            _listener = _BatchingQueueListener(q, stream, flush_interval_s=settings.LOG_FLUSH_INTERVAL_S)
+            _listener.start()
+            atexit.register(stop_logging)
+        return _queue_handler
+
+
+def stop_logging() -> None:
+    """Vacía la cola de logs y detiene el hilo escritor."""
+    global _listener
+    with _pipeline_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def logging_stats() -> Dict[str, Any]:
+    handler = _queue_handler
+    return {
+        "async": handler is not None,
+        "pending": handler.queue.qsize() if handler is not None else 0,
+        "dropped": handler.dropped if handler is not None else 0,
+    }
+
 
 def get_logger(name: str):
     logger = logging.getLogger(name)
-    
+
     # If logger already has handlers, assume it's configured
-    if logger.hasHandlers():
+    # (solo los propios: un basicConfig en la raíz no debe desviar los logs de la app)
+    if logger.handlers:
         return logger
-        
-    logger.setLevel(logging.INFO)
-    
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JsonFormatter())
-    
-    logger.addHandler(handler)
+
+    logger.setLevel(getattr(logging, str(settings.LOG_LEVEL).upper(), logging.INFO))
+    logger.addHandler(_shared_handler())
     logger.propagate = False
-    
+
     return logger
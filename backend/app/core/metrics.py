@@ -0,0 +1,323 @@
+import abc
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.tracing import span
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+NODE_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+
+
+def _format_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if v == -math.inf:
+        return "-Inf"
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        lock = self._lock
+        lock.acquire()
+        self._value += amount
+        lock.release()
+
+    def get(self) -> float:
+        return self._value
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_fn", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._fn: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, fn: Optional[Callable[[], float]]) -> None:
+        """El valor se lee de `fn()` en cada exposición (profundidad de colas, tamaño de cachés...)."""
+        self._fn = fn
+
+    def get(self) -> float:
+        fn = self._fn
+        if fn is None:
+            return self._value
+        try:
+            return float(fn())
+        except Exception:
+            return math.nan
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # Un contador por cubeta (no acumulado) más la cubeta +Inf; se acumulan al exponer
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._bounds, value)
+        # acquire/release explícitos: más baratos que `with` en esta ruta caliente
+        lock = self._lock
+        lock.acquire()
+        self._counts[i] += 1
+        self._sum += value
+        lock.release()
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        # Sin etiquetas, la métrica delega en un único hijo creado de antemano
+        self._default = self._new_child() if not self.labelnames else None
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """Serie nueva (contador, gauge o histograma) para una combinación de etiquetas."""
+
+    def labels(self, *values: str, **kwargs: str):
+        """Hijo para una combinación de valores de etiqueta (se crea una vez y se reutiliza)."""
+        if kwargs:
+            values = tuple(str(kwargs[n]) for n in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: se esperaban etiquetas {list(self.labelnames)}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        if self._default is not None:
+            return [((), self._default)]
+        with self._lock:
+            return sorted(self._children.items())
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._items():
+            yield f"{self.name}{_label_str(self.labelnames, values)} {_format_value(child.get())}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def get(self) -> float:
+        return self._default.get()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set_function(self, fn: Optional[Callable[[], float]]) -> None:
+        self._default.set_function(fn)
+
+    def get(self) -> float:
+        return self._default.get()
+
+
+class Histogram(_Metric):
+    """
+    Histograma de cubetas fijas (límites superiores inclusivos, como `le` en Prometheus).
+
+    `observe` hace una búsqueda binaria sobre los límites y dos sumas bajo un lock propio del
+    hijo: no reserva memoria ni toma locks globales.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS_S):
+        bounds = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        if not bounds:
+            raise ValueError(f"{name}: se requiere al menos una cubeta")
+        self.buckets = bounds
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        return self._default.snapshot()
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._items():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                labels = _label_str(self.labelnames, values, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _label_str(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """Registro en proceso de métricas; `render()` produce el formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                # Re-importar un módulo no duplica la métrica
+                if type(existing) is not cls or existing.labelnames != tuple(labelnames):
+                    raise ValueError(f"Métrica ya registrada con otro tipo o etiquetas: {name}")
+                return existing
+            metric = cls(name, documentation, labelnames, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS_S) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Métricas de la aplicación ---
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "Peticiones HTTP atendidas.", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta.", ("method", "route"))
+
+ROUTING_QUERY_SECONDS = REGISTRY.histogram("routing_query_seconds", "Tiempo de una consulta de PathFinder.", ("algorithm",))
+ROUTING_SETTLED_NODES = REGISTRY.histogram("routing_settled_nodes", "Nodos asentados por consulta (implementaciones NetworkX).", ("algorithm",), buckets=NODE_BUCKETS)
+ROUTING_RELAXED_EDGES = REGISTRY.histogram("routing_relaxed_edges", "Aristas evaluadas por consulta (implementaciones Rustworkx).", ("algorithm",), buckets=NODE_BUCKETS)
+NODE_SNAP_SECONDS = REGISTRY.histogram("node_snap_seconds", "Tiempo de ajuste de una coordenada al nodo más cercano del grafo.")
+SIMULATION_BATCH_STAGE_SECONDS = REGISTRY.histogram("simulation_batch_stage_seconds", "Tiempo por etapa de la simulación por lotes (por grupo o bloque).", ("stage",))
+SIMULATION_BATCH_ITEMS = REGISTRY.counter("simulation_batch_items_total", "Pedidos procesados por la simulación por lotes.", ("result",))
+
+ML_INFERENCE_SECONDS = REGISTRY.histogram("ml_inference_seconds", "Tiempo de inferencia por llamada.", ("model",))
+ML_INFERENCE_BATCH_SIZE = REGISTRY.histogram("ml_inference_batch_size", "Filas por llamada de inferencia.", ("model",), buckets=SIZE_BUCKETS)
+
+SQLITE_QUERY_SECONDS = REGISTRY.histogram("sqlite_query_seconds", "Tiempo de las consultas de lectura a SQLite.", ("query",))
+SQLITE_WRITE_SECONDS = REGISTRY.histogram("sqlite_write_seconds", "Tiempo de ejecución de una transacción en el hilo escritor.")
+SQLITE_WRITE_WAIT_SECONDS = REGISTRY.histogram("sqlite_write_wait_seconds", "Espera en la cola del hilo escritor.")
+
+SQLITE_WRITE_QUEUE_DEPTH = REGISTRY.gauge("sqlite_write_queue_depth", "Transacciones en espera del hilo escritor.")
+LOG_QUEUE_PENDING = REGISTRY.gauge("log_queue_pending", "Registros de log encolados pendientes de escribir.")
+LOG_RECORDS_DROPPED = REGISTRY.gauge("log_records_dropped", "Registros de log descartados con la cola llena (acumulado).")
+EVENT_SINK_PENDING = REGISTRY.gauge("event_sink_pending", "Eventos de simulación encolados pendientes de escribir.")
+
+CACHE_REQUESTS = REGISTRY.counter("cache_requests_total", "Accesos a cachés en memoria por resultado (hit/miss).", ("cache", "result"))
+SINGLEFLIGHT_REQUESTS = REGISTRY.counter(
+    "singleflight_requests_total",
+    "Peticiones por grupo single-flight: leader (calcula), coalesced (espera al cálculo en curso) o cached (TTL).",
+    ("group", "result"),
+)
+
+
+def timed_query(name: str) -> Callable:
+    """Decorador: registra la duración en `sqlite_query_seconds{query=name}` y como span de la traza."""
+    child = SQLITE_QUERY_SECONDS.labels(name)
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with span(name):
+                    return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
@@ -1,67 +1,152 @@
+import random
 import time
 import uuid
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS
+from app.core.tracing import TRACE_HEADER, Trace, end_trace, should_sample, start_trace
 
 logger = get_logger(__name__)
 
-class RequestMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        request_id = str(uuid.uuid4())
-        start_time = time.time()
-        
-        # Set request_id in request state for access in endpoints if needed
-        request.state.request_id = request_id
-        
-        # Log Request Start
+_TRACE_HEADER_KEY = TRACE_HEADER.lower().encode("latin-1")
+
+
+def _route_label(scope: Scope) -> str:
+    # Plantilla de la ruta ("/api/jobs/{job_id}"), no la URL: la cardinalidad queda acotada
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _observe_request(scope: Scope, status_code: int, seconds: float) -> None:
+    if not settings.ENABLE_METRICS:
+        return
+    route = _route_label(scope)
+    HTTP_REQUEST_SECONDS.labels(scope["method"], route).observe(seconds)
+    HTTP_REQUESTS.labels(scope["method"], route, status_code).inc()
+
+
+def _header(scope: Scope, key: bytes) -> Optional[bytes]:
+    for k, v in scope.get("headers") or ():
+        if k == key:
+            return v
+    return None
+
+
+def _client_ip(scope: Scope) -> Optional[str]:
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _log_trace(scope: Scope, trace: Trace, request_id: str, total_s: float) -> None:
+    if total_s * 1000.0 >= settings.TRACE_LOG_MIN_MS:
         logger.info(
-            f"Request started",
+            "Request trace",
             extra={
                 "request_id": request_id,
-                "method": request.method,
-                "path": request.url.path,
-                "client_ip": request.client.host if request.client else None
-            }
+                "method": scope["method"],
+                "path": scope["path"],
+                "duration_ms": round(total_s * 1000.0, 2),
+                "stages": trace.breakdown(),
+            },
         )
-        
+
+
+class RequestMiddleware:
+    """
+    Middleware ASGI puro: request_id, métricas HTTP, trazas y log de la petición.
+
+    A diferencia de `BaseHTTPMiddleware` no crea una tarea ni un stream intermedio por
+    petición; las cabeceras `X-Request-ID`, `X-Process-Time` y `Server-Timing` se agregan al
+    mensaje `http.response.start`. Las peticiones exitosas se registran con probabilidad
+    `LOG_SUCCESS_SAMPLE_RATE`; las respuestas >= 400 y las excepciones, siempre.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = str(uuid.uuid4())
+        start = time.perf_counter()
+
+        # Set request_id in request state for access in endpoints if needed
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        trace = token = None
+        forced = settings.TRACE_ALLOW_FORCE and _header(scope, _TRACE_HEADER_KEY) == b"1"
+        if should_sample(settings.TRACE_SAMPLE_RATE, forced):
+            trace, token = start_trace(request_id)
+
+        status: Dict[str, Any] = {"code": 500, "sent_at": None}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                elapsed = now - start
+                status["code"] = message["status"]
+                status["sent_at"] = now
+                headers: List[Tuple[bytes, bytes]] = list(message.get("headers") or ())
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                headers.append((b"x-process-time", str(elapsed * 1000.0).encode("latin-1")))
+                if trace is not None:
+                    # Tiempo entre el fin del último stage raíz y la respuesta: validación + serialización
+                    if trace.last_root_end is not None:
+                        trace.record("response", max(0.0, now - trace.last_root_end))
+                    if settings.TRACE_SERVER_TIMING:
+                        headers.append((b"server-timing", trace.server_timing(elapsed).encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
         try:
-            response = await call_next(request)
-            process_time = (time.time() - start_time) * 1000
-            
-            # Log Request Success
-            logger.info(
-                f"Request completed",
-                extra={
-                    "request_id": request_id,
-                    "method": request.method,
-                    "path": request.url.path,
-                    "status_code": response.status_code,
-                    "duration_ms": round(process_time, 2)
-                }
-            )
-            
-            response.headers["X-Request-ID"] = request_id
-            response.headers["X-Process-Time"] = str(process_time)
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            process_time = (time.time() - start_time) * 1000
-            
+            elapsed = time.perf_counter() - start
+            _observe_request(scope, 500, elapsed)
+
             # Log Request Failure
             logger.error(
                 f"Request failed: {str(e)}",
                 extra={
                     "request_id": request_id,
-                    "method": request.method,
-                    "path": request.url.path,
-                    "duration_ms": round(process_time, 2),
-                    "error": str(e)
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "client_ip": _client_ip(scope),
+                    "duration_ms": round(elapsed * 1000.0, 2),
+                    "error": str(e),
                 },
-                exc_info=True
+                exc_info=True,
             )
-            
+
             # Re-raise to let exception handlers handle the response
-            raise e
+            raise
+        else:
+            end = status["sent_at"] or time.perf_counter()
+            elapsed = end - start
+            code = status["code"]
+            _observe_request(scope, code, elapsed)
+            if trace is not None:
+                _log_trace(scope, trace, request_id, elapsed)
+
+            # Log Request Success (muestreado) o respuesta de error (siempre)
+            if code >= 400 or settings.LOG_SUCCESS_SAMPLE_RATE >= 1.0 or random.random() < settings.LOG_SUCCESS_SAMPLE_RATE:
+                logger.info(
+                    "Request completed",
+                    extra={
+                        "request_id": request_id,
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "client_ip": _client_ip(scope),
+                        "status_code": code,
+                        "duration_ms": round(elapsed * 1000.0, 2),
+                    },
+                )
+        finally:
+            if token is not None:
+                end_trace(token)
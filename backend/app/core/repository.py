@@ -1,5 +1,8 @@
 from typing import List, Dict, Optional, Any
-from app.core.localdb import fetch_product_by_id, fetch_products, fetch_sellers, log_simulation_event, seed_if_empty
+from app.core.catalog_cache import CatalogCache
+from app.core.event_sink import EventSink
+from app.core.localdb import fetch_sellers_near, haversine_km, log_simulation_event, seed_if_empty, simulation_event_row
+from app.schemas import ProductListResponse, SellerListResponse
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -30,20 +33,32 @@ MOCK_SELLERS = [
 ]
 
 class DataRepository:
-    def __init__(self):
+    def __init__(self, event_sink: Optional[EventSink] = None):
+        # Con event_sink, los eventos de simulación se escriben en lotes desde un hilo de fondo
+        self.event_sink = event_sink
+        # Productos y vendedores se leen de un snapshot en memoria que se invalida al escribir el catálogo
+        self.catalog = CatalogCache()
         seed_if_empty(MOCK_PRODUCTS, MOCK_SELLERS)
         logger.info("Repository initialized in LOCAL DB mode (SQLite).")
 
     def get_products(self) -> List[Dict[str, Any]]:
         try:
-            return fetch_products()
+            return list(self.catalog.snapshot().products)
         except Exception as e:
             logger.error(f"Local DB error fetching products: {e}. Falling back to mock data.")
             return MOCK_PRODUCTS
 
+    def get_products_json(self) -> bytes:
+        """Respuesta de `/api/products` ya serializada (una vez por versión del catálogo)."""
+        try:
+            return self.catalog.snapshot().products_json
+        except Exception as e:
+            logger.error(f"Local DB error fetching products: {e}. Falling back to mock data.")
+            return ProductListResponse(products=MOCK_PRODUCTS).model_dump_json().encode("utf-8")
+
     def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
         try:
-            found = fetch_product_by_id(product_id)
+            found = self.catalog.snapshot().products_by_id.get(product_id)
             if found:
                 return found
         except Exception as e:
@@ -53,18 +68,58 @@ class DataRepository:
 
     def get_sellers(self, product_id: Optional[str] = None) -> List[Dict[str, Any]]:
         try:
-            return fetch_sellers(product_id=product_id)
+            return list(self.catalog.snapshot().sellers_for(product_id))
+        except Exception as e:
+            logger.error(f"Local DB error fetching sellers: {e}. Falling back to mock data.")
+            return self._mock_sellers(product_id)
+
+    def get_sellers_json(self, product_id: Optional[str] = None) -> bytes:
+        """Respuesta de `/api/sellers` ya serializada (una vez por versión y producto)."""
+        try:
+            return self.catalog.snapshot().sellers_json(product_id)
         except Exception as e:
             logger.error(f"Local DB error fetching sellers: {e}. Falling back to mock data.")
-            if product_id:
-                return [s for s in MOCK_SELLERS if product_id in s["products"]]
-            return MOCK_SELLERS
+            return SellerListResponse(sellers=self._mock_sellers(product_id)).model_dump_json().encode("utf-8")
+
+    @staticmethod
+    def _mock_sellers(product_id: Optional[str]) -> List[Dict[str, Any]]:
+        if product_id:
+            return [s for s in MOCK_SELLERS if product_id in s["products"]]
+        return MOCK_SELLERS
+
+    def get_sellers_near(
+        self,
+        product_id: Optional[str],
+        lat: float,
+        lng: float,
+        radius_km: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Vendedores más cercanos en línea recta (índice R*Tree), con `distance_km`."""
+        try:
+            return fetch_sellers_near(product_id, lat, lng, radius_km=radius_km, limit=limit)
+        except Exception as e:
+            logger.error(f"Local DB error fetching nearby sellers: {e}. Falling back to mock data.")
+            ranked = []
+            for s in MOCK_SELLERS:
+                if product_id and product_id not in s["products"]:
+                    continue
+                d = haversine_km(lat, lng, s["coordinates"]["lat"], s["coordinates"]["lng"])
+                if radius_km is None or d <= radius_km:
+                    ranked.append({**s, "distance_km": round(d, 4)})
+            ranked.sort(key=lambda s: s["distance_km"])
+            return ranked[:limit] if limit is not None else ranked
 
     def get_pois(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
         return []
 
     def log_simulation_event(self, event_data: Dict[str, Any]):
+        event_type = str(event_data.get("event_type") or "unknown")
         try:
-            log_simulation_event(str(event_data.get("event_type") or "unknown"), event_data)
+            if self.event_sink is not None:
+                if not self.event_sink.emit(simulation_event_row(event_type, event_data)):
+                    logger.warning(f"Event sink full, dropped simulation event: {event_type}")
+                return
+            log_simulation_event(event_type, event_data)
         except Exception as e:
             logger.error(f"Failed to log event to Local DB: {e}")
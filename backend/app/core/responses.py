@@ -0,0 +1,153 @@
+import dataclasses
+import json
+import typing
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+
+import numpy as np
+from pydantic import BaseModel
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+
+
+def _default(obj: Any) -> Any:
+    # Tipos que el encoder no serializa por sí mismo
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+try:
+    import orjson
+
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(content: Any) -> bytes:
+        """JSON compacto en UTF-8; arreglos y escalares de NumPy sin conversión previa (NaN -> null)."""
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+except ImportError:  # pragma: no cover - orjson es opcional
+
+    def dumps_bytes(content: Any) -> bytes:
+        """JSON compacto en UTF-8 (stdlib); NumPy se convierte vía `default`."""
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Evento Server-Sent Events con `data` en JSON de una línea."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps_bytes(data) + b"\n\n"
+
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON para resultados internos de confianza (simulate, evaluaciones de modelos).
+
+    Al retornar una `Response`, FastAPI no revalida el contenido contra el `response_model`
+    ni lo recorre con `jsonable_encoder`: el dict se codifica una sola vez con `dumps_bytes`.
+    El `response_model` del endpoint se mantiene para la documentación OpenAPI.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+
+# modelo -> (campos en orden, defaults de los opcionales, campos con modelos anidados)
+_MODEL_PLANS: Dict[type, Tuple[Tuple[str, ...], Dict[str, Any], Dict[str, Tuple[bool, Type[BaseModel]]]]] = {}
+
+
+def _nested_model(annotation: Any) -> Optional[Tuple[bool, Type[BaseModel]]]:
+    """(es_lista, modelo) si la anotación es un modelo, Optional[modelo] o List[modelo]."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return False, annotation
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin is Union:
+        models = [a for a in args if isinstance(a, type) and issubclass(a, BaseModel)]
+        if len(models) == 1 and all(a is type(None) or a is models[0] for a in args):
+            return False, models[0]
+    elif origin in (list, typing.List) and len(args) == 1:
+        inner = _nested_model(args[0])
+        if inner is not None and not inner[0]:
+            return True, inner[1]
+    return None
+
+
+def _model_plan(model: Type[BaseModel]):
+    plan = _MODEL_PLANS.get(model)
+    if plan is None:
+        fields = model.model_fields
+        defaults = {name: f.get_default(call_default_factory=True) for name, f in fields.items() if not f.is_required()}
+        nested = {name: sub for name, f in fields.items() if (sub := _nested_model(f.annotation)) is not None}
+        plan = _MODEL_PLANS[model] = (tuple(fields), defaults, nested)
+    return plan
+
+
+def with_model_defaults(content: Any, model: Type[BaseModel]) -> Any:
+    """
+    El dict con las mismas claves que `model.model_dump()`: campos opcionales ausentes con su
+    default (null), sin claves ajenas al modelo y recursivo en modelos anidados. No valida tipos.
+    """
+    if not isinstance(content, dict):
+        return content
+    names, defaults, nested = _model_plan(model)
+    out = {}
+    for name in names:
+        if name in content:
+            value = content[name]
+            sub = nested.get(name)
+            if sub is not None and value is not None:
+                many, sub_model = sub
+                value = [with_model_defaults(v, sub_model) for v in value] if many else with_model_defaults(value, sub_model)
+            out[name] = value
+        elif name in defaults:
+            out[name] = defaults[name]
+    return out
+
+
+def fast_json(content: Any, status_code: int = 200, model: Optional[Type[BaseModel]] = None) -> Union[FastJSONResponse, Any]:
+    """
+    `FastJSONResponse` si `FAST_JSON_RESPONSES` está activo; si no, el contenido tal cual (ruta
+    pydantic). Con `model` (el `response_model` del endpoint) la respuesta tiene las mismas
+    claves que produciría pydantic, incluidos los opcionales no asignados como null.
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return content
+    if model is not None:
+        content = with_model_defaults(content, model)
+    return FastJSONResponse(content, status_code=status_code)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    `StreamingResponse` que ejecuta `on_close` exactamente una vez al terminar de atender la
+    petición: fin normal, error, desconexión del cliente (también antes del primer bloque, cuando
+    el generador nunca llega a iniciarse) o cancelación. `background` no cubre esos casos.
+    """
+
+    def __init__(self, content: Any, on_close: Callable[[], None], **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
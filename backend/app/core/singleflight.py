@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.core.metrics import SINGLEFLIGHT_REQUESTS
+from app.core.tracing import span
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalescencia de peticiones idénticas concurrentes (patrón single-flight).
+
+    `do(key, fn)`: la primera petición con una clave ejecuta `fn` (leader); las que llegan
+    mientras está en curso esperan y reciben el mismo resultado (o la misma excepción). Con
+    `ttl_s > 0` el resultado exitoso se sirve además durante ese tiempo a peticiones
+    posteriores. Los resultados se comparten entre peticiones: deben tratarse como de solo
+    lectura. Pensado para handlers síncronos (threadpool de FastAPI).
+    """
+
+    def __init__(self, name: str, ttl_s: float = 0.0, max_entries: int = 1024, enabled: bool = True):
+        self.name = name
+        self.ttl_s = float(max(0.0, ttl_s))
+        self.max_entries = int(max(1, max_entries))
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._results: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._leader = SINGLEFLIGHT_REQUESTS.labels(name, "leader")
+        self._coalesced = SINGLEFLIGHT_REQUESTS.labels(name, "coalesced")
+        self._cached = SINGLEFLIGHT_REQUESTS.labels(name, "cached")
+        self._counts = {"leader": 0, "coalesced": 0, "cached": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            if self.ttl_s > 0:
+                entry = self._results.get(key)
+                if entry is not None:
+                    if entry[0] > time.monotonic():
+                        self._counts["cached"] += 1
+                        self._cached.inc()
+                        return entry[1]
+                    del self._results[key]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counts["leader"] += 1
+            else:
+                call.waiters += 1
+                self._counts["coalesced"] += 1
+
+        if not leader:
+            self._coalesced.inc()
+            with span("coalesced_wait"):
+                call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._leader.inc()
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                if call.error is None and self.ttl_s > 0:
+                    self._results[key] = (time.monotonic() + self.ttl_s, call.result)
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+            call.event.set()
+        return call.result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ttl_s": self.ttl_s,
+                "in_flight": len(self._calls),
+                "cached_results": len(self._results),
+                **self._counts,
+            }
@@ -0,0 +1,150 @@
+import contextvars
+import functools
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TRACE_HEADER = "X-Trace"
+
+
+class Trace:
+    """
+    Desglose de tiempos de una petición.
+
+    Los spans se agregan por ruta de anidamiento ("simulate/dijkstra"): un stage repetido por
+    vendedor suma su duración y su conteo en una sola entrada, de modo que la memoria por
+    petición no crece con el número de iteraciones.
+    """
+
+    __slots__ = ("request_id", "started", "stages", "_order", "last_root_end")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # ruta -> [conteo, total_s, max_s]
+        self._order: List[str] = []
+        self.last_root_end: Optional[float] = None
+
+    def record(self, path: str, seconds: float) -> None:
+        stage = self.stages.get(path)
+        if stage is None:
+            self.stages[path] = [1, seconds, seconds]
+            self._order.append(path)
+        else:
+            stage[0] += 1
+            stage[1] += seconds
+            if seconds > stage[2]:
+                stage[2] = seconds
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        out = []
+        for path in self._order:
+            count, total, peak = self.stages[path]
+            out.append(
+                {
+                    "stage": path,
+                    "count": int(count),
+                    "total_ms": round(total * 1000.0, 3),
+                    "max_ms": round(peak * 1000.0, 3),
+                }
+            )
+        return out
+
+    def server_timing(self, total_s: Optional[float] = None) -> str:
+        """Cabecera `Server-Timing`: un valor por stage (nombres con "." en lugar de "/")."""
+        parts = []
+        for path in self._order:
+            count, total, _ = self.stages[path]
+            name = path.replace("/", ".")
+            desc = f';desc="x{int(count)}"' if count > 1 else ""
+            parts.append(f"{name};dur={total * 1000.0:.3f}{desc}")
+        if total_s is not None:
+            parts.append(f"total;dur={total_s * 1000.0:.3f}")
+        return ", ".join(parts)
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+_current_path: contextvars.ContextVar[str] = contextvars.ContextVar("current_span_path", default="")
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("trace", "path", "start", "token")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        parent = _current_path.get()
+        self.path = f"{parent}/{name}" if parent else name
+
+    def __enter__(self):
+        self.token = _current_path.set(self.path)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _current_path.reset(self.token)
+        self.trace.record(self.path, end - self.start)
+        if "/" not in self.path:
+            self.trace.last_root_end = end
+        return False
+
+
+def span(name: str):
+    """
+    Mide un stage dentro de la petición actual (`with span("dijkstra"): ...`).
+
+    Sin traza activa (petición no muestreada o código fuera de una petición) devuelve un
+    context manager vacío compartido: el costo es una lectura de ContextVar.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def traced(name: str) -> Callable:
+    """Decorador equivalente a envolver la función completa en `span(name)`."""
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def should_sample(sample_rate: float, forced: bool = False) -> bool:
+    if forced:
+        return True
+    if sample_rate <= 0.0:
+        return False
+    return sample_rate >= 1.0 or random.random() < sample_rate
+
+
+def start_trace(request_id: str) -> Tuple[Trace, contextvars.Token]:
+    trace = Trace(request_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: contextvars.Token) -> None:
+    _current_trace.reset(token)
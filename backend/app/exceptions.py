@@ -7,3 +7,27 @@ class GeoLocationError(Exception):
         self.message = message
         self.details = details
         super().__init__(self.message)
+
+
+class JobQueueFullError(Exception):
+    """
+    Excepción lanzada cuando la cola de jobs en segundo plano alcanzó su límite
+    de trabajos pendientes.
+    """
+    def __init__(self, message: str, details: str = None):
+        self.message = message
+        self.details = details
+        super().__init__(self.message)
+
+
+class AdmissionRejectedError(Exception):
+    """
+    Excepción lanzada por el control de admisión cuando una petición de cómputo pesado
+    no obtiene un slot: cola llena (429) o espera agotada (503).
+    """
+    def __init__(self, message: str, details: str = None, status_code: int = 503, retry_after_s: int = 1):
+        self.message = message
+        self.details = details
+        self.status_code = status_code
+        self.retry_after_s = retry_after_s
+        super().__init__(self.message)
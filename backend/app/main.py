@@ -1,7 +1,8 @@
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import time
@@ -13,11 +14,11 @@ import traceback
 import math
 import numpy as np
 import pandas as pd
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score, confusion_matrix, roc_curve, auc, precision_recall_fscore_support
-from sklearn.model_selection import train_test_split
-import joblib
-from xgboost import XGBRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import threading
+import multiprocessing
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Add backend root to path to ensure app module is resolvable
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,26 +27,63 @@ sys.path.append(backend_root)
 
 from app.services.graph.loader import DataLoader
 from app.services.routing.algorithms import PathFinder
-from app.core.localdb import fetch_daily_demand
+from app.services.routing.geometry import decode_path, format_geometries, format_geometry, path_length_m, zoom_tolerance_m
+from app.core.event_sink import EventSink
+from app.core.localdb import (
+    close_db,
+    compact_simulation_events_job,
+    fetch_daily_demand,
+    fetch_daily_demand_all,
+    fetch_demand_rollup,
+    fetch_simulation_event_archives,
+    fetch_simulation_event_stats,
+    fetch_simulation_stats,
+    insert_simulation_events,
+    pool_stats,
+)
 from app.core.repository import DataRepository
-from app.services.simulation.engine import MarkovChain, FactorSimulator, KPICalculator, AdminKPICalculator, SimulationSessionManager, SmartRouteEngine
+from app.services.simulation.engine import MarkovChain, FactorSimulator, KPICalculator, SimulationSessionManager, SmartRouteEngine
+from app.services.simulation.batch import FALLBACK_PRODUCT, BatchSimulator, build_route_result, summarize_routes
+from app.services.simulation.fields import GEOMETRY, IMPACT, MONTE_CARLO, project_route, stages_for_fields
 from app.services.validation.validator_service import ValidatorService
-from app.ml.demand_forecasting.forecaster import DemandForecaster
-from app.ml.eta_predictor import ETAPredictor
-from app.ml.impact_predictor import ImpactPredictor
-from app.core.logger import get_logger
-from app.exceptions import GeoLocationError
+from app.ml.demand_forecasting.forecaster import DemandForecaster, daily_to_frame, train_demand_artifact
+from app.ml.demand_forecasting.fast_forecaster import FourierForecaster
+from app.ml.demand_forecasting.materializer import ForecastMaterializer
+from app.ml.demand_forecasting.parallel_training import load_training_summary, train_all_demand_artifacts
+from app.ml.eta_predictor import ETAPredictor, DEFAULT_MODEL_PATH as ETA_MODEL_PATH, train_eta_mock
+from app.ml.impact_predictor import ImpactPredictor, DEFAULT_MULTI_STRATEGY, MULTI_STRATEGIES, model_multi_strategy, train_impact_artifact
+from app.services.jobs.runner import JobRunner, JobKind, ACTIVE_STATUSES, FINAL_STATUSES
+from app.services.ingestion.orders import OrderIngestor
+from app.services.export.datasets import EXPORT_FORMATS, export_all, list_snapshots
+from app.services.offload.pool import HeavyTaskPool
+from app.services.offload.tasks import demand_cv_task, eta_evaluate_task, impact_evaluate_task, validation_stats_task
+from app.core.admission import AdmissionController, WorkloadClass
+from app.core.singleflight import SingleFlight
+from app.core.responses import ClosingStreamingResponse, FastJSONResponse, dumps_bytes, fast_json, sse_event, with_model_defaults
+from app.core.logger import get_logger, logging_stats
+from app.core.metrics import (
+    CACHE_REQUESTS,
+    EVENT_SINK_PENDING,
+    LOG_QUEUE_PENDING,
+    LOG_RECORDS_DROPPED,
+    METRICS_CONTENT_TYPE,
+    NODE_SNAP_SECONDS,
+    REGISTRY,
+    SQLITE_WRITE_QUEUE_DEPTH,
+)
+from app.exceptions import AdmissionRejectedError, GeoLocationError, JobQueueFullError
 from app.schemas import (
-    RouteRequest, SimulationRequest, RecalculateRequest,
+    RouteRequest, SimulationRequest, SimulationBatchRequest, RecalculateRequest,
     ProductListResponse, SellerListResponse, POIListResponse,
-    SimulationResponse, RecalculateResponse, ValidationStatsResponse,
-    DemandForecastResponse
+    RouteResult, SimulationResponse, RecalculateResponse, ValidationStatsResponse,
+    DemandForecastResponse, JobSubmitRequest
 )
 
 PRODUCT_IDS = ["maiz", "cacao", "arroz", "cafe", "platano", "mani", "limon", "yuca"]
 
 from app.core.config import settings
 from app.core.middleware import RequestMiddleware
+from app.core.tracing import span, traced
 
 logger = get_logger(__name__)
 impact_predictor = ImpactPredictor()
@@ -53,7 +91,8 @@ impact_predictor = ImpactPredictor()
 def _warmup_impact_model():
     try:
         if not impact_predictor.model_loaded:
-            impact_predictor.train_mock(n_samples=8000, n_estimators=120, max_depth=5)
+            # Un solo booster multi-target: ~8x menos árboles que entrenar que el wrapper legacy
+            impact_predictor.train_mock(n_samples=8000, n_estimators=120, max_depth=5, multi_strategy=DEFAULT_MULTI_STRATEGY)
             impact_predictor.force_reload()
             try:
                 from app.services.simulation import engine as sim_engine
@@ -64,7 +103,8 @@ def _warmup_impact_model():
     except Exception:
         pass
 
-if "PYTEST_CURRENT_TEST" not in os.environ:
+# Los procesos de jobs (spawn) re-importan este módulo: no deben entrenar en el arranque
+if "PYTEST_CURRENT_TEST" not in os.environ and multiprocessing.parent_process() is None:
     threading.Thread(target=_warmup_impact_model, daemon=True).start()
 
 app = FastAPI(title="TuDistri API", description="API for Portoviejo Route Optimization", version="1.0.0")
@@ -85,6 +125,19 @@ async def geolocation_exception_handler(request: Request, exc: GeoLocationError)
         },
     )
 
+@app.exception_handler(AdmissionRejectedError)
+async def admission_rejected_exception_handler(request: Request, exc: AdmissionRejectedError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "error": "AdmissionRejectedError",
+            "message": exc.message,
+            "details": exc.details,
+            "timestamp": time.time()
+        },
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     error_details = traceback.format_exc()
@@ -116,31 +169,268 @@ session_manager = SimulationSessionManager()
 validator_service = None
 markov_chain = MarkovChain() # Default chain for stateless requests
 repository = None
+job_runner: Optional[JobRunner] = None
+_job_runner_lock = threading.Lock()
+forecast_materializer: Optional[ForecastMaterializer] = None
+event_sink: Optional[EventSink] = None
+heavy_pool: Optional[HeavyTaskPool] = None
+batch_simulator: Optional[BatchSimulator] = None
+_stream_executor: Optional[ThreadPoolExecutor] = None
+_stream_executor_lock = threading.Lock()
+simulate_flight = SingleFlight("simulate", ttl_s=settings.SIMULATE_COALESCE_TTL_S, enabled=settings.SINGLEFLIGHT_ENABLED)
+forecast_flight = SingleFlight("demand_forecast", ttl_s=settings.FORECAST_COALESCE_TTL_S, enabled=settings.SINGLEFLIGHT_ENABLED)
+# Endpoints pesados: los slots equivalen a los workers del pool; a igual disponibilidad se
+# atiende primero la evaluación de modelos (interactiva) que la validación completa
+admission = AdmissionController(
+    [
+        WorkloadClass(
+            "evaluation",
+            max_concurrent=settings.HEAVY_EVALUATION_MAX_CONCURRENT,
+            max_queue=settings.HEAVY_EVALUATION_MAX_QUEUE,
+            queue_timeout_s=settings.HEAVY_EVALUATION_QUEUE_TIMEOUT_S,
+            priority=10,
+        ),
+        WorkloadClass(
+            "validation",
+            max_concurrent=settings.HEAVY_VALIDATION_MAX_CONCURRENT,
+            max_queue=settings.HEAVY_VALIDATION_MAX_QUEUE,
+            queue_timeout_s=settings.HEAVY_VALIDATION_QUEUE_TIMEOUT_S,
+            priority=20,
+        ),
+    ],
+    capacity=settings.HEAVY_POOL_WORKERS,
+)
+# Los lotes de simulación corren en hilos del servidor (no en el pool), con su propio cupo
+batch_admission = AdmissionController(
+    [
+        WorkloadClass(
+            "simulate_batch",
+            max_concurrent=settings.SIMULATION_BATCH_MAX_CONCURRENT,
+            max_queue=settings.SIMULATION_BATCH_MAX_QUEUE,
+            queue_timeout_s=settings.SIMULATION_BATCH_QUEUE_TIMEOUT_S,
+        ),
+    ],
+    capacity=settings.SIMULATION_BATCH_MAX_CONCURRENT,
+)
+
+def _reload_eta_models(params=None, result=None):
+    ETAPredictor().force_reload()
+    try:
+        from app.services.simulation import engine as sim_engine
+
+        sim_engine._eta_predictor.force_reload()
+    except Exception:
+        pass
+
+def _reload_impact_models(params=None, result=None):
+    impact_predictor.force_reload()
+    try:
+        from app.services.simulation import engine as sim_engine
+
+        sim_engine._impact_predictor.force_reload()
+    except Exception:
+        pass
+
+def _refresh_materialized_forecast(params, result=None):
+    if forecast_materializer is not None:
+        forecast_materializer.refresh_async(params["product"])
+
+def _retrain_demand_model(product: str) -> str:
+    """Pedidos nuevos del producto: reentrena en un job deduplicado (su on_complete rematerializa)."""
+    return get_job_runner().submit("demand_train", {"product": product}, dedupe=True)["id"]
+
+def _validate_demand_job(params):
+    product = str(params.get("product") or "").strip()
+    if not product:
+        raise ValueError("product es requerido.")
+    lookback_days = int(max(30, min(int(params.get("lookback_days") or 365), 3650)))
+    return {"product": product, "lookback_days": lookback_days}
+
+def _prepare_demand_job(params):
+    since = (pd.Timestamp.utcnow() - pd.Timedelta(days=params["lookback_days"])).isoformat()
+    daily = fetch_daily_demand(product_id=params["product"].lower(), since_iso=since)
+    if not daily or len(daily) < 30:
+        raise ValueError(f"Historical demand not found for {params['product']}")
+    return {"product": params["product"], "daily": daily}
+
+def _validate_demand_train_all_job(params):
+    products = params.get("products") or PRODUCT_IDS
+    unknown = sorted(set(products) - set(PRODUCT_IDS))
+    if unknown:
+        raise ValueError(f"Productos desconocidos: {unknown}. Valores permitidos: {PRODUCT_IDS}")
+    return {
+        "products": [p for p in PRODUCT_IDS if p in set(products)],
+        "lookback_days": int(max(30, min(int(params.get("lookback_days") or 365), 3650))),
+        "timeout_s": float(max(10.0, min(float(params.get("timeout_s") or 600.0), 3600.0))),
+        "max_workers": int(params["max_workers"]) if params.get("max_workers") else None,
+    }
+
+def _prepare_demand_train_all_job(params):
+    # Una sola consulta agregada para todos los productos
+    since = (pd.Timestamp.utcnow() - pd.Timedelta(days=params["lookback_days"])).isoformat()
+    return {
+        "daily_by_product": fetch_daily_demand_all(since_iso=since, product_ids=params["products"]),
+        "products": params["products"],
+        "timeout_s": params["timeout_s"],
+        "max_workers": params["max_workers"],
+    }
+
+def _refresh_materialized_forecasts(params, result=None):
+    if forecast_materializer is None:
+        return
+    for item in (result or {}).get("products", []):
+        if item.get("status") == "succeeded":
+            forecast_materializer.refresh_async(item["product"])
+
+def _validate_events_compact_job(params):
+    older = params.get("older_than_days")
+    return {
+        "older_than_days": int(max(0, min(int(settings.SIMULATION_EVENTS_RETENTION_DAYS if older is None else older), 3650))),
+        # Lotes chicos: cada uno ocupa el escritor único de SQLite mientras dura su transacción
+        "batch_size": int(max(100, min(int(params.get("batch_size") or 2000), 10000))),
+    }
+
+def get_job_runner() -> JobRunner:
+    global job_runner
+    with _job_runner_lock:
+        if job_runner is None:
+            runner = JobRunner(max_workers=settings.JOBS_MAX_WORKERS, max_pending=settings.JOBS_MAX_PENDING)
+            runner.register(JobKind(
+                name="eta_train_mock",
+                fn=train_eta_mock,
+                artifact_path=lambda params: ETA_MODEL_PATH,
+                on_complete=_reload_eta_models,
+            ))
+            runner.register(JobKind(
+                name="impact_train_mock",
+                fn=train_impact_artifact,
+                artifact_path=lambda params: impact_predictor.model_path,
+                on_complete=_reload_impact_models,
+            ))
+            runner.register(JobKind(
+                name="demand_train",
+                fn=train_demand_artifact,
+                artifact_path=lambda params: DemandForecaster(params["product"]).model_path,
+                validate=_validate_demand_job,
+                prepare=_prepare_demand_job,
+                on_complete=_refresh_materialized_forecast,
+            ))
+            runner.register(JobKind(
+                name="demand_train_all",
+                fn=train_all_demand_artifacts,
+                validate=_validate_demand_train_all_job,
+                prepare=_prepare_demand_train_all_job,
+                on_complete=_refresh_materialized_forecasts,
+            ))
+            runner.register(JobKind(
+                name="simulation_events_compact",
+                fn=compact_simulation_events_job,
+                validate=_validate_events_compact_job,
+                in_process=True,
+            ))
+            runner.start()
+            job_runner = runner
+        return job_runner
+
+def _submit_job(kind: str, params: Dict[str, Any], dedupe: bool = False) -> Dict[str, Any]:
+    try:
+        return get_job_runner().submit(kind, params, dedupe=dedupe)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"{e.message}: {e.details}" if e.details else e.message)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+def _run_job(kind: str, params: Dict[str, Any], background: bool, label: str):
+    """Encola un job; con background=False espera el resultado (hasta JOBS_SYNC_WAIT_S)."""
+    job = _submit_job(kind, params)
+    if not background:
+        job = get_job_runner().wait(job["id"], timeout=settings.JOBS_SYNC_WAIT_S)
+    if job["status"] == "succeeded":
+        return job
+    if job["status"] in ACTIVE_STATUSES:
+        return JSONResponse(status_code=202, content={"job": job, "timestamp": time.time()})
+    raise HTTPException(status_code=500, detail=f"{label} {job['id']} {job['status']}: {job.get('error')}")
+
+def _run_training_job(kind: str, params: Dict[str, Any], background: bool):
+    return _run_job(kind, params, background, "Training job")
+
+def _run_maintenance_job(kind: str, params: Dict[str, Any], background: bool):
+    return _run_job(kind, params, background, "Maintenance job")
 
 @app.on_event("startup")
 async def startup_event():
-    global graph, path_finder, validator_service, repository
+    global graph, path_finder, validator_service, repository, forecast_materializer, event_sink, heavy_pool, batch_simulator
     logger.info("Loading graph...")
+    if settings.EVENT_SINK_ENABLED:
+        event_sink = EventSink(
+            insert_simulation_events,
+            max_queue=settings.EVENT_SINK_MAX_QUEUE,
+            batch_size=settings.EVENT_SINK_BATCH_SIZE,
+            flush_interval_s=settings.EVENT_SINK_FLUSH_INTERVAL_S,
+            policy=settings.EVENT_SINK_POLICY,
+            block_timeout_s=settings.EVENT_SINK_BLOCK_TIMEOUT_S,
+        ).start()
+        EVENT_SINK_PENDING.set_function(lambda: event_sink.stats()["pending"])
+    SQLITE_WRITE_QUEUE_DEPTH.set_function(lambda: pool_stats()["write_queue_depth"])
+    LOG_QUEUE_PENDING.set_function(lambda: logging_stats()["pending"])
+    LOG_RECORDS_DROPPED.set_function(lambda: logging_stats()["dropped"])
     # Initialize repository
-    repository = DataRepository()
+    repository = DataRepository(event_sink=event_sink)
     
     # Data dir is parallel to backend in Ruta_Op/data
     project_root = os.path.dirname(backend_root)
     data_dir = os.path.join(project_root, 'data')
     
     loader = DataLoader(data_dir=data_dir)
+    # Los workers cargan su propia copia del grafo desde el GraphML (solo si un task lo necesita)
+    heavy_pool = HeavyTaskPool(max_workers=settings.HEAVY_POOL_WORKERS, nice=settings.HEAVY_POOL_NICE, graph_path=loader.graph_path)
     try:
         graph = loader.load_graph()
         if graph is None:
             raise ValueError("Graph loader returned None")
         path_finder = PathFinder(graph)
         validator_service = ValidatorService(graph, path_finder)
+        batch_simulator = BatchSimulator(
+            graph,
+            path_finder,
+            repository,
+            max_sellers=settings.SIMULATION_MAX_SELLERS,
+            radius_km=settings.SIMULATION_SELLER_RADIUS_KM,
+            chunk_size=settings.SIMULATION_BATCH_CHUNK_SIZE,
+        )
         logger.info(f"Graph loaded successfully with {len(graph.nodes)} nodes!")
     except Exception as e:
         logger.error(f"CRITICAL ERROR loading graph: {e}")
         graph = None
         path_finder = None
 
+    get_job_runner()
+
+    if settings.FORECAST_MATERIALIZE_ENABLED:
+        forecast_materializer = ForecastMaterializer(
+            PRODUCT_IDS,
+            max_horizon_days=settings.FORECAST_MAX_HORIZON_DAYS,
+            refresh_interval_s=settings.FORECAST_REFRESH_INTERVAL_S,
+            watch_interval_s=settings.FORECAST_WATCH_INTERVAL_S,
+            retrain=_retrain_demand_model,
+        )
+        forecast_materializer.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    if forecast_materializer is not None:
+        forecast_materializer.stop()
+    if job_runner is not None:
+        job_runner.shutdown()
+    if heavy_pool is not None:
+        heavy_pool.shutdown()
+    if _stream_executor is not None:
+        _stream_executor.shutdown(wait=False, cancel_futures=True)
+    if event_sink is not None:
+        # Los eventos pendientes se escriben antes de cerrar la base
+        event_sink.stop()
+    close_db()
+
 @app.get("/health")
 def health_check():
     return {
@@ -149,20 +439,45 @@ def health_check():
         "db": "sqlite"
     }
 
-@app.post("/api/routes/recalculate", response_model=RecalculateResponse)
-def recalculate_route(request: RecalculateRequest):
-    if graph is None:
-        raise HTTPException(status_code=503, detail="Graph service not available")
-
-    try:
-        start_node = ox.distance.nearest_nodes(graph, request.current_lng, request.current_lat)
-        end_node = ox.distance.nearest_nodes(graph, request.dest_lng, request.dest_lat)
-    except Exception as e:
-        raise GeoLocationError(
-            message="Error finding nodes for recalculation",
-            details=str(e)
-        )
+@app.get("/metrics")
+def metrics():
+    """Métricas en formato de texto de Prometheus (latencias HTTP, ruteo, inferencia, SQLite y cachés)."""
+    if not settings.ENABLE_METRICS:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/db/stats")
+def db_stats():
+    """Métricas del pool de conexiones SQLite, del registro diferido de eventos y del caché del catálogo."""
+    stats = pool_stats()
+    stats["event_sink"] = event_sink.stats() if event_sink is not None else None
+    stats["catalog_cache"] = repository.catalog.stats() if repository is not None else None
+    stats["singleflight"] = {f.name: f.stats() for f in (simulate_flight, forecast_flight)}
+    return stats
+
+@app.get("/api/heavy/stats")
+def heavy_stats():
+    """Estado del pool de procesos de endpoints pesados y de las colas de admisión por clase."""
+    return {
+        "pool": heavy_pool.stats() if heavy_pool is not None else None,
+        "admission": admission.stats(),
+        "batch_admission": batch_admission.stats(),
+    }
 
+def _geometry_tolerance(request, lat: float) -> Optional[float]:
+    """Tolerancia Douglas-Peucker pedida: explícita en metros o derivada del nivel de zoom."""
+    if request.simplify_tolerance_m:
+        return float(request.simplify_tolerance_m)
+    if request.simplify_zoom is not None:
+        return zoom_tolerance_m(request.simplify_zoom, lat)
+    return None
+
+def _nearest_node(lng: float, lat: float):
+    start = time.perf_counter()
+    with span("nearest_nodes"):
+        node = ox.distance.nearest_nodes(graph, lng, lat)
+    NODE_SNAP_SECONDS.observe(time.perf_counter() - start)
+    return node
 
 @app.exception_handler(RequestValidationError)
 async def request_validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -186,31 +501,28 @@ async def request_validation_exception_handler(request: Request, exc: RequestVal
         },
     )
 
+@app.post("/api/routes/recalculate", response_model=RecalculateResponse)
+@traced("recalculate")
+def recalculate_route(request: RecalculateRequest):
+    if graph is None:
+        raise HTTPException(status_code=503, detail="Graph service not available")
+
+    try:
+        start_node = _nearest_node(request.current_lng, request.current_lat)
+        end_node = _nearest_node(request.dest_lng, request.dest_lat)
+    except Exception as e:
+        raise GeoLocationError(
+            message="Error finding nodes for recalculation",
+            details=str(e)
+        )
+
     result = path_finder.run_dijkstra(start_node, end_node, weight='weight', event_type=request.event_type)
 
     if not result["path"]:
         raise HTTPException(status_code=404, detail="No route found")
 
     # Decode path
-    path_coords = []
-    path_nodes = result["path"]
-    total_distance_m = 0
-    
-    for i in range(len(path_nodes) - 1):
-        u, v = path_nodes[i], path_nodes[i+1]
-        edge_data = graph.get_edge_data(u, v)[0]
-        total_distance_m += float(edge_data.get('length', 0))
-        
-        if 'geometry' in edge_data:
-            for x, y in list(edge_data['geometry'].coords):
-                if not path_coords or path_coords[-1] != [y, x]:
-                    path_coords.append([y, x])
-        else:
-            node_u = graph.nodes[u]
-            node_v = graph.nodes[v]
-            if not path_coords or path_coords[-1] != [node_u['y'], node_u['x']]:
-                path_coords.append([node_u['y'], node_u['x']])
-            path_coords.append([node_v['y'], node_v['x']])
+    path_coords, total_distance_m = decode_path(graph, result["path"])
 
     # Persist event
     if request.simulation_id:
@@ -229,7 +541,7 @@ async def request_validation_exception_handler(request: Request, exc: RequestVal
             logger.error(f"Failed to log event: {e}")
 
     return {
-        "route_geometry": path_coords,
+        "route_geometry": format_geometry(path_coords, request.geometry_format, _geometry_tolerance(request, request.current_lat)),
         "distance_km": total_distance_m / 1000,
         "duration_min": round(result["cost"] / 60, 2),
         "duration_seconds": result["cost"],
@@ -243,60 +555,158 @@ def root():
 
 @app.get("/api/products", response_model=ProductListResponse)
 def get_products():
-    return {"products": repository.get_products()}
+    # Cuerpo serializado una vez por versión del catálogo: sin consulta ni validación por petición
+    return Response(content=repository.get_products_json(), media_type="application/json")
 
 @app.get("/api/sellers", response_model=SellerListResponse)
 def get_sellers(product_id: Optional[str] = None):
-    return {"sellers": repository.get_sellers(product_id)}
+    return Response(content=repository.get_sellers_json(product_id), media_type="application/json")
 
 @app.get("/api/pois", response_model=POIListResponse)
 async def get_pois(category: Optional[str] = None):
     return {"pois": repository.get_pois(category)}
 
 @app.post("/api/routes/simulate", response_model=SimulationResponse)
+@traced("simulate")
 def simulate_routes(request: SimulationRequest):
     if graph is None:
         raise HTTPException(status_code=503, detail="Graph service not available")
 
-    # Get product
-    product = repository.get_product_by_id(request.product_id)
-    if not product:
-        # If product not found even in mock, return empty routes or handle gracefully
-        # But repository ensures mock fallback, so product should exist if ID is valid mock ID
-        # If ID is totally unknown, we might want to return error or use generic fallback
-        product = {"price_per_unit": 50, "unit": "kg", "name": "Producto", "image_url": ""}
+    try:
+        user_node = _nearest_node(request.user_lng, request.user_lat)
+    except Exception as e:
+        raise GeoLocationError(
+            message="Error finding user location on map",
+            details=str(e)
+        )
 
-    # Get sellers
-    sellers = repository.get_sellers(request.product_id)
-    
-    if not sellers:
-        return {
-            "session_id": request.session_id,
-            "recommended_route": None,
-            "all_routes": [],
-            "metrics": {
-                "revenue": 0.0,
-                "profit": 0.0,
-                "distance_total": 0.0,
-                "duration_total": 0.0,
-                "platform_profit": 0.0,
-                "prediction_accuracy": 0.0,
-                "avg_time_reduction": 0.0,
-                "revenue_growth": 0.0
-            },
-            "timestamp": time.time()
-        }
+    # Peticiones concurrentes con el mismo nodo de usuario, producto, peso, sesión, formato de
+    # geometría y campos comparten el cálculo
+    key = (
+        user_node,
+        request.product_id,
+        float(request.weight or 0),
+        request.session_id,
+        request.geometry_format,
+        _geometry_tolerance(request, request.user_lat),
+        tuple(request.fields) if request.fields is not None else None,
+    )
+    result = simulate_flight.do(key, lambda: _simulate_routes(request, user_node))
+    with span("serialize"):
+        if request.fields is not None:
+            # Respuesta parcial: no cumple SimulationResponse, se serializa sin validar
+            return FastJSONResponse(result)
+        return fast_json(result, model=SimulationResponse)
+
+@app.post("/api/routes/simulate/stream")
+@traced("simulate_stream")
+def simulate_routes_stream(request: SimulationRequest, format: str = "sse"):
+    """
+    Simulate en streaming: cada `RouteResult` se envía en cuanto su vendedor termina (vendedores
+    calculados en paralelo) y al final un evento `summary` con `recommended_route`, `metrics`,
+    `session_id`, `timestamp` y `route_count`. `format=sse` (eventos `route` / `summary`) o
+    `format=ndjson` (una línea `{"event": ..., "data": ...}` por evento).
+    """
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format inválido. Valores permitidos: ['ndjson', 'sse']")
+    if graph is None:
+        raise HTTPException(status_code=503, detail="Graph service not available")
 
-    routes_result = []
-    
     try:
-        user_node = ox.distance.nearest_nodes(graph, request.user_lng, request.user_lat)
+        user_node = _nearest_node(request.user_lng, request.user_lat)
     except Exception as e:
         raise GeoLocationError(
             message="Error finding user location on map",
             details=str(e)
         )
 
+    product, sellers, current_state = _simulation_context(request)
+    events = _simulate_route_events(request, user_node, product, sellers, current_state)
+    if format == "ndjson":
+        body = (dumps_bytes({"event": event, "data": data}) + b"\n" for event, data in events)
+        return StreamingResponse(body, media_type="application/x-ndjson")
+    body = (sse_event(event, data) for event, data in events)
+    # Sin buffering en proxies (nginx) para que cada evento llegue al cliente de inmediato
+    return StreamingResponse(body, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _get_stream_executor() -> ThreadPoolExecutor:
+    global _stream_executor
+    with _stream_executor_lock:
+        if _stream_executor is None:
+            _stream_executor = ThreadPoolExecutor(max_workers=settings.SIMULATION_STREAM_WORKERS, thread_name_prefix="simulate-stream")
+        return _stream_executor
+
+def _simulate_route_events(request: SimulationRequest, user_node, product, sellers, current_state):
+    """Genera ("route", ruta) por vendedor en orden de término y al final ("summary", ...)."""
+    tolerance_m = _geometry_tolerance(request, request.user_lat)
+    routes = []
+    if sellers:
+        executor = _get_stream_executor()
+        pending_sellers = iter(sellers)  # en orden de cercanía
+        in_flight = set()
+
+        def submit_next():
+            seller = next(pending_sellers, None)
+            if seller is not None:
+                # Cada tarea con su copia del contexto: los spans siguen ligados a la traza de la petición
+                ctx = contextvars.copy_context()
+                in_flight.add(executor.submit(ctx.run, _simulate_seller_route, request, user_node, seller, product, current_state))
+
+        # Ventana de vendedores en curso por petición: con todos a la vez, el trabajo ligado al GIL
+        # se intercala y todas las rutas terminan casi juntas al final
+        for _ in range(max(1, settings.SIMULATION_STREAM_CONCURRENCY)):
+            submit_next()
+        try:
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    submit_next()
+                    route = future.result()
+                    if route is None:
+                        continue
+                    if "route_geometry" in route and (tolerance_m or request.geometry_format != "coords"):
+                        route["route_geometry"] = format_geometry(route["route_geometry"], request.geometry_format, tolerance_m)
+                    routes.append(route)
+                    if request.fields is None:
+                        yield "route", with_model_defaults(route, RouteResult)
+                    else:
+                        yield "route", project_route(route, request.fields)
+        finally:
+            # Cliente desconectado: lo que aún no empezó no se calcula
+            for future in in_flight:
+                future.cancel()
+
+    summary = summarize_routes(request.session_id, routes, request.fields)
+    del summary["all_routes"]  # ya enviadas una por una
+    if request.fields is None:
+        summary["recommended_route"] = with_model_defaults(summary["recommended_route"], RouteResult)
+    summary["route_count"] = len(routes)
+    yield "summary", summary
+
+def _simulation_context(request: SimulationRequest):
+    """Producto, vendedores candidatos y estado de Markov de una simulación (avanza la cadena una vez)."""
+    # Get product
+    product = repository.get_product_by_id(request.product_id)
+    if not product:
+        # If product not found even in mock, return empty routes or handle gracefully
+        # But repository ensures mock fallback, so product should exist if ID is valid mock ID
+        # If ID is totally unknown, we might want to return error or use generic fallback
+        product = FALLBACK_PRODUCT
+
+    # Get sellers: solo los K más cercanos en línea recta, para acotar el trabajo de ruteo
+    with span("sellers"):
+        sellers = repository.get_sellers_near(
+            request.product_id,
+            request.user_lat,
+            request.user_lng,
+            radius_km=settings.SIMULATION_SELLER_RADIUS_KM,
+            limit=settings.SIMULATION_MAX_SELLERS,
+        )
+
+    if not sellers:
+        return product, [], None
+
     # Use session if provided, else default chain
     chain = markov_chain
     if request.session_id:
@@ -304,299 +714,291 @@ def simulate_routes(request: SimulationRequest):
 
     # 1. Determinar estado del sistema (Markov)
     # Avanzamos el estado una vez por petición (global o sesión)
-    current_state = chain.next_state() 
+    current_state = chain.next_state()
+    return product, sellers, current_state
 
-    for seller in sellers:
-        seller_coords = seller["coordinates"]
-        try:
-            target_node = ox.distance.nearest_nodes(graph, seller_coords["lng"], seller_coords["lat"])
-            result = path_finder.run_dijkstra(user_node, target_node, weight='weight')
-            
-            if not result["path"]: continue
-            
-            # Validate result cost
-            if math.isinf(result["cost"]) or math.isnan(result["cost"]):
-                logger.warning(f"Invalid routing cost for seller {seller['id']}: {result['cost']}")
-                continue
-
-            # Decode path
-            path_coords = []
-            path_nodes = result["path"]
-            total_distance_m = 0
-            for i in range(len(path_nodes) - 1):
-                u, v = path_nodes[i], path_nodes[i+1]
-                edge_data = graph.get_edge_data(u, v)[0]
-                total_distance_m += float(edge_data.get('length', 0))
-                
-                if 'geometry' in edge_data:
-                    for x, y in list(edge_data['geometry'].coords):
-                        if not path_coords or path_coords[-1] != [y, x]:
-                            path_coords.append([y, x])
-                else:
-                    node_u = graph.nodes[u]
-                    node_v = graph.nodes[v]
-                    if not path_coords or path_coords[-1] != [node_u['y'], node_u['x']]:
-                        path_coords.append([node_u['y'], node_u['x']])
-                    path_coords.append([node_v['y'], node_v['x']])
-
-            dist_km = total_distance_m / 1000
-            
-            # 2. Simular Factores (Base)
-            raw_duration_min = float(result["cost"] / 60)
-            base_metrics = {
-                "duration_min": round(FactorSimulator.calibrate_base_time(dist_km, raw_duration_min), 2),
-                "distance_km": dist_km
-            }
-            
-            # 2.1 Aplicar SmartRouteEngine (Ajuste por Estado)
+def _simulate_seller_route(request: SimulationRequest, user_node, seller, product, current_state):
+    """Ruta, factores y KPIs de un vendedor (geometría sin formatear); None si no hay ruta válida."""
+    seller_coords = seller["coordinates"]
+    try:
+        target_node = _nearest_node(seller_coords["lng"], seller_coords["lat"])
+        result = path_finder.run_dijkstra(user_node, target_node, weight='weight')
+        
+        if not result["path"]:
+            return None
+        
+        # Validate result cost
+        if math.isinf(result["cost"]) or math.isnan(result["cost"]):
+            logger.warning(f"Invalid routing cost for seller {seller['id']}: {result['cost']}")
+            return None
+
+        # Solo las etapas que piden los `fields` de la petición (todas por defecto)
+        stages = stages_for_fields(request.fields)
+
+        # Decode path
+        if GEOMETRY in stages:
+            with span("decode_geometry"):
+                path_coords, total_distance_m = decode_path(graph, result["path"])
+        else:
+            path_coords, total_distance_m = None, path_length_m(graph, result["path"])
+
+        dist_km = total_distance_m / 1000
+        
+        # 2. Simular Factores (Base)
+        raw_duration_min = float(result["cost"] / 60)
+        base_metrics = {
+            "duration_min": round(FactorSimulator.calibrate_base_time(dist_km, raw_duration_min), 2),
+            "distance_km": dist_km
+        }
+        
+        # 2.1 Aplicar SmartRouteEngine (Ajuste por Estado)
+        with span("smart_route"):
             smart_result = SmartRouteEngine.calculate_optimal_route(
                 current_route=path_coords,
                 base_duration_min=base_metrics["duration_min"],
                 base_distance_km=base_metrics["distance_km"],
                 state=current_state
             )
-            
-            factors = FactorSimulator.simulate_factors(
-                state=current_state,
-                base_duration_min=base_metrics["duration_min"],
-                distance_km=smart_result["final_distance_km"]
-            )
-            
-            # 3. KPIs
-            # Usamos las métricas ajustadas para los KPIs
-            adjusted_base_metrics = {
-                "duration_min": base_metrics["duration_min"],
-                "distance_km": smart_result["final_distance_km"]
-            }
-            kpis = KPICalculator.calculate_kpis(factors, adjusted_base_metrics)
-            
-            transport_cost = 2.50 + (smart_result["final_distance_km"] * 0.35 * factors["fuel_factor"])
-            simulated_price = product.get("price_per_unit", 10) * 1.20
-            estimated_revenue = simulated_price * float(request.weight or 0)
-            load_percentage = max(0.0, min(100.0, (float(request.weight or 0) / 500.0) * 100.0))
-
-            routes_result.append({
-                "seller_id": seller["id"],
-                "seller_name": seller["name"],
-                "seller_rating": seller.get("rating", 0),
-                "seller_trips": seller.get("trips_count", 0),
-                "route_geometry": smart_result["final_route"], # Usar ruta potencialmente ajustada
-                "duration_seconds": kpis["simulated_duration_min"] * 60, 
-                "distance_meters": smart_result["final_distance_km"] * 1000,
-                "distance_km": smart_result["final_distance_km"],
-                "duration_min_base": base_metrics["duration_min"], # Original sin ajustar
-                "duration_min": kpis["simulated_duration_min"],
-                "transport_cost": round(transport_cost, 2),
-                "estimated_revenue": round(estimated_revenue, 2),
-                "net_profit": round(estimated_revenue - transport_cost, 2),
-                "load_percentage": load_percentage,
-                "product_image": product.get("image_url", ""),
-                "product_name": product.get("name", "Unknown"),
-                "price_per_unit": simulated_price,
-                "freshness_score": kpis["freshness_score"],
-                "punctuality_score": kpis["punctuality_score"],
-                "satisfaction_score": kpis["satisfaction_score"],
-                "efficiency_score": kpis.get("efficiency_score"),
-                "emissions_kg_co2": kpis.get("emissions_kg_co2"),
-                "waste_percent": kpis.get("waste_percent"),
-                "energy_saving_percent": kpis.get("energy_saving_percent"),
-                "simulation_state": {"state": kpis["state"].value if hasattr(kpis["state"], "value") else kpis["state"]},
-                "time_adjustments": smart_result["adjustments"],
-                "route_changed": smart_result["route_changed"],
-                "original_duration_min": base_metrics["duration_min"]
-            })
-            
-        except Exception as e:
-            logger.error(f"Error calculating route for seller {seller.get('id')}: {e}")
-            continue
 
-    routes_result.sort(key=lambda x: x["duration_seconds"])
+        factors = None
+        if MONTE_CARLO in stages:
+            with span("simulate_factors"):
+                factors = FactorSimulator.simulate_factors(
+                    state=current_state,
+                    base_duration_min=base_metrics["duration_min"],
+                    distance_km=smart_result["final_distance_km"]
+                )
+        
+        # 3. KPIs
+        # Usamos las métricas ajustadas para los KPIs
+        adjusted_base_metrics = {
+            "duration_min": base_metrics["duration_min"],
+            "distance_km": smart_result["final_distance_km"]
+        }
+        kpis = None
+        if IMPACT in stages:
+            # El modelo de impacto solo usa el estado de los factores, no el Monte Carlo
+            with span("calculate_kpis"):
+                kpis = KPICalculator.calculate_kpis(factors or {"state": current_state}, adjusted_base_metrics)
+        
+        return build_route_result(seller, product, request.weight, base_metrics, smart_result, factors, kpis, state=current_state)
+        
+    except Exception as e:
+        logger.error(f"Error calculating route for seller {seller.get('id')}: {e}")
+        return None
+
+def _simulate_routes(request: SimulationRequest, user_node):
+    product, sellers, current_state = _simulation_context(request)
+    if not sellers:
+        return summarize_routes(request.session_id, [], request.fields)
 
-    # Metrics aggregation
-    best_route = routes_result[0] if routes_result else {}
-    admin_metrics = AdminKPICalculator.calculate_admin_metrics(routes_result)
+    tolerance_m = _geometry_tolerance(request, request.user_lat)
+    routes_result = []
+    for seller in sellers:
+        route = _simulate_seller_route(request, user_node, seller, product, current_state)
+        if route is not None:
+            routes_result.append(route)
+
+    # Simplificación / polyline de todas las rutas en un solo paso vectorizado
+    if routes_result and "route_geometry" in routes_result[0] and (tolerance_m or request.geometry_format != "coords"):
+        with span("encode_geometry"):
+            geometries = format_geometries([r["route_geometry"] for r in routes_result], request.geometry_format, tolerance_m)
+        for route, geometry in zip(routes_result, geometries):
+            route["route_geometry"] = geometry
+
+    return summarize_routes(request.session_id, routes_result, request.fields)
+
+@app.post("/api/routes/simulate_batch")
+async def simulate_routes_batch(request: SimulationBatchRequest):
+    """
+    Simulación de muchos pedidos en una petición (pruebas de carga, planificación de capacidad).
+    Responde NDJSON: una línea por pedido con `index` (posición en `items`), `id` y la respuesta
+    de simulate, o `error`. Las líneas salen por grupos de producto a medida que se calculan.
+    """
+    if graph is None or batch_simulator is None:
+        raise HTTPException(status_code=503, detail="Graph service not available")
+    if len(request.items) > settings.SIMULATION_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Too many items: {len(request.items)} (max {settings.SIMULATION_BATCH_MAX_ITEMS})")
 
-    return {
-        "session_id": request.session_id,
-        "recommended_route": routes_result[0] if routes_result else None,
-        "all_routes": routes_result,
-        "metrics": {
-            "revenue": round(best_route.get("estimated_revenue", 0), 2),
-            "profit": round(best_route.get("net_profit", 0), 2),
-            "distance_total": round(best_route.get("distance_km", 0), 2),
-            "duration_total": round(best_route.get("duration_min", 0), 2),
-            "platform_profit": admin_metrics["platform_profit"],
-            "prediction_accuracy": admin_metrics["prediction_accuracy"],
-            "avg_time_reduction": admin_metrics["avg_time_reduction"],
-            "revenue_growth": admin_metrics["revenue_growth"]
-        },
-        "timestamp": time.time()
-    }
+    # El slot se conserva hasta terminar de transmitir el último resultado
+    await batch_admission.acquire("simulate_batch")
+    try:
+        chain = session_manager.get_session(request.session_id) if request.session_id else MarkovChain()
+        mean_lat = sum(it.user_lat for it in request.items) / len(request.items)
+        chunks = batch_simulator.run_chunks(
+            request.items,
+            chain,
+            session_id=request.session_id,
+            geometry_format=request.geometry_format,
+            tolerance_m=_geometry_tolerance(request, mean_lat),
+        )
+    except Exception:
+        batch_admission.release("simulate_batch")
+        raise
+
+    def lines():
+        # Cálculo y codificación de cada bloque en el threadpool; el event loop solo transmite
+        for results in chunks:
+            yield b"".join(dumps_bytes(r) + b"\n" for r in results)
+
+    # El slot se libera al cerrar la respuesta, aunque el cliente se desconecte antes del primer bloque
+    return ClosingStreamingResponse(
+        iterate_in_threadpool(lines()),
+        on_close=lambda: batch_admission.release("simulate_batch"),
+        media_type="application/x-ndjson",
+    )
 
 @app.get("/api/validation/stats", response_model=ValidationStatsResponse)
-def get_validation_stats():
-    if not validator_service:
+async def get_validation_stats():
+    if not validator_service or heavy_pool is None:
          raise HTTPException(status_code=503, detail="Validation service not available")
 
+    async with admission.slot("validation"):
+        try:
+            stats = await heavy_pool.run(validation_stats_task, routing_samples=15, n_simulations=100)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Validation failed: {str(e)}")
+    return {**stats, "timestamp": time.time()}
+
+def _schedule_missing_demand_model(product: str, lookback_days: int) -> JSONResponse:
+    """Encola (sin esperar) el entrenamiento Prophet de un producto sin pickle y responde 202 con el job."""
+    since = (pd.Timestamp.utcnow() - pd.Timedelta(days=lookback_days)).isoformat()
+    daily = fetch_daily_demand(product_id=product.lower(), since_iso=since)
+    if not daily or len(daily) < 30:
+        raise HTTPException(status_code=404, detail=f"Model for {product} not found")
+
+    job = _submit_job("demand_train", {"product": product, "lookback_days": lookback_days}, dedupe=True)
+    return JSONResponse(status_code=202, content={"product": product, "job": job, "timestamp": time.time()})
+
+@app.post("/api/orders/ingest")
+async def ingest_orders(request: Request, format: str = "ndjson", chunk_size: int = 50000):
+    """
+    Ingesta masiva de pedidos. El cuerpo (NDJSON o CSV con encabezado) se consume como stream y
+    se inserta por bloques; los agregados de demanda se actualizan en la misma transacción.
+    """
     try:
-        routing_stats = validator_service.validate_routing_algorithms(samples=15)
-        sim_stats = validator_service.validate_simulation_stability(n_simulations=100)
-        return {
-            "routing": routing_stats,
-            "simulation": sim_stats,
-            "timestamp": time.time()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Validation failed: {str(e)}")
+        ingestor = OrderIngestor(fmt=format, chunk_size=int(max(1000, min(chunk_size, 200000))))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    async for data in request.stream():
+        if data:
+            await run_in_threadpool(ingestor.feed_bytes, data)
+    return await run_in_threadpool(ingestor.close)
+
+@app.get("/api/simulation/events/stats")
+def get_simulation_event_stats(
+    simulation_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Distancia agregada y duración nueva promedio por tipo de evento. Sin `simulation_id` se lee
+    el agregado diario (incluye eventos ya archivados); con `simulation_id`, los eventos vivos.
+    """
+    if simulation_id:
+        return fetch_simulation_stats(simulation_id)
+    return fetch_simulation_event_stats(since_iso=since, until_iso=until, event_type=event_type)
+
+@app.get("/api/simulation/events/archives")
+def get_simulation_event_archives():
+    return {"partitions": fetch_simulation_event_archives()}
+
+@app.post("/api/simulation/events/compact")
+def compact_simulation_events_endpoint(older_than_days: Optional[int] = None, background: bool = True):
+    """Archiva (zlib, por mes) los eventos más antiguos que la retención configurada."""
+    return _run_maintenance_job("simulation_events_compact", {"older_than_days": older_than_days}, background)
+
+@app.get("/api/exports")
+def get_exports():
+    """Último snapshot columnar publicado de cada dataset (manifiesto)."""
+    return {"snapshots": list_snapshots()}
+
+@app.post("/api/exports")
+async def create_exports(datasets: Optional[str] = None, format: str = "parquet"):
+    """Exporta `orders` y/o `simulation_events` (separados por coma) a Parquet o Arrow IPC particionado."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {format}. Valores permitidos: {list(EXPORT_FORMATS)}")
+    names = [d.strip() for d in datasets.split(",") if d.strip()] if datasets else None
+    try:
+        manifests = await run_in_threadpool(export_all, fmt=format, datasets=names)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return {"snapshots": list(manifests.values())}
+
+@app.get("/api/demand/history")
+def get_demand_history(product: str, granularity: str = "day", lookback_days: int = 365):
+    lookback_days = int(max(1, min(lookback_days, 3650)))
+    since = (pd.Timestamp.utcnow() - pd.Timedelta(days=lookback_days)).isoformat()
+    try:
+        history = fetch_demand_rollup(product.lower(), since_iso=since, granularity=granularity)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return {"product": product, "granularity": granularity, "history": history}
+
+def _fallback_demand_forecast(product: str, days: int, lookback_days: int = 365):
+    """
+    Sin pickle Prophet: responde al instante con el motor Fourier (NumPy) y deja el
+    entrenamiento de Prophet encolado en el pool de jobs.
+    """
+    since = (pd.Timestamp.utcnow() - pd.Timedelta(days=lookback_days)).isoformat()
+    daily = fetch_daily_demand(product_id=product.lower(), since_iso=since)
+    if not daily or len(daily) < 30:
+        raise HTTPException(status_code=404, detail=f"Historical demand not found for {product}")
+
+    training_job = None
+    try:
+        training_job = _submit_job("demand_train", {"product": product, "lookback_days": lookback_days}, dedupe=True)
+    except HTTPException as e:
+        logger.warning(f"Could not schedule demand training for {product}: {e.detail}")
 
-@app.get("/api/demand/forecast", response_model=DemandForecastResponse)
+    fallback = FourierForecaster(product)
+    fallback.train(daily_to_frame(daily))
+    return {
+        "product": product,
+        "forecast": fallback.predict(days=days),
+        "engine": fallback.model_version,
+        "training_job": training_job,
+    }
+
+@app.get("/api/demand/forecast", response_model=DemandForecastResponse, response_model_exclude_none=True)
 def get_demand_forecast(product: str, days: int = 7):
+    if forecast_materializer is not None:
+        materialized = forecast_materializer.get_forecast(product, days)
+        if materialized:
+            CACHE_REQUESTS.labels("demand_forecast", "hit").inc()
+            return {"product": product, "forecast": materialized}
+        CACHE_REQUESTS.labels("demand_forecast", "miss").inc()
+    return forecast_flight.do((product, int(days)), lambda: _compute_demand_forecast(product, days))
+
+def _compute_demand_forecast(product: str, days: int):
     try:
         forecaster = DemandForecaster(product)
         if not forecaster.load():
-            lookback_days = 365
-            since = (pd.Timestamp.utcnow() - pd.Timedelta(days=lookback_days)).isoformat()
-            daily = fetch_daily_demand(product_id=product.lower(), since_iso=since)
-            if not daily or len(daily) < 30:
-                raise HTTPException(status_code=404, detail=f"Historical demand not found for {product}")
-
-            df = pd.DataFrame(daily, columns=["day", "y"])
-            df["ds"] = pd.to_datetime(df["day"])
-            df["y"] = pd.to_numeric(df["y"], errors="coerce").fillna(0.0).clip(lower=0.0)
-            df = df[["ds", "y"]]
-            forecaster.train(df)
-            forecaster.save()
-            forecaster.load()
-        
+            return _fallback_demand_forecast(product, days)
+
         forecast = forecaster.predict(days=days)
         return {"product": product, "forecast": forecast}
+    except HTTPException:
+        raise
     except ValueError as ve:
          raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
          raise HTTPException(status_code=500, detail=f"Internal forecasting error: {str(e)}")
 
 @app.get("/api/models/eta/evaluate")
-def evaluate_eta_model(n_samples: int = 3000, sample_points: int = 300):
-    predictor = ETAPredictor()
-    if not predictor.model_loaded:
+async def evaluate_eta_model(n_samples: int = 3000, sample_points: int = 300):
+    if not ETAPredictor().model_loaded or heavy_pool is None:
         raise HTTPException(status_code=503, detail="ETA model not loaded")
 
-    n_samples = int(max(200, min(n_samples, 20000)))
-    sample_points = int(max(50, min(sample_points, 1000)))
-
-    rng = np.random.default_rng(42)
-
-    dist = rng.uniform(1.0, 50.0, n_samples)
-    speed_kmh = np.clip(rng.normal(33.0, 7.0, n_samples), 16.0, 60.0)
-    base_dur = (dist / np.maximum(speed_kmh, 1e-6)) * 60.0
-    base_dur = base_dur * np.clip(rng.normal(1.0, 0.05, n_samples), 0.85, 1.15)
-
-    hour = rng.integers(6, 23, n_samples)
-    day = rng.integers(0, 7, n_samples)
-    is_weekend = (day >= 5).astype(int)
-    is_peak_hour = (((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))).astype(int)
-
-    rain = rng.choice([0, 5, 20], size=n_samples, p=[0.78, 0.17, 0.05])
-    traffic = rng.beta(2.0, 2.5, n_samples)
-    road_ratio = rng.uniform(0.3, 0.8, n_samples)
-
-    traffic_effect = 0.15 + 0.85 * (1.0 - np.exp(-2.2 * traffic))
-    rain_effect = np.where(rain > 0, 0.08 + (rain / 70.0), 0.0)
-    peak_effect = ((is_peak_hour == 1) & (is_weekend == 0)).astype(float) * 0.28
-
-    stop_time = np.clip(rng.lognormal(mean=np.log(1.6), sigma=0.75, size=n_samples), 0.0, 20.0)
-    incident = rng.binomial(1, p=np.clip(0.02 + 0.06 * traffic + 0.03 * (rain > 0).astype(float), 0.0, 0.25), size=n_samples)
-    incident_delay = incident * rng.uniform(0.0, 18.0, n_samples)
-    loading_delay = np.clip(rng.normal(4.0, 3.8, n_samples), 0.0, 22.0)
-    driver_style = rng.normal(0.0, 1.0, n_samples)
-
-    multiplier = 1.0 + peak_effect + rain_effect + (traffic_effect * 0.65)
-    y_true = (base_dur * multiplier) + stop_time + incident_delay + loading_delay + (driver_style * 4.0)
-    y_true = np.clip(y_true, 1.0, 240.0)
-    sigma = np.clip(0.13 * y_true + 1.6 * (rain > 0).astype(float) + 1.3 * traffic, 1.6, 28.0)
-    y_true = np.clip(y_true + rng.normal(0.0, sigma, n_samples), 1.0, 240.0)
-
-    X = pd.DataFrame(
-        {
-            "hour_of_day": hour,
-            "day_of_week": day,
-            "is_weekend": is_weekend,
-            "distance_km": dist,
-            "base_duration_min": base_dur,
-            "rain_intensity": rain,
-            "traffic_level": traffic,
-            "is_peak_hour": is_peak_hour,
-            "road_type_primary_ratio": road_ratio,
-        }
-    )[predictor.pipeline.feature_columns]
-
-    y_pred = predictor.model.predict(X)
-
-    mae = float(mean_absolute_error(y_true, y_pred))
-    rmse = float(np.sqrt(mean_squared_error(y_true, y_pred)))
-    r2 = float(r2_score(y_true, y_pred))
-
-    ratio_true = y_true / np.maximum(base_dur, 1e-6)
-    ratio_pred = y_pred / np.maximum(base_dur, 1e-6)
-    threshold_ratio = 1.10
-    y_true_cls = (ratio_true > threshold_ratio).astype(int)
-    y_pred_cls = (ratio_pred > threshold_ratio).astype(int)
-
-    tn, fp, fn, tp = confusion_matrix(y_true_cls, y_pred_cls, labels=[0, 1]).ravel()
-    precision, recall, f1, _ = precision_recall_fscore_support(y_true_cls, y_pred_cls, average="binary", zero_division=0)
-
-    fpr, tpr, thresholds = roc_curve(y_true_cls, ratio_pred)
-    roc_auc = float(auc(fpr, tpr))
-
-    idx = rng.choice(n_samples, size=sample_points, replace=False)
-    points = [{"y_true": float(y_true[i]), "y_pred": float(y_pred[i])} for i in idx]
-
-    feature_importances = None
-    if hasattr(predictor.model, "feature_importances_"):
-        feature_importances = [
-            {"feature": f, "importance": float(v)}
-            for f, v in zip(predictor.pipeline.feature_columns, predictor.model.feature_importances_)
-        ]
-        feature_importances.sort(key=lambda x: x["importance"], reverse=True)
-
-    latency_ms_single = None
-    try:
-        sample_row = X.iloc[0:1]
-        t0 = time.time()
-        for _ in range(80):
-            predictor.model.predict(sample_row)
-        latency_ms_single = ((time.time() - t0) / 80.0) * 1000.0
-    except Exception:
-        latency_ms_single = None
-
-    model_params = None
-    try:
-        params = predictor.model.get_params()
-        model_params = {k: params.get(k) for k in ["n_estimators", "max_depth", "learning_rate", "subsample", "colsample_bytree", "reg_lambda", "reg_alpha"]}
-    except Exception:
-        model_params = None
-
-    return {
-        "model_loaded": True,
-        "n_samples": n_samples,
-        "metrics": {"mae": round(mae, 4), "rmse": round(rmse, 4), "r2": round(r2, 6)},
-        "classification": {
-            "label_definition": f"late_if_true_ratio_gt_{threshold_ratio}",
-            "score_definition": "predicted_ratio=y_pred/base_duration_min",
-            "threshold_ratio": threshold_ratio,
-            "confusion_matrix": {"tn": int(tn), "fp": int(fp), "fn": int(fn), "tp": int(tp)},
-            "precision": round(float(precision), 6),
-            "recall": round(float(recall), 6),
-            "f1": round(float(f1), 6),
-            "roc_auc": round(float(roc_auc), 6),
-            "roc_curve": [{"fpr": float(a), "tpr": float(b)} for a, b in zip(fpr, tpr)],
-        },
-        "sample_points": points,
-        "feature_importances": feature_importances,
-        "latency_ms_single": round(float(latency_ms_single), 4) if latency_ms_single is not None else None,
-        "model_params": model_params,
-        "timestamp": time.time(),
-    }
+    async with admission.slot("evaluation"):
+        result = await heavy_pool.run(eta_evaluate_task, model_path=ETA_MODEL_PATH, n_samples=n_samples, sample_points=sample_points)
+    if result is None:
+        raise HTTPException(status_code=503, detail="ETA model not loaded")
+    return fast_json({**result, "timestamp": time.time()})
 
 class ETAPredictRequest(BaseModel):
     base_duration_min: float
@@ -655,174 +1057,44 @@ def eta_model_reload():
     }
 
 @app.post("/api/models/eta/train_mock")
-def eta_model_train_mock(req: ETATrainMockRequest):
-    n_samples = int(max(1000, min(req.n_samples, 200000)))
-    n_estimators = int(max(20, min(req.n_estimators, 500)))
-    max_depth = int(max(2, min(req.max_depth, 12)))
-
-    rng = np.random.default_rng(42)
-
-    dist = rng.uniform(1.0, 50.0, n_samples)
-    speed_kmh = np.clip(rng.normal(33.0, 7.0, n_samples), 16.0, 60.0)
-    base_dur = (dist / np.maximum(speed_kmh, 1e-6)) * 60.0
-    base_dur = base_dur * np.clip(rng.normal(1.0, 0.05, n_samples), 0.85, 1.15)
-
-    hour = rng.integers(6, 23, n_samples)
-    day = rng.integers(0, 7, n_samples)
-    is_weekend = (day >= 5).astype(int)
-    is_peak_hour = (((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))).astype(int)
-
-    rain = rng.choice([0, 5, 20], size=n_samples, p=[0.78, 0.17, 0.05])
-    traffic = rng.beta(2.0, 2.5, n_samples)
-    road_ratio = rng.uniform(0.3, 0.8, n_samples)
-
-    traffic_effect = 0.15 + 0.85 * (1.0 - np.exp(-2.2 * traffic))
-    rain_effect = np.where(rain > 0, 0.08 + (rain / 70.0), 0.0)
-    peak_effect = ((is_peak_hour == 1) & (is_weekend == 0)).astype(float) * 0.28
-
-    stop_time = np.clip(rng.lognormal(mean=np.log(1.6), sigma=0.75, size=n_samples), 0.0, 20.0)
-    incident = rng.binomial(1, p=np.clip(0.02 + 0.06 * traffic + 0.03 * (rain > 0).astype(float), 0.0, 0.25), size=n_samples)
-    incident_delay = incident * rng.uniform(0.0, 18.0, n_samples)
-    loading_delay = np.clip(rng.normal(4.0, 3.8, n_samples), 0.0, 22.0)
-    driver_style = rng.normal(0.0, 1.0, n_samples)
-
-    multiplier = 1.0 + peak_effect + rain_effect + (traffic_effect * 0.65)
-    y_true = (base_dur * multiplier) + stop_time + incident_delay + loading_delay + (driver_style * 4.0)
-    y_true = np.clip(y_true, 1.0, 240.0)
-    sigma = np.clip(0.13 * y_true + 1.6 * (rain > 0).astype(float) + 1.3 * traffic, 1.6, 28.0)
-    y = np.clip(y_true + rng.normal(0.0, sigma, n_samples), 1.0, 240.0)
-
-    predictor = ETAPredictor()
-
-    X = pd.DataFrame(
-        {
-            "hour_of_day": hour,
-            "day_of_week": day,
-            "is_weekend": is_weekend,
-            "distance_km": dist,
-            "base_duration_min": base_dur,
-            "rain_intensity": rain,
-            "traffic_level": traffic,
-            "is_peak_hour": is_peak_hour,
-            "road_type_primary_ratio": road_ratio,
-        }
-    )[predictor.pipeline.feature_columns]
-
-    model = XGBRegressor(
-        n_estimators=max(120, n_estimators),
-        learning_rate=0.05,
-        max_depth=max_depth,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        reg_lambda=2.0,
-        reg_alpha=0.2,
-        min_child_weight=4.0,
-        gamma=0.2,
-        objective="reg:squarederror",
-        n_jobs=-1,
-        tree_method="hist",
+def eta_model_train_mock(req: ETATrainMockRequest, background: bool = False):
+    outcome = _run_training_job(
+        "eta_train_mock",
+        {"n_samples": req.n_samples, "n_estimators": req.n_estimators, "max_depth": req.max_depth},
+        background=background,
     )
-
-    X_train, X_tmp, y_train, y_tmp = train_test_split(X, y, test_size=0.30, random_state=42)
-    X_val, X_test, y_val, y_test = train_test_split(X_tmp, y_tmp, test_size=0.50, random_state=42)
-
-    start = time.time()
-    model.fit(X_train, y_train)
-    train_time_s = time.time() - start
-
-    preds_train = model.predict(X_train)
-    preds_test = model.predict(X_test)
-
-    mae_train = float(mean_absolute_error(y_train, preds_train))
-    rmse_train = float(np.sqrt(mean_squared_error(y_train, preds_train)))
-    r2_train = float(r2_score(y_train, preds_train))
-    mae_test = float(mean_absolute_error(y_test, preds_test))
-    rmse_test = float(np.sqrt(mean_squared_error(y_test, preds_test)))
-    r2_test = float(r2_score(y_test, preds_test))
-
-    os.makedirs(os.path.dirname(predictor.model_path), exist_ok=True)
-    joblib.dump(model, predictor.model_path)
-
-    predictor.force_reload()
-    try:
-        from app.services.simulation import engine as sim_engine
-
-        sim_engine._eta_predictor.force_reload()
-    except Exception:
-        pass
+    if isinstance(outcome, JSONResponse):
+        return outcome
 
     return {
-        "trained": True,
-        "n_samples": n_samples,
-        "params": {"n_estimators": n_estimators, "max_depth": max_depth},
-        "metrics": {
-            "mae": round(mae_test, 4),
-            "rmse": round(rmse_test, 4),
-            "r2": round(r2_test, 6),
-            "train": {"mae": round(mae_train, 4), "rmse": round(rmse_train, 4), "r2": round(r2_train, 6)},
-            "test": {"mae": round(mae_test, 4), "rmse": round(rmse_test, 4), "r2": round(r2_test, 6)},
-            "best_iteration": int(getattr(model, "best_iteration", n_estimators)),
-        },
-        "train_time_s": round(train_time_s, 4),
-        "model_loaded": bool(predictor.model_loaded),
+        **outcome["result"],
+        "job_id": outcome["id"],
+        "model_loaded": bool(ETAPredictor().model_loaded),
         "timestamp": time.time(),
     }
 
 @app.get("/api/models/demand/evaluate")
-def evaluate_demand_model(product: str, initial: str = "180 days", period: str = "30 days", horizon: str = "30 days"):
-    forecaster = DemandForecaster(product)
-    if not forecaster.load():
-        raise HTTPException(status_code=404, detail=f"Model for {product} not found")
-
-    try:
-        from prophet.diagnostics import cross_validation, performance_metrics
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Prophet diagnostics not available: {e}")
+async def evaluate_demand_model(product: str, initial: str = "180 days", period: str = "30 days", horizon: str = "30 days"):
+    if heavy_pool is None:
+        raise HTTPException(status_code=503, detail="Heavy task pool not available")
 
-    try:
-        df_cv = cross_validation(forecaster.model, initial=initial, period=period, horizon=horizon)
-        df_p = performance_metrics(df_cv)
-        metrics = df_p.mean(numeric_only=True).to_dict()
-
-        sample = df_cv[["ds", "y", "yhat", "yhat_lower", "yhat_upper"]].tail(120).copy()
-        sample_points = [
-            {
-                "date": row["ds"].strftime("%Y-%m-%d") if hasattr(row["ds"], "strftime") else str(row["ds"]),
-                "y": float(row["y"]) if row["y"] is not None else None,
-                "yhat": float(row["yhat"]) if row["yhat"] is not None else None,
-                "yhat_lower": float(row["yhat_lower"]) if row["yhat_lower"] is not None else None,
-                "yhat_upper": float(row["yhat_upper"]) if row["yhat_upper"] is not None else None,
-            }
-            for _, row in sample.iterrows()
-        ]
-
-        return {
-            "model_loaded": True,
-            "product": product,
-            "cv": {"initial": initial, "period": period, "horizon": horizon},
-            "metrics": {k: float(v) for k, v in metrics.items()},
-            "sample_points": sample_points,
-            "timestamp": time.time(),
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Demand model evaluation failed: {e}")
+    async with admission.slot("evaluation"):
+        try:
+            result = await heavy_pool.run(demand_cv_task, product, initial=initial, period=period, horizon=horizon)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ImportError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Demand model evaluation failed: {e}")
+    return fast_json({**result, "timestamp": time.time()})
 
 @app.get("/api/models/demand/evaluate_fast")
 def evaluate_demand_model_fast(product: str, lookback_days: int = 365, test_days: int = 30):
     forecaster = DemandForecaster(product)
     if not forecaster.load():
-        since = (pd.Timestamp.utcnow() - pd.Timedelta(days=int(max(30, min(lookback_days, 3650))))).isoformat()
-        daily = fetch_daily_demand(product_id=product.lower(), since_iso=since)
-        if daily and len(daily) >= 30:
-            df = pd.DataFrame(daily, columns=["day", "y"])
-            df["ds"] = pd.to_datetime(df["day"])
-            df["y"] = pd.to_numeric(df["y"], errors="coerce").fillna(0.0).clip(lower=0.0)
-            df = df[["ds", "y"]]
-            forecaster.train(df)
-            forecaster.save()
-            forecaster.load()
-        else:
-            raise HTTPException(status_code=404, detail=f"Model for {product} not found")
+        # El request no espera el entrenamiento: se reintenta cuando el job termina
+        return _schedule_missing_demand_model(product, lookback_days=int(max(30, min(lookback_days, 3650))))
 
     lookback_days = int(max(30, min(lookback_days, 3650)))
     test_days = int(max(7, min(test_days, 180)))
@@ -833,10 +1105,7 @@ def evaluate_demand_model_fast(product: str, lookback_days: int = 365, test_days
         since = (pd.Timestamp.utcnow() - pd.Timedelta(days=lookback_days)).isoformat()
         daily = fetch_daily_demand(product_id=product_id, since_iso=since)
         if daily:
-            df_hist = pd.DataFrame(daily, columns=["day", "y"])
-            df_hist["ds"] = pd.to_datetime(df_hist["day"])
-            df_hist["y"] = pd.to_numeric(df_hist["y"], errors="coerce").fillna(0.0).clip(lower=0.0)
-            df_hist = df_hist[["ds", "y"]]
+            df_hist = daily_to_frame(daily)
     except Exception:
         df_hist = None
 
@@ -866,21 +1135,13 @@ def evaluate_demand_model_fast(product: str, lookback_days: int = 365, test_days
 
     model_version = getattr(forecaster, "model_version", "")
     should_retrain = (model_version != "prophet_v3") or (mape > 160.0) or (r2 < 0.5)
-    if should_retrain and df_hist is not None and len(df_hist) >= 60:
-        forecaster.train(df_hist)
-        forecaster.save()
-        forecaster.load()
-        yhat_df = forecaster.model.predict(df_test[["ds"]])
-        y_pred = np.maximum(0.0, yhat_df["yhat"].astype(float).to_numpy())
-        err = y_true - y_pred
-        mae = float(mean_absolute_error(y_true, y_pred))
-        rmse = float(np.sqrt(mean_squared_error(y_true, y_pred)))
-        r2 = float(r2_score(y_true, y_pred)) if float(np.var(y_true)) > 1e-9 else 0.0
-        eps = float(max(1.0, np.percentile(np.abs(y_true), 20)))
-        denom_mape = np.maximum(np.abs(y_true), eps)
-        mape = float(np.mean(np.abs(err) / denom_mape)) * 100.0
-        smape = float(np.mean((2.0 * np.abs(err)) / np.maximum(np.abs(y_true) + np.abs(y_pred) + eps, 1e-6))) * 100.0
-        wmape = float(np.sum(np.abs(err)) / max(float(np.sum(np.abs(y_true))), eps * len(y_true))) * 100.0
+    retrain_job = None
+    if should_retrain and data_source == "sqlite.orders" and len(df_hist) >= 60:
+        # El reentrenamiento corre en el pool de jobs; la respuesta usa el modelo vigente
+        try:
+            retrain_job = _submit_job("demand_train", {"product": product, "lookback_days": lookback_days}, dedupe=True)
+        except HTTPException as e:
+            logger.warning(f"Could not schedule demand retraining for {product}: {e.detail}")
 
     sample = pd.DataFrame({"ds": df_test["ds"], "y": y_true, "yhat": y_pred}).tail(120)
     sample_points = [
@@ -902,6 +1163,7 @@ def evaluate_demand_model_fast(product: str, lookback_days: int = 365, test_days
             "r2": round(r2, 6),
         },
         "sample_points": sample_points,
+        "retrain_job": retrain_job,
         "timestamp": time.time(),
     }
 
@@ -921,7 +1183,40 @@ def demand_models_status():
                 "last_modified": mtime,
             }
         )
-    return {"models": items, "timestamp": time.time()}
+    return {
+        "models": items,
+        "materialized": forecast_materializer.status() if forecast_materializer is not None else None,
+        "training_summary": load_training_summary(),
+        "timestamp": time.time(),
+    }
+
+class DemandTrainAllRequest(BaseModel):
+    products: Optional[List[str]] = None
+    lookback_days: int = 365
+    timeout_s: float = 600.0
+    max_workers: Optional[int] = None
+
+@app.post("/api/models/demand/train_all")
+def demand_models_train_all(req: DemandTrainAllRequest, background: bool = True):
+    outcome = _run_training_job(
+        "demand_train_all",
+        {"products": req.products, "lookback_days": req.lookback_days, "timeout_s": req.timeout_s, "max_workers": req.max_workers},
+        background=background,
+    )
+    if isinstance(outcome, JSONResponse):
+        return outcome
+    return {**outcome["result"], "job_id": outcome["id"], "timestamp": time.time()}
+
+@app.post("/api/models/demand/forecasts/refresh")
+def refresh_materialized_forecasts(product: Optional[str] = None):
+    if forecast_materializer is None:
+        raise HTTPException(status_code=503, detail="Forecast materialization disabled")
+    if product:
+        outcome = forecast_materializer.refresh_product(product)
+        if outcome is None:
+            raise HTTPException(status_code=404, detail=f"No trained demand model for {product}")
+        return {"refreshed": [outcome], "timestamp": time.time()}
+    return {**forecast_materializer.refresh_all(reason="api"), "timestamp": time.time()}
 
 class ImpactPredictRequest(BaseModel):
     distance_km: float
@@ -932,12 +1227,15 @@ class ImpactTrainMockRequest(BaseModel):
     n_samples: int = 10000
     n_estimators: int = 120
     max_depth: int = 5
+    multi_strategy: str = DEFAULT_MULTI_STRATEGY
 
 @app.get("/api/models/impact/status")
 def impact_model_status():
     return {
         "model_loaded": bool(impact_predictor.model_loaded),
         "model_path": impact_predictor.model_path,
+        "multi_strategy": model_multi_strategy(impact_predictor.model),
+        "surrogate": impact_predictor.surrogate.describe() if impact_predictor.surrogate is not None else None,
         "timestamp": time.time(),
     }
 
@@ -957,33 +1255,75 @@ def impact_model_predict(req: ImpactPredictRequest):
     return {"prediction": pred.to_dict(), "timestamp": time.time()}
 
 @app.post("/api/models/impact/train_mock")
-def impact_model_train_mock(req: ImpactTrainMockRequest):
-    result = impact_predictor.train_mock(
-        n_samples=req.n_samples,
-        n_estimators=req.n_estimators,
-        max_depth=req.max_depth,
+def impact_model_train_mock(req: ImpactTrainMockRequest, background: bool = False):
+    if req.multi_strategy not in MULTI_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"multi_strategy inválido. Valores permitidos: {list(MULTI_STRATEGIES)}")
+    outcome = _run_training_job(
+        "impact_train_mock",
+        {
+            "n_samples": req.n_samples,
+            "n_estimators": req.n_estimators,
+            "max_depth": req.max_depth,
+            "multi_strategy": req.multi_strategy,
+        },
+        background=background,
     )
-    impact_predictor.force_reload()
-    try:
-        from app.services.simulation import engine as sim_engine
-
-        sim_engine._impact_predictor.force_reload()
-    except Exception:
-        pass
+    if isinstance(outcome, JSONResponse):
+        return outcome
 
     return {
-        **result,
+        **outcome["result"],
+        "job_id": outcome["id"],
         "model_loaded": bool(impact_predictor.model_loaded),
         "timestamp": time.time(),
     }
 
 @app.get("/api/models/impact/evaluate")
-def impact_model_evaluate(n_samples: int = 6000, sample_points: int = 300):
-    if not impact_predictor.model_loaded:
+async def impact_model_evaluate(n_samples: int = 6000, sample_points: int = 300):
+    if not impact_predictor.model_loaded or heavy_pool is None:
+        raise HTTPException(status_code=503, detail="Impact model not loaded")
+
+    async with admission.slot("evaluation"):
+        result = await heavy_pool.run(impact_evaluate_task, model_path=impact_predictor.model_path, n_samples=n_samples, sample_points=sample_points)
+    if result is None:
         raise HTTPException(status_code=503, detail="Impact model not loaded")
+    return fast_json({**result, "timestamp": time.time()})
+
+@app.post("/api/jobs", status_code=202)
+def submit_job(req: JobSubmitRequest):
+    return _submit_job(req.kind, req.params, dedupe=req.dedupe)
+
+@app.get("/api/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 50):
+    runner = get_job_runner()
+    return {
+        "jobs": runner.list(limit=int(max(1, min(limit, 500))), status=status),
+        "runner": runner.stats(),
+        "timestamp": time.time(),
+    }
 
-    result = impact_predictor.evaluate_mock(n_samples=n_samples, sample_points=sample_points)
-    return {**result, "timestamp": time.time()}
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = get_job_runner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = get_job_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = get_job_runner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job["status"] not in FINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is still {job['status']}")
+    return {"job_id": job_id, "status": job["status"], "result": job["result"], "error": job["error"]}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,138 @@
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.ml.demand_forecasting.forecaster import forecast_records
+
+MODEL_VERSION = "fourier_v1"
+
+# z de la normal para el mismo interval_width (0.9) que usa el modelo Prophet
+_Z_90 = 1.6448536269514722
+
+
+def _fourier(t_days, period, order):
+    """Columnas sin/cos de orden 1..order para un período en días (como las estacionalidades de Prophet)."""
+    if order <= 0:
+        return np.empty((len(t_days), 0))
+    k = np.arange(1, order + 1)
+    angles = 2.0 * np.pi * np.outer(t_days, k) / period
+    return np.hstack([np.sin(angles), np.cos(angles)])
+
+
+class FourierForecaster:
+    """
+    Pronóstico de demanda con regresión lineal en forma cerrada: tendencia lineal +
+    estacionalidad semanal y anual en series de Fourier, resuelta con mínimos cuadrados
+    regularizados (ridge) en NumPy. Ajusta en milisegundos y expone la misma interfaz que
+    DemandForecaster (train/predict/predict_frame/save/load), por lo que sirve de respaldo
+    mientras el modelo Prophet se entrena en segundo plano.
+
+    Las bandas lower/upper son el intervalo de predicción al 90% bajo residuos normales.
+    """
+
+    def __init__(self, product_name, models_dir=None, weekly_order=3, yearly_order=6, ridge=1.0):
+        self.product_name = product_name
+        self.weekly_order = int(weekly_order)
+        self.yearly_order = int(yearly_order)
+        self.ridge = float(ridge)
+        self.model = None
+        self.model_version = MODEL_VERSION
+        if models_dir is None:
+            models_dir = os.path.join(os.path.dirname(__file__), "models")
+        self.models_dir = models_dir
+        self.model_path = os.path.join(self.models_dir, f"fourier_{product_name}.pkl")
+
+    def _design(self, ds, model):
+        t_days = (pd.to_datetime(ds).to_numpy(dtype="datetime64[D]").astype(np.int64)).astype(float)
+        trend = (t_days - model["t0"]) / model["t_scale"]
+        return np.column_stack(
+            [
+                np.ones_like(trend),
+                trend,
+                _fourier(t_days, 7.0, model["weekly_order"]),
+                _fourier(t_days, 365.25, model["yearly_order"]),
+            ]
+        )
+
+    def train(self, df):
+        start = time.time()
+        df = df.copy()
+        df["ds"] = pd.to_datetime(df["ds"])
+        df["y"] = pd.to_numeric(df["y"], errors="coerce").fillna(0.0).clip(lower=0.0)
+        df = df[["ds", "y"]].sort_values("ds")
+
+        # Mismo preprocesamiento que DemandForecaster: días faltantes = demanda 0
+        full_range = pd.date_range(df["ds"].min(), df["ds"].max(), freq="D")
+        df = df.set_index("ds").reindex(full_range)
+        df.index.name = "ds"
+        df["y"] = df["y"].fillna(0.0).astype(float)
+        df = df.reset_index()
+
+        n = len(df)
+        if n < 2:
+            raise ValueError("Not enough history to fit the forecaster.")
+        t_days = df["ds"].to_numpy(dtype="datetime64[D]").astype(np.int64).astype(float)
+        model = {
+            "t0": float(t_days[0]),
+            "t_scale": float(max(1.0, t_days[-1] - t_days[0])),
+            "weekly_order": self.weekly_order if n >= 14 else 0,
+            "yearly_order": self.yearly_order if n >= 120 else 0,
+            "last_ds": df["ds"].iloc[-1],
+        }
+
+        X = self._design(df["ds"], model)
+        y = df["y"].to_numpy(dtype=float)
+        penalty = np.full(X.shape[1], self.ridge)
+        penalty[:2] = 0.0  # sin regularizar intercepto ni tendencia
+        xtx_inv = np.linalg.pinv(X.T @ X + np.diag(penalty))
+        beta = xtx_inv @ (X.T @ y)
+
+        resid = y - X @ beta
+        dof = max(1, n - X.shape[1])
+        model.update(
+            {
+                "beta": beta,
+                "xtx_inv": xtx_inv,
+                "sigma": float(np.sqrt(np.sum(resid ** 2) / dof)),
+                "n_obs": n,
+                "fit_time_s": time.time() - start,
+            }
+        )
+        self.model = model
+
+    def predict_frame(self, days=7):
+        if self.model is None:
+            raise ValueError("Model not trained or loaded.")
+        ds = pd.date_range(pd.Timestamp(self.model["last_ds"]) + pd.Timedelta(days=1), periods=int(days), freq="D")
+        X = self._design(ds, self.model)
+        yhat = X @ self.model["beta"]
+        leverage = np.einsum("ij,jk,ik->i", X, self.model["xtx_inv"], X)
+        half_width = _Z_90 * self.model["sigma"] * np.sqrt(1.0 + leverage)
+        return pd.DataFrame(
+            {
+                "ds": ds,
+                "yhat": np.maximum(0.0, yhat),
+                "yhat_lower": np.maximum(0.0, yhat - half_width),
+                "yhat_upper": np.maximum(0.0, yhat + half_width),
+            }
+        )
+
+    def predict(self, days=7):
+        return forecast_records(self.predict_frame(days=days))
+
+    def save(self, path=None):
+        if self.model is None:
+            return
+        os.makedirs(self.models_dir, exist_ok=True)
+        joblib.dump({"version": MODEL_VERSION, "product": self.product_name, "model": self.model}, path or self.model_path)
+
+    def load(self):
+        if not os.path.exists(self.model_path):
+            return False
+        payload = joblib.load(self.model_path)
+        self.model = payload.get("model")
+        self.model_version = str(payload.get("version") or "")
+        return self.model is not None
@@ -5,9 +5,49 @@ from prophet.diagnostics import cross_validation, performance_metrics
 import joblib
 import os
 import json
+import time
 
 MODEL_VERSION = "prophet_v3"
 
+
+def daily_to_frame(daily):
+    """Convierte filas (day, total) de SQLite al DataFrame ds/y que espera Prophet."""
+    df = pd.DataFrame(daily, columns=["day", "y"])
+    df["ds"] = pd.to_datetime(df["day"])
+    df["y"] = pd.to_numeric(df["y"], errors="coerce").fillna(0.0).clip(lower=0.0)
+    return df[["ds", "y"]]
+
+
+def forecast_records(forecast_df):
+    """Convierte un DataFrame ds/yhat/yhat_lower/yhat_upper al esquema de respuesta de la API."""
+    dates = pd.to_datetime(forecast_df["ds"]).dt.strftime("%Y-%m-%d").tolist()
+    yhat = np.round(forecast_df["yhat"].to_numpy(dtype=float), 2).tolist()
+    lower = np.round(forecast_df["yhat_lower"].to_numpy(dtype=float), 2).tolist()
+    upper = np.round(forecast_df["yhat_upper"].to_numpy(dtype=float), 2).tolist()
+    return [
+        {"date": d, "forecast": f, "lower_bound": lo, "upper_bound": up}
+        for d, f, lo, up in zip(dates, yhat, lower, upper)
+    ]
+
+
+def train_demand_artifact(artifact_path, product, daily):
+    """
+    Entrena un modelo Prophet para `product` y lo serializa en `artifact_path`.
+    Es una función de módulo para poder ejecutarse en un proceso worker.
+    """
+    forecaster = DemandForecaster(product)
+    start = time.time()
+    forecaster.train(daily_to_frame(daily))
+    train_time_s = time.time() - start
+    forecaster.save(path=artifact_path)
+    return {
+        "trained": True,
+        "product": product,
+        "n_days": len(daily),
+        "model_version": MODEL_VERSION,
+        "train_time_s": round(train_time_s, 4),
+    }
+
 class DemandForecaster:
     def __init__(self, product_name, models_dir=None):
         self.product_name = product_name
@@ -45,26 +85,19 @@ class DemandForecaster:
         self.model.fit(df)
         print("Training complete.")
         
-    def predict(self, days=7):
+    def predict_frame(self, days=7):
+        """Predice solo los `days` días posteriores al histórico (sin re-predecir todo el historial)."""
         if self.model is None:
             raise ValueError("Model not trained or loaded.")
-            
-        future = self.model.make_future_dataframe(periods=days)
+
+        last_date = pd.Timestamp(self.model.history['ds'].max())
+        future = pd.DataFrame({"ds": pd.date_range(last_date + pd.Timedelta(days=1), periods=int(days), freq="D")})
         forecast = self.model.predict(future)
-        
-        last_date = self.model.history['ds'].max()
-        future_forecast = forecast[forecast['ds'] > last_date].copy()
-        
-        results = []
-        for _, row in future_forecast.iterrows():
-            results.append({
-                "date": row['ds'].strftime('%Y-%m-%d'),
-                "forecast": round(row['yhat'], 2),
-                "lower_bound": round(row['yhat_lower'], 2),
-                "upper_bound": round(row['yhat_upper'], 2)
-            })
-            
-        return results
+        return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+    def predict(self, days=7):
+        future_forecast = self.predict_frame(days=days)
+        return forecast_records(future_forecast)
 
     def evaluate(self, initial='365 days', period='30 days', horizon='7 days'):
         if self.model is None:
@@ -77,18 +110,19 @@ class DemandForecaster:
         print(f"Validation Metrics: {metrics}")
         return metrics
 
-    def save(self):
+    def save(self, path=None):
         if self.model is None:
             return
+        path = path or self.model_path
         joblib.dump(
             {
                 "version": MODEL_VERSION,
                 "product": self.product_name,
                 "model": self.model,
             },
-            self.model_path,
+            path,
         )
-        print(f"Model saved to {self.model_path}")
+        print(f"Model saved to {path}")
 
     def load(self):
         if os.path.exists(self.model_path):
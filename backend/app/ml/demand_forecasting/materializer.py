@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.core.localdb import (
+    fetch_demand_forecast_run,
+    fetch_demand_forecast_runs,
+    fetch_materialized_forecast,
+    fetch_orders_watermark,
+    fetch_orders_watermarks,
+    replace_demand_forecasts,
+)
+from app.core.logger import get_logger
+from app.ml.demand_forecasting.forecaster import DemandForecaster, forecast_records
+
+logger = get_logger(__name__)
+
+
+def _artifact_mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ForecastMaterializer:
+    """
+    Capa de materialización de pronósticos Prophet.
+
+    Para cada producto se predice una sola vez hasta `max_horizon_days` y el resultado se guarda en
+    la tabla `demand_forecasts` (clave product_id + model_version + day). Las consultas se
+    responden con un slice de esa tabla; si el pickle del modelo cambió desde la última
+    materialización, el pronóstico se considera obsoleto y se devuelve None (el llamador usa
+    el camino en línea) mientras se programa un refresco.
+
+    Un hilo en segundo plano refresca todos los productos cada `refresh_interval_s`. Cada
+    `watch_interval_s` se revisa la marca de agua de `orders` (id más alto) por producto: los
+    pedidos nuevos solo cambian el pronóstico al reentrenar, así que por cada producto cuya marca
+    avanzó se llama a `retrain(product)` (en la app, un job `demand_train` deduplicado cuyo
+    `on_complete` vuelve a materializar). Si `retrain` falla, el producto se reintenta en la
+    siguiente revisión.
+    """
+
+    def __init__(
+        self,
+        product_ids: Sequence[str],
+        max_horizon_days: int = 90,
+        refresh_interval_s: float = 3600.0,
+        watch_interval_s: float = 30.0,
+        models_dir: Optional[str] = None,
+        retrain: Optional[Callable[[str], Any]] = None,
+    ):
+        self.product_ids = list(product_ids)
+        self.max_horizon_days = int(max(1, max_horizon_days))
+        self.refresh_interval_s = float(refresh_interval_s)
+        self.watch_interval_s = float(max(0.05, watch_interval_s))
+        self.models_dir = models_dir
+        self.retrain = retrain
+        self._refresh_lock = threading.Lock()
+        self._scheduled: set = set()
+        self._scheduled_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_watermark: Optional[int] = None
+        self._product_watermarks: Dict[str, int] = {}
+        self._retrain_backlog: set = set()
+        self._last_full_refresh = 0.0
+
+    def _forecaster(self, product: str) -> DemandForecaster:
+        return DemandForecaster(product, models_dir=self.models_dir)
+
+    def refresh_product(self, product: str, orders_watermark: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Recalcula y persiste el pronóstico de un producto. Retorna None si no hay modelo entrenado."""
+        with self._refresh_lock:
+            forecaster = self._forecaster(product)
+            mtime_ns = _artifact_mtime_ns(forecaster.model_path)
+            if mtime_ns is None or not forecaster.load():
+                return None
+
+            start = time.time()
+            records = forecast_records(forecaster.predict_frame(days=self.max_horizon_days))
+            model_version = f"{forecaster.model_version or 'legacy'}:{mtime_ns}"
+            if orders_watermark is None:
+                orders_watermark = fetch_orders_watermark()
+            replace_demand_forecasts(
+                product,
+                model_version,
+                [(r["date"], r["forecast"], r["lower_bound"], r["upper_bound"]) for r in records],
+                artifact_mtime_ns=mtime_ns,
+                orders_watermark=orders_watermark,
+            )
+            elapsed = time.time() - start
+            logger.info(f"Materialized {len(records)} forecast days for {product} ({model_version}) in {elapsed:.2f}s")
+            return {"product": product, "model_version": model_version, "days": len(records), "time_s": round(elapsed, 4)}
+
+    def refresh_all(self, reason: str = "manual") -> Dict[str, Any]:
+        """Vuelve a predecir y materializar todos los productos con modelo entrenado."""
+        start = time.time()
+        watermark = fetch_orders_watermark()
+        refreshed: List[Dict[str, Any]] = []
+        skipped: List[str] = []
+        failed: Dict[str, str] = {}
+        for product in self.product_ids:
+            try:
+                outcome = self.refresh_product(product, orders_watermark=watermark)
+            except Exception as e:
+                logger.error(f"Forecast materialization failed for {product}: {e}")
+                failed[product] = str(e)
+                continue
+            if outcome is None:
+                skipped.append(product)
+            else:
+                refreshed.append(outcome)
+        self._last_full_refresh = time.time()
+        return {
+            "reason": reason,
+            "refreshed": refreshed,
+            "skipped": skipped,
+            "failed": failed,
+            "orders_watermark": watermark,
+            "time_s": round(time.time() - start, 4),
+        }
+
+    def _advance_watermark(self, watermark: int) -> List[str]:
+        """Actualiza las marcas por producto con los pedidos posteriores a la última revisión y retorna los que avanzaron."""
+        if watermark == self._last_watermark:
+            return []
+        first = self._last_watermark is None
+        moved = fetch_orders_watermarks(since_id=self._last_watermark or 0)
+        self._product_watermarks.update(moved)
+        self._last_watermark = watermark
+        # La primera revisión solo fija el punto de partida
+        return [] if first else [p for p in self.product_ids if p in moved]
+
+    def retrain_products(self, products: Sequence[str]) -> Dict[str, Any]:
+        """Pide reentrenar `products` y los que quedaron pendientes de una revisión anterior."""
+        due = [p for p in self.product_ids if p in set(products) or p in self._retrain_backlog]
+        retraining: Dict[str, Any] = {}
+        failed: Dict[str, str] = {}
+        for product in due:
+            try:
+                retraining[product] = self.retrain(product)
+            except Exception as e:
+                logger.warning(f"Could not schedule demand retraining for {product}: {e}")
+                failed[product] = str(e)
+                self._retrain_backlog.add(product)
+                continue
+            self._retrain_backlog.discard(product)
+        return {
+            "reason": "new_orders",
+            "retraining": retraining,
+            "failed": failed,
+            "orders_watermark": self._last_watermark,
+            "product_watermarks": {p: self._product_watermarks[p] for p in due if p in self._product_watermarks},
+        }
+
+    def refresh_async(self, product: str) -> None:
+        """Programa el refresco de un producto en un hilo aparte (se ignora si ya está programado)."""
+        with self._scheduled_lock:
+            if product in self._scheduled:
+                return
+            self._scheduled.add(product)
+
+        def _run():
+            try:
+                self.refresh_product(product)
+            except Exception as e:
+                logger.error(f"Forecast materialization failed for {product}: {e}")
+            finally:
+                with self._scheduled_lock:
+                    self._scheduled.discard(product)
+
+        threading.Thread(target=_run, name=f"forecast-refresh-{product}", daemon=True).start()
+
+    def get_forecast(self, product: str, days: int) -> Optional[List[Dict[str, Any]]]:
+        """Slice del pronóstico materializado, o None si no existe, está obsoleto o excede el horizonte."""
+        days = int(days)
+        if days <= 0:
+            return None
+        run = fetch_demand_forecast_run(product)
+        mtime_ns = _artifact_mtime_ns(self._forecaster(product).model_path)
+        if mtime_ns is not None and (run is None or mtime_ns != int(run["artifact_mtime_ns"])):
+            # Modelo nuevo o reentrenado: se materializa en segundo plano
+            self.refresh_async(product)
+            return None
+        if run is None or mtime_ns is None or days > int(run["horizon_days"]):
+            return None
+        return fetch_materialized_forecast(product, run["model_version"], days)
+
+    def check_for_updates(self) -> Optional[Dict[str, Any]]:
+        """Reentrena los productos con pedidos nuevos, o refresca todo si venció el intervalo de refresco."""
+        moved = self._advance_watermark(fetch_orders_watermark())
+        if self.retrain is not None and (moved or self._retrain_backlog):
+            return self.retrain_products(moved)
+        if self.refresh_interval_s > 0 and time.time() - self._last_full_refresh >= self.refresh_interval_s:
+            return self.refresh_all(reason="schedule")
+        return None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.check_for_updates()
+            except Exception as e:
+                logger.error(f"Forecast materializer refresh failed: {e}")
+            self._stop.wait(self.watch_interval_s)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="forecast-materializer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "max_horizon_days": self.max_horizon_days,
+            "refresh_interval_s": self.refresh_interval_s,
+            "watch_interval_s": self.watch_interval_s,
+            "orders_watermark": self._last_watermark,
+            "product_watermarks": dict(self._product_watermarks),
+            "retrain_backlog": sorted(self._retrain_backlog),
+            "last_full_refresh": self._last_full_refresh or None,
+            "runs": fetch_demand_forecast_runs(),
+        }
@@ -0,0 +1,204 @@
+import json
+import multiprocessing
+import os
+import queue
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.ml.demand_forecasting.forecaster import MODEL_VERSION, DemandForecaster, daily_to_frame
+
+DEFAULT_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+SUMMARY_FILENAME = "training_summary.json"
+MIN_TRAINING_DAYS = 30
+
+
+def _fit_metrics(forecaster: DemandForecaster, eval_days: int) -> Dict[str, float]:
+    """Métricas in-sample sobre los últimos `eval_days` del histórico de entrenamiento."""
+    hist = forecaster.model.history[["ds", "y"]].tail(int(eval_days))
+    y_true = hist["y"].astype(float).to_numpy()
+    y_pred = np.maximum(0.0, forecaster.model.predict(hist[["ds"]])["yhat"].astype(float).to_numpy())
+    err = y_true - y_pred
+    eps = float(max(1.0, np.percentile(np.abs(y_true), 20)))
+    return {
+        "eval_days": int(len(y_true)),
+        "mae": round(float(np.mean(np.abs(err))), 4),
+        "rmse": round(float(np.sqrt(np.mean(err ** 2))), 4),
+        "smape_pct": round(float(np.mean((2.0 * np.abs(err)) / np.maximum(np.abs(y_true) + np.abs(y_pred) + eps, 1e-6))) * 100.0, 4),
+        "wmape_pct": round(float(np.sum(np.abs(err)) / max(float(np.sum(np.abs(y_true))), eps * len(y_true))) * 100.0, 4),
+    }
+
+
+def train_product_model(product: str, daily: List[Tuple[str, float]], models_dir: Optional[str] = None, eval_days: int = 30) -> Dict[str, Any]:
+    """
+    Entrena y guarda el modelo Prophet de un producto. El pickle se escribe en un archivo temporal
+    y se mueve con os.replace, de modo que un lector nunca ve un artefacto a medio escribir.
+    """
+    forecaster = DemandForecaster(product, models_dir=models_dir)
+    start = time.time()
+    forecaster.train(daily_to_frame(daily))
+    fit_time_s = time.time() - start
+
+    metrics = _fit_metrics(forecaster, eval_days)
+    tmp_path = f"{forecaster.model_path}.{os.getpid()}.tmp"
+    try:
+        forecaster.save(path=tmp_path)
+        os.replace(tmp_path, forecaster.model_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        "product": product,
+        "status": "succeeded",
+        "n_days": len(daily),
+        "fit_time_s": round(fit_time_s, 4),
+        "metrics": metrics,
+        "model_path": forecaster.model_path,
+        "model_version": MODEL_VERSION,
+    }
+
+
+def _worker(product: str, daily: List[Tuple[str, float]], models_dir: Optional[str], eval_days: int, results: Any) -> None:
+    try:
+        results.put(train_product_model(product, daily, models_dir=models_dir, eval_days=eval_days))
+    except Exception as e:
+        results.put({"product": product, "status": "failed", "error": f"{type(e).__name__}: {e}"})
+
+
+def _write_summary(path: str, summary: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def train_all_products(
+    daily_by_product: Dict[str, List[Tuple[str, float]]],
+    products: Optional[Sequence[str]] = None,
+    models_dir: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    timeout_s: float = 600.0,
+    eval_days: int = 30,
+    summary_path: Optional[str] = None,
+    mp_start_method: str = "spawn",
+) -> Dict[str, Any]:
+    """
+    Entrena en paralelo un modelo Prophet por producto, un proceso por ajuste.
+
+    Cada producto tiene su propio límite `timeout_s` (medido desde que su proceso arranca); al
+    vencerse el proceso se termina y el artefacto anterior queda intacto. Los productos con menos
+    de MIN_TRAINING_DAYS días de historia se omiten. El resumen (tiempos y métricas) se guarda
+    como JSON en `summary_path` (por defecto `<models_dir>/training_summary.json`).
+    """
+    products = list(products) if products is not None else sorted(daily_by_product)
+    models_dir = models_dir or DEFAULT_MODELS_DIR
+    os.makedirs(models_dir, exist_ok=True)
+    summary_path = summary_path or os.path.join(models_dir, SUMMARY_FILENAME)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = deque()
+    for product in products:
+        daily = daily_by_product.get(product) or []
+        if len(daily) < MIN_TRAINING_DAYS:
+            results[product] = {"product": product, "status": "skipped", "n_days": len(daily), "error": "Not enough history"}
+        else:
+            pending.append(product)
+
+    workers = int(max(1, min(max_workers or os.cpu_count() or 1, len(pending) or 1)))
+    ctx = multiprocessing.get_context(mp_start_method)
+    result_q = ctx.Queue()
+    running: Dict[str, Tuple[Any, float]] = {}
+    start = time.time()
+
+    def _collect(block_s: float) -> None:
+        """Recoge todos los resultados disponibles (espera hasta `block_s` por el primero)."""
+        while True:
+            try:
+                msg = result_q.get(timeout=block_s) if block_s > 0 else result_q.get_nowait()
+            except queue.Empty:
+                return
+            block_s = 0
+            product = msg["product"]
+            if product in running:
+                proc, started = running.pop(product)
+                msg["wall_time_s"] = round(time.time() - started, 4)
+                proc.join(5)
+            results[product] = msg
+
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                product = pending.popleft()
+                proc = ctx.Process(
+                    target=_worker,
+                    args=(product, daily_by_product[product], models_dir, eval_days, result_q),
+                    name=f"prophet-train-{product}",
+                )
+                proc.start()
+                running[product] = (proc, time.time())
+
+            _collect(0.2)
+
+            now = time.time()
+            for product, (proc, started) in list(running.items()):
+                if product not in running:
+                    continue
+                if now - started > timeout_s:
+                    proc.terminate()
+                    proc.join(5)
+                    running.pop(product, None)
+                    results[product] = {
+                        "product": product,
+                        "status": "timeout",
+                        "error": f"Training exceeded {timeout_s:.0f}s",
+                        "wall_time_s": round(now - started, 4),
+                    }
+                elif not proc.is_alive():
+                    # El resultado pudo llegar justo antes de que el proceso terminara
+                    _collect(1.0)
+                    if product in running:
+                        running.pop(product)
+                        results[product] = {
+                            "product": product,
+                            "status": "failed",
+                            "error": f"Worker exited with code {proc.exitcode}",
+                        }
+    finally:
+        for proc, _ in running.values():
+            proc.terminate()
+            proc.join(5)
+        result_q.close()
+
+    items = [results[p] for p in products]
+    fit_times = [r["fit_time_s"] for r in items if r.get("status") == "succeeded"]
+    wall_time_s = time.time() - start
+    summary = {
+        "model_version": MODEL_VERSION,
+        "workers": workers,
+        "timeout_s": timeout_s,
+        "wall_time_s": round(wall_time_s, 4),
+        "sum_fit_time_s": round(float(sum(fit_times)), 4),
+        "max_fit_time_s": round(float(max(fit_times)), 4) if fit_times else None,
+        "succeeded": sum(1 for r in items if r.get("status") == "succeeded"),
+        "products": items,
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
+    }
+    _write_summary(summary_path, summary)
+    return summary
+
+
+def load_training_summary(models_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    path = os.path.join(models_dir or DEFAULT_MODELS_DIR, SUMMARY_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def train_all_demand_artifacts(artifact_path: Optional[str], daily_by_product: Dict[str, List[Tuple[str, float]]], **kwargs: Any) -> Dict[str, Any]:
+    """Adaptador para el runner de jobs: no produce un artefacto único, cada producto se guarda atómicamente."""
+    return train_all_products(daily_by_product, **kwargs)
@@ -1,3 +1,5 @@
+import argparse
+import json
 import os
 import sys
 import pandas as pd
@@ -13,31 +15,31 @@ sys.path.append(backend_root)
 from app.ml.demand_forecasting.data_generator import generate_synthetic_demand
 from app.ml.demand_forecasting.forecaster import DemandForecaster
 
-def main():
+def train_synthetic():
     products = ['Cacao', 'Arroz']
-    
+
     results = {}
-    
+
     for product in products:
         print(f"\n--- Processing {product} ---")
-        
+
         # 1. Generate Data
         df = generate_synthetic_demand(product, days=730)
-        
+
         # 2. Train Model
         forecaster = DemandForecaster(product)
         forecaster.train(df)
-        
+
         # 3. Evaluate (Quick check)
         try:
             metrics = forecaster.evaluate(initial='500 days', period='30 days', horizon='7 days')
             results[product] = metrics
         except Exception as e:
             print(f"Skipping evaluation due to data constraints: {e}")
-        
+
         # 4. Save
         forecaster.save()
-        
+
         # 5. Predict next week
         forecast = forecaster.predict(days=7)
         print(f"Forecast for next 7 days:\n{forecast}")
@@ -45,5 +47,50 @@ def main():
     print("\n--- Summary ---")
     print(results)
 
+def train_all(lookback_days, workers, timeout_s, from_export=None):
+    """
+    Entrena todos los productos en paralelo. La serie diaria sale de SQLite (una sola consulta)
+    o, con `from_export`, del último snapshot columnar de `orders` en ese directorio.
+    """
+    from app.core.localdb import fetch_daily_demand_all
+    from app.ml.demand_forecasting.parallel_training import train_all_products
+    from app.schemas import ALLOWED_PRODUCT_IDS
+
+    products = sorted(ALLOWED_PRODUCT_IDS)
+    since = (pd.Timestamp.utcnow() - pd.Timedelta(days=lookback_days)).isoformat()
+    if from_export is not None:
+        from app.services.export.datasets import load_daily_demand
+
+        root = from_export or None
+        daily_by_product = {p: load_daily_demand(p, since_iso=since, root=root) for p in products}
+    else:
+        daily_by_product = fetch_daily_demand_all(since_iso=since, product_ids=products)
+    summary = train_all_products(daily_by_product, products=products, max_workers=workers, timeout_s=timeout_s)
+
+    print(f"\n--- Summary ({summary['wall_time_s']:.1f}s wall, {summary['sum_fit_time_s']:.1f}s fit total) ---")
+    for item in summary["products"]:
+        metrics = item.get("metrics") or {}
+        print(f"{item['product']:<10}{item['status']:<11}{item.get('fit_time_s', '-')!s:>10}  {json.dumps(metrics)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento de modelos de demanda (Prophet).")
+    parser.add_argument("--all", action="store_true", help="Entrenar todos los productos desde SQLite en paralelo.")
+    parser.add_argument("--lookback-days", type=int, default=365)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto: núcleos disponibles).")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Límite por producto en segundos.")
+    parser.add_argument(
+        "--from-export",
+        nargs="?",
+        const="",
+        default=None,
+        help="Con --all: leer pedidos del snapshot Parquet/Arrow exportado (directorio opcional; por defecto EXPORT_DIR).",
+    )
+    args = parser.parse_args()
+
+    if args.all:
+        train_all(args.lookback_days, args.workers, args.timeout, from_export=args.from_export)
+    else:
+        train_synthetic()
+
 if __name__ == "__main__":
     main()
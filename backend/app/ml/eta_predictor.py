@@ -1,15 +1,25 @@
 import os
+import time
 import joblib
+import numpy as np
 import pandas as pd
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 from datetime import datetime
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score, confusion_matrix, roc_curve, auc, precision_recall_fscore_support
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
 from .feature_pipeline import FeaturePipeline
+from app.core.metrics import ML_INFERENCE_BATCH_SIZE, ML_INFERENCE_SECONDS
+from app.core.tracing import traced
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# En la nueva estructura, models está en app/ml/models
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'eta_xgboost_v1.pkl')
+
 class ETAPredictor:
     """
     Clase principal para realizar predicciones de ETA usando modelos de Machine Learning.
@@ -23,9 +33,7 @@ class ETAPredictor:
         
         # Ruta por defecto
         if model_path is None:
-            # En la nueva estructura, models está en app/ml/models
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            model_path = os.path.join(base_dir, 'models', 'eta_xgboost_v1.pkl')
+            model_path = DEFAULT_MODEL_PATH
             
         self.model_path = model_path
         self._load_model()
@@ -44,6 +52,7 @@ class ETAPredictor:
             logger.warning(f"No se encontró archivo de modelo en {self.model_path}. Usando modo fallback.")
             self.model_loaded = False
 
+    @traced("eta_inference")
     def predict(self, 
                 base_duration_min: float,
                 distance_km: float,
@@ -65,6 +74,7 @@ class ETAPredictor:
         if traffic_data is None:
             traffic_data = {}
 
+        start = time.perf_counter()
         try:
             # 1. Preparar features
             features_df = self.pipeline.transform(
@@ -77,6 +87,8 @@ class ETAPredictor:
             
             # 2. Inferencia
             prediction = self.model.predict(features_df)
+            ML_INFERENCE_SECONDS.labels("eta").observe(time.perf_counter() - start)
+            ML_INFERENCE_BATCH_SIZE.labels("eta").observe(1)
             
             # Retornar valor escalar, asegurando que sea positivo
             predicted_duration = max(float(prediction[0]), base_duration_min * 0.5)
@@ -87,6 +99,235 @@ class ETAPredictor:
             logger.error(f"Error en inferencia ML: {e}")
             return None
 
+    @traced("eta_inference")
+    def predict_batch(self,
+                      base_duration_min,
+                      distance_km,
+                      rain_mm,
+                      traffic_level,
+                      timestamp: datetime = None) -> Optional[np.ndarray]:
+        """
+        Versión vectorizada de `predict`: una sola llamada al modelo para todas las rutas.
+        `rain_mm` y `traffic_level` equivalen a weather_data['rain_mm'] y traffic_data['level'].
+        Retorna None si el modelo no está cargado o la inferencia falla.
+        """
+        if not self.model_loaded:
+            return None
+        base = np.asarray(base_duration_min, dtype=np.float64)
+        if len(base) == 0:
+            return np.empty(0)
+        if timestamp is None:
+            timestamp = datetime.now()
+
+        start = time.perf_counter()
+        try:
+            features_df = self.pipeline.transform_many(timestamp, distance_km, base, rain_mm, traffic_level)
+            prediction = np.asarray(self.model.predict(features_df), dtype=np.float64)
+            ML_INFERENCE_SECONDS.labels("eta").observe(time.perf_counter() - start)
+            ML_INFERENCE_BATCH_SIZE.labels("eta").observe(len(base))
+            return np.maximum(prediction, base * 0.5)
+        except Exception as e:
+            logger.error(f"Error en inferencia ML (lote): {e}")
+            return None
+
     def force_reload(self):
         """Fuerza la recarga del modelo (útil tras reentrenamiento)."""
         self._load_model()
+
+
+def generate_eta_synthetic(n_samples: int, rng: np.random.Generator) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Genera el dataset sintético de ETA usado para entrenar y evaluar el modelo mock.
+    Retorna (X, y, base_duration_min). El orden de consumo del rng es estable.
+    """
+    dist = rng.uniform(1.0, 50.0, n_samples)
+    speed_kmh = np.clip(rng.normal(33.0, 7.0, n_samples), 16.0, 60.0)
+    base_dur = (dist / np.maximum(speed_kmh, 1e-6)) * 60.0
+    base_dur = base_dur * np.clip(rng.normal(1.0, 0.05, n_samples), 0.85, 1.15)
+
+    hour = rng.integers(6, 23, n_samples)
+    day = rng.integers(0, 7, n_samples)
+    is_weekend = (day >= 5).astype(int)
+    is_peak_hour = (((hour >= 7) & (hour <= 9)) | ((hour >= 17) & (hour <= 19))).astype(int)
+
+    rain = rng.choice([0, 5, 20], size=n_samples, p=[0.78, 0.17, 0.05])
+    traffic = rng.beta(2.0, 2.5, n_samples)
+    road_ratio = rng.uniform(0.3, 0.8, n_samples)
+
+    traffic_effect = 0.15 + 0.85 * (1.0 - np.exp(-2.2 * traffic))
+    rain_effect = np.where(rain > 0, 0.08 + (rain / 70.0), 0.0)
+    peak_effect = ((is_peak_hour == 1) & (is_weekend == 0)).astype(float) * 0.28
+
+    stop_time = np.clip(rng.lognormal(mean=np.log(1.6), sigma=0.75, size=n_samples), 0.0, 20.0)
+    incident = rng.binomial(1, p=np.clip(0.02 + 0.06 * traffic + 0.03 * (rain > 0).astype(float), 0.0, 0.25), size=n_samples)
+    incident_delay = incident * rng.uniform(0.0, 18.0, n_samples)
+    loading_delay = np.clip(rng.normal(4.0, 3.8, n_samples), 0.0, 22.0)
+    driver_style = rng.normal(0.0, 1.0, n_samples)
+
+    multiplier = 1.0 + peak_effect + rain_effect + (traffic_effect * 0.65)
+    y_true = (base_dur * multiplier) + stop_time + incident_delay + loading_delay + (driver_style * 4.0)
+    y_true = np.clip(y_true, 1.0, 240.0)
+    sigma = np.clip(0.13 * y_true + 1.6 * (rain > 0).astype(float) + 1.3 * traffic, 1.6, 28.0)
+    y = np.clip(y_true + rng.normal(0.0, sigma, n_samples), 1.0, 240.0)
+
+    X = pd.DataFrame(
+        {
+            "hour_of_day": hour,
+            "day_of_week": day,
+            "is_weekend": is_weekend,
+            "distance_km": dist,
+            "base_duration_min": base_dur,
+            "rain_intensity": rain,
+            "traffic_level": traffic,
+            "is_peak_hour": is_peak_hour,
+            "road_type_primary_ratio": road_ratio,
+        }
+    )[FeaturePipeline().feature_columns]
+    return X, y, base_dur
+
+
+def train_eta_mock(model_path: str, n_samples: int = 10000, n_estimators: int = 80, max_depth: int = 4) -> Dict[str, Any]:
+    """
+    Entrena el modelo ETA sobre datos sintéticos y lo serializa en `model_path`.
+    Es una función de módulo para poder ejecutarse en un proceso worker.
+    """
+    n_samples = int(max(1000, min(n_samples, 200000)))
+    n_estimators = int(max(20, min(n_estimators, 500)))
+    max_depth = int(max(2, min(max_depth, 12)))
+
+    rng = np.random.default_rng(42)
+    X, y, _ = generate_eta_synthetic(n_samples, rng)
+
+    model = XGBRegressor(
+        n_estimators=max(120, n_estimators),
+        learning_rate=0.05,
+        max_depth=max_depth,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        reg_lambda=2.0,
+        reg_alpha=0.2,
+        min_child_weight=4.0,
+        gamma=0.2,
+        objective="reg:squarederror",
+        n_jobs=-1,
+        tree_method="hist",
+    )
+
+    X_train, X_tmp, y_train, y_tmp = train_test_split(X, y, test_size=0.30, random_state=42)
+    X_val, X_test, y_val, y_test = train_test_split(X_tmp, y_tmp, test_size=0.50, random_state=42)
+
+    start = time.time()
+    model.fit(X_train, y_train)
+    train_time_s = time.time() - start
+
+    preds_train = model.predict(X_train)
+    preds_test = model.predict(X_test)
+
+    mae_train = float(mean_absolute_error(y_train, preds_train))
+    rmse_train = float(np.sqrt(mean_squared_error(y_train, preds_train)))
+    r2_train = float(r2_score(y_train, preds_train))
+    mae_test = float(mean_absolute_error(y_test, preds_test))
+    rmse_test = float(np.sqrt(mean_squared_error(y_test, preds_test)))
+    r2_test = float(r2_score(y_test, preds_test))
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    joblib.dump(model, model_path)
+
+    return {
+        "trained": True,
+        "n_samples": n_samples,
+        "params": {"n_estimators": n_estimators, "max_depth": max_depth},
+        "metrics": {
+            "mae": round(mae_test, 4),
+            "rmse": round(rmse_test, 4),
+            "r2": round(r2_test, 6),
+            "train": {"mae": round(mae_train, 4), "rmse": round(rmse_train, 4), "r2": round(r2_train, 6)},
+            "test": {"mae": round(mae_test, 4), "rmse": round(rmse_test, 4), "r2": round(r2_test, 6)},
+            "best_iteration": int(getattr(model, "best_iteration", n_estimators)),
+        },
+        "train_time_s": round(train_time_s, 4),
+    }
+
+
+def evaluate_eta_mock(model_path: Optional[str] = None, n_samples: int = 3000, sample_points: int = 300) -> Optional[Dict[str, Any]]:
+    """
+    Evalúa el modelo ETA sobre datos sintéticos (regresión + clasificación de retraso).
+    Retorna None si el modelo no está cargado. Función de módulo para ejecutarse en un proceso worker.
+    """
+    predictor = ETAPredictor(model_path=model_path)
+    if not predictor.model_loaded:
+        return None
+
+    n_samples = int(max(200, min(n_samples, 20000)))
+    sample_points = int(max(50, min(sample_points, 1000)))
+
+    rng = np.random.default_rng(42)
+    X, y_true, base_dur = generate_eta_synthetic(n_samples, rng)
+    X = X[predictor.pipeline.feature_columns]
+
+    y_pred = predictor.model.predict(X)
+
+    mae = float(mean_absolute_error(y_true, y_pred))
+    rmse = float(np.sqrt(mean_squared_error(y_true, y_pred)))
+    r2 = float(r2_score(y_true, y_pred))
+
+    ratio_true = y_true / np.maximum(base_dur, 1e-6)
+    ratio_pred = y_pred / np.maximum(base_dur, 1e-6)
+    threshold_ratio = 1.10
+    y_true_cls = (ratio_true > threshold_ratio).astype(int)
+    y_pred_cls = (ratio_pred > threshold_ratio).astype(int)
+
+    tn, fp, fn, tp = confusion_matrix(y_true_cls, y_pred_cls, labels=[0, 1]).ravel()
+    precision, recall, f1, _ = precision_recall_fscore_support(y_true_cls, y_pred_cls, average="binary", zero_division=0)
+
+    fpr, tpr, thresholds = roc_curve(y_true_cls, ratio_pred)
+    roc_auc = float(auc(fpr, tpr))
+
+    idx = rng.choice(n_samples, size=sample_points, replace=False)
+    points = [{"y_true": float(y_true[i]), "y_pred": float(y_pred[i])} for i in idx]
+
+    feature_importances = None
+    if hasattr(predictor.model, "feature_importances_"):
+        feature_importances = [
+            {"feature": f, "importance": float(v)}
+            for f, v in zip(predictor.pipeline.feature_columns, predictor.model.feature_importances_)
+        ]
+        feature_importances.sort(key=lambda x: x["importance"], reverse=True)
+
+    latency_ms_single = None
+    try:
+        sample_row = X.iloc[0:1]
+        t0 = time.time()
+        for _ in range(80):
+            predictor.model.predict(sample_row)
+        latency_ms_single = ((time.time() - t0) / 80.0) * 1000.0
+    except Exception:
+        latency_ms_single = None
+
+    model_params = None
+    try:
+        params = predictor.model.get_params()
+        model_params = {k: params.get(k) for k in ["n_estimators", "max_depth", "learning_rate", "subsample", "colsample_bytree", "reg_lambda", "reg_alpha"]}
+    except Exception:
+        model_params = None
+
+    return {
+        "model_loaded": True,
+        "n_samples": n_samples,
+        "metrics": {"mae": round(mae, 4), "rmse": round(rmse, 4), "r2": round(r2, 6)},
+        "classification": {
+            "label_definition": f"late_if_true_ratio_gt_{threshold_ratio}",
+            "score_definition": "predicted_ratio=y_pred/base_duration_min",
+            "threshold_ratio": threshold_ratio,
+            "confusion_matrix": {"tn": int(tn), "fp": int(fp), "fn": int(fn), "tp": int(tp)},
+            "precision": round(float(precision), 6),
+            "recall": round(float(recall), 6),
+            "f1": round(float(f1), 6),
+            "roc_auc": round(float(roc_auc), 6),
+            "roc_curve": [{"fpr": float(a), "tpr": float(b)} for a, b in zip(fpr, tpr)],
+        },
+        "sample_points": points,
+        "feature_importances": feature_importances,
+        "latency_ms_single": round(float(latency_ms_single), 4) if latency_ms_single is not None else None,
+        "model_params": model_params,
+    }
@@ -66,6 +66,34 @@ class FeaturePipeline:
         
         return pd.DataFrame(data)[self.feature_columns]
 
+    def transform_many(self,
+                       timestamp: datetime,
+                       distance_km,
+                       base_duration_min,
+                       rain_intensity,
+                       traffic_level,
+                       primary_ratio: float = 0.5) -> pd.DataFrame:
+        """
+        Versión vectorizada de `transform` para muchas rutas en el mismo instante: una fila por
+        ruta con las mismas reglas de hora pico / fin de semana.
+        """
+        distance_km = np.asarray(distance_km, dtype=np.float64)
+        n = len(distance_km)
+        hour = timestamp.hour
+        day = timestamp.weekday()
+        data = {
+            'hour_of_day': np.full(n, hour),
+            'day_of_week': np.full(n, day),
+            'is_weekend': np.full(n, 1 if day >= 5 else 0),
+            'distance_km': distance_km,
+            'base_duration_min': np.asarray(base_duration_min, dtype=np.float64),
+            'rain_intensity': np.broadcast_to(np.asarray(rain_intensity, dtype=np.float64), (n,)),
+            'traffic_level': np.broadcast_to(np.asarray(traffic_level, dtype=np.float64), (n,)),
+            'is_peak_hour': np.full(n, 1 if (7 <= hour <= 9) or (17 <= hour <= 19) else 0),
+            'road_type_primary_ratio': np.full(n, primary_ratio),
+        }
+        return pd.DataFrame(data)[self.feature_columns]
+
     def batch_transform(self, df_raw: pd.DataFrame) -> pd.DataFrame:
         """
         Para procesamiento en lote (entrenamiento).
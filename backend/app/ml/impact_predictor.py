@@ -2,7 +2,7 @@ import os
 import math
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import joblib
 import numpy as np
@@ -13,7 +13,11 @@ from sklearn.multioutput import MultiOutputRegressor
 from sklearn.metrics import confusion_matrix, roc_curve, auc, precision_recall_fscore_support
 from xgboost import XGBRegressor
 
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.metrics import CACHE_REQUESTS, ML_INFERENCE_BATCH_SIZE, ML_INFERENCE_SECONDS
+from app.core.tracing import traced
+from app.ml.impact_surrogate import ImpactSurrogateGrid, scenario_codes_for
 
 logger = get_logger(__name__)
 
@@ -27,6 +31,12 @@ SCENARIOS: Dict[str, Dict[str, float]] = {
 
 MODEL_VERSION = "impact_xgboost_v2"
 
+# "multi_output_tree": un único booster XGBoost con hojas vectoriales (un árbol predice los 8 targets).
+# "one_output_per_tree": un único booster nativo, un árbol por target en cada ronda.
+# "wrapper": MultiOutputRegressor legacy (8 modelos independientes).
+MULTI_STRATEGIES = ("multi_output_tree", "one_output_per_tree", "wrapper")
+DEFAULT_MULTI_STRATEGY = "multi_output_tree"
+
 
 def _deadline_minutes(distance_km: float) -> float:
     if distance_km <= 3.0:
@@ -150,6 +160,45 @@ def _generate_impact_synthetic(
     return X, y, scenario_code, scenario_names
 
 
+def build_impact_model(
+    n_estimators: int,
+    max_depth: int,
+    multi_strategy: str = DEFAULT_MULTI_STRATEGY,
+) -> Union[XGBRegressor, MultiOutputRegressor]:
+    """
+    Construye el regresor multi-target. Con las estrategias nativas se entrena y
+    serializa un solo booster; con "wrapper" se conserva el MultiOutputRegressor original.
+    """
+    params: Dict[str, Any] = {
+        "n_estimators": n_estimators,
+        "learning_rate": 0.06,
+        "max_depth": max_depth,
+        "subsample": 0.75,
+        "colsample_bytree": 0.75,
+        "reg_lambda": 2.0,
+        "reg_alpha": 0.2,
+        "min_child_weight": 4.0,
+        "gamma": 0.3,
+        "objective": "reg:squarederror",
+        "n_jobs": -1,
+        "tree_method": "hist",
+    }
+    if multi_strategy == "wrapper":
+        return MultiOutputRegressor(XGBRegressor(**params))
+    return XGBRegressor(multi_strategy=multi_strategy, **params)
+
+
+def model_multi_strategy(model: Any) -> Optional[str]:
+    if model is None:
+        return None
+    if isinstance(model, MultiOutputRegressor):
+        return "wrapper"
+    try:
+        return str(model.get_params().get("multi_strategy") or "one_output_per_tree")
+    except Exception:
+        return None
+
+
 @dataclass
 class ImpactPrediction:
     duration_min: float
@@ -174,28 +223,63 @@ class ImpactPrediction:
         }
 
 
+IMPACT_FEATURE_COLUMNS = ("distance_km", "scenario_code", "base_duration_min", "risk_factor", "consumption_factor")
+IMPACT_TARGET_NAMES = (
+    "duration_min",
+    "emissions_kg_co2",
+    "efficiency_score",
+    "freshness_score",
+    "punctuality_score",
+    "satisfaction_score",
+    "waste_percent",
+    "energy_saving_percent",
+)
+
+
+def _observe_inference(start: float, n: int, surrogate_hits: Optional[int]) -> None:
+    ML_INFERENCE_SECONDS.labels("impact").observe(time.perf_counter() - start)
+    ML_INFERENCE_BATCH_SIZE.labels("impact").observe(n)
+    if surrogate_hits is not None:
+        # La malla surrogate actúa como caché precalculado del modelo completo
+        if surrogate_hits:
+            CACHE_REQUESTS.labels("impact_surrogate", "hit").inc(surrogate_hits)
+        if n - surrogate_hits:
+            CACHE_REQUESTS.labels("impact_surrogate", "miss").inc(n - surrogate_hits)
+
+
 class ImpactPredictor:
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, use_surrogate: Optional[bool] = None):
         if model_path is None:
             model_path = os.path.join(os.path.dirname(__file__), "models", "impact_xgboost_v1.pkl")
         self.model_path = model_path
         self.model_loaded = False
-        self.model: Optional[MultiOutputRegressor] = None
-        self.feature_columns = ["distance_km", "scenario_code", "base_duration_min", "risk_factor", "consumption_factor"]
-        self.target_names = [
-            "duration_min",
-            "emissions_kg_co2",
-            "efficiency_score",
-            "freshness_score",
-            "punctuality_score",
-            "satisfaction_score",
-            "waste_percent",
-            "energy_saving_percent",
-        ]
+        self.model: Optional[Union[XGBRegressor, MultiOutputRegressor]] = None
+        self.feature_columns = list(IMPACT_FEATURE_COLUMNS)
+        self.target_names = list(IMPACT_TARGET_NAMES)
         self.model_version = MODEL_VERSION
+        self.use_surrogate = settings.IMPACT_SURROGATE_ENABLED if use_surrogate is None else bool(use_surrogate)
+        self.surrogate: Optional[ImpactSurrogateGrid] = None
         self._load()
 
+    def _build_surrogate(self):
+        self.surrogate = None
+        if not self.use_surrogate or not self.model_loaded or self.model is None:
+            return
+        try:
+            self.surrogate = ImpactSurrogateGrid.build(
+                self.model,
+                self.feature_columns,
+                self.target_names,
+                SCENARIOS,
+                n_distance=settings.IMPACT_SURROGATE_DISTANCE_STEPS,
+                n_duration=settings.IMPACT_SURROGATE_DURATION_STEPS,
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo construir la malla surrogate de Impact: {e}")
+            self.surrogate = None
+
     def _load(self):
+        self.surrogate = None
         try:
             if os.path.exists(self.model_path):
                 payload = joblib.load(self.model_path)
@@ -210,6 +294,7 @@ class ImpactPredictor:
                 self.model_loaded = bool(self.model is not None)
                 if self.model_loaded:
                     logger.info(f"Modelo Impact cargado desde {self.model_path}")
+                self._build_surrogate()
             else:
                 self.model_loaded = False
         except Exception as e:
@@ -227,6 +312,25 @@ class ImpactPredictor:
         f = SCENARIOS.get(scenario, SCENARIOS["Normal"])
         return float(f["Ft"]), float(f["Fr"]), float(f["Fc"])
 
+    def _default_base_duration(self, distance_km: float) -> float:
+        ideal_speed_kmh = 35.0
+        return (distance_km / max(ideal_speed_kmh, 1e-6)) * 60.0
+
+    def _to_prediction(self, y: np.ndarray) -> ImpactPrediction:
+        pred = {name: float(val) for name, val in zip(self.target_names, y)}
+
+        pred["duration_min"] = max(0.0, pred["duration_min"])
+        pred["emissions_kg_co2"] = max(0.0, pred["emissions_kg_co2"])
+        pred["efficiency_score"] = _clamp(pred["efficiency_score"], 0.0, 100.0)
+        pred["freshness_score"] = _clamp(pred["freshness_score"], 0.0, 100.0)
+        pred["punctuality_score"] = _clamp(pred["punctuality_score"], 0.0, 100.0)
+        pred["satisfaction_score"] = _clamp(pred["satisfaction_score"], 1.0, 5.0)
+        pred["waste_percent"] = _clamp(pred["waste_percent"], 0.0, 100.0)
+        pred["energy_saving_percent"] = _clamp(pred["energy_saving_percent"], 0.0, 100.0)
+
+        return ImpactPrediction(**pred)
+
+    @traced("impact_inference")
     def predict(
         self,
         distance_km: float,
@@ -236,13 +340,21 @@ class ImpactPredictor:
         if not self.model_loaded or self.model is None:
             return None
 
+        start = time.perf_counter()
         distance_km = float(max(0.0, distance_km))
         Ft, Fr, Fc = self._scenario_factors(scenario)
         scenario_code = self._scenario_to_code(scenario)
 
         if base_duration_min is None:
-            ideal_speed_kmh = 35.0
-            base_duration_min = (distance_km / max(ideal_speed_kmh, 1e-6)) * 60.0
+            base_duration_min = self._default_base_duration(distance_km)
+
+        surrogate = self.surrogate
+        if surrogate is not None and bool(surrogate.contains(distance_km, base_duration_min)):
+            y = surrogate.interpolate(
+                np.array([scenario_code]), np.array([distance_km]), np.array([float(base_duration_min)])
+            )[0]
+            _observe_inference(start, 1, 1)
+            return self._to_prediction(y)
 
         X = pd.DataFrame(
             [
@@ -257,47 +369,93 @@ class ImpactPredictor:
         )[self.feature_columns]
 
         y = self.model.predict(X)[0]
-        pred = {name: float(val) for name, val in zip(self.target_names, y)}
+        _observe_inference(start, 1, 0 if surrogate is not None else None)
+        return self._to_prediction(y)
 
-        pred["duration_min"] = max(0.0, pred["duration_min"])
-        pred["emissions_kg_co2"] = max(0.0, pred["emissions_kg_co2"])
-        pred["efficiency_score"] = _clamp(pred["efficiency_score"], 0.0, 100.0)
-        pred["freshness_score"] = _clamp(pred["freshness_score"], 0.0, 100.0)
-        pred["punctuality_score"] = _clamp(pred["punctuality_score"], 0.0, 100.0)
-        pred["satisfaction_score"] = _clamp(pred["satisfaction_score"], 1.0, 5.0)
-        pred["waste_percent"] = _clamp(pred["waste_percent"], 0.0, 100.0)
-        pred["energy_saving_percent"] = _clamp(pred["energy_saving_percent"], 0.0, 100.0)
+    @traced("impact_inference")
+    def predict_batch(
+        self,
+        distance_km: List[float],
+        scenarios: List[str],
+        base_duration_min: Optional[List[Optional[float]]] = None,
+    ) -> Optional[List[ImpactPrediction]]:
+        """
+        Versión vectorizada de `predict`: los puntos dentro de la malla surrogate se interpolan
+        en bloque y el resto se resuelve con una única llamada al modelo completo.
+        """
+        if not self.model_loaded or self.model is None:
+            return None
+        n = len(distance_km)
+        if n == 0:
+            return []
 
-        return ImpactPrediction(**pred)
+        start = time.perf_counter()
+        dist = np.maximum(0.0, np.asarray(distance_km, dtype=np.float64))
+        if base_duration_min is None:
+            base_duration_min = [None] * n
+        dur = np.array(
+            [self._default_base_duration(d) if b is None else float(b) for d, b in zip(dist, base_duration_min)],
+            dtype=np.float64,
+        )
+        codes = scenario_codes_for(list(scenarios))
+        y = np.empty((n, len(self.target_names)), dtype=np.float64)
+
+        inside = np.zeros(n, dtype=bool)
+        surrogate = self.surrogate
+        if surrogate is not None:
+            inside = surrogate.contains(dist, dur)
+            if np.any(inside):
+                y[inside] = surrogate.interpolate(codes[inside], dist[inside], dur[inside])
+
+        outside = ~inside
+        if np.any(outside):
+            factors = [self._scenario_factors(s) for s in scenarios]
+            X = pd.DataFrame(
+                {
+                    "distance_km": dist,
+                    "scenario_code": codes.astype(float),
+                    "base_duration_min": dur,
+                    "risk_factor": [f[1] for f in factors],
+                    "consumption_factor": [f[2] for f in factors],
+                }
+            )[self.feature_columns]
+            y[outside] = self.model.predict(X[outside])
 
-    def train_mock(self, n_samples: int = 10000, n_estimators: int = 120, max_depth: int = 5) -> Dict[str, Any]:
+        _observe_inference(start, n, int(np.count_nonzero(inside)) if surrogate is not None else None)
+        return [self._to_prediction(row) for row in y]
+
+    def train_mock(
+        self,
+        n_samples: int = 10000,
+        n_estimators: int = 120,
+        max_depth: int = 5,
+        multi_strategy: str = DEFAULT_MULTI_STRATEGY,
+        dataset: Optional[str] = None,
+        dataset_root: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Entrena con datos sintéticos generados en memoria o, con `dataset`, con el último
+        snapshot columnar exportado (ver `export_impact_training_set`).
+        """
         n_samples = int(max(2000, min(n_samples, 200000)))
         n_estimators = int(max(50, min(n_estimators, 800)))
         max_depth = int(max(2, min(max_depth, 12)))
+        if multi_strategy not in MULTI_STRATEGIES:
+            raise ValueError(f"multi_strategy inválido. Valores permitidos: {list(MULTI_STRATEGIES)}")
 
-        rng = np.random.default_rng(42)
-        X_raw, y, scenario_code, _ = _generate_impact_synthetic(n_samples=n_samples, rng=rng)
-        X = X_raw[self.feature_columns]
+        if dataset:
+            X, y, scenario_code = self._load_training_set(dataset, dataset_root)
+            n_samples = len(X)
+        else:
+            rng = np.random.default_rng(42)
+            X_raw, y, scenario_code, _ = _generate_impact_synthetic(n_samples=n_samples, rng=rng)
+            X = X_raw[self.feature_columns]
 
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42, stratify=scenario_code
         )
 
-        base_model = XGBRegressor(
-            n_estimators=n_estimators,
-            learning_rate=0.06,
-            max_depth=max_depth,
-            subsample=0.75,
-            colsample_bytree=0.75,
-            reg_lambda=2.0,
-            reg_alpha=0.2,
-            min_child_weight=4.0,
-            gamma=0.3,
-            objective="reg:squarederror",
-            n_jobs=-1,
-            tree_method="hist",
-        )
-        model = MultiOutputRegressor(base_model)
+        model = build_impact_model(n_estimators=n_estimators, max_depth=max_depth, multi_strategy=multi_strategy)
 
         start = time.time()
         model.fit(X_train, y_train)
@@ -326,16 +484,30 @@ class ImpactPredictor:
         )
         self.model = model
         self.model_loaded = True
+        self._build_surrogate()
 
         return {
             "trained": True,
             "n_samples": n_samples,
-            "params": {"n_estimators": n_estimators, "max_depth": max_depth},
+            "params": {"n_estimators": n_estimators, "max_depth": max_depth, "multi_strategy": multi_strategy},
             "metrics_train": metrics_train,
             "metrics_test": metrics_test,
             "train_time_s": float(round(train_time_s, 4)),
         }
 
+    def _load_training_set(self, dataset: str, root: Optional[str]) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        from app.services.export.datasets import column_arrays, load_table
+
+        columns = list(dict.fromkeys(self.feature_columns + self.target_names + ["scenario_code"]))
+        table = load_table(dataset, columns=columns, root=root)
+        if table.num_rows == 0:
+            raise ValueError(f"El dataset {dataset} está vacío")
+        # Columnas numéricas sin nulos: vistas NumPy sobre los buffers de Arrow, sin copia
+        arrays = column_arrays(table, columns)
+        X = pd.DataFrame({c: arrays[c] for c in self.feature_columns}, copy=False)
+        y = np.column_stack([arrays[t] for t in self.target_names])
+        return X, y, arrays["scenario_code"].astype(int)
+
     def evaluate_mock(self, n_samples: int = 6000, sample_points: int = 300) -> Dict[str, Any]:
         if not self.model_loaded or self.model is None:
             raise RuntimeError("Impact model not loaded")
@@ -432,3 +604,45 @@ class ImpactPredictor:
             "sample_points": sample,
         }
 
+
+
+def train_impact_artifact(
+    artifact_path: str,
+    n_samples: int = 10000,
+    n_estimators: int = 120,
+    max_depth: int = 5,
+    multi_strategy: str = DEFAULT_MULTI_STRATEGY,
+    dataset: Optional[str] = None,
+    dataset_root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Entrena el modelo Impact en `artifact_path`. Función de módulo para ejecutarse en un proceso worker."""
+    predictor = ImpactPredictor(model_path=artifact_path, use_surrogate=False)
+    return predictor.train_mock(
+        n_samples=n_samples,
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        multi_strategy=multi_strategy,
+        dataset=dataset,
+        dataset_root=dataset_root,
+    )
+
+
+IMPACT_DATASET_NAME = "impact_training"
+
+
+def export_impact_training_set(
+    n_samples: int = 10000,
+    seed: int = 42,
+    root: Optional[str] = None,
+    fmt: str = "parquet",
+) -> Dict[str, Any]:
+    """Exporta un conjunto sintético de entrenamiento (features + targets) como snapshot columnar."""
+    from app.services.export.datasets import export_frame
+
+    rng = np.random.default_rng(seed)
+    X, y, _, scenario_names = _generate_impact_synthetic(n_samples=int(n_samples), rng=rng)
+    df = X.copy()
+    for idx, name in enumerate(IMPACT_TARGET_NAMES):
+        df[name] = y[:, idx]
+    df["scenario"] = scenario_names
+    return export_frame(IMPACT_DATASET_NAME, df, partition_cols=("scenario",), root=root, fmt=fmt, source={"n_samples": int(n_samples), "seed": seed})
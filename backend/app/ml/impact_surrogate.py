@@ -0,0 +1,192 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# Orden de escenarios = scenario_code usado en el entrenamiento del modelo Impact
+SCENARIO_ORDER: Tuple[str, ...] = ("Normal", "Lluvia", "Tráfico", "Huelga")
+
+DEFAULT_DISTANCE_RANGE = (0.0, 40.0)
+DEFAULT_DURATION_RANGE = (0.0, 140.0)
+
+
+class ImpactSurrogateGrid:
+    """
+    Superficie precalculada del modelo Impact sobre una malla uniforme
+    (distance_km x base_duration_min) por escenario.
+
+    El modelo se evalúa una sola vez al construir la malla; las consultas se responden con
+    interpolación bilineal vectorizada. Fuera de la malla `contains` devuelve False y el
+    llamador debe usar el modelo completo.
+    """
+
+    def __init__(
+        self,
+        distance_grid: np.ndarray,
+        duration_grid: np.ndarray,
+        values: np.ndarray,
+        target_names: Sequence[str],
+        error_bounds: Optional[Dict[str, Dict[str, float]]] = None,
+        build_time_s: float = 0.0,
+    ):
+        self.distance_grid = np.asarray(distance_grid, dtype=np.float64)
+        self.duration_grid = np.asarray(duration_grid, dtype=np.float64)
+        # (n_scenarios, n_distance, n_duration, n_targets) en float32
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.target_names = list(target_names)
+        self.error_bounds = error_bounds or {}
+        self.build_time_s = float(build_time_s)
+
+        self._d0 = float(self.distance_grid[0])
+        self._d_step = float(self.distance_grid[1] - self.distance_grid[0])
+        self._b0 = float(self.duration_grid[0])
+        self._b_step = float(self.duration_grid[1] - self.duration_grid[0])
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(self.values.shape)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes + self.distance_grid.nbytes + self.duration_grid.nbytes)
+
+    @staticmethod
+    def _feature_frame(
+        scenario_codes: np.ndarray,
+        distances: np.ndarray,
+        durations: np.ndarray,
+        feature_columns: Sequence[str],
+        scenario_factors: Dict[str, Dict[str, float]],
+    ) -> pd.DataFrame:
+        fr = np.array([scenario_factors[s]["Fr"] for s in SCENARIO_ORDER], dtype=float)
+        fc = np.array([scenario_factors[s]["Fc"] for s in SCENARIO_ORDER], dtype=float)
+        return pd.DataFrame(
+            {
+                "distance_km": distances,
+                "scenario_code": scenario_codes.astype(float),
+                "base_duration_min": durations,
+                "risk_factor": fr[scenario_codes],
+                "consumption_factor": fc[scenario_codes],
+            }
+        )[list(feature_columns)]
+
+    @classmethod
+    def build(
+        cls,
+        model: Any,
+        feature_columns: Sequence[str],
+        target_names: Sequence[str],
+        scenario_factors: Dict[str, Dict[str, float]],
+        n_distance: int = 96,
+        n_duration: int = 96,
+        distance_range: Tuple[float, float] = DEFAULT_DISTANCE_RANGE,
+        duration_range: Tuple[float, float] = DEFAULT_DURATION_RANGE,
+        n_error_samples: int = 2000,
+        seed: int = 42,
+    ) -> "ImpactSurrogateGrid":
+        start = time.time()
+        n_distance = int(max(2, n_distance))
+        n_duration = int(max(2, n_duration))
+        distance_grid = np.linspace(distance_range[0], distance_range[1], n_distance)
+        duration_grid = np.linspace(duration_range[0], duration_range[1], n_duration)
+        n_scen = len(SCENARIO_ORDER)
+
+        # Una sola llamada al modelo para toda la malla
+        s_idx, d_idx, b_idx = np.meshgrid(np.arange(n_scen), np.arange(n_distance), np.arange(n_duration), indexing="ij")
+        X = cls._feature_frame(
+            s_idx.ravel(), distance_grid[d_idx.ravel()], duration_grid[b_idx.ravel()], feature_columns, scenario_factors
+        )
+        y = np.asarray(model.predict(X), dtype=np.float32)
+        values = y.reshape(n_scen, n_distance, n_duration, -1)
+
+        grid = cls(distance_grid, duration_grid, values, target_names)
+        grid.error_bounds = grid._measure_error(model, feature_columns, scenario_factors, n_error_samples, seed)
+        grid.build_time_s = time.time() - start
+
+        worst = max(grid.error_bounds.items(), key=lambda kv: kv[1]["p99_abs"], default=(None, {}))
+        logger.info(
+            f"Impact surrogate grid built: shape={grid.shape}, {grid.nbytes / 1024:.0f} KiB, "
+            f"{grid.build_time_s:.2f}s; worst p99 abs error {worst[0]}={worst[1].get('p99_abs')}",
+            extra={"surrogate_error_bounds": grid.error_bounds},
+        )
+        return grid
+
+    def _measure_error(
+        self,
+        model: Any,
+        feature_columns: Sequence[str],
+        scenario_factors: Dict[str, Dict[str, float]],
+        n_samples: int,
+        seed: int,
+    ) -> Dict[str, Dict[str, float]]:
+        n_samples = int(max(100, n_samples))
+        rng = np.random.default_rng(seed)
+        codes = rng.integers(0, len(SCENARIO_ORDER), n_samples)
+        dist = rng.uniform(self.distance_grid[0], self.distance_grid[-1], n_samples)
+        dur = rng.uniform(self.duration_grid[0], self.duration_grid[-1], n_samples)
+
+        y_full = np.asarray(model.predict(self._feature_frame(codes, dist, dur, feature_columns, scenario_factors)), dtype=np.float64)
+        y_grid = self.interpolate(codes, dist, dur).astype(np.float64)
+        abs_err = np.abs(y_full - y_grid)
+
+        return {
+            name: {
+                "mean_abs": float(round(np.mean(abs_err[:, j]), 5)),
+                "p99_abs": float(round(np.percentile(abs_err[:, j], 99), 5)),
+                "max_abs": float(round(np.max(abs_err[:, j]), 5)),
+            }
+            for j, name in enumerate(self.target_names)
+        }
+
+    def contains(self, distances: np.ndarray, durations: np.ndarray) -> np.ndarray:
+        distances = np.asarray(distances, dtype=np.float64)
+        durations = np.asarray(durations, dtype=np.float64)
+        return (
+            (distances >= self.distance_grid[0])
+            & (distances <= self.distance_grid[-1])
+            & (durations >= self.duration_grid[0])
+            & (durations <= self.duration_grid[-1])
+        )
+
+    def interpolate(self, scenario_codes: np.ndarray, distances: np.ndarray, durations: np.ndarray) -> np.ndarray:
+        """Interpolación bilineal vectorizada. Devuelve (n, n_targets); los puntos fuera de rango se recortan al borde."""
+        codes = np.asarray(scenario_codes, dtype=np.intp)
+        fd = (np.asarray(distances, dtype=np.float64) - self._d0) / self._d_step
+        fb = (np.asarray(durations, dtype=np.float64) - self._b0) / self._b_step
+
+        n_d = self.distance_grid.shape[0]
+        n_b = self.duration_grid.shape[0]
+        fd = np.clip(fd, 0.0, n_d - 1)
+        fb = np.clip(fb, 0.0, n_b - 1)
+        i = np.minimum(fd.astype(np.intp), n_d - 2)
+        j = np.minimum(fb.astype(np.intp), n_b - 2)
+        tx = (fd - i)[:, None]
+        ty = (fb - j)[:, None]
+
+        v = self.values
+        v00 = v[codes, i, j]
+        v10 = v[codes, i + 1, j]
+        v01 = v[codes, i, j + 1]
+        v11 = v[codes, i + 1, j + 1]
+        return (v00 * (1.0 - tx) + v10 * tx) * (1.0 - ty) + (v01 * (1.0 - tx) + v11 * tx) * ty
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "shape": list(self.shape),
+            "distance_range": [float(self.distance_grid[0]), float(self.distance_grid[-1])],
+            "duration_range": [float(self.duration_grid[0]), float(self.duration_grid[-1])],
+            "bytes": self.nbytes,
+            "build_time_s": round(self.build_time_s, 4),
+            "error_bounds": self.error_bounds,
+        }
+
+
+def scenario_codes_for(scenarios: List[str]) -> np.ndarray:
+    lookup = {name: code for code, name in enumerate(SCENARIO_ORDER)}
+    return np.array([lookup.get(s, 0) for s in scenarios], dtype=np.intp)
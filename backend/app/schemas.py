@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Dict, Any, Literal
+from typing import List, Optional, Dict, Any, Literal, Union
 
 ALLOWED_PRODUCT_IDS = {"maiz", "cacao", "arroz", "cafe", "platano", "mani", "limon", "yuca"}
 ALLOWED_EVENT_TYPES = {"rain", "traffic", "protest"}
@@ -22,22 +22,65 @@ class RouteRequest(BaseModel):
             raise ValueError(f"mode inválido. Valores permitidos: {sorted(ALLOWED_ROUTE_MODES)}")
         return vv
 
+def _normalize_product_id(v: str) -> str:
+    if not isinstance(v, str) or not v.strip():
+        raise ValueError("product_id es requerido.")
+    vv = v.strip().lower()
+    if vv not in ALLOWED_PRODUCT_IDS:
+        raise ValueError(f"product_id inválido. Valores permitidos: {sorted(ALLOWED_PRODUCT_IDS)}")
+    return vv
+
 class SimulationRequest(BaseModel):
     user_lat: float = Field(..., ge=-90.0, le=90.0, description="Latitud del usuario (WGS84).")
     user_lng: float = Field(..., ge=-180.0, le=180.0, description="Longitud del usuario (WGS84).")
     product_id: str = Field(..., description="ID de producto a simular.")
     weight: float = Field(1.0, gt=0.0, description="Peso (kg) solicitado.")
     session_id: Optional[str] = None
+    geometry_format: Literal["coords", "polyline"] = Field("coords", description="Formato de route_geometry: lista [[lat, lng], ...] o polyline codificada (precisión 1e-5).")
+    simplify_tolerance_m: Optional[float] = Field(None, ge=0.0, le=1000.0, description="Tolerancia (m) de simplificación Douglas-Peucker de la geometría.")
+    simplify_zoom: Optional[int] = Field(None, ge=0, le=22, description="Alternativa a simplify_tolerance_m: tolerancia de un píxel al nivel de zoom dado.")
+    fields: Optional[List[str]] = Field(None, description="Campos de RouteResult a devolver (lista o separados por coma) y/o `metrics`; solo se calculan las etapas que los producen. Sin fields, respuesta completa.")
 
     @field_validator("product_id")
     @classmethod
     def _validate_product_id(cls, v: str) -> str:
-        if not isinstance(v, str) or not v.strip():
-            raise ValueError("product_id es requerido.")
-        vv = v.strip().lower()
-        if vv not in ALLOWED_PRODUCT_IDS:
-            raise ValueError(f"product_id inválido. Valores permitidos: {sorted(ALLOWED_PRODUCT_IDS)}")
-        return vv
+        return _normalize_product_id(v)
+
+    @field_validator("fields", mode="before")
+    @classmethod
+    def _validate_fields(cls, v: Any) -> Optional[List[str]]:
+        if v is None:
+            return None
+        if isinstance(v, str):
+            v = v.split(",")
+        if not isinstance(v, list) or not all(isinstance(x, str) for x in v):
+            raise ValueError("fields debe ser una lista de nombres o un texto separado por comas.")
+        names = {x.strip() for x in v if x.strip()}
+        allowed = set(RouteResult.model_fields) | {"metrics"}
+        unknown = names - allowed
+        if unknown:
+            raise ValueError(f"fields inválidos: {sorted(unknown)}. Valores permitidos: {sorted(allowed)}")
+        # Ordenados: misma clave de coalescencia para el mismo conjunto de campos
+        return sorted(names)
+
+class SimulationBatchItem(BaseModel):
+    user_lat: float = Field(..., ge=-90.0, le=90.0, description="Latitud del usuario (WGS84).")
+    user_lng: float = Field(..., ge=-180.0, le=180.0, description="Longitud del usuario (WGS84).")
+    product_id: str = Field(..., description="ID de producto a simular.")
+    weight: float = Field(1.0, gt=0.0, description="Peso (kg) solicitado.")
+    id: Optional[str] = Field(None, description="Identificador del pedido; se devuelve tal cual en su resultado.")
+
+    @field_validator("product_id")
+    @classmethod
+    def _validate_product_id(cls, v: str) -> str:
+        return _normalize_product_id(v)
+
+class SimulationBatchRequest(BaseModel):
+    items: List[SimulationBatchItem] = Field(..., min_length=1, description="Pedidos a simular (usuario, producto, peso).")
+    session_id: Optional[str] = Field(None, description="Sesión cuya cadena de Markov se usa; sin sesión, una cadena propia del lote.")
+    geometry_format: Literal["coords", "polyline"] = Field("coords", description="Formato de route_geometry: lista [[lat, lng], ...] o polyline codificada (precisión 1e-5).")
+    simplify_tolerance_m: Optional[float] = Field(None, ge=0.0, le=1000.0, description="Tolerancia (m) de simplificación Douglas-Peucker de la geometría.")
+    simplify_zoom: Optional[int] = Field(None, ge=0, le=22, description="Alternativa a simplify_tolerance_m: tolerancia de un píxel al nivel de zoom dado.")
 
 class RecalculateRequest(BaseModel):
     current_lat: float = Field(..., ge=-90.0, le=90.0, description="Latitud actual (WGS84).")
@@ -49,6 +92,9 @@ class RecalculateRequest(BaseModel):
     session_id: Optional[str] = None
     progress: Optional[float] = Field(0.0, ge=0.0, le=1.0, description="Progreso de la ruta (0..1).")
     vehicle_weight: Optional[float] = Field(None, gt=0.0, description="Peso del vehículo/carga (kg).")
+    geometry_format: Literal["coords", "polyline"] = Field("coords", description="Formato de route_geometry: lista [[lat, lng], ...] o polyline codificada (precisión 1e-5).")
+    simplify_tolerance_m: Optional[float] = Field(None, ge=0.0, le=1000.0, description="Tolerancia (m) de simplificación Douglas-Peucker de la geometría.")
+    simplify_zoom: Optional[int] = Field(None, ge=0, le=22, description="Alternativa a simplify_tolerance_m: tolerancia de un píxel al nivel de zoom dado.")
 
     @field_validator("event_type")
     @classmethod
@@ -97,7 +143,7 @@ class RouteResult(BaseModel):
     seller_name: str
     seller_rating: float = 0
     seller_trips: int = 0
-    route_geometry: List[List[float]] # [[lat, lng], ...]
+    route_geometry: Union[List[List[float]], str] # [[lat, lng], ...] o polyline codificada
     duration_seconds: float
     distance_meters: float
     distance_km: float
@@ -151,7 +197,7 @@ class POIListResponse(BaseModel):
     pois: List[POI]
 
 class RecalculateResponse(BaseModel):
-    route_geometry: List[List[float]]
+    route_geometry: Union[List[List[float]], str]
     distance_km: float
     duration_min: float
     duration_seconds: float
@@ -166,3 +212,10 @@ class ValidationStatsResponse(BaseModel):
 class DemandForecastResponse(BaseModel):
     product: str
     forecast: List[Dict[str, Any]]
+    engine: Optional[str] = Field(None, description="Motor de respaldo usado mientras el modelo Prophet se entrena.")
+    training_job: Optional[Dict[str, Any]] = None
+
+class JobSubmitRequest(BaseModel):
+    kind: str = Field(..., description="Tipo de job (eta_train_mock, impact_train_mock, demand_train).")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Parámetros del job.")
+    dedupe: bool = Field(False, description="Reutiliza un job activo con el mismo tipo y parámetros.")
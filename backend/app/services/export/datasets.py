@@ -0,0 +1,379 @@
+import json
+import os
+import shutil
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.core.localdb import get_db
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+EXPORT_FORMATS = ("parquet", "arrow")
+DEFAULT_EXPORT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "exports"))
+MANIFEST_FILENAME = "manifest.json"
+LATEST_FILENAME = "LATEST"
+ROWS_PER_GROUP = 128_000
+
+# Filtros estilo pyarrow/pandas: [("product_id", "==", "maiz"), ("created_at", ">=", "2025-01-01")]
+Filters = Sequence[Tuple[str, str, Any]]
+
+
+def _arrow():
+    """Importación diferida: pyarrow solo es necesario para exportar o leer snapshots."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("pyarrow no está instalado: `pip install pyarrow` para exportar/leer snapshots columnares") from e
+    return pa, pc, ds, pq
+
+
+def export_root(root: Optional[str] = None) -> str:
+    return os.path.abspath(root or settings.EXPORT_DIR or DEFAULT_EXPORT_DIR)
+
+
+def _dataset_format(fmt: str) -> Tuple[str, str]:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}. Valores permitidos: {list(EXPORT_FORMATS)}")
+    # "arrow" = Arrow IPC (Feather v2): lectura con memory-map y sin decodificar
+    return ("parquet", "parquet") if fmt == "parquet" else ("ipc", "arrow")
+
+
+def _write_json_atomic(path: str, payload: Any) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def write_snapshot(
+    name: str,
+    batches: Iterable[Any],
+    schema: Any,
+    partition_cols: Sequence[str] = (),
+    root: Optional[str] = None,
+    fmt: str = "parquet",
+    source: Optional[Dict[str, Any]] = None,
+    keep: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Escribe un snapshot particionado (estilo Hive: `col=valor/`) de `batches` (RecordBatch de
+    pyarrow) en `<root>/<name>/<snapshot_id>/` y lo publica en `<root>/<name>/LATEST` solo
+    cuando terminó de escribirse. Se conservan los últimos `keep` snapshots.
+    """
+    pa, _, ds, _ = _arrow()
+    ds_format, ext = _dataset_format(fmt)
+    dataset_dir = os.path.join(export_root(root), name)
+    os.makedirs(dataset_dir, exist_ok=True)
+    snapshot_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+    tmp_dir = os.path.join(dataset_dir, f".tmp-{snapshot_id}")
+    final_dir = os.path.join(dataset_dir, snapshot_id)
+
+    rows = [0]
+
+    def _counted() -> Iterator[Any]:
+        for batch in batches:
+            rows[0] += batch.num_rows
+            yield batch
+
+    start = time.time()
+    partitioning = None
+    if partition_cols:
+        partitioning = ds.partitioning(pa.schema([schema.field(c) for c in partition_cols]), flavor="hive")
+    options = {"max_rows_per_group": ROWS_PER_GROUP, "min_rows_per_group": min(ROWS_PER_GROUP, 16_384)}
+    try:
+        ds.write_dataset(
+            _counted(),
+            tmp_dir,
+            schema=schema,
+            format=ds_format,
+            partitioning=partitioning,
+            basename_template="part-{i}." + ext,
+            existing_data_behavior="error",
+            **options,
+        )
+        os.replace(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    manifest = {
+        "name": name,
+        "snapshot_id": snapshot_id,
+        "format": fmt,
+        "partitioning": list(partition_cols),
+        "rows": rows[0],
+        "schema": {f.name: str(f.type) for f in schema},
+        "created_at": datetime.utcnow().isoformat(),
+        "write_time_s": round(time.time() - start, 4),
+        "source": source or {},
+    }
+    _write_json_atomic(os.path.join(final_dir, MANIFEST_FILENAME), manifest)
+    _write_json_atomic(os.path.join(dataset_dir, LATEST_FILENAME), {"snapshot_id": snapshot_id})
+    _prune_snapshots(dataset_dir, settings.EXPORT_KEEP_SNAPSHOTS if keep is None else keep)
+    logger.info(f"Exported {name} snapshot {snapshot_id}: {rows[0]} rows", extra={"export": manifest})
+    return manifest
+
+
+def _prune_snapshots(dataset_dir: str, keep: int) -> None:
+    snapshots = sorted(d for d in os.listdir(dataset_dir) if not d.startswith(".") and os.path.isdir(os.path.join(dataset_dir, d)))
+    for old in snapshots[: max(0, len(snapshots) - max(1, int(keep)))]:
+        shutil.rmtree(os.path.join(dataset_dir, old), ignore_errors=True)
+
+
+def _record_batches(cursor: Any, columns: Sequence[str], chunk_rows: int, convert) -> Iterator[Any]:
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield convert(dict(zip(columns, zip(*rows))))
+
+
+def _timestamps(values: Sequence[str]) -> np.ndarray:
+    return pd.to_datetime(pd.Series(values, dtype=object), format="ISO8601").to_numpy(dtype="datetime64[us]")
+
+
+def export_orders(
+    root: Optional[str] = None,
+    fmt: str = "parquet",
+    since_iso: Optional[str] = None,
+    chunk_rows: int = 100_000,
+) -> Dict[str, Any]:
+    """
+    Exporta `orders` particionado por `product_id` y `month`. Las filas se leen en el orden del
+    índice (product_id, created_at), así cada row group cubre un rango compacto de fechas y los
+    filtros por fecha descartan row groups completos por sus estadísticas min/max.
+    """
+    pa, _, _, _ = _arrow()
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("created_at", pa.timestamp("us")),
+            ("weight_kg", pa.float64()),
+            ("product_id", pa.string()),
+            ("month", pa.string()),
+        ]
+    )
+    where, params = "", []
+    if since_iso:
+        where, params = "WHERE created_at >= ?", [since_iso]
+    cursor = get_db().execute(
+        f"""
+        SELECT id, created_at, weight_kg, product_id, substr(created_at, 1, 7) AS month
+        FROM orders {where}
+        ORDER BY product_id, created_at
+        """,
+        params,
+    )
+
+    def _convert(cols: Dict[str, Tuple[Any, ...]]) -> Any:
+        return pa.record_batch(
+            [
+                pa.array(np.fromiter(cols["id"], dtype=np.int64, count=len(cols["id"]))),
+                pa.array(_timestamps(cols["created_at"])),
+                pa.array(np.fromiter(cols["weight_kg"], dtype=np.float64, count=len(cols["weight_kg"]))),
+                pa.array(cols["product_id"], type=pa.string()),
+                pa.array(cols["month"], type=pa.string()),
+            ],
+            schema=schema,
+        )
+
+    batches = _record_batches(cursor, schema.names, int(max(1, chunk_rows)), _convert)
+    return write_snapshot("orders", batches, schema, ("product_id", "month"), root=root, fmt=fmt, source={"since": since_iso})
+
+
+_EVENT_COLUMNS = ("id", "created_at", "event_type", "simulation_id", "trigger_progress", "distance_added_m", "new_duration_min", "payload_json")
+
+
+def export_simulation_events(
+    root: Optional[str] = None,
+    fmt: str = "parquet",
+    include_archived: bool = True,
+    chunk_rows: int = 100_000,
+) -> Dict[str, Any]:
+    """
+    Exporta `simulation_events` (y, opcionalmente, las particiones archivadas descomprimidas)
+    particionado por `event_type` y `month`, con las columnas tipadas del evento.
+    """
+    pa, _, _, _ = _arrow()
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("created_at", pa.timestamp("us")),
+            ("simulation_id", pa.string()),
+            ("trigger_progress", pa.float64()),
+            ("distance_added_m", pa.float64()),
+            ("new_duration_min", pa.float64()),
+            ("payload_json", pa.string()),
+            ("archived", pa.bool_()),
+            ("event_type", pa.string()),
+            ("month", pa.string()),
+        ]
+    )
+
+    def _convert(cols: Dict[str, Tuple[Any, ...]], archived: bool) -> Any:
+        n = len(cols["id"])
+        return pa.record_batch(
+            [
+                pa.array(cols["id"], type=pa.int64()),
+                pa.array(_timestamps(cols["created_at"])),
+                pa.array(cols["simulation_id"], type=pa.string()),
+                pa.array(cols["trigger_progress"], type=pa.float64()),
+                pa.array(cols["distance_added_m"], type=pa.float64()),
+                pa.array(cols["new_duration_min"], type=pa.float64()),
+                pa.array(cols["payload_json"], type=pa.string()),
+                pa.array(np.full(n, archived)),
+                pa.array(cols["event_type"], type=pa.string()),
+                pa.array([str(c)[:7] for c in cols["created_at"]], type=pa.string()),
+            ],
+            schema=schema,
+        )
+
+    conn = get_db()
+
+    def _batches() -> Iterator[Any]:
+        if include_archived:
+            for r in conn.execute("SELECT codec, data FROM simulation_event_archives ORDER BY partition, id"):
+                if r["codec"] != "zlib":
+                    raise ValueError(f"Codec no soportado: {r['codec']}")
+                rows = json.loads(zlib.decompress(r["data"]))
+                if rows:
+                    yield _convert(dict(zip(_EVENT_COLUMNS, zip(*rows))), True)
+        cursor = conn.execute(f"SELECT {', '.join(_EVENT_COLUMNS)} FROM simulation_events ORDER BY event_type, created_at")
+        yield from _record_batches(cursor, _EVENT_COLUMNS, int(max(1, chunk_rows)), lambda cols: _convert(cols, False))
+
+    return write_snapshot(
+        "simulation_events", _batches(), schema, ("event_type", "month"), root=root, fmt=fmt, source={"include_archived": include_archived}
+    )
+
+
+def export_frame(
+    name: str,
+    df: pd.DataFrame,
+    partition_cols: Sequence[str] = (),
+    root: Optional[str] = None,
+    fmt: str = "parquet",
+    source: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Exporta un DataFrame (p. ej. un dataset cosechado de simulaciones) como snapshot."""
+    pa, _, _, _ = _arrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return write_snapshot(name, table.to_batches(max_chunksize=ROWS_PER_GROUP), table.schema, partition_cols, root=root, fmt=fmt, source=source)
+
+
+def latest_snapshot(name: str, root: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    dataset_dir = os.path.join(export_root(root), name)
+    try:
+        with open(os.path.join(dataset_dir, LATEST_FILENAME), "r", encoding="utf-8") as f:
+            snapshot_id = json.load(f)["snapshot_id"]
+        with open(os.path.join(dataset_dir, snapshot_id, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def list_snapshots(root: Optional[str] = None) -> List[Dict[str, Any]]:
+    base = export_root(root)
+    if not os.path.isdir(base):
+        return []
+    found = []
+    for name in sorted(os.listdir(base)):
+        manifest = latest_snapshot(name, root=base)
+        if manifest is not None:
+            found.append(manifest)
+    return found
+
+
+def open_dataset(name: str, root: Optional[str] = None, snapshot_id: Optional[str] = None) -> Any:
+    """`pyarrow.dataset.Dataset` del snapshot (por defecto el último publicado)."""
+    _, _, ds, _ = _arrow()
+    manifest = latest_snapshot(name, root=root)
+    if manifest is None:
+        raise FileNotFoundError(f"No hay snapshots exportados de {name}")
+    snapshot_id = snapshot_id or manifest["snapshot_id"]
+    path = os.path.join(export_root(root), name, snapshot_id)
+    ds_format, _ = _dataset_format(manifest["format"])
+    return ds.dataset(path, format=ds_format, partitioning="hive" if manifest["partitioning"] else None, exclude_invalid_files=True)
+
+
+def _filter_expression(dataset: Any, filters: Optional[Filters]) -> Any:
+    if not filters:
+        return None
+    pa, _, _, pq = _arrow()
+    typed = []
+    for col, op, value in filters:
+        field_type = dataset.schema.field(col).type
+        if pa.types.is_timestamp(field_type) and isinstance(value, str):
+            value = pd.Timestamp(value).to_datetime64()
+        typed.append((col, op, value))
+    return pq.filters_to_expression(typed)
+
+
+def load_table(
+    name: str,
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[Filters] = None,
+    root: Optional[str] = None,
+    snapshot_id: Optional[str] = None,
+) -> Any:
+    """
+    Lee columnas de un snapshot como `pyarrow.Table`. Los filtros sobre columnas de partición
+    descartan directorios y los demás se evalúan contra las estadísticas de cada row group.
+    """
+    dataset = open_dataset(name, root=root, snapshot_id=snapshot_id)
+    return dataset.to_table(columns=list(columns) if columns else None, filter=_filter_expression(dataset, filters))
+
+
+def load_frame(name: str, columns: Optional[Sequence[str]] = None, filters: Optional[Filters] = None, root: Optional[str] = None) -> pd.DataFrame:
+    return load_table(name, columns=columns, filters=filters, root=root).to_pandas()
+
+
+def column_arrays(table: Any, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Columnas como arreglos NumPy. Una columna numérica de un solo bloque y sin nulos se expone
+    sin copia sobre el buffer de Arrow; en otro caso se concatena (una copia).
+    """
+    out: Dict[str, np.ndarray] = {}
+    for c in columns:
+        chunked = table.column(c)
+        if chunked.num_chunks == 1 and chunked.null_count == 0:
+            try:
+                out[c] = chunked.chunk(0).to_numpy(zero_copy_only=True)
+                continue
+            except Exception:
+                pass
+        out[c] = chunked.to_numpy()
+    return out
+
+
+def load_daily_demand(product_id: str, since_iso: Optional[str] = None, root: Optional[str] = None) -> List[Tuple[str, float]]:
+    """Serie diaria (día, kg) de un producto desde el snapshot de `orders`, en el formato de `fetch_daily_demand`."""
+    _, pc, _, _ = _arrow()
+    filters: List[Tuple[str, str, Any]] = [("product_id", "==", product_id)]
+    if since_iso:
+        filters.append(("created_at", ">=", since_iso[:10]))
+        filters.append(("month", ">=", since_iso[:7]))
+    table = load_table("orders", columns=["created_at", "weight_kg"], filters=filters, root=root)
+    if table.num_rows == 0:
+        return []
+    table = table.append_column("day", pc.strftime(table["created_at"], format="%Y-%m-%d"))
+    daily = table.group_by("day").aggregate([("weight_kg", "sum")]).sort_by("day")
+    return list(zip(daily["day"].to_pylist(), (float(v) for v in daily["weight_kg_sum"].to_pylist())))
+
+
+def export_all(root: Optional[str] = None, fmt: str = "parquet", datasets: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    exporters = {"orders": export_orders, "simulation_events": export_simulation_events}
+    names = list(datasets or exporters)
+    unknown = sorted(set(names) - set(exporters))
+    if unknown:
+        raise ValueError(f"Datasets desconocidos: {unknown}. Valores permitidos: {sorted(exporters)}")
+    return {n: exporters[n](root=root, fmt=fmt) for n in names}
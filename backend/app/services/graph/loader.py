@@ -9,13 +9,14 @@ class DataLoader:
         self.data_dir = data_dir
         self.raw_dir = os.path.join(data_dir, "raw")
         self.processed_dir = os.path.join(data_dir, "processed")
+        self.graph_path = os.path.join(self.processed_dir, "portoviejo_graph.graphml")
         
         os.makedirs(self.raw_dir, exist_ok=True)
         os.makedirs(self.processed_dir, exist_ok=True)
 
     def load_graph(self, force_download=False):
         """Loads the graph from disk or downloads it if not present."""
-        filepath = os.path.join(self.processed_dir, "portoviejo_graph.graphml")
+        filepath = self.graph_path
         
         if not force_download and os.path.exists(filepath):
             print(f"Loading graph from {filepath}...")
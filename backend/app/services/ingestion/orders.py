@@ -0,0 +1,180 @@
+import codecs
+import io
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from app.core.localdb import fetch_products, insert_orders
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+ORDER_FORMATS = ("ndjson", "csv")
+REQUIRED_COLUMNS = ("created_at", "product_id", "weight_kg")
+MAX_WEIGHT_KG = 100_000.0
+MAX_ERROR_SAMPLES = 20
+
+
+class OrderIngestor:
+    """
+    Ingesta masiva de pedidos desde NDJSON o CSV.
+
+    Las líneas se acumulan en bloques de `chunk_size`; cada bloque se parsea y valida de forma
+    vectorizada con pandas y se inserta con `insert_orders` en una sola transacción, junto con
+    la actualización de los agregados de demanda. Las filas inválidas se descartan y se cuentan.
+    """
+
+    def __init__(self, fmt: str = "ndjson", chunk_size: int = 50_000, product_ids: Optional[Set[str]] = None):
+        fmt = str(fmt).lower()
+        if fmt not in ORDER_FORMATS:
+            raise ValueError(f"Formato no soportado: {fmt}. Valores permitidos: {list(ORDER_FORMATS)}")
+        self.fmt = fmt
+        self.chunk_size = int(max(1, chunk_size))
+        self.product_ids = set(product_ids) if product_ids is not None else {p["id"] for p in fetch_products()}
+        self._buffer: List[str] = []
+        self._header: Optional[str] = None
+        self._chunk_first_line = 1
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._pending = ""
+        self._start = time.perf_counter()
+        self.accepted = 0
+        self.rejected = 0
+        self.chunks = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def feed(self, lines: Iterable[str]) -> None:
+        """Agrega líneas (sin salto de línea) y procesa cada bloque completo."""
+        buffer, chunk_size = self._buffer, self.chunk_size
+        for line in lines:
+            if not line or (line[0] in " \t\r" and line.isspace()):
+                continue
+            if self._header is None and self.fmt == "csv":
+                self._header = line
+                self._chunk_first_line = 2
+                continue
+            buffer.append(line)
+            if len(buffer) >= chunk_size:
+                self.flush()
+                buffer = self._buffer
+
+    def feed_bytes(self, data: bytes) -> None:
+        """Agrega un fragmento crudo del cuerpo (p. ej. de un stream HTTP); la última línea incompleta queda pendiente."""
+        lines = (self._pending + self._decoder.decode(data)).split("\n")
+        self._pending = lines.pop()
+        self.feed([line[:-1] if line.endswith("\r") else line for line in lines])
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        first_line = self._chunk_first_line
+        self._chunk_first_line += len(lines)
+        self._process_chunk(lines, first_line)
+
+    def _parse(self, lines: List[str]) -> pd.DataFrame:
+        if self.fmt == "csv":
+            if self._header is None:
+                raise ValueError("CSV sin encabezado")
+            return pd.read_csv(io.StringIO(self._header + "\n" + "\n".join(lines)), dtype=str, keep_default_na=False)
+        # Un solo json.loads sobre el bloque como arreglo, en lugar de un parseo por línea
+        records = json.loads("[" + ",".join(lines) + "]")
+        try:
+            return pd.DataFrame({c: [r.get(c) for r in records] for c in REQUIRED_COLUMNS})
+        except AttributeError:
+            raise ValueError("Cada registro NDJSON debe ser un objeto")
+
+    def _reject(self, first_line: int, mask: np.ndarray, reason: str) -> None:
+        idx = np.flatnonzero(mask)
+        self.rejected += int(idx.size)
+        room = MAX_ERROR_SAMPLES - len(self.errors)
+        for i in idx[: max(0, room)]:
+            self.errors.append({"line": int(first_line + i), "error": reason})
+
+    def _process_chunk(self, lines: List[str], first_line: int) -> None:
+        try:
+            df = self._parse(lines)
+        except ValueError as e:
+            # Un registro mal formado invalida el parseo del bloque: se reintenta línea a línea
+            if len(lines) == 1:
+                self._reject(first_line, np.ones(1, dtype=bool), f"Registro mal formado: {e}")
+                return
+            for i, line in enumerate(lines):
+                self._process_chunk([line], first_line + i)
+            return
+
+        missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+        if missing:
+            self._reject(first_line, np.ones(len(lines), dtype=bool), f"Faltan columnas: {missing}")
+            return
+
+        # Pocos productos distintos: se normalizan los valores únicos, no cada fila
+        codes, uniques = pd.factorize(df["product_id"].astype(str), sort=False)
+        normalized = np.array([u.strip().lower() for u in uniques] + [""], dtype=object)
+        product = normalized[codes]
+        weight = pd.to_numeric(df["weight_kg"], errors="coerce").to_numpy(dtype=float)
+        ts = pd.to_datetime(df["created_at"].astype(str), errors="coerce", format="ISO8601", utc=True)
+        ts_values = ts.dt.tz_convert(None).to_numpy(dtype="datetime64[s]")
+
+        known = np.array([u in self.product_ids for u in normalized], dtype=bool)
+        bad_product = ~known[codes]
+        bad_weight = ~np.isfinite(weight) | (weight <= 0.0) | (weight > MAX_WEIGHT_KG)
+        bad_ts = np.isnat(ts_values)
+        self._reject(first_line, bad_product, "product_id desconocido")
+        self._reject(first_line, bad_weight & ~bad_product, f"weight_kg debe estar en (0, {MAX_WEIGHT_KG:g}]")
+        self._reject(first_line, bad_ts & ~bad_product & ~bad_weight, "created_at no es una fecha ISO 8601")
+
+        ok = ~(bad_product | bad_weight | bad_ts)
+        if not ok.any():
+            return
+        # Orden por (product_id, created_at): las inserciones en el índice quedan contiguas
+        ts_ok, product, weight = ts_values[ok], product[ok], np.round(weight[ok], 3)
+        order = np.lexsort((ts_ok, product))
+        created_at = np.datetime_as_string(ts_ok[order], unit="s")
+        product, weight = product[order], weight[order]
+
+        # Deltas de los agregados calculados con groupby en lugar de recorrer filas
+        days = created_at.astype("U10")
+        grouped = pd.DataFrame({"p": product, "d": days, "kg": weight}).groupby(["p", "d"], sort=False)["kg"].agg(["sum", "count"])
+        daily_deltas = {key: [float(kg), int(n)] for key, kg, n in zip(grouped.index, grouped["sum"], grouped["count"])}
+
+        rows = list(zip(created_at.tolist(), product.tolist(), weight.tolist()))
+        insert_orders(rows, daily_deltas=daily_deltas)
+        self.accepted += len(rows)
+        self.chunks += 1
+
+    def close(self) -> Dict[str, Any]:
+        tail = (self._pending + self._decoder.decode(b"", final=True)).rstrip("\r")
+        self._pending = ""
+        if tail:
+            self.feed([tail])
+        self.flush()
+        elapsed = time.perf_counter() - self._start
+        summary = {
+            "format": self.fmt,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "chunks": self.chunks,
+            "errors": self.errors,
+            "time_s": round(elapsed, 4),
+            "orders_per_s": round(self.accepted / elapsed, 1) if elapsed > 0 else None,
+        }
+        logger.info(
+            f"Ingested {self.accepted} orders ({self.rejected} rejected) in {elapsed:.2f}s",
+            extra={"ingestion": {k: v for k, v in summary.items() if k != "errors"}},
+        )
+        return summary
+
+
+def ingest_lines(lines: Iterable[str], fmt: str = "ndjson", chunk_size: int = 50_000) -> Dict[str, Any]:
+    ingestor = OrderIngestor(fmt=fmt, chunk_size=chunk_size)
+    ingestor.feed(lines)
+    return ingestor.close()
+
+
+def ingest_file(path: str, fmt: Optional[str] = None, chunk_size: int = 50_000) -> Dict[str, Any]:
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    with open(path, "r", encoding="utf-8") as f:
+        return ingest_lines((line.rstrip("\r\n") for line in f), fmt=fmt, chunk_size=chunk_size)
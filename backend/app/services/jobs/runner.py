@@ -0,0 +1,341 @@
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.localdb import fetch_job, fetch_jobs, insert_job, mark_interrupted_jobs, update_job
+from app.core.logger import get_logger
+from app.exceptions import JobQueueFullError
+
+logger = get_logger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+FINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+@dataclass
+class JobKind:
+    """
+    Tipo de job registrado en el runner.
+
+    - fn(artifact_path, **kwargs): se ejecuta en un proceso propio y debe ser una función de módulo.
+      Si el tipo produce un artefacto, lo escribe en `artifact_path` (ruta temporal).
+    - artifact_path(params): destino final del artefacto; el runner lo reemplaza con os.replace
+      únicamente cuando el job termina con éxito.
+    - validate(params): normaliza/valida los parámetros antes de encolar (lanza ValueError).
+    - prepare(params): construye los kwargs de `fn` en el proceso padre (p. ej. lecturas de SQLite).
+    - on_complete(params, result): se llama tras el swap del artefacto (recarga de modelos).
+    - in_process: `fn` corre en un hilo del proceso del servidor (de a un job a la vez, sin ocupar
+      cupo de `max_workers`) y recibe `cancel_event`; para mantenimiento de SQLite, que debe pasar por
+      el escritor único del pool de conexiones.
+    """
+    name: str
+    fn: Callable[..., Dict[str, Any]]
+    artifact_path: Optional[Callable[[Dict[str, Any]], str]] = None
+    validate: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None
+    in_process: bool = False
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class JobProcessExit(RuntimeError):
+    """El proceso del job terminó sin enviar resultado (cancelado, señal o fallo fatal)."""
+
+
+def _exit_on_sigterm(signum, frame):
+    sys.exit(128 + signum)
+
+
+def _job_process_main(conn, fn: Callable[..., Dict[str, Any]], artifact_path: Optional[str], kwargs: Dict[str, Any]) -> None:
+    # Cancelación = SIGTERM; como SystemExit, los `finally` del job terminan sus propios subprocesos
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    try:
+        outcome = (True, fn(artifact_path, **kwargs))
+    except Exception as e:
+        outcome = (False, e)
+    try:
+        conn.send(outcome)
+    except Exception:
+        # Resultado o excepción no serializable
+        conn.send((False, RuntimeError(f"{type(outcome[1]).__name__}: {outcome[1]}")))
+    finally:
+        conn.close()
+
+
+class _JobProcess:
+    """Un proceso por job: a diferencia de un pool, se puede terminar sin afectar a otros jobs."""
+
+    def __init__(self, ctx, name: str, fn: Callable[..., Dict[str, Any]], artifact_path: Optional[str], kwargs: Dict[str, Any]):
+        self.future: Future = Future()
+        self.future.set_running_or_notify_cancel()
+        recv_conn, send_conn = ctx.Pipe(duplex=False)
+        self.process = ctx.Process(target=_job_process_main, args=(send_conn, fn, artifact_path, kwargs), name=name)
+        self.process.start()
+        send_conn.close()
+        threading.Thread(target=self._wait, args=(recv_conn,), name=f"{name}-wait", daemon=True).start()
+
+    def _wait(self, conn) -> None:
+        try:
+            ok, payload = conn.recv()
+        except (EOFError, OSError):
+            ok, payload = False, None
+        finally:
+            conn.close()
+        self.process.join()
+        if ok:
+            self.future.set_result(payload)
+        else:
+            self.future.set_exception(payload or JobProcessExit(f"Job process exited with code {self.process.exitcode}"))
+
+    def terminate(self) -> None:
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class JobRunner:
+    """
+    Ejecutor local de jobs de entrenamiento, cada uno en su propio proceso.
+
+    El estado de cada job se persiste en la tabla `jobs` de SQLite. El runner limita la cantidad
+    de jobs en ejecución (`max_workers`) y en cola (`max_pending`); los jobs en cola se despachan
+    en orden FIFO a medida que se liberan workers. Cancelar un job en ejecución termina su proceso.
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 16, mp_start_method: str = "spawn"):
+        self.max_workers = int(max(1, max_workers))
+        self.max_pending = int(max(0, max_pending))
+        self._mp_start_method = mp_start_method
+        self._kinds: Dict[str, JobKind] = {}
+        self._pending: Deque[str] = deque()
+        self._running: Dict[str, Future] = {}
+        self._specs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._artifacts: Dict[str, Tuple[str, str]] = {}
+        self._events: Dict[str, threading.Event] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._processes: Dict[str, _JobProcess] = {}
+        self._lock = threading.RLock()
+        self._thread_executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+
+    def start(self) -> None:
+        interrupted = mark_interrupted_jobs()
+        if interrupted:
+            logger.warning(f"Marked {interrupted} interrupted jobs as failed")
+
+    def register(self, kind: JobKind) -> None:
+        self._kinds[kind.name] = kind
+
+    @property
+    def kinds(self) -> List[str]:
+        return sorted(self._kinds)
+
+    def _get_thread_executor(self) -> ThreadPoolExecutor:
+        if self._thread_executor is None:
+            self._thread_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-in-process")
+        return self._thread_executor
+
+    def _has_capacity_locked(self, kind: JobKind) -> bool:
+        in_process = len(self._cancel_events)
+        if kind.in_process:
+            return in_process < 1
+        return len(self._running) - in_process < self.max_workers
+
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None, dedupe: bool = False) -> Dict[str, Any]:
+        """
+        Encola un job y retorna su estado. Con `dedupe=True`, si ya existe un job activo del mismo
+        tipo y parámetros se retorna ese job en lugar de crear otro.
+        """
+        job_kind = self._kinds.get(kind)
+        if job_kind is None:
+            raise ValueError(f"Tipo de job desconocido: {kind}. Valores permitidos: {self.kinds}")
+        params = dict(params or {})
+        if job_kind.validate is not None:
+            params = job_kind.validate(params)
+
+        with self._lock:
+            if self._closed:
+                raise JobQueueFullError("Job runner is shutting down")
+            if dedupe:
+                for job_id, (k, p) in self._specs.items():
+                    if k == kind and p == params:
+                        return fetch_job(job_id)
+            if len(self._pending) >= self.max_pending and len(self._running) >= self.max_workers:
+                raise JobQueueFullError(
+                    "Job queue is full",
+                    details=f"{len(self._running)} running, {len(self._pending)} queued (max_pending={self.max_pending})",
+                )
+
+            job_id = uuid.uuid4().hex
+            insert_job(job_id, kind, params)
+            self._specs[job_id] = (kind, params)
+            self._events[job_id] = threading.Event()
+            self._pending.append(job_id)
+            self._dispatch_locked()
+        return fetch_job(job_id)
+
+    def _dispatch_locked(self) -> None:
+        # FIFO por ejecutor: un job en proceso no espera a que se libere un worker
+        for job_id in list(self._pending):
+            if self._closed:
+                return
+            # Un job que termina al instante reentra aquí desde `_on_done` y puede despachar o
+            # cerrar jobs de esta misma instantánea
+            if job_id not in self._pending or job_id not in self._specs:
+                continue
+            kind_name, params = self._specs[job_id]
+            kind = self._kinds[kind_name]
+            if not self._has_capacity_locked(kind):
+                continue
+            self._pending.remove(job_id)
+            try:
+                kwargs = kind.prepare(params) if kind.prepare is not None else dict(params)
+                tmp_path = None
+                if kind.artifact_path is not None:
+                    dest = kind.artifact_path(params)
+                    tmp_path = f"{dest}.job-{job_id}.tmp"
+                    self._artifacts[job_id] = (tmp_path, dest)
+                if kind.in_process:
+                    cancel_event = threading.Event()
+                    future = self._get_thread_executor().submit(kind.fn, tmp_path, cancel_event=cancel_event, **kwargs)
+                    self._cancel_events[job_id] = cancel_event
+                else:
+                    job_process = _JobProcess(
+                        multiprocessing.get_context(self._mp_start_method), f"job-{kind_name}-{job_id[:8]}", kind.fn, tmp_path, kwargs
+                    )
+                    self._processes[job_id] = job_process
+                    future = job_process.future
+            except Exception as e:
+                logger.error(f"Job {job_id} ({kind_name}) could not be dispatched: {e}")
+                self._finish(job_id, "failed", error=str(e))
+                continue
+
+            update_job(job_id, status="running", started_at=_now())
+            self._running[job_id] = future
+            future.add_done_callback(lambda f, jid=job_id: self._on_done(jid, f))
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        kind_name, params = self._specs.get(job_id, (None, {}))
+        kind = self._kinds.get(kind_name)
+        tmp_path, dest = self._artifacts.get(job_id, (None, None))
+        try:
+            job = fetch_job(job_id)
+            if future.cancelled() or (job is not None and job["cancel_requested"]):
+                self._finish(job_id, "cancelled")
+                return
+
+            exc = future.exception()
+            if exc is not None:
+                logger.error(f"Job {job_id} ({kind_name}) failed: {exc}")
+                self._finish(job_id, "failed", error=f"{type(exc).__name__}: {exc}")
+                return
+
+            result = future.result() or {}
+            if tmp_path and dest:
+                if not os.path.exists(tmp_path):
+                    self._finish(job_id, "failed", error="Job finished without producing its artifact")
+                    return
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(tmp_path, dest)
+            if kind is not None and kind.on_complete is not None:
+                try:
+                    kind.on_complete(params, result)
+                except Exception as e:
+                    logger.error(f"Job {job_id} ({kind_name}) on_complete hook failed: {e}")
+            self._finish(job_id, "succeeded", result=result)
+            logger.info(f"Job {job_id} ({kind_name}) succeeded")
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind_name}) completion handling failed: {e}")
+            self._finish(job_id, "failed", error=str(e))
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._running.pop(job_id, None)
+                self._artifacts.pop(job_id, None)
+                self._cancel_events.pop(job_id, None)
+                self._processes.pop(job_id, None)
+                self._dispatch_locked()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        update_job(job_id, status=status, result=result, error=error, finished_at=_now())
+        with self._lock:
+            self._specs.pop(job_id, None)
+            event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return fetch_job(job_id)
+
+    def list(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        return fetch_jobs(limit=limit, status=status)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancela un job. Los jobs en cola se cancelan de inmediato; a los que ya corren en su
+        proceso se les envía SIGTERM y su artefacto temporal se descarta. A los jobs en proceso
+        del servidor se les activa `cancel_event` para que se detengan entre lotes.
+        """
+        with self._lock:
+            job = fetch_job(job_id)
+            if job is None or job["status"] in FINAL_STATUSES:
+                return job
+            if job_id in self._pending:
+                self._pending.remove(job_id)
+                self._finish(job_id, "cancelled")
+            elif job_id in self._running:
+                update_job(job_id, cancel_requested=1)
+                if job_id in self._processes:
+                    self._processes[job_id].terminate()
+                if job_id in self._cancel_events:
+                    self._cancel_events[job_id].set()
+        return fetch_job(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            event = self._events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+        return fetch_job(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "running": len(self._running),
+                "queued": len(self._pending),
+                "kinds": self.kinds,
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            self._closed = True
+            pending = list(self._pending)
+            self._pending.clear()
+            for cancel_event in self._cancel_events.values():
+                cancel_event.set()
+            processes = list(self._processes.values())
+        for job_id in pending:
+            self._finish(job_id, "cancelled", error="Server shutdown")
+        for job_process in processes:
+            if wait:
+                job_process.process.join()
+            else:
+                job_process.terminate()
+        if self._thread_executor is not None:
+            self._thread_executor.shutdown(wait=wait, cancel_futures=True)
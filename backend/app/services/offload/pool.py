@@ -0,0 +1,117 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Estado del proceso worker (se completa en `_init_worker`)
+_worker_graph_path: Optional[str] = None
+_worker_graph = None
+
+
+def _init_worker(graph_path: Optional[str], nice: int) -> None:
+    global _worker_graph_path
+    _worker_graph_path = graph_path
+    if nice > 0 and hasattr(os, "nice"):
+        try:
+            # Prioridad de CPU más baja: las peticiones ligeras del proceso principal ganan al planificador
+            os.nice(nice)
+        except OSError:
+            pass
+
+
+def worker_graph():
+    """Grafo vial del worker: se carga una sola vez (GraphML) en el primer task que lo necesita."""
+    global _worker_graph
+    if _worker_graph is None:
+        if not _worker_graph_path or not os.path.exists(_worker_graph_path):
+            raise RuntimeError(f"Graph file not available in worker: {_worker_graph_path}")
+        import osmnx as ox
+
+        _worker_graph = ox.load_graphml(_worker_graph_path)
+    return _worker_graph
+
+
+class HeavyTaskPool:
+    """
+    Pool de procesos dedicado a endpoints de cómputo pesado (validación, evaluación de modelos).
+
+    Separado del pool de jobs de entrenamiento: estas tareas se esperan dentro de la petición.
+    Los workers (spawn) corren con prioridad reducida (`nice`) para no competir con el event
+    loop ni con el threadpool de FastAPI. El executor se crea en el primer uso y se recrea si un
+    worker muere (BrokenProcessPool).
+    """
+
+    def __init__(self, max_workers: int = 1, nice: int = 10, graph_path: Optional[str] = None, mp_start_method: str = "spawn"):
+        self.max_workers = int(max(1, max_workers))
+        self.nice = int(max(0, nice))
+        self.graph_path = graph_path
+        self._mp_start_method = mp_start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self._mp_start_method),
+                    initializer=_init_worker,
+                    initargs=(self.graph_path, self.nice),
+                )
+            return self._executor
+
+    def _reset(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Ejecuta `fn(*args, **kwargs)` (función de módulo) en un worker y espera su resultado."""
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        self._running += 1
+        try:
+            result = await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+        except BrokenProcessPool:
+            self._failed += 1
+            logger.error(f"Heavy task pool broken while running {getattr(fn, '__name__', fn)}; restarting")
+            self._reset(executor)
+            raise
+        except BaseException:
+            self._failed += 1
+            raise
+        finally:
+            self._running -= 1
+        self._completed += 1
+        return result
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "nice": self.nice,
+            "started": self._executor is not None,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "restarts": self._restarts,
+        }
@@ -0,0 +1,80 @@
+"""
+Tareas de cómputo pesado que se ejecutan en `HeavyTaskPool`.
+
+Son funciones de módulo (picklables) que retornan dicts serializables; el endpoint agrega el
+timestamp. Los errores esperados se señalan con excepciones estándar que el endpoint traduce
+a códigos HTTP: LookupError -> 404, ImportError -> 503.
+"""
+from typing import Any, Dict, Optional
+
+from app.services.offload.pool import worker_graph
+
+_validator = None
+
+
+def validation_stats_task(routing_samples: int = 15, n_simulations: int = 100) -> Dict[str, Any]:
+    """Dijkstra vs A* sobre rutas aleatorias + estabilidad Monte Carlo (antes en el threadpool)."""
+    global _validator
+    if _validator is None:
+        from app.services.routing.algorithms import PathFinder
+        from app.services.validation.validator_service import ValidatorService
+
+        graph = worker_graph()
+        _validator = ValidatorService(graph, PathFinder(graph))
+    return {
+        "routing": _validator.validate_routing_algorithms(samples=routing_samples),
+        "simulation": _validator.validate_simulation_stability(n_simulations=n_simulations),
+    }
+
+
+def eta_evaluate_task(model_path: Optional[str] = None, n_samples: int = 3000, sample_points: int = 300) -> Optional[Dict[str, Any]]:
+    from app.ml.eta_predictor import evaluate_eta_mock
+
+    return evaluate_eta_mock(model_path=model_path, n_samples=n_samples, sample_points=sample_points)
+
+
+def impact_evaluate_task(model_path: Optional[str] = None, n_samples: int = 6000, sample_points: int = 300) -> Optional[Dict[str, Any]]:
+    from app.ml.impact_predictor import ImpactPredictor
+
+    predictor = ImpactPredictor(model_path=model_path, use_surrogate=False)
+    if not predictor.model_loaded:
+        return None
+    return predictor.evaluate_mock(n_samples=n_samples, sample_points=sample_points)
+
+
+def demand_cv_task(product: str, initial: str = "180 days", period: str = "30 days", horizon: str = "30 days") -> Dict[str, Any]:
+    """Validación cruzada de Prophet (cross_validation reentrena el modelo por cada corte)."""
+    from app.ml.demand_forecasting.forecaster import DemandForecaster
+
+    forecaster = DemandForecaster(product)
+    if not forecaster.load():
+        raise LookupError(f"Model for {product} not found")
+
+    try:
+        from prophet.diagnostics import cross_validation, performance_metrics
+    except Exception as e:
+        raise ImportError(f"Prophet diagnostics not available: {e}")
+
+    df_cv = cross_validation(forecaster.model, initial=initial, period=period, horizon=horizon)
+    df_p = performance_metrics(df_cv)
+    metrics = df_p.mean(numeric_only=True).to_dict()
+
+    sample = df_cv[["ds", "y", "yhat", "yhat_lower", "yhat_upper"]].tail(120).copy()
+    sample_points = [
+        {
+            "date": row["ds"].strftime("%Y-%m-%d") if hasattr(row["ds"], "strftime") else str(row["ds"]),
+            "y": float(row["y"]) if row["y"] is not None else None,
+            "yhat": float(row["yhat"]) if row["yhat"] is not None else None,
+            "yhat_lower": float(row["yhat_lower"]) if row["yhat_lower"] is not None else None,
+            "yhat_upper": float(row["yhat_upper"]) if row["yhat_upper"] is not None else None,
+        }
+        for _, row in sample.iterrows()
+    ]
+
+    return {
+        "model_loaded": True,
+        "product": product,
+        "cv": {"initial": initial, "period": period, "horizon": horizon},
+        "metrics": {k: float(v) for k, v in metrics.items()},
+        "sample_points": sample_points,
+    }
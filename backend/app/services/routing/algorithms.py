@@ -4,7 +4,10 @@ import heapq
 import time
 import math
 import logging
+import threading
 from app.core.logger import get_logger
+from app.core.metrics import ROUTING_QUERY_SECONDS, ROUTING_RELAXED_EDGES, ROUTING_SETTLED_NODES
+from app.core.tracing import span
 
 # Configure logging
 logger = get_logger(__name__)
@@ -41,6 +44,18 @@ def apply_penalties(base_weight, highway, event_type, vehicle_profile):
 
     return base_weight * penalty
 
+def edge_cost(edge_data, weight_attr='weight', event_type=None, vehicle_profile=None):
+    """Costo de una arista tal como lo evalúan las consultas de PathFinder (peso base + penalizaciones)."""
+    try:
+        base_weight = float(edge_data.get(weight_attr, 1.0))
+    except (ValueError, TypeError):
+        base_weight = 1.0
+    if not math.isfinite(base_weight):
+        base_weight = 1.0
+    if base_weight < 0:
+        base_weight = 0
+    return apply_penalties(base_weight, normalize_highway(edge_data), event_type, vehicle_profile)
+
 def haversine_heuristic(u, v, G):
     """
     Heuristic function for A* using Haversine distance.
@@ -73,9 +88,22 @@ def haversine_heuristic(u, v, G):
     max_speed_mps = 40.0
     return (R * c) / max_speed_mps
 
+def _observe_query(result, seconds):
+    algorithm = result.get("algorithm", "unknown")
+    ROUTING_QUERY_SECONDS.labels(algorithm).observe(seconds)
+    explored = result.get("explored_nodes")
+    if explored is not None and explored >= 0:
+        ROUTING_SETTLED_NODES.labels(algorithm).observe(explored)
+    relaxed = result.get("relaxed_edges")
+    if relaxed is not None:
+        ROUTING_RELAXED_EDGES.labels(algorithm).observe(relaxed)
+
+
 class PathFinder:
     def __init__(self, G: nx.MultiDiGraph):
         self.G = G
+        self._cost_graphs = {}
+        self._cost_graphs_lock = threading.Lock()
         self._init_rustworkx()
 
     def _init_rustworkx(self):
@@ -104,23 +132,132 @@ class PathFinder:
             if 'osmid_temp' in data:
                 del data['osmid_temp']
 
+    def _cost_graph(self, weight: str, reverse: bool):
+        """
+        Copia del grafo Rustworkx con el costo de cada arista (sin eventos) como payload, para que
+        las consultas masivas no evalúen las penalizaciones en cada relajación. Con `reverse`, las
+        aristas invertidas. Se construye una vez por atributo de peso.
+        """
+        key = (weight, reverse)
+        with self._cost_graphs_lock:
+            graph = self._cost_graphs.get(key)
+            if graph is not None:
+                return graph
+            forward = self._cost_graphs.get((weight, False))
+            if forward is None:
+                forward = self.rx_graph.copy()
+                for idx in forward.edge_indices():
+                    forward.update_edge_by_index(idx, edge_cost(forward.get_edge_data_by_index(idx), weight))
+                self._cost_graphs[(weight, False)] = forward
+            graph = forward
+            if reverse:
+                graph = forward.copy()
+                graph.reverse()
+                self._cost_graphs[key] = graph
+            return graph
+
+    @staticmethod
+    def _walk_tree(graph, dist, root, end):
+        """
+        Reconstruye el camino mínimo de `root` a `end` desde las distancias del árbol: en cada paso
+        retrocede por la arista entrante cuyo extremo cumple dist[u] + w == dist[v].
+        Retorna la secuencia [end, ..., root] o None si no se puede reconstruir.
+        """
+        seq = [end]
+        seen = {end}
+        v = end
+        while v != root:
+            dv = dist[v]
+            best, best_err = None, math.inf
+            for u, _, w in graph.in_edges(v):
+                du = dist.get(u)
+                if du is None or u in seen:
+                    continue
+                err = abs(du + w - dv)
+                if err < best_err:
+                    best, best_err = u, err
+            if best is None or best_err > 1e-6 * max(1.0, dv):
+                return None
+            seq.append(best)
+            seen.add(best)
+            v = best
+        return seq
+
+    def route_many(self, pairs, weight='weight'):
+        """
+        Rutas de costo mínimo (sin eventos ni perfil de vehículo) para muchos pares (origen, destino).
+
+        En lugar de una consulta por par se calcula un árbol de caminos mínimos por cada nodo
+        distinto del lado con menos nodos: desde cada origen sobre el grafo, o desde cada destino
+        sobre el grafo invertido. Los caminos se reconstruyen desde las distancias del árbol.
+        Retorna {(origen, destino): {"path": [...], "cost": float}}; los pares sin camino se omiten.
+        """
+        pairs = list(dict.fromkeys(pairs))
+        if self.rx_graph is None:
+            out = {}
+            for s, t in pairs:
+                result = self.run_dijkstra(s, t, weight=weight)
+                if result["path"] and math.isfinite(result["cost"]):
+                    out[(s, t)] = {"path": result["path"], "cost": result["cost"]}
+            return out
+
+        by_source, by_target = {}, {}
+        for s, t in pairs:
+            if s == t or s not in self.osm_to_rx or t not in self.osm_to_rx:
+                continue
+            by_source.setdefault(s, []).append(t)
+            by_target.setdefault(t, []).append(s)
+
+        # Árboles desde el lado con menos nodos distintos; con el grafo invertido, el árbol desde
+        # un destino da la distancia de cada origen hacia él
+        reverse = len(by_target) < len(by_source)
+        roots = by_target if reverse else by_source
+        graph = self._cost_graph(weight, reverse)
+        out = {}
+        for root, ends in roots.items():
+            start = time.perf_counter()
+            with span("dijkstra_tree"):
+                root_idx = self.osm_to_rx[root]
+                dist = dict(rx.digraph_dijkstra_shortest_path_lengths(graph, root_idx, float))
+                dist[root_idx] = 0.0
+                for end in ends:
+                    end_idx = self.osm_to_rx[end]
+                    if end_idx not in dist:
+                        continue
+                    seq = self._walk_tree(graph, dist, root_idx, end_idx)
+                    if seq is None:
+                        continue
+                    # En el grafo invertido la secuencia ya va de origen a destino
+                    path = [self.rx_to_osm[i] for i in (seq if reverse else reversed(seq))]
+                    key = (end, root) if reverse else (root, end)
+                    out[key] = {"path": path, "cost": dist[end_idx]}
+            _observe_query({"algorithm": "Dijkstra tree (RX)"}, time.perf_counter() - start)
+        return out
+
     def run_dijkstra(self, source, target, weight='weight', event_type=None, vehicle_profile=None):
         """
         Runs Dijkstra's algorithm and returns path and stats.
         Uses Rustworkx for performance, falls back to NetworkX if needed.
         Supports dynamic events: 'rain', 'traffic', 'protest'.
         """
-        if self.rx_graph and source in self.osm_to_rx and target in self.osm_to_rx:
-            return self._run_dijkstra_rx(source, target, weight, event_type, vehicle_profile)
-            
-        return self._run_dijkstra_nx(source, target, weight, event_type, vehicle_profile)
+        start = time.perf_counter()
+        with span("dijkstra"):
+            if self.rx_graph and source in self.osm_to_rx and target in self.osm_to_rx:
+                result = self._run_dijkstra_rx(source, target, weight, event_type, vehicle_profile)
+            else:
+                result = self._run_dijkstra_nx(source, target, weight, event_type, vehicle_profile)
+        _observe_query(result, time.perf_counter() - start)
+        return result
 
     def _run_dijkstra_rx(self, source, target, weight_attr, event_type, vehicle_profile):
         start_time = time.time()
         u_idx = self.osm_to_rx[source]
         v_idx = self.osm_to_rx[target]
+        relaxed = 0
         
         def weight_fn(edge_data):
+            nonlocal relaxed
+            relaxed += 1
             # Handle string weights from GraphML
             try:
                 base_weight = float(edge_data.get(weight_attr, 1.0))
@@ -135,6 +272,7 @@ class PathFinder:
         try:
             # Get path indices
             paths = rx.dijkstra_shortest_paths(self.rx_graph, u_idx, target=v_idx, weight_fn=weight_fn)
+            relaxed_edges = relaxed
             if v_idx in paths:
                 path_indices = paths[v_idx]
             else:
@@ -178,6 +316,7 @@ class PathFinder:
                 "path": final_path,
                 "cost": cost,
                 "explored_nodes": -1, # Not available in RX
+                "relaxed_edges": relaxed_edges,
                 "time_seconds": end_time - start_time
             }
             
@@ -263,6 +402,13 @@ class PathFinder:
         Runs A* algorithm and returns path and stats.
         Uses Haversine heuristic.
         """
+        start = time.perf_counter()
+        with span("astar"):
+            result = self._run_astar(source, target, weight, event_type, vehicle_profile)
+        _observe_query(result, time.perf_counter() - start)
+        return result
+
+    def _run_astar(self, source, target, weight='weight', event_type=None, vehicle_profile=None):
         if source not in self.G or target not in self.G:
             logger.error(f"Source {source} or Target {target} not in graph")
             return {"algorithm": "A*", "path": [], "cost": float('inf'), "error": "Node not found"}
@@ -276,7 +422,11 @@ class PathFinder:
             def goal_fn(node_data):
                 return node_data == target
 
+            relaxed = 0
+
             def edge_cost_fn(edge_data):
+                nonlocal relaxed
+                relaxed += 1
                 try:
                     base_weight = float(edge_data.get(weight, 1.0))
                 except (ValueError, TypeError):
@@ -297,6 +447,7 @@ class PathFinder:
 
             try:
                 path_indices = rx.digraph_astar_shortest_path(self.rx_graph, u_idx, goal_fn, edge_cost_fn, estimate_cost_fn)
+                relaxed_edges = relaxed
                 if not path_indices:
                     return {"algorithm": "A* (RX)", "path": [], "cost": float('inf'), "error": "No path"}
 
@@ -316,7 +467,7 @@ class PathFinder:
                     cost += min_edge_weight
 
                 end_time = time.time()
-                return {"algorithm": "A* (RX)", "path": final_path, "cost": cost, "explored_nodes": -1, "time_seconds": end_time - start_time}
+                return {"algorithm": "A* (RX)", "path": final_path, "cost": cost, "explored_nodes": -1, "relaxed_edges": relaxed_edges, "time_seconds": end_time - start_time}
             except Exception as e:
                 logger.error(f"Error in RX A*: {e}")
 
@@ -0,0 +1,235 @@
+import itertools
+import math
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+GEOMETRY_FORMATS = ("coords", "polyline")
+
+_EARTH_RADIUS_M = 6371008.8
+_M_PER_DEG = math.pi * _EARTH_RADIUS_M / 180.0
+# Metros por píxel en el ecuador a zoom 0 (Web Mercator, teselas de 256 px)
+_MERCATOR_M_PER_PX_Z0 = 156543.03392
+
+
+def decode_path(graph, path_nodes: Sequence) -> Tuple[List[List[float]], float]:
+    """
+    Geometría [[lat, lng], ...] y distancia (m) de una ruta dada como secuencia de nodos.
+    Usa la geometría de la arista cuando existe y omite vértices repetidos consecutivos.
+    """
+    path_coords: List[List[float]] = []
+    total_distance_m = 0.0
+    for i in range(len(path_nodes) - 1):
+        u, v = path_nodes[i], path_nodes[i + 1]
+        edge_data = graph.get_edge_data(u, v)[0]
+        total_distance_m += float(edge_data.get("length", 0))
+
+        if "geometry" in edge_data:
+            for x, y in list(edge_data["geometry"].coords):
+                if not path_coords or path_coords[-1] != [y, x]:
+                    path_coords.append([y, x])
+        else:
+            node_u = graph.nodes[u]
+            node_v = graph.nodes[v]
+            if not path_coords or path_coords[-1] != [node_u["y"], node_u["x"]]:
+                path_coords.append([node_u["y"], node_u["x"]])
+            path_coords.append([node_v["y"], node_v["x"]])
+    return path_coords, total_distance_m
+
+
+def path_length_m(graph, path_nodes: Sequence) -> float:
+    """Distancia (m) de una ruta sin reconstruir su geometría; mismo resultado que `decode_path`."""
+    return sum(float(graph.get_edge_data(u, v)[0].get("length", 0)) for u, v in zip(path_nodes, path_nodes[1:]))
+
+
+def zoom_tolerance_m(zoom: float, lat: float = 0.0) -> float:
+    """Tolerancia equivalente a un píxel de pantalla para un nivel de zoom de mapa a la latitud dada."""
+    return _MERCATOR_M_PER_PX_Z0 * math.cos(math.radians(lat)) / (2.0 ** float(zoom))
+
+
+def _stack(routes: Sequence[Sequence[Sequence[float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatena varias geometrías [[lat, lng], ...] en un arreglo (N, 2) y retorna también sus largos."""
+    lengths = np.fromiter((len(r) for r in routes), dtype=np.int64, count=len(routes))
+    total = int(lengths.sum())
+    if routes and all(isinstance(r, np.ndarray) for r in routes):
+        pts = np.concatenate([r.reshape(-1, 2) for r in routes]).astype(np.float64, copy=False) if total else np.empty((0, 2))
+    else:
+        # fromiter sobre las coordenadas aplanadas es ~3x más rápido que np.asarray con listas anidadas
+        flat = itertools.chain.from_iterable(itertools.chain.from_iterable(routes))
+        pts = np.fromiter(flat, dtype=np.float64, count=2 * total).reshape(-1, 2)
+    return pts, lengths
+
+
+def _dp_keep(pts: np.ndarray, lengths: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """
+    Máscara de puntos que conserva Douglas-Peucker, para varias rutas concatenadas a la vez.
+
+    Cada ruta se proyecta a un plano local (equirectangular en su latitud media). En cada
+    iteración se procesan juntos todos los tramos pendientes de todas las rutas: la distancia
+    de cada punto interior a su cuerda y el máximo por tramo se calculan en un solo paso con
+    NumPy, así que el número de iteraciones es la profundidad de la subdivisión y no la
+    cantidad de puntos conservados. Siempre se conservan el primer y el último punto de cada ruta.
+    """
+    n = len(pts)
+    keep = np.zeros(n, dtype=bool)
+    nonempty = lengths > 0
+    if not n:
+        return keep
+    ends_all = np.cumsum(lengths) - 1
+    starts = (ends_all - lengths + 1)[nonempty]
+    ends = ends_all[nonempty]
+    keep[starts] = True
+    keep[ends] = True
+
+    lat_mean = np.add.reduceat(pts[:, 0], starts) / lengths[nonempty]
+    coslat = np.repeat(np.cos(np.radians(lat_mean)), lengths[nonempty])
+    x = pts[:, 1] * coslat * _M_PER_DEG
+    y = pts[:, 0] * _M_PER_DEG
+
+    tol2 = float(tolerance_m) ** 2
+    while starts.size:
+        inner = ends - starts - 1
+        pending = inner > 0
+        starts, ends, inner = starts[pending], ends[pending], inner[pending]
+        if not starts.size:
+            break
+
+        # Índices de los puntos interiores de todos los tramos, agrupados por tramo
+        offsets = np.cumsum(inner) - inner
+        seg = np.repeat(np.arange(starts.size), inner)
+        idx = np.arange(offsets[-1] + inner[-1]) + np.repeat(starts + 1 - offsets, inner)
+
+        ax, ay = x[starts], y[starts]
+        bx, by = x[ends] - ax, y[ends] - ay
+        len2 = bx * bx + by * by
+        inv = np.divide(1.0, len2, out=np.zeros_like(len2), where=len2 > 0.0)
+        px, py = x[idx] - ax[seg], y[idx] - ay[seg]
+        bx, by = bx[seg], by[seg]
+        # Distancia al segmento (no a la recta): cubre rutas que vuelven sobre sí mismas
+        t = np.clip((px * bx + py * by) * inv[seg], 0.0, 1.0)
+        dx, dy = px - t * bx, py - t * by
+        dist2 = dx * dx + dy * dy
+
+        seg_max = np.maximum.reduceat(dist2, offsets)
+        # Primer punto que alcanza el máximo de su tramo (los tramos son contiguos)
+        at_max = np.flatnonzero(dist2 == seg_max[seg])
+        seg_at = seg[at_max]
+        first = np.ones(at_max.size, dtype=bool)
+        first[1:] = seg_at[1:] != seg_at[:-1]
+        split = idx[at_max[first]]
+
+        refine = seg_max > tol2
+        split = split[refine]
+        keep[split] = True
+        starts, ends = np.concatenate([starts[refine], split]), np.concatenate([split, ends[refine]])
+    return keep
+
+
+def simplify(coords: Union[np.ndarray, Sequence[Sequence[float]]], tolerance_m: float) -> np.ndarray:
+    """Douglas-Peucker sobre [[lat, lng], ...] con tolerancia en metros (ver `_dp_keep`)."""
+    pts, lengths = _stack([coords])
+    if len(pts) < 3 or tolerance_m <= 0:
+        return pts
+    return pts[_dp_keep(pts, lengths, tolerance_m)]
+
+
+def _encode_many(pts: np.ndarray, lengths: np.ndarray, precision: int = 5) -> List[str]:
+    """
+    Polylines de Google de varias rutas concatenadas.
+
+    Vectorizado: deltas enteros (reiniciados al inicio de cada ruta), zigzag y los grupos de
+    5 bits de cada valor se arman como una matriz (valores x 7 grupos) filtrada con una máscara;
+    el texto resultante se corta por ruta con los conteos de caracteres.
+    """
+    if not len(pts):
+        return [""] * len(lengths)
+    ints = np.round(pts * (10 ** precision)).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    starts = (np.cumsum(lengths) - lengths)[lengths > 0]
+    deltas[starts] = ints[starts]
+    values = ((deltas << 1) ^ (deltas >> 63)).astype(np.uint64).ravel()
+
+    # Un valor de 32 bits necesita hasta 7 grupos de 5 bits
+    shifts = np.arange(7, dtype=np.uint64) * np.uint64(5)
+    chunks = (values[:, None] >> shifts[None, :]) & np.uint64(0x1F)
+    n_chunks = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 7):
+        n_chunks += values >= (np.uint64(1) << np.uint64(5 * k))
+    col = np.arange(7)[None, :]
+    mask = col < n_chunks[:, None]
+    chunks |= np.where(col < (n_chunks[:, None] - 1), np.uint64(0x20), np.uint64(0))
+    text = (chunks[mask] + np.uint64(63)).astype(np.uint8).tobytes().decode("ascii")
+
+    chars_per_point = n_chunks[0::2] + n_chunks[1::2]
+    bounds = np.concatenate([[0], np.cumsum(chars_per_point)])[np.cumsum(np.concatenate([[0], lengths]))]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(lengths))]
+
+
+def encode_polyline(coords: Union[np.ndarray, Sequence[Sequence[float]]], precision: int = 5) -> str:
+    """Codifica [[lat, lng], ...] como polyline de Google (precisión 1e-5 por defecto)."""
+    pts, lengths = _stack([coords])
+    return _encode_many(pts, lengths, precision)[0]
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Inverso de `encode_polyline`: [[lat, lng], ...]."""
+    factor = float(10 ** precision)
+    coords: List[List[float]] = []
+    index = lat = lng = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            result = shift = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coords.append([lat / factor, lng / factor])
+    return coords
+
+
+def format_geometries(
+    routes: Sequence[Sequence[Sequence[float]]],
+    geometry_format: str = "coords",
+    tolerance_m: Optional[float] = None,
+) -> List[Union[List[List[float]], str]]:
+    """
+    Aplica la simplificación (si hay tolerancia) y el formato pedido a varias geometrías
+    [[lat, lng], ...] en un solo paso vectorizado. Sin tolerancia y en formato "coords" las
+    retorna sin tocar.
+    """
+    if not tolerance_m and geometry_format == "coords":
+        return list(routes)
+    if not routes:
+        return []
+    pts, lengths = _stack(routes)
+    if tolerance_m:
+        keep = _dp_keep(pts, lengths, tolerance_m)
+        pts = pts[keep]
+        kept = np.concatenate([[0], np.cumsum(keep)])
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        lengths = kept[bounds[1:]] - kept[bounds[:-1]]
+    if geometry_format == "polyline":
+        return _encode_many(pts, lengths)
+    out = []
+    offset = 0
+    for n in lengths.tolist():
+        out.append(pts[offset:offset + n].tolist())
+        offset += n
+    return out
+
+
+def format_geometry(
+    coords: Sequence[Sequence[float]],
+    geometry_format: str = "coords",
+    tolerance_m: Optional[float] = None,
+) -> Union[List[List[float]], str]:
+    """`format_geometries` para una sola geometría."""
+    return format_geometries([coords], geometry_format, tolerance_m)[0]
@@ -0,0 +1,404 @@
+import math
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import osmnx as ox
+
+from app.core.logger import get_logger
+from app.core.metrics import SIMULATION_BATCH_ITEMS, SIMULATION_BATCH_STAGE_SECONDS
+from app.core.responses import with_model_defaults
+from app.core.tracing import span
+from app.schemas import SimulationResponse
+from app.services.routing.geometry import decode_path, format_geometries
+from app.services.simulation.engine import AdminKPICalculator, FactorSimulator, KPICalculator, SmartRouteEngine
+from app.services.simulation.fields import ADMIN, FIELD_STAGES, IMPACT, project_route, stages_for_fields
+
+logger = get_logger(__name__)
+
+_EARTH_RADIUS_KM = 6371.0088
+
+# Producto genérico cuando el ID no está en el catálogo ni en los mocks
+FALLBACK_PRODUCT = {"price_per_unit": 50, "unit": "kg", "name": "Producto", "image_url": ""}
+
+_IMPACT_ROUTE_FIELDS = tuple(name for name, stages in FIELD_STAGES.items() if stages == {IMPACT})
+
+
+def build_route_result(
+    seller: Dict[str, Any],
+    product: Dict[str, Any],
+    weight: float,
+    base_metrics: Dict[str, float],
+    smart_result: Dict[str, Any],
+    factors: Optional[Dict[str, Any]],
+    kpis: Optional[Dict[str, Any]],
+    state: Any = None,
+) -> Dict[str, Any]:
+    """
+    Entrada de `all_routes` de simulate a partir de las métricas ya calculadas de una ruta.
+    Con `fields`, las etapas omitidas llegan como None (`factors`, `kpis`, `final_route`) y sus
+    campos no se incluyen; `state` da entonces el estado de la simulación.
+    """
+    simulated_price = product.get("price_per_unit", 10) * 1.20
+    estimated_revenue = simulated_price * float(weight or 0)
+    load_percentage = max(0.0, min(100.0, (float(weight or 0) / 500.0) * 100.0))
+    transport_cost = None
+    if factors is not None:
+        transport_cost = 2.50 + (smart_result["final_distance_km"] * 0.35 * factors["fuel_factor"])
+    if kpis is None:
+        kpis = {}
+        state = KPICalculator._scenario_name({"state": state})
+    else:
+        state = kpis["state"]
+
+    route = {
+        "seller_id": seller["id"],
+        "seller_name": seller["name"],
+        "seller_rating": seller.get("rating", 0),
+        "seller_trips": seller.get("trips_count", 0),
+        "route_geometry": smart_result["final_route"], # Usar ruta potencialmente ajustada
+        "duration_seconds": kpis["simulated_duration_min"] * 60 if kpis else None,
+        "distance_meters": smart_result["final_distance_km"] * 1000,
+        "distance_km": smart_result["final_distance_km"],
+        "duration_min_base": base_metrics["duration_min"], # Original sin ajustar
+        "duration_min": kpis.get("simulated_duration_min"),
+        "transport_cost": round(transport_cost, 2) if transport_cost is not None else None,
+        "estimated_revenue": round(estimated_revenue, 2),
+        "net_profit": round(estimated_revenue - transport_cost, 2) if transport_cost is not None else None,
+        "load_percentage": load_percentage,
+        "product_image": product.get("image_url", ""),
+        "product_name": product.get("name", "Unknown"),
+        "price_per_unit": simulated_price,
+        "freshness_score": kpis.get("freshness_score"),
+        "punctuality_score": kpis.get("punctuality_score"),
+        "satisfaction_score": kpis.get("satisfaction_score"),
+        "efficiency_score": kpis.get("efficiency_score"),
+        "emissions_kg_co2": kpis.get("emissions_kg_co2"),
+        "waste_percent": kpis.get("waste_percent"),
+        "energy_saving_percent": kpis.get("energy_saving_percent"),
+        "simulation_state": {"state": state.value if hasattr(state, "value") else state},
+        "time_adjustments": smart_result["adjustments"],
+        "route_changed": smart_result["route_changed"],
+        "original_duration_min": base_metrics["duration_min"]
+    }
+    if smart_result["final_route"] is None:
+        del route["route_geometry"]
+    if transport_cost is None:
+        del route["transport_cost"], route["net_profit"]
+    if not kpis:
+        for key in _IMPACT_ROUTE_FIELDS:
+            del route[key]
+    return route
+
+
+def summarize_routes(session_id: Optional[str], routes: List[Dict[str, Any]], fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Respuesta de simulate: rutas ordenadas por duración, la recomendada y las métricas agregadas.
+    Con `fields`, cada ruta se reduce a esos campos (más `seller_id`) y `metrics` solo se calcula
+    si se pide; sin la duración del modelo de impacto, se ordena por `duration_min_base`.
+    """
+    with_metrics = ADMIN in stages_for_fields(fields)
+    if not routes:
+        summary = {
+            "session_id": session_id,
+            "recommended_route": None,
+            "all_routes": [],
+            "metrics": {
+                "revenue": 0.0,
+                "profit": 0.0,
+                "distance_total": 0.0,
+                "duration_total": 0.0,
+                "platform_profit": 0.0,
+                "prediction_accuracy": 0.0,
+                "avg_time_reduction": 0.0,
+                "revenue_growth": 0.0
+            },
+            "timestamp": time.time()
+        }
+        if not with_metrics:
+            del summary["metrics"]
+        return summary
+
+    sort_key = "duration_seconds" if "duration_seconds" in routes[0] else "duration_min_base"
+    routes.sort(key=lambda x: x[sort_key])
+    best_route = routes[0]
+    metrics = None
+    if with_metrics:
+        with span("admin_metrics"):
+            admin_metrics = AdminKPICalculator.calculate_admin_metrics(routes)
+        metrics = {
+            "revenue": round(best_route.get("estimated_revenue", 0), 2),
+            "profit": round(best_route.get("net_profit", 0), 2),
+            "distance_total": round(best_route.get("distance_km", 0), 2),
+            "duration_total": round(best_route.get("duration_min", 0), 2),
+            "platform_profit": admin_metrics["platform_profit"],
+            "prediction_accuracy": admin_metrics["prediction_accuracy"],
+            "avg_time_reduction": admin_metrics["avg_time_reduction"],
+            "revenue_growth": admin_metrics["revenue_growth"]
+        }
+
+    if fields is not None:
+        routes = [project_route(r, fields) for r in routes]
+        best_route = routes[0]
+    summary = {
+        "session_id": session_id,
+        "recommended_route": best_route,
+        "all_routes": routes,
+        "metrics": metrics,
+        "timestamp": time.time()
+    }
+    if not with_metrics:
+        del summary["metrics"]
+    return summary
+
+
+def nearest_sellers(
+    user_lat: Sequence[float],
+    user_lng: Sequence[float],
+    seller_lat: Sequence[float],
+    seller_lng: Sequence[float],
+    k: int,
+    radius_km: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Los `k` vendedores más cercanos en línea recta (haversine) a cada usuario, con el mismo
+    criterio que `fetch_sellers_near` pero con una sola matriz de distancias para todos.
+    Retorna (índices, distancias_km) de forma (usuarios, k); los huecos quedan en -1 / inf.
+    """
+    ulat = np.radians(np.asarray(user_lat, dtype=np.float64))[:, None]
+    ulng = np.radians(np.asarray(user_lng, dtype=np.float64))[:, None]
+    slat = np.radians(np.asarray(seller_lat, dtype=np.float64))[None, :]
+    slng = np.radians(np.asarray(seller_lng, dtype=np.float64))[None, :]
+    a = np.sin((slat - ulat) / 2.0) ** 2 + np.cos(ulat) * np.cos(slat) * np.sin((slng - ulng) / 2.0) ** 2
+    dist = 2.0 * _EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+    if radius_km is not None:
+        dist = np.where(dist <= radius_km, dist, np.inf)
+
+    n_users, n_sellers = dist.shape
+    k = int(min(k, n_sellers))
+    if k <= 0:
+        return np.full((n_users, 0), -1, dtype=np.int64), np.full((n_users, 0), np.inf)
+    if k < n_sellers:
+        idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(n_sellers), (n_users, n_sellers)).copy()
+    order = np.argsort(np.take_along_axis(dist, idx, axis=1), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    near = np.take_along_axis(dist, idx, axis=1)
+    idx[~np.isfinite(near)] = -1
+    return idx, near
+
+
+def _observe(stage: str, start: float) -> None:
+    SIMULATION_BATCH_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+class BatchSimulator:
+    """
+    Simulación de muchos pedidos (usuario, producto, peso) en una sola pasada, para pruebas de
+    carga y planificación de capacidad. Cada pedido produce un resultado con la forma de simulate.
+
+    - Todos los puntos (usuarios y vendedores) se ajustan al grafo con una consulta al índice espacial.
+    - Los pedidos se agrupan por producto: el conjunto de vendedores se comparte y los K más
+      cercanos a cada usuario salen de una matriz de distancias.
+    - El ruteo usa árboles de caminos mínimos (`PathFinder.route_many`), no una consulta por par.
+    - Factores Monte Carlo, KPIs y geometrías se calculan vectorizados por bloques de `chunk_size`
+      pedidos, y los resultados se entregan a medida que termina cada bloque.
+    """
+
+    def __init__(self, graph, path_finder, repository, max_sellers: int = 10, radius_km: Optional[float] = None, chunk_size: int = 256):
+        self.graph = graph
+        self.path_finder = path_finder
+        self.repository = repository
+        self.max_sellers = int(max_sellers)
+        self.radius_km = radius_km
+        self.chunk_size = int(max(1, chunk_size))
+
+    def snap(self, lngs: Sequence[float], lats: Sequence[float]) -> np.ndarray:
+        """Nodo más cercano del grafo para cada punto, en una sola consulta."""
+        if len(lngs) == 0:
+            return np.empty(0, dtype=object)
+        with span("nearest_nodes"):
+            nodes = ox.distance.nearest_nodes(self.graph, np.asarray(lngs, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+        return np.asarray(nodes)
+
+    def run(
+        self,
+        items: Sequence[Any],
+        chain,
+        session_id: Optional[str] = None,
+        geometry_format: str = "coords",
+        tolerance_m: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Simula `items` (objetos con user_lat, user_lng, product_id, weight y opcionalmente id) y
+        produce un dict por pedido con `index` (posición en la entrada), `id` y la respuesta de
+        simulate, o `error` si el pedido falló. El orden de salida sigue los grupos por producto.
+        La cadena de Markov avanza un estado por pedido, en el orden de entrada.
+        """
+        for results in self.run_chunks(items, chain, session_id, geometry_format, tolerance_m):
+            yield from results
+
+    def run_chunks(
+        self,
+        items: Sequence[Any],
+        chain,
+        session_id: Optional[str] = None,
+        geometry_format: str = "coords",
+        tolerance_m: Optional[float] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Como `run`, pero entrega los resultados de cada bloque juntos."""
+        if not items:
+            return
+        states = [chain.next_state() for _ in items]
+
+        start = time.perf_counter()
+        user_nodes = self.snap([it.user_lng for it in items], [it.user_lat for it in items])
+        _observe("snap", start)
+
+        groups: Dict[str, List[int]] = {}
+        for i, it in enumerate(items):
+            groups.setdefault(it.product_id, []).append(i)
+
+        seller_nodes: Dict[Any, Any] = {}
+        for product_id, indices in groups.items():
+            try:
+                prepared = self._prepare_group(product_id, indices, items, user_nodes, seller_nodes)
+            except Exception as e:
+                logger.error(f"Batch simulation failed for product {product_id}: {e}")
+                yield [self._error(i, items[i], e) for i in indices]
+                continue
+            product, sellers, near_idx, routes = prepared
+            for pos in range(0, len(indices), self.chunk_size):
+                chunk = indices[pos:pos + self.chunk_size]
+                try:
+                    results = self._simulate_chunk(
+                        chunk, near_idx[pos:pos + self.chunk_size], items, states, user_nodes, product, sellers,
+                        seller_nodes, routes, session_id, geometry_format, tolerance_m,
+                    )
+                except Exception as e:
+                    logger.error(f"Batch simulation chunk failed for product {product_id}: {e}")
+                    results = [self._error(i, items[i], e) for i in chunk]
+                yield results
+
+    @staticmethod
+    def _error(index: int, item: Any, exc: Exception) -> Dict[str, Any]:
+        SIMULATION_BATCH_ITEMS.labels("error").inc()
+        return {"index": index, "id": getattr(item, "id", None), "error": str(exc)}
+
+    def _prepare_group(self, product_id, indices, items, user_nodes, seller_nodes):
+        """Vendedores del producto, los K más cercanos por usuario y las rutas de todos los pares."""
+        product = self.repository.get_product_by_id(product_id) or FALLBACK_PRODUCT
+
+        start = time.perf_counter()
+        with span("sellers"):
+            sellers = self.repository.get_sellers(product_id)
+            if not sellers:
+                return product, [], np.full((len(indices), 0), -1, dtype=np.int64), {}
+            near_idx, _ = nearest_sellers(
+                [items[i].user_lat for i in indices],
+                [items[i].user_lng for i in indices],
+                [s["coordinates"]["lat"] for s in sellers],
+                [s["coordinates"]["lng"] for s in sellers],
+                self.max_sellers,
+                self.radius_km,
+            )
+            # Solo se ajustan al grafo los vendedores elegidos por algún usuario (una vez por lote)
+            used = np.unique(near_idx[near_idx >= 0])
+            missing = [j for j in used.tolist() if sellers[j]["id"] not in seller_nodes]
+            if missing:
+                nodes = self.snap(
+                    [sellers[j]["coordinates"]["lng"] for j in missing],
+                    [sellers[j]["coordinates"]["lat"] for j in missing],
+                )
+                for j, node in zip(missing, nodes.tolist()):
+                    seller_nodes[sellers[j]["id"]] = node
+        _observe("sellers", start)
+
+        start = time.perf_counter()
+        pairs = [
+            (user_nodes[i].item(), seller_nodes[sellers[j]["id"]])
+            for row, i in enumerate(indices)
+            for j in near_idx[row].tolist()
+            if j >= 0
+        ]
+        with span("routing"):
+            routes = self.path_finder.route_many(pairs, weight="weight")
+        _observe("routing", start)
+        return product, sellers, near_idx, routes
+
+    def _simulate_chunk(
+        self, chunk, near_idx, items, states, user_nodes, product, sellers, seller_nodes, routes,
+        session_id, geometry_format, tolerance_m,
+    ) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        owners: List[int] = []
+        route_sellers: List[Dict[str, Any]] = []
+        base_list: List[Dict[str, float]] = []
+        smart_list: List[Dict[str, Any]] = []
+        decoded: Dict[Tuple[Any, Any], Tuple[List[List[float]], float]] = {}
+
+        with span("decode_geometry"):
+            for row, i in enumerate(chunk):
+                user_node = user_nodes[i].item()
+                for j in near_idx[row].tolist():
+                    if j < 0:
+                        continue
+                    seller = sellers[j]
+                    key = (user_node, seller_nodes[seller["id"]])
+                    route = routes.get(key)
+                    if route is None or math.isinf(route["cost"]) or math.isnan(route["cost"]):
+                        continue
+                    if key not in decoded:
+                        decoded[key] = decode_path(self.graph, route["path"])
+                    path_coords, total_distance_m = decoded[key]
+                    dist_km = total_distance_m / 1000
+                    base_metrics = {
+                        "duration_min": round(FactorSimulator.calibrate_base_time(dist_km, float(route["cost"] / 60)), 2),
+                        "distance_km": dist_km,
+                    }
+                    smart_list.append(SmartRouteEngine.calculate_optimal_route(
+                        current_route=path_coords,
+                        base_duration_min=base_metrics["duration_min"],
+                        base_distance_km=base_metrics["distance_km"],
+                        state=states[i],
+                    ))
+                    owners.append(i)
+                    route_sellers.append(seller)
+                    base_list.append(base_metrics)
+        _observe("decode", start)
+
+        start = time.perf_counter()
+        with span("simulate_factors"):
+            factors = FactorSimulator.simulate_factors_batch(
+                [states[i] for i in owners],
+                [b["duration_min"] for b in base_list],
+                [s["final_distance_km"] for s in smart_list],
+            )
+        with span("calculate_kpis"):
+            kpis = KPICalculator.calculate_kpis_batch(
+                factors,
+                [{"duration_min": b["duration_min"], "distance_km": s["final_distance_km"]} for b, s in zip(base_list, smart_list)],
+            )
+        _observe("simulate", start)
+
+        per_item: Dict[int, List[Dict[str, Any]]] = {i: [] for i in chunk}
+        records = []
+        for i, seller, base, smart, f, k in zip(owners, route_sellers, base_list, smart_list, factors, kpis):
+            record = build_route_result(seller, product, items[i].weight, base, smart, f, k)
+            per_item[i].append(record)
+            records.append(record)
+
+        start = time.perf_counter()
+        if records and (tolerance_m or geometry_format != "coords"):
+            with span("encode_geometry"):
+                geometries = format_geometries([r["route_geometry"] for r in records], geometry_format, tolerance_m)
+            for record, geometry in zip(records, geometries):
+                record["route_geometry"] = geometry
+        _observe("encode", start)
+
+        SIMULATION_BATCH_ITEMS.labels("ok").inc(len(chunk))
+        return [
+            {"index": i, "id": getattr(items[i], "id", None), **with_model_defaults(summarize_routes(session_id, per_item[i]), SimulationResponse)}
+            for i in chunk
+        ]
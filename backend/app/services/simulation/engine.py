@@ -108,6 +108,42 @@ class SimulationState(Enum):
     RAIN = "Lluvia"
     STRIKE = "Huelga"
 
+# Parámetros (low, high, mode) de random.triangular por estado para el Monte Carlo de factores
+_TIME_FACTOR_PARAMS = {
+    SimulationState.NORMAL: (0.95, 1.0, 1.05),
+    SimulationState.TRAFFIC: (1.2, 1.4, 1.8),
+    SimulationState.RAIN: (1.1, 1.25, 1.4),
+    SimulationState.STRIKE: (1.5, 2.0, 3.0),
+}
+_DEGRADATION_PARAMS = {
+    SimulationState.NORMAL: (0.01, 0.02, 0.03),
+    SimulationState.TRAFFIC: (0.02, 0.03, 0.05),
+    SimulationState.RAIN: (0.03, 0.05, 0.08),
+    SimulationState.STRIKE: (0.05, 0.10, 0.15),
+}
+_FUEL_FACTOR_PARAMS = {
+    SimulationState.NORMAL: (0.9, 1.0, 1.1),
+    SimulationState.TRAFFIC: (1.3, 1.5, 1.8),
+    SimulationState.RAIN: (1.1, 1.2, 1.3),
+    SimulationState.STRIKE: (1.0, 1.2, 1.5),
+}
+# Entradas del modelo ETA por estado: (lluvia en mm, nivel de tráfico)
+_ETA_CONDITIONS = {
+    SimulationState.NORMAL: (0, 0),
+    SimulationState.TRAFFIC: (0, 0.8),
+    SimulationState.RAIN: (20, 0),
+    SimulationState.STRIKE: (0, 1.0),
+}
+
+def _triangular(u, low, high, mode):
+    """`random.triangular(low, high, mode)` vectorizado sobre uniformes `u` (misma fórmula, moda fuera de rango incluida)."""
+    c = (mode - low) / (high - low)
+    flip = u > c
+    u = np.where(flip, 1.0 - u, u)
+    c = np.where(flip, 1.0 - c, c)
+    low, high = np.where(flip, high, low), np.where(flip, low, high)
+    return low + (high - low) * np.sqrt(u * c)
+
 class MarkovChain:
     def __init__(self):
         self.states = list(SimulationState)
@@ -323,21 +359,12 @@ class FactorSimulator:
             # 1. Factor Tiempo (Multiplicador sobre base)
             ml_duration = None
             if _eta_predictor.model_loaded:
-                weather_data = {'rain_mm': 0}
-                traffic_data = {'level': 0}
-                
-                if state == SimulationState.RAIN:
-                    weather_data['rain_mm'] = 20
-                elif state == SimulationState.TRAFFIC:
-                    traffic_data['level'] = 0.8
-                elif state == SimulationState.STRIKE:
-                    traffic_data['level'] = 1.0
-                
+                rain_mm, traffic_level = _ETA_CONDITIONS[state]
                 ml_duration = _eta_predictor.predict(
                     base_duration_min=calibrated_base_time,
                     distance_km=distance_km,
-                    weather_data=weather_data,
-                    traffic_data=traffic_data
+                    weather_data={'rain_mm': rain_mm},
+                    traffic_data={'level': traffic_level}
                 )
 
             if ml_duration:
@@ -345,42 +372,15 @@ class FactorSimulator:
                 results["simulated_duration"].append(ml_duration * noise)
             else:
                 # Fallback
-                if state == SimulationState.NORMAL:
-                    time_params = (0.95, 1.0, 1.05)
-                elif state == SimulationState.TRAFFIC:
-                    time_params = (1.2, 1.4, 1.8)
-                elif state == SimulationState.RAIN:
-                    time_params = (1.1, 1.25, 1.4)
-                else: # STRIKE
-                    time_params = (1.5, 2.0, 3.0)
-                    
-                time_factor = random.triangular(*time_params)
+                time_factor = random.triangular(*_TIME_FACTOR_PARAMS[state])
                 results["simulated_duration"].append(calibrated_base_time * time_factor)
             
             # 2. Factor Frescura
-            if state == SimulationState.NORMAL:
-                fresh_params = (0.01, 0.02, 0.03)
-            elif state == SimulationState.TRAFFIC:
-                fresh_params = (0.02, 0.03, 0.05)
-            elif state == SimulationState.RAIN:
-                fresh_params = (0.03, 0.05, 0.08)
-            else: # STRIKE
-                fresh_params = (0.05, 0.10, 0.15)
-                
             results["initial_freshness"].append(random.triangular(0.95, 1.0, 0.99) * 100)
-            results["degradation_rate"].append(random.triangular(*fresh_params))
+            results["degradation_rate"].append(random.triangular(*_DEGRADATION_PARAMS[state]))
             
             # 3. Factor Combustible
-            if state == SimulationState.NORMAL:
-                fuel_params = (0.9, 1.0, 1.1)
-            elif state == SimulationState.TRAFFIC:
-                fuel_params = (1.3, 1.5, 1.8) 
-            elif state == SimulationState.RAIN:
-                fuel_params = (1.1, 1.2, 1.3)
-            else: # STRIKE
-                fuel_params = (1.0, 1.2, 1.5)
-                
-            results["fuel_factor"].append(random.triangular(*fuel_params))
+            results["fuel_factor"].append(random.triangular(*_FUEL_FACTOR_PARAMS[state]))
 
         avg_results = {
             "simulated_duration": sum(results["simulated_duration"]) / n_iterations,
@@ -392,27 +392,107 @@ class FactorSimulator:
         
         return avg_results
 
+    @staticmethod
+    def simulate_factors_batch(
+        states: List[SimulationState],
+        base_duration_min: List[float],
+        distance_km: List[float],
+        n_iterations: int = 100,
+        rng: Optional[np.random.Generator] = None,
+    ) -> List[Dict]:
+        """
+        `simulate_factors` para muchas rutas a la vez: las iteraciones Monte Carlo se muestrean
+        como matrices (rutas x iteraciones) con las mismas distribuciones, y el ETA del modelo se
+        obtiene con una sola inferencia (sus features no cambian entre iteraciones).
+        """
+        if n_iterations <= 0:
+            logger.warning("n_iterations must be positive. Defaulting to 100.")
+            n_iterations = 100
+        n = len(states)
+        if n == 0:
+            return []
+        rng = rng if rng is not None else np.random.default_rng()
+        distance = np.asarray(distance_km, dtype=np.float64)
+        calibrated = np.array(
+            [FactorSimulator.calibrate_base_time(d, b) for d, b in zip(distance, base_duration_min)], dtype=np.float64
+        )
+        shape = (n, n_iterations)
+
+        def params(table):
+            # (3, n, 1): parámetros de cada ruta según su estado, para difundir sobre las iteraciones
+            return np.array([table[s] for s in states], dtype=np.float64).T[:, :, None]
+
+        ml_duration = None
+        if _eta_predictor.model_loaded:
+            conditions = np.array([_ETA_CONDITIONS[s] for s in states], dtype=np.float64)
+            ml_duration = _eta_predictor.predict_batch(calibrated, distance, conditions[:, 0], conditions[:, 1])
+
+        fallback = calibrated[:, None] * _triangular(rng.random(shape), *params(_TIME_FACTOR_PARAMS))
+        if ml_duration is not None:
+            noisy = ml_duration[:, None] * rng.normal(1.0, 0.03, shape)
+            use_ml = np.isfinite(ml_duration) & (ml_duration != 0)
+            simulated = np.where(use_ml[:, None], noisy, fallback)
+        else:
+            simulated = fallback
+
+        freshness = _triangular(rng.random(shape), 0.95, 1.0, 0.99) * 100
+        degradation = _triangular(rng.random(shape), *params(_DEGRADATION_PARAMS))
+        fuel = _triangular(rng.random(shape), *params(_FUEL_FACTOR_PARAMS))
+
+        means = [m.mean(axis=1).tolist() for m in (simulated, freshness, degradation, fuel)]
+        return [
+            {
+                "simulated_duration": means[0][i],
+                "initial_freshness": means[1][i],
+                "degradation_rate": means[2][i],
+                "fuel_factor": means[3][i],
+                "state": state,
+            }
+            for i, state in enumerate(states)
+        ]
+
 class KPICalculator:
+    @staticmethod
+    def _scenario_name(factors) -> str:
+        state_value = factors["state"].value if hasattr(factors["state"], "value") else str(factors["state"])
+        return state_value if state_value in SCENARIOS else "Normal"
+
+    @staticmethod
+    def _from_prediction(pred, scenario_name: str) -> Dict:
+        return {
+            "punctuality_score": round(pred.punctuality_score, 1),
+            "freshness_score": round(pred.freshness_score, 1),
+            "satisfaction_score": round(pred.satisfaction_score, 1),
+            "simulated_duration_min": round(pred.duration_min, 2),
+            "efficiency_score": round(pred.efficiency_score, 1),
+            "emissions_kg_co2": round(pred.emissions_kg_co2, 3),
+            "waste_percent": round(pred.waste_percent, 2),
+            "energy_saving_percent": round(pred.energy_saving_percent, 2),
+            "state": scenario_name
+        }
+
+    @staticmethod
+    def calculate_kpis_batch(factors_list: List[Dict], base_metrics_list: List[Dict]) -> List[Dict]:
+        """`calculate_kpis` para muchas rutas con una sola inferencia del modelo de impacto (`predict_batch`)."""
+        scenarios = [KPICalculator._scenario_name(f) for f in factors_list]
+        preds = _impact_predictor.predict_batch(
+            distance_km=[float(b.get("distance_km", 0) or 0) for b in base_metrics_list],
+            scenarios=scenarios,
+            base_duration_min=[float(b.get("duration_min", 0) or 0) for b in base_metrics_list],
+        )
+        if preds is None:
+            return [KPICalculator.calculate_kpis(f, b) for f, b in zip(factors_list, base_metrics_list)]
+        return [KPICalculator._from_prediction(p, name) for p, name in zip(preds, scenarios)]
+
     @staticmethod
     def calculate_kpis(factors, base_metrics):
         distance_km = float(base_metrics.get("distance_km", 0) or 0)
         base_duration_min = float(base_metrics.get("duration_min", 0) or 0)
-        state_value = factors["state"].value if hasattr(factors["state"], "value") else str(factors["state"])
 
-        scenario_name = state_value if state_value in SCENARIOS else "Normal"
+        scenario_name = KPICalculator._scenario_name(factors)
         pred = _impact_predictor.predict(distance_km=distance_km, scenario=scenario_name, base_duration_min=base_duration_min)
         if pred is not None:
-            return {
-                "punctuality_score": round(pred.punctuality_score, 1),
-                "freshness_score": round(pred.freshness_score, 1),
-                "satisfaction_score": round(pred.satisfaction_score, 1),
-                "simulated_duration_min": round(pred.duration_min, 2),
-                "efficiency_score": round(pred.efficiency_score, 1),
-                "emissions_kg_co2": round(pred.emissions_kg_co2, 3),
-                "waste_percent": round(pred.waste_percent, 2),
-                "energy_saving_percent": round(pred.energy_saving_percent, 2),
-                "state": scenario_name
-            }
+            return KPICalculator._from_prediction(pred, scenario_name)
 
         Ft = float(SCENARIOS.get(scenario_name, SCENARIOS["Normal"])["Ft"])
         Fr = float(SCENARIOS.get(scenario_name, SCENARIOS["Normal"])["Fr"])
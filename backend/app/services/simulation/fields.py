@@ -0,0 +1,48 @@
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+# Etapas opcionales del pipeline de simulate y los campos de respuesta que dependen de cada una.
+# El resto de campos de RouteResult (vendedor, distancia, producto, duración base, estado) sale
+# del ruteo, que siempre se ejecuta.
+GEOMETRY = "geometry"
+MONTE_CARLO = "monte_carlo"
+IMPACT = "impact"
+ADMIN = "admin"
+ALL_STAGES: FrozenSet[str] = frozenset({GEOMETRY, MONTE_CARLO, IMPACT, ADMIN})
+
+FIELD_STAGES: Dict[str, FrozenSet[str]] = {
+    "route_geometry": frozenset({GEOMETRY}),
+    "transport_cost": frozenset({MONTE_CARLO}),
+    "net_profit": frozenset({MONTE_CARLO}),
+    "duration_seconds": frozenset({IMPACT}),
+    "duration_min": frozenset({IMPACT}),
+    "freshness_score": frozenset({IMPACT}),
+    "punctuality_score": frozenset({IMPACT}),
+    "satisfaction_score": frozenset({IMPACT}),
+    "efficiency_score": frozenset({IMPACT}),
+    "emissions_kg_co2": frozenset({IMPACT}),
+    "waste_percent": frozenset({IMPACT}),
+    "energy_saving_percent": frozenset({IMPACT}),
+    # `metrics` agrega profit (Monte Carlo) y duration_total (modelo de impacto) de la recomendada
+    "metrics": frozenset({ADMIN, MONTE_CARLO, IMPACT}),
+}
+
+# Campos que siempre acompañan a una ruta proyectada, para poder identificarla
+ROUTE_KEY_FIELDS = ("seller_id",)
+
+
+def stages_for_fields(fields: Optional[Iterable[str]]) -> FrozenSet[str]:
+    """Etapas necesarias para producir `fields`; sin `fields` (respuesta completa), todas."""
+    if fields is None:
+        return ALL_STAGES
+    stages = set()
+    for name in fields:
+        stages |= FIELD_STAGES.get(name, frozenset())
+    return frozenset(stages)
+
+
+def project_route(route: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """La ruta con solo `seller_id` y los campos pedidos; sin `fields`, la ruta tal cual."""
+    if fields is None:
+        return route
+    wanted = set(fields)
+    return {k: v for k, v in route.items() if k in wanted or k in ROUTE_KEY_FIELDS}
@@ -0,0 +1,69 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import localdb
+from app.core.config import settings
+
+
+def _read_mix(product_ids):
+    localdb.fetch_products()
+    for pid in product_ids:
+        localdb.fetch_sellers(pid)
+        localdb.fetch_daily_demand(pid, "2000-01-01")
+
+
+def _run(threads, iterations, product_ids):
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        for _ in range(iterations):
+            _read_mix(product_ids)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - start
+
+
+def run_benchmark(iterations=200, thread_counts=(1, 2, 4, 8)):
+    """
+    Mide lecturas por segundo (fetch_products, fetch_sellers y fetch_daily_demand) con varios
+    hilos concurrentes sobre una copia de la base local, cada hilo con su propia conexión del pool.
+    """
+    original = settings.LOCAL_DB_FILENAME
+    source = localdb.get_db_path()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            target = os.path.join(tmp, "pool_bench.sqlite3")
+            shutil.copyfile(source, target)
+            settings.LOCAL_DB_FILENAME = target
+            localdb.close_db()
+            product_ids = [p["id"] for p in localdb.fetch_products()]
+            _read_mix(product_ids)  # calentamiento: caché de páginas y sentencias
+
+            print(f"\nSQLite read concurrency benchmark (iterations/thread={iterations}, products={len(product_ids)})")
+            print(f"{'threads':>8}{'time_s':>9}{'reads/s':>12}")
+            reads_per_iter = 1 + 2 * len(product_ids)
+            for threads in thread_counts:
+                elapsed = _run(threads, iterations, product_ids)
+                total = threads * iterations * reads_per_iter
+                print(f"{threads:>8}{elapsed:>9.2f}{total / elapsed:>12.0f}")
+            print(localdb.pool_stats())
+            localdb.close_db()
+    finally:
+        settings.LOCAL_DB_FILENAME = original
+
+
+if __name__ == "__main__":
+    run_benchmark()
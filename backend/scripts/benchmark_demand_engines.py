@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ml.demand_forecasting.data_generator import generate_synthetic_demand
+from app.ml.demand_forecasting.fast_forecaster import FourierForecaster
+from app.ml.demand_forecasting.forecaster import DemandForecaster
+
+
+def _metrics(y_true, frame):
+    y_pred = frame["yhat"].to_numpy(dtype=float)
+    err = y_true - y_pred
+    covered = (y_true >= frame["yhat_lower"].to_numpy()) & (y_true <= frame["yhat_upper"].to_numpy())
+    return {
+        "mae": float(np.mean(np.abs(err))),
+        "smape_pct": float(np.mean(2.0 * np.abs(err) / np.maximum(np.abs(y_true) + np.abs(y_pred), 1e-6))) * 100.0,
+        "coverage_pct": float(np.mean(covered)) * 100.0,
+    }
+
+
+def run_benchmark(products=("Cacao", "Arroz", "maiz"), days=730, holdout_days=30):
+    """
+    Compara Prophet contra el motor Fourier (NumPy) sobre la serie sintética: tiempo de ajuste,
+    latencia de predicción y error sobre los últimos `holdout_days` días no vistos.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for product in products:
+            df = generate_synthetic_demand(product, days=days)
+            train, test = df.iloc[:-holdout_days], df.iloc[-holdout_days:]
+            y_true = test["y"].to_numpy(dtype=float)
+
+            for engine_cls in (DemandForecaster, FourierForecaster):
+                engine = engine_cls(product, models_dir=tmp)
+                t0 = time.perf_counter()
+                engine.train(train)
+                fit_s = time.perf_counter() - t0
+
+                t0 = time.perf_counter()
+                frame = engine.predict_frame(days=holdout_days)
+                predict_ms = (time.perf_counter() - t0) * 1000.0
+
+                rows.append((product, engine_cls.__name__, fit_s, predict_ms, _metrics(y_true, frame)))
+
+    print(f"\nDemand engines benchmark ({days} days, holdout {holdout_days})")
+    print(f"{'product':<10}{'engine':<20}{'fit_s':>9}{'predict_ms':>12}{'MAE':>10}{'sMAPE%':>9}{'cov90%':>9}")
+    for product, engine, fit_s, predict_ms, m in rows:
+        print(f"{product:<10}{engine:<20}{fit_s:>9.3f}{predict_ms:>12.2f}{m['mae']:>10.2f}{m['smape_pct']:>9.2f}{m['coverage_pct']:>9.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
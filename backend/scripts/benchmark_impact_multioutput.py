@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.ml.impact_predictor import ImpactPredictor, MULTI_STRATEGIES, _generate_impact_synthetic
+
+
+def run_benchmark(n_samples=8000, n_estimators=120, max_depth=5, n_single=300, n_eval=5000):
+    """
+    Compara el MultiOutputRegressor legacy contra los boosters multi-target nativos de XGBoost:
+    tiempo de entrenamiento, latencia de inferencia (fila única y lote) y MAE por target.
+    """
+    X_eval, y_eval, _, _ = _generate_impact_synthetic(n_samples=n_eval, rng=np.random.default_rng(7))
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for strategy in MULTI_STRATEGIES:
+            predictor = ImpactPredictor(model_path=os.path.join(tmp, f"impact_{strategy}.pkl"))
+            start = time.time()
+            result = predictor.train_mock(n_samples=n_samples, n_estimators=n_estimators, max_depth=max_depth, multi_strategy=strategy)
+            train_time_s = time.time() - start
+
+            t0 = time.perf_counter()
+            for i in range(n_single):
+                predictor.predict(distance_km=1.0 + (i % 30), scenario="Normal", base_duration_min=12.0)
+            single_ms = ((time.perf_counter() - t0) / n_single) * 1000.0
+
+            X = X_eval[predictor.feature_columns]
+            t0 = time.perf_counter()
+            y_pred = predictor.model.predict(X)
+            batch_ms = (time.perf_counter() - t0) * 1000.0
+
+            mae = np.mean(np.abs(y_pred - y_eval), axis=0)
+            rows.append((strategy, train_time_s, single_ms, batch_ms, mae, result["metrics_test"]))
+
+    names = ImpactPredictor(model_path=os.devnull).target_names
+    print(f"\nImpact model benchmark (n_samples={n_samples}, n_estimators={n_estimators}, max_depth={max_depth})")
+    print(f"{'strategy':<22}{'train_s':>10}{'predict_ms':>12}{f'batch{n_eval}_ms':>16}")
+    for strategy, train_time_s, single_ms, batch_ms, _, _ in rows:
+        print(f"{strategy:<22}{train_time_s:>10.2f}{single_ms:>12.3f}{batch_ms:>16.2f}")
+
+    print("\nMAE por target (holdout independiente)")
+    print(f"{'target':<24}" + "".join(f"{s:>22}" for s, *_ in rows))
+    for j, name in enumerate(names):
+        print(f"{name:<24}" + "".join(f"{r[4][j]:>22.4f}" for r in rows))
+
+
+if __name__ == "__main__":
+    run_benchmark()
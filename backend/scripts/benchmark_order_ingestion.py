@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import localdb
+from app.core.config import settings
+from app.services.ingestion.orders import OrderIngestor
+
+PRODUCTS = ["maiz", "cacao", "arroz", "cafe", "platano", "mani", "limon", "yuca"]
+
+
+def _synthetic_orders(n, seed=7):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-01T00:00:00")
+    created_at = np.datetime_as_string(start + rng.integers(0, 730 * 86400, n).astype("timedelta64[s]"), unit="s")
+    return pd.DataFrame(
+        {
+            "created_at": created_at,
+            "product_id": np.array(PRODUCTS)[rng.integers(0, len(PRODUCTS), n)],
+            "weight_kg": np.round(rng.uniform(1.0, 500.0, n), 3),
+        }
+    )
+
+
+def _seed_products(conn):
+    conn.executemany(
+        "INSERT INTO products (id, name, price_per_unit, unit) VALUES (?, ?, 1.0, 'kg')",
+        [(p, p) for p in PRODUCTS],
+    )
+    conn.commit()
+
+
+def run_benchmark(n=500_000, chunk_size=50_000):
+    """
+    Ingesta `n` pedidos sintéticos (NDJSON y CSV) en una base SQLite temporal y reporta
+    pedidos/s de extremo a extremo: parseo, validación, inserción y agregados de demanda.
+    """
+    df = _synthetic_orders(n)
+    payloads = {
+        "ndjson": df.to_json(orient="records", lines=True).splitlines(),
+        "csv": df.to_csv(index=False).splitlines(),
+    }
+
+    original = settings.LOCAL_DB_FILENAME
+    print(f"\nOrder ingestion benchmark (n={n}, chunk_size={chunk_size})")
+    print(f"{'format':<8}{'accepted':>10}{'time_s':>9}{'orders/s':>12}")
+    try:
+        for fmt, lines in payloads.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                settings.LOCAL_DB_FILENAME = os.path.join(tmp, "ingest_bench.sqlite3")
+                localdb.close_db()
+                localdb.run_write(_seed_products)
+
+                start = time.perf_counter()
+                ingestor = OrderIngestor(fmt=fmt, chunk_size=chunk_size)
+                ingestor.feed(lines)
+                summary = ingestor.close()
+                elapsed = time.perf_counter() - start
+
+                total = localdb.get_db().execute("SELECT SUM(n_orders) FROM daily_demand").fetchone()[0]
+                assert total == summary["accepted"] == n, (total, summary["accepted"])
+                print(f"{fmt:<8}{summary['accepted']:>10}{elapsed:>9.2f}{summary['accepted'] / elapsed:>12.0f}")
+                localdb.close_db()
+    finally:
+        settings.LOCAL_DB_FILENAME = original
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import logger as logger_mod
+from app.core import middleware as middleware_mod
+from app.core.config import settings
+from app.core.logger import JsonFormatter, get_logger
+from app.core.middleware import RequestMiddleware
+
+
+class _BaseHTTPRequestMiddleware(BaseHTTPMiddleware):
+    """Referencia: el middleware anterior (BaseHTTPMiddleware, dos logs síncronos por petición)."""
+
+    def __init__(self, app, log):
+        super().__init__(app)
+        self.log = log
+
+    async def dispatch(self, request: Request, call_next):
+        request_id = str(uuid.uuid4())
+        start_time = time.time()
+        request.state.request_id = request_id
+        self.log.info("Request started", extra={"request_id": request_id, "method": request.method, "path": request.url.path})
+        response = await call_next(request)
+        process_time = (time.time() - start_time) * 1000
+        self.log.info(
+            "Request completed",
+            extra={"request_id": request_id, "method": request.method, "path": request.url.path, "status_code": response.status_code, "duration_ms": round(process_time, 2)},
+        )
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+
+def _sync_logger(name: str, stream) -> logging.Logger:
+    log = logging.getLogger(name)
+    log.handlers = []
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    return log
+
+
+def _health_app(middleware, **kwargs) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(middleware, **kwargs)
+
+    @app.get("/health")
+    def health_check():
+        return {"status": "ok", "graph_loaded": True, "db": "sqlite"}
+
+    return app
+
+
+async def _drive(app: FastAPI, n_requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get("/health")  # calentamiento
+
+        remaining = n_requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                r = await client.get("/health")
+                assert r.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def run_benchmark(n_requests: int = 5000, concurrency: int = 8):
+    """
+    Peticiones/s sobre `/health` en proceso (httpx ASGITransport, sin red) con cada combinación
+    de middleware y logging. Los logs se escriben en /dev/null: se mide el costo de formatear y
+    escribir, no el de la terminal.
+    """
+    devnull = open(os.devnull, "w")
+    sync_log = _sync_logger("benchmark.sync", devnull)
+    get_logger("benchmark.queued")  # inicia el listener compartido
+    if logger_mod._listener is not None:
+        logger_mod._listener.handlers[0].setStream(devnull)
+    queued_handlers = list(middleware_mod.logger.handlers)
+    sample_rate = settings.LOG_SUCCESS_SAMPLE_RATE
+
+    configs = [
+        ("BaseHTTPMiddleware + sync log", _BaseHTTPRequestMiddleware, {"log": sync_log}, None, 1.0),
+        ("ASGI + sync log", RequestMiddleware, {}, sync_log.handlers, 1.0),
+        ("ASGI + queued log", RequestMiddleware, {}, queued_handlers, 1.0),
+        ("ASGI + queued log, 10% success", RequestMiddleware, {}, queued_handlers, 0.1),
+    ]
+    print(f"\n/health throughput (requests={n_requests}, concurrency={concurrency}, orjson={logger_mod._dumps.__module__ != 'json'})")
+    print(f"{'config':<34}{'time_s':>9}{'req/s':>10}{'us/req':>9}")
+    try:
+        for label, middleware, kwargs, handlers, rate in configs:
+            if handlers is not None:
+                middleware_mod.logger.handlers = list(handlers)
+            settings.LOG_SUCCESS_SAMPLE_RATE = rate
+            elapsed = asyncio.run(_drive(_health_app(middleware, **kwargs), n_requests, concurrency))
+            print(f"{label:<34}{elapsed:>9.3f}{n_requests / elapsed:>10.0f}{elapsed / n_requests * 1e6:>9.1f}")
+    finally:
+        middleware_mod.logger.handlers = queued_handlers
+        settings.LOG_SUCCESS_SAMPLE_RATE = sample_rate
+        logger_mod.stop_logging()
+        devnull.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=run_benchmark.__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    run_benchmark(args.requests, args.concurrency)
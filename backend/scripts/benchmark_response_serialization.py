@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.responses import FastJSONResponse, dumps_bytes
+from app.schemas import SimulationResponse
+
+
+def _route_geometry(rng: np.random.Generator, n_points: int) -> list:
+    steps = rng.normal(0.0, 6e-5, (n_points, 2)) + [4e-5, 3e-5]
+    return np.round(np.cumsum(steps, axis=0) + [-1.055, -80.455], 7).tolist()
+
+
+def simulate_payload(n_sellers: int = 10, n_points: int = 1200, seed: int = 7) -> dict:
+    """Respuesta de simulate con la forma real: rutas completas, KPIs (algunos escalares NumPy) y métricas."""
+    rng = np.random.default_rng(seed)
+    routes = []
+    for i in range(n_sellers):
+        duration_min = float(rng.uniform(12.0, 45.0))
+        routes.append({
+            "seller_id": f"seller_{i}",
+            "seller_name": f"Vendedor {i}",
+            "seller_rating": 4.5,
+            "seller_trips": 120 + i,
+            "route_geometry": _route_geometry(rng, n_points),
+            "duration_seconds": duration_min * 60,
+            "distance_meters": 8200.0 + i,
+            "distance_km": 8.2,
+            "duration_min_base": round(duration_min * 0.8, 2),
+            "duration_min": duration_min,
+            "transport_cost": 5.37,
+            "estimated_revenue": 600.0,
+            "net_profit": 594.63,
+            "load_percentage": 2.0,
+            "product_image": "/assets/products/maiz.jpg",
+            "product_name": "Maíz",
+            "price_per_unit": 60.0,
+            "freshness_score": np.float64(rng.uniform(80, 99)),
+            "punctuality_score": np.float64(rng.uniform(80, 99)),
+            "satisfaction_score": np.float64(rng.uniform(80, 99)),
+            "efficiency_score": np.float64(rng.uniform(80, 99)),
+            "emissions_kg_co2": np.float64(rng.uniform(0.5, 2.0)),
+            "waste_percent": np.float64(rng.uniform(0.5, 3.0)),
+            "energy_saving_percent": np.float64(rng.uniform(5, 15)),
+            "simulation_state": {"state": "Normal"},
+            "time_adjustments": ["+3 min por Tráfico"],
+            "route_changed": False,
+            "original_duration_min": round(duration_min * 0.8, 2),
+        })
+    routes.sort(key=lambda r: r["duration_seconds"])
+    metrics = {k: 1.0 for k in ("revenue", "profit", "distance_total", "duration_total", "platform_profit", "prediction_accuracy", "avg_time_reduction", "revenue_growth")}
+    return {"session_id": None, "recommended_route": routes[0], "all_routes": routes, "metrics": metrics, "timestamp": time.time()}
+
+
+async def _pydantic_path(field, payload) -> bytes:
+    # Lo que hace FastAPI con un endpoint síncrono y response_model: validación en el threadpool,
+    # serialización a tipos JSON y json.dumps de Starlette
+    content = await serialize_response(field=field, response_content=payload, is_coroutine=False)
+    return JSONResponse(content).body
+
+
+async def _time_async(fn, repeat: int) -> float:
+    await fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat
+
+
+async def _end_to_end(payload: dict, repeat: int):
+    app = FastAPI()
+
+    @app.get("/pydantic", response_model=SimulationResponse)
+    def pydantic_route():
+        return payload
+
+    @app.get("/fast", response_model=SimulationResponse)
+    def fast_route():
+        return FastJSONResponse(payload)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {}
+        for path in ("/pydantic", "/fast"):
+            async def call():
+                r = await client.get(path)
+                assert r.status_code == 200, r.text
+            results[path] = await _time_async(call, repeat)
+        return results
+
+
+def run_benchmark(n_sellers: int = 10, n_points: int = 1200, repeat: int = 30):
+    """
+    Serialización de una respuesta de simulate de `n_sellers` vendedores: ruta FastAPI con
+    `response_model` (revalidación pydantic + json.dumps) frente a `FastJSONResponse` (orjson
+    directo sobre el dict, NumPy incluido). También mide la petición completa en proceso.
+    """
+    payload = simulate_payload(n_sellers, n_points)
+    field = create_model_field(name="Response_simulate", type_=SimulationResponse, mode="serialization")
+
+    async def measure():
+        pyd_body = await _pydantic_path(field, payload)
+        fast_body = dumps_bytes(payload)
+        pyd_s = await _time_async(lambda: _pydantic_path(field, payload), repeat)
+
+        async def fast():
+            return FastJSONResponse(payload).body
+
+        fast_s = await _time_async(fast, repeat)
+        e2e = await _end_to_end(payload, repeat)
+        return pyd_body, fast_body, pyd_s, fast_s, e2e
+
+    pyd_body, fast_body, pyd_s, fast_s, e2e = asyncio.run(measure())
+    print(f"\nsimulate response: {n_sellers} sellers x {n_points} vertices")
+    print(f"{'path':<28}{'serialize_ms':>14}{'request_ms':>12}{'bytes':>10}")
+    print(f"{'response_model + json':<28}{pyd_s * 1000:>14.2f}{e2e['/pydantic'] * 1000:>12.2f}{len(pyd_body):>10}")
+    print(f"{'FastJSONResponse (orjson)':<28}{fast_s * 1000:>14.2f}{e2e['/fast'] * 1000:>12.2f}{len(fast_body):>10}")
+    print(f"speedup: serialize x{pyd_s / fast_s:.1f}, request x{e2e['/pydantic'] / e2e['/fast']:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=run_benchmark.__doc__)
+    parser.add_argument("--sellers", type=int, default=10)
+    parser.add_argument("--points", type=int, default=1200)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    run_benchmark(args.sellers, args.points, args.repeat)
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.schemas import SimulationResponse
+from app.services.routing.geometry import format_geometries, zoom_tolerance_m
+
+
+def synthetic_route(rng: np.random.Generator, n_turns: int = 40, spacing_m: float = 8.0) -> list:
+    """Ruta tipo OSM: tramos rectos con giros, densificados con un vértice cada `spacing_m` metros."""
+    m_per_deg = 111_195.0
+    heading = rng.uniform(0, 2 * np.pi)
+    pos = np.array([-1.055, -80.455])
+    points = [pos.copy()]
+    for _ in range(n_turns):
+        heading += rng.normal(0.0, 0.8)
+        length_m = rng.uniform(80.0, 400.0)
+        steps = max(1, int(length_m / spacing_m))
+        step = np.array([np.sin(heading), np.cos(heading)]) * (length_m / steps / m_per_deg)
+        for _ in range(steps):
+            pos = pos + step + rng.normal(0.0, 2e-7, 2)
+            points.append(pos.copy())
+    return np.round(np.array(points), 7).tolist()
+
+
+def _response(geometries) -> dict:
+    route = {
+        "seller_id": "s1", "seller_name": "Vendedor", "duration_seconds": 900.0, "distance_meters": 9000.0,
+        "distance_km": 9.0, "duration_min": 15.0,
+    }
+    routes = [{**route, "seller_id": f"s{i}", "route_geometry": g} for i, g in enumerate(geometries)]
+    return {
+        "session_id": None,
+        "recommended_route": routes[0],
+        "all_routes": routes,
+        "metrics": {k: 0.0 for k in ("revenue", "profit", "distance_total", "duration_total", "platform_profit", "prediction_accuracy", "avg_time_reduction", "revenue_growth")},
+        "timestamp": time.time(),
+    }
+
+
+def _time(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run_benchmark(n_routes: int = 10, repeat: int = 20):
+    """
+    Tamaño y tiempo de validación + serialización de una respuesta de simulación (pydantic,
+    como hace FastAPI con `response_model`) según el formato de geometría y la simplificación.
+    """
+    rng = np.random.default_rng(7)
+    routes = [synthetic_route(rng) for _ in range(n_routes)]
+    n_points = sum(len(r) for r in routes)
+    configs = [
+        ("coords (default)", "coords", None),
+        ("coords, DP 5 m", "coords", 5.0),
+        ("polyline", "polyline", None),
+        ("polyline, DP 5 m", "polyline", 5.0),
+        ("polyline, zoom 15", "polyline", zoom_tolerance_m(15, -1.05)),
+    ]
+    print(f"\nSimulationResponse with {n_routes} routes, {n_points} vertices")
+    print(f"{'config':<22}{'encode_ms':>10}{'serialize_ms':>14}{'total_ms':>10}{'bytes':>10}")
+    for label, fmt, tol in configs:
+        encode_s = _time(lambda: format_geometries(routes, fmt, tol), repeat)
+        payload = _response(format_geometries(routes, fmt, tol))
+        # Igual que FastAPI con response_model: validación, dump a tipos JSON y json.dumps
+        serialize = lambda: json.dumps(SimulationResponse.model_validate(payload).model_dump(mode="json"))
+        body = serialize()
+        serialize_s = _time(serialize, repeat)
+        total_ms = (encode_s + serialize_s) * 1000
+        print(f"{label:<22}{encode_s * 1000:>10.2f}{serialize_s * 1000:>14.2f}{total_ms:>10.2f}{len(body):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=run_benchmark.__doc__)
+    parser.add_argument("--routes", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.routes, args.repeat)
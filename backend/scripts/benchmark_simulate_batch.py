@@ -0,0 +1,125 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import networkx as nx
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import app.main as main
+from app.core.localdb import haversine_km
+from app.schemas import SimulationBatchItem, SimulationRequest
+from app.services.routing.algorithms import PathFinder
+from app.services.simulation.batch import BatchSimulator
+from app.services.simulation.engine import MarkovChain
+
+PRODUCTS = ["maiz", "cacao", "arroz", "cafe"]
+
+
+def synthetic_city(n: int = 60, seed: int = 7) -> nx.MultiDiGraph:
+    """Grilla dirigida de n x n intersecciones (~110 m entre nodos) con pesos y tipos de vía variados."""
+    rng = random.Random(seed)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    for i in range(n):
+        for j in range(n):
+            G.add_node(i * n + j, y=-1.09 + i * 0.001, x=-80.49 + j * 0.001)
+    for i in range(n):
+        for j in range(n):
+            u = i * n + j
+            for v in ([u + 1] if j < n - 1 else []) + ([u + n] if i < n - 1 else []):
+                for a, b in ((u, v), (v, u)):
+                    if rng.random() < 0.92:
+                        G.add_edge(a, b, weight=rng.uniform(8.0, 25.0), length=110.0, highway=rng.choice(["primary", "secondary", "residential"]))
+    return G
+
+
+class SyntheticRepository:
+    """Catálogo en memoria con la interfaz que usan simulate y la simulación por lotes."""
+
+    def __init__(self, n_sellers: int, n: int, seed: int = 7):
+        rng = random.Random(seed)
+        self.sellers = [
+            {
+                "id": f"seller_{k}",
+                "name": f"Vendedor {k}",
+                "rating": 4.5,
+                "trips_count": 100 + k,
+                "products": rng.sample(PRODUCTS, 2),
+                "coordinates": {"lat": -1.09 + rng.random() * (n - 1) * 0.001, "lng": -80.49 + rng.random() * (n - 1) * 0.001},
+            }
+            for k in range(n_sellers)
+        ]
+
+    def get_product_by_id(self, product_id):
+        return {"id": product_id, "name": product_id.title(), "price_per_unit": 60.0, "image_url": ""}
+
+    def get_sellers(self, product_id=None):
+        return [s for s in self.sellers if product_id is None or product_id in s["products"]]
+
+    def get_sellers_near(self, product_id, lat, lng, radius_km=None, limit=None):
+        ranked = sorted(
+            ({**s, "distance_km": haversine_km(lat, lng, s["coordinates"]["lat"], s["coordinates"]["lng"])} for s in self.get_sellers(product_id)),
+            key=lambda s: s["distance_km"],
+        )
+        return [s for s in ranked if radius_km is None or s["distance_km"] <= radius_km][:limit]
+
+
+def run_benchmark(n_items: int = 1000, single_sample: int = 10, n_sellers: int = 20, grid: int = 60, max_sellers: int = 10):
+    """
+    Throughput de la simulación de pedidos: `/api/routes/simulate` llamado en secuencia (una
+    muestra de `single_sample` pedidos, mismo código que el endpoint) frente a `BatchSimulator`
+    con los `n_items` pedidos en una sola pasada. Grafo y catálogo sintéticos.
+    """
+    G = synthetic_city(grid)
+    repo = SyntheticRepository(n_sellers, grid)
+    pf = PathFinder(G)
+    main.graph, main.path_finder, main.repository = G, pf, repo
+    main.settings.SIMULATION_MAX_SELLERS = max_sellers
+
+    rng = random.Random(11)
+    span_deg = (grid - 1) * 0.001
+    items = [
+        SimulationBatchItem(
+            user_lat=-1.09 + rng.random() * span_deg,
+            user_lng=-80.49 + rng.random() * span_deg,
+            product_id=rng.choice(PRODUCTS),
+            weight=25.0,
+        )
+        for _ in range(n_items)
+    ]
+
+    start = time.perf_counter()
+    for it in items[:single_sample]:
+        request = SimulationRequest(user_lat=it.user_lat, user_lng=it.user_lng, product_id=it.product_id, weight=it.weight, geometry_format="polyline")
+        main._simulate_routes(request, main._nearest_node(it.user_lng, it.user_lat))
+    single_s = (time.perf_counter() - start) / single_sample
+
+    sim = BatchSimulator(G, pf, repo, max_sellers=max_sellers)
+    start = time.perf_counter()
+    first_chunk_s = None
+    results = 0
+    for chunk in sim.run_chunks(items, MarkovChain(), geometry_format="polyline"):
+        if first_chunk_s is None:
+            first_chunk_s = time.perf_counter() - start
+        results += len(chunk)
+    batch_s = time.perf_counter() - start
+
+    print(f"\n{n_items} orders, {n_sellers} sellers (K={max_sellers}), graph {G.number_of_nodes()} nodes / {G.number_of_edges()} edges")
+    print(f"{'mode':<28}{'ms/order':>10}{'orders/s':>10}{'total_s':>10}")
+    print(f"{'sequential simulate':<28}{single_s * 1000:>10.2f}{1 / single_s:>10.1f}{single_s * n_items:>10.1f}  (extrapolated)")
+    print(f"{'simulate_batch':<28}{batch_s / results * 1000:>10.2f}{results / batch_s:>10.1f}{batch_s:>10.1f}")
+    print(f"first chunk after {first_chunk_s * 1000:.0f} ms; speedup x{single_s * n_items / batch_s:.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=run_benchmark.__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--single-sample", type=int, default=10)
+    parser.add_argument("--sellers", type=int, default=20)
+    parser.add_argument("--grid", type=int, default=60)
+    parser.add_argument("--max-sellers", type=int, default=10)
+    args = parser.parse_args()
+    run_benchmark(args.items, args.single_sample, args.sellers, args.grid, args.max_sellers)
@@ -0,0 +1,57 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import app.main as main
+from app.schemas import SimulationRequest
+from app.services.routing.algorithms import PathFinder
+from benchmark_simulate_batch import PRODUCTS, SyntheticRepository, synthetic_city
+
+FIELD_SETS = {
+    "full (default)": None,
+    "eta + distance": "duration_min,distance_km",
+    "distance only": "distance_km,seller_name",
+    "geometry + eta": "route_geometry,duration_min",
+    "profit": "net_profit,distance_km",
+}
+
+
+def run_benchmark(n_requests: int = 5, n_sellers: int = 20, grid: int = 60, max_sellers: int = 10):
+    """
+    Latencia de `/api/routes/simulate` según `fields`: respuesta completa frente a conjuntos de
+    campos que omiten geometría, Monte Carlo, modelo de impacto y métricas de administración.
+    Grafo y catálogo sintéticos.
+    """
+    G = synthetic_city(grid)
+    main.graph, main.path_finder, main.repository = G, PathFinder(G), SyntheticRepository(n_sellers, grid)
+    main.settings.SIMULATION_MAX_SELLERS = max_sellers
+    rng = random.Random(11)
+    span_deg = (grid - 1) * 0.001
+    points = [(-1.09 + rng.random() * span_deg, -80.49 + rng.random() * span_deg, rng.choice(PRODUCTS)) for _ in range(n_requests)]
+
+    print(f"\n{n_requests} requests, {max_sellers} sellers each")
+    print(f"{'fields':<18}{'ms/request':>12}{'speedup':>10}")
+    baseline = None
+    for label, fields in FIELD_SETS.items():
+        start = time.perf_counter()
+        for lat, lng, product_id in points:
+            request = SimulationRequest(user_lat=lat, user_lng=lng, product_id=product_id, weight=25.0, geometry_format="polyline", fields=fields)
+            main._simulate_routes(request, main._nearest_node(lng, lat))
+        elapsed = (time.perf_counter() - start) / n_requests
+        baseline = baseline or elapsed
+        print(f"{label:<18}{elapsed * 1000:>12.1f}{baseline / elapsed:>10.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=run_benchmark.__doc__)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--sellers", type=int, default=20)
+    parser.add_argument("--grid", type=int, default=60)
+    parser.add_argument("--max-sellers", type=int, default=10)
+    args = parser.parse_args()
+    run_benchmark(args.requests, args.sellers, args.grid, args.max_sellers)
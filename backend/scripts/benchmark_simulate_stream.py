@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import app.main as main
+from app.schemas import SimulationRequest
+from app.services.routing.algorithms import PathFinder
+from benchmark_simulate_batch import PRODUCTS, SyntheticRepository, synthetic_city
+
+
+def _requests(n: int, grid: int):
+    rng = random.Random(11)
+    span_deg = (grid - 1) * 0.001
+    return [
+        SimulationRequest(
+            user_lat=-1.09 + rng.random() * span_deg,
+            user_lng=-80.49 + rng.random() * span_deg,
+            product_id=rng.choice(PRODUCTS),
+            weight=25.0,
+            geometry_format="polyline",
+        )
+        for _ in range(n)
+    ]
+
+
+def run_benchmark(n_requests: int = 3, n_sellers: int = 20, grid: int = 60, max_sellers: int = 10, windows: str = "1,2,4"):
+    """
+    Tiempo hasta la primera ruta frente a la latencia total: `/api/routes/simulate` (todo al
+    final) y `/api/routes/simulate/stream` con distintas ventanas de vendedores en curso
+    (`SIMULATION_STREAM_CONCURRENCY`). Grafo y catálogo sintéticos.
+    """
+    G = synthetic_city(grid)
+    main.graph, main.path_finder, main.repository = G, PathFinder(G), SyntheticRepository(n_sellers, grid)
+    main.settings.SIMULATION_MAX_SELLERS = max_sellers
+    requests = _requests(n_requests, grid)
+
+    def measure(stream: bool):
+        first, total = [], []
+        for request in requests:
+            user_node = main._nearest_node(request.user_lng, request.user_lat)
+            start = time.perf_counter()
+            if stream:
+                context = main._simulation_context(request)
+                ttfr = None
+                for event, _ in main._simulate_route_events(request, user_node, *context):
+                    if ttfr is None:
+                        ttfr = time.perf_counter() - start
+            else:
+                main._simulate_routes(request, user_node)
+                ttfr = time.perf_counter() - start
+            first.append(ttfr)
+            total.append(time.perf_counter() - start)
+        return sum(first) / len(first), sum(total) / len(total)
+
+    print(f"\n{n_requests} requests, {max_sellers} sellers each, {os.cpu_count()} CPU")
+    print(f"{'mode':<26}{'first_route_ms':>16}{'total_ms':>10}{'ratio':>8}")
+    ttfr, total = measure(stream=False)
+    print(f"{'simulate':<26}{ttfr * 1000:>16.0f}{total * 1000:>10.0f}{ttfr / total:>8.2f}")
+    for window in (int(w) for w in windows.split(",")):
+        main.settings.SIMULATION_STREAM_CONCURRENCY = window
+        ttfr, total = measure(stream=True)
+        print(f"{f'stream, window {window}':<26}{ttfr * 1000:>16.0f}{total * 1000:>10.0f}{ttfr / total:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=run_benchmark.__doc__)
+    parser.add_argument("--requests", type=int, default=3)
+    parser.add_argument("--sellers", type=int, default=20)
+    parser.add_argument("--grid", type=int, default=60)
+    parser.add_argument("--max-sellers", type=int, default=10)
+    parser.add_argument("--windows", default="1,2,4")
+    args = parser.parse_args()
+    run_benchmark(args.requests, args.sellers, args.grid, args.max_sellers, args.windows)
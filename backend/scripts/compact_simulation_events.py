@@ -0,0 +1,28 @@
+import argparse
+import os
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.config import settings
+from app.core.localdb import compact_simulation_events, fetch_simulation_event_archives
+
+
+def main():
+    """Archiva en particiones mensuales comprimidas los eventos de simulación más antiguos que la retención."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--older-than-days", type=int, default=settings.SIMULATION_EVENTS_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    start = time.time()
+    result = compact_simulation_events(older_than_days=args.older_than_days, batch_size=args.batch_size)
+    print(f"Compaction finished in {time.time() - start:.2f}s: {result}")
+    for partition in fetch_simulation_event_archives():
+        print(partition)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+import os
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.export.datasets import EXPORT_FORMATS, export_all
+
+
+def main():
+    """Exporta orders y simulation_events a snapshots columnares particionados (Parquet o Arrow IPC)."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("datasets", nargs="*", help="orders, simulation_events (por defecto: todos)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    parser.add_argument("--out", default=None, help="Directorio raíz (por defecto EXPORT_DIR o app/data/exports)")
+    parser.add_argument("--impact-samples", type=int, default=0, help="Además, exportar N muestras sintéticas de entrenamiento de Impact")
+    args = parser.parse_args()
+
+    start = time.time()
+    manifests = export_all(root=args.out, fmt=args.format, datasets=args.datasets or None)
+    if args.impact_samples:
+        from app.ml.impact_predictor import export_impact_training_set
+
+        manifests["impact_training"] = export_impact_training_set(n_samples=args.impact_samples, root=args.out, fmt=args.format)
+    for name, m in manifests.items():
+        print(f"{name:<20}{m['rows']:>10} rows  snapshot={m['snapshot_id']}  partitions={m['partitioning']}")
+    print(f"Export finished in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+import json
+import os
+import sys
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.ingestion.orders import ingest_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta masiva de pedidos (NDJSON o CSV) en SQLite.")
+    parser.add_argument("path", help="Archivo .ndjson/.jsonl o .csv")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default=None, help="Por defecto se infiere de la extensión.")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    summary = ingest_file(args.path, fmt=args.format, chunk_size=args.chunk_size)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.localdb import rebuild_demand_rollups
+
+
+def main():
+    """Reconstruye daily_demand / weekly_demand / monthly_demand desde la tabla orders."""
+    start = time.time()
+    counts = rebuild_demand_rollups()
+    print(f"Rollups rebuilt in {time.time() - start:.2f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
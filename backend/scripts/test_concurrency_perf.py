@@ -1,16 +1,25 @@
-
+import argparse
 import time
 import requests
 import threading
 import sys
 
-def make_heavy_request(base_url):
+import numpy as np
+
+HEAVY_ENDPOINTS = {
+    "validation": "/api/validation/stats",
+    "eta": "/api/models/eta/evaluate",
+    "impact": "/api/models/impact/evaluate",
+}
+
+def make_heavy_request(base_url, path, results):
     start = time.time()
     try:
-        # Request validation stats which runs simulations (CPU heavy)
-        response = requests.get(f"{base_url}/api/validation/stats")
+        # Request validation stats / model evaluation (CPU heavy, runs in the heavy process pool)
+        response = requests.get(f"{base_url}{path}")
         duration = time.time() - start
-        print(f"Heavy request finished in {duration:.2f}s (Status: {response.status_code})")
+        results.append(response.status_code)
+        print(f"Heavy request {path} finished in {duration:.2f}s (Status: {response.status_code})")
     except Exception as e:
         print(f"Heavy request failed: {e}")
 
@@ -26,19 +35,66 @@ def make_light_request(base_url, delay=0.1):
         print(f"Light request failed: {e}")
         return 999
 
+def light_latencies(base_url, stop, latencies, interval_s=0.01):
+    """Peticiones ligeras secuenciales a /health mientras corren las pesadas."""
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            session.get(f"{base_url}/health")
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            latencies.append(999.0)
+        time.sleep(interval_s)
+
+def summarize(label, latencies):
+    if not latencies:
+        print(f"{label:<10} no samples")
+        return
+    ms = np.array(latencies) * 1000.0
+    print(f"{label:<10} n={len(ms):<5} p50={np.percentile(ms, 50):7.1f}ms  p95={np.percentile(ms, 95):7.1f}ms  p99={np.percentile(ms, 99):7.1f}ms  max={ms.max():7.1f}ms")
+
+def run_probe(base_url, heavy, n_heavy, baseline_s=3.0):
+    # Línea base: /health sin carga pesada
+    stop = threading.Event()
+    baseline = []
+    t = threading.Thread(target=light_latencies, args=(base_url, stop, baseline))
+    t.start()
+    time.sleep(baseline_s)
+    stop.set()
+    t.join()
+
+    # Carga: n_heavy peticiones pesadas en paralelo (las que exceden la cola reciben 429/503)
+    stop = threading.Event()
+    loaded = []
+    statuses = []
+    t = threading.Thread(target=light_latencies, args=(base_url, stop, loaded))
+    t.start()
+    heavy_threads = [
+        threading.Thread(target=make_heavy_request, args=(base_url, HEAVY_ENDPOINTS[heavy[i % len(heavy)]], statuses))
+        for i in range(n_heavy)
+    ]
+    for h in heavy_threads:
+        h.start()
+    for h in heavy_threads:
+        h.join()
+    stop.set()
+    t.join()
+
+    print("\n/health latency")
+    summarize("baseline", baseline)
+    summarize("loaded", loaded)
+    print(f"heavy statuses: { {s: statuses.count(s) for s in sorted(set(statuses))} }")
+
 if __name__ == "__main__":
     # Assuming server is running on localhost:8000
-    BASE_URL = "http://127.0.0.1:8000"
-    
+    parser = argparse.ArgumentParser(description="Latencia de /health mientras corren endpoints pesados")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--heavy", default="validation", help="Lista separada por comas: validation,eta,impact")
+    parser.add_argument("--n-heavy", type=int, default=4)
+    args = parser.parse_args()
+
     print("--- Starting Concurrency Test ---")
-    print("Triggering heavy request and light request in parallel...")
-    
-    t1 = threading.Thread(target=make_heavy_request, args=(BASE_URL,))
-    t2 = threading.Thread(target=make_light_request, args=(BASE_URL,))
-    
-    t1.start()
-    t2.start()
-    
-    t1.join()
-    t2.join()
+    print("Triggering heavy requests while probing /health latency...")
+    run_probe(args.base_url, [h.strip() for h in args.heavy.split(",") if h.strip()], args.n_heavy)
     print("--- Test Finished ---")
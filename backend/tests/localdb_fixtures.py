@@ -0,0 +1,44 @@
+"""Base SQLite temporal compartida por los tests que leen o escriben a través de `app.core.localdb`."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from typing import Iterable, Tuple
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.core.config import settings
+
+
+class TempDBTestCase(unittest.TestCase):
+    """
+    Cada test corre contra una base nueva en `self.tmp_dir` (`settings.LOCAL_DB_FILENAME`
+    apunta a ella y el pool se reabre); `tearDown` cierra el pool y restaura la configuración.
+    Las subclases llaman a `super().setUp()` antes de usar la base y a `super().tearDown()` al final.
+    """
+
+    db_filename = "test.sqlite3"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self._db_filename = settings.LOCAL_DB_FILENAME
+        settings.LOCAL_DB_FILENAME = os.path.join(self.tmp_dir, self.db_filename)
+        localdb.close_db()
+
+    def tearDown(self):
+        localdb.close_db()
+        settings.LOCAL_DB_FILENAME = self._db_filename
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def seed_products(self, products: Iterable[Tuple[str, str]] = (("maiz", "Maíz"), ("cafe", "Café"))) -> None:
+        """Inserta productos mínimos (precio 1.0 por kg) por el escritor único."""
+        rows = list(products)
+
+        def _tx(conn):
+            conn.executemany("INSERT INTO products (id, name, price_per_unit, unit) VALUES (?, ?, 1.0, 'kg')", rows)
+            conn.commit()
+
+        localdb.run_write(_tx)
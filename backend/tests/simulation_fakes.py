@@ -0,0 +1,100 @@
+"""Grafo, catálogo y cadena de Markov de prueba compartidos por los tests de simulate y de simulación por lotes."""
+import os
+import random
+import sys
+import unittest
+from typing import Any, Dict, List, Optional
+
+import networkx as nx
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.localdb import haversine_km
+from app.services.simulation.engine import SimulationState
+
+
+def grid_graph(n: int = 10, spacing_deg: float = 0.008, length_m: float = 880.0, seed: Optional[int] = None) -> nx.MultiDiGraph:
+    """
+    Grilla dirigida de n x n intersecciones desde (-1.09, -80.49).
+    Sin `seed`, aristas en ambos sentidos con pesos que crecen por fila y largos por columna
+    (rutas distintas por vendedor); con `seed`, pesos y tipos de vía aleatorios y ~10% de
+    aristas solo en un sentido.
+    """
+    rng = random.Random(seed)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    for i in range(n):
+        for j in range(n):
+            G.add_node(i * n + j, y=-1.09 + i * spacing_deg, x=-80.49 + j * spacing_deg)
+    for i in range(n):
+        for j in range(n):
+            u = i * n + j
+            for v in ([u + 1] if j < n - 1 else []) + ([u + n] if i < n - 1 else []):
+                for a, b in ((u, v), (v, u)):
+                    if seed is None:
+                        G.add_edge(a, b, length=length_m + j, weight=60.0 + i)
+                    elif rng.random() < 0.9:
+                        highway = rng.choice(["primary", "residential", "tertiary"])
+                        G.add_edge(a, b, weight=rng.choice([20.0, 35.0, 50.0]), length=length_m, highway=highway)
+    return G
+
+
+def nearby_sellers(n: int = 5) -> List[Dict[str, Any]]:
+    """Vendedores en diagonal sobre la grilla, sin lista de productos (venden todo)."""
+    return [
+        {"id": f"s{k}", "name": f"Vendedor {k}", "rating": 4.0, "trips_count": k,
+         "coordinates": {"lat": -1.085 + k * 0.012, "lng": -80.485 + k * 0.01}}
+        for k in range(n)
+    ]
+
+
+class FakeRepository:
+    """Catálogo en memoria con la interfaz de `DataRepository` que usan simulate y `BatchSimulator`."""
+
+    def __init__(self, sellers: Optional[List[Dict[str, Any]]] = None):
+        self.sellers = nearby_sellers() if sellers is None else sellers
+
+    def get_product_by_id(self, product_id):
+        return {"id": product_id, "name": product_id.title(), "price_per_unit": 40.0, "image_url": ""}
+
+    def get_sellers(self, product_id=None):
+        return [s for s in self.sellers if product_id is None or product_id in s.get("products", [product_id])]
+
+    def get_sellers_near(self, product_id, lat, lng, radius_km=None, limit=None):
+        ranked = sorted(self.get_sellers(product_id), key=lambda s: haversine_km(lat, lng, s["coordinates"]["lat"], s["coordinates"]["lng"]))
+        return ranked[:limit]
+
+
+class FixedChain:
+    """Cadena de Markov que siempre devuelve el mismo estado (resultados comparables entre peticiones)."""
+
+    def __init__(self, state: SimulationState = SimulationState.NORMAL):
+        self.state = state
+
+    def next_state(self):
+        return self.state
+
+
+class SimulateAppTestCase(unittest.TestCase):
+    """Instala grafo, catálogo y cadena de prueba en `app.main` y un `TestClient` sin startup."""
+
+    state = SimulationState.NORMAL
+
+    @classmethod
+    def setUpClass(cls):
+        from fastapi.testclient import TestClient
+
+        import app.main as main
+        from app.services.routing.algorithms import PathFinder
+
+        cls.main = main
+        cls._saved = (main.graph, main.path_finder, main.repository, main.markov_chain)
+        G = grid_graph()
+        main.graph, main.path_finder, main.repository, main.markov_chain = G, PathFinder(G), FakeRepository(), FixedChain(cls.state)
+        # Sin `with`: no corre el startup (no descarga el grafo)
+        cls.client = TestClient(main.app)
+        cls.body = {"user_lat": -1.07, "user_lng": -80.47, "product_id": "maiz", "weight": 20}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.main.graph, cls.main.path_finder, cls.main.repository, cls.main.markov_chain = cls._saved
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.admission import AdmissionController, WorkloadClass
+from app.exceptions import AdmissionRejectedError
+from app.services.offload.pool import HeavyTaskPool
+
+
+def _controller(capacity=1, **overrides):
+    heavy = dict(max_concurrent=1, max_queue=1, queue_timeout_s=1.0, priority=20)
+    heavy.update(overrides)
+    return AdmissionController(
+        [
+            WorkloadClass("evaluation", max_concurrent=1, max_queue=4, queue_timeout_s=1.0, priority=10),
+            WorkloadClass("validation", **heavy),
+        ],
+        capacity=capacity,
+    )
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_queue_full_is_429_and_wait_timeout_is_503(self):
+        async def scenario():
+            ctl = _controller(queue_timeout_s=0.05)
+            await ctl.acquire("validation")
+            waiter = asyncio.ensure_future(ctl.acquire("validation"))
+            await asyncio.sleep(0)
+            with self.assertRaises(AdmissionRejectedError) as full:
+                await ctl.acquire("validation")
+            with self.assertRaises(AdmissionRejectedError) as timeout:
+                await waiter
+            return ctl, full.exception, timeout.exception
+
+        ctl, full, timeout = asyncio.run(scenario())
+        self.assertEqual(full.status_code, 429)
+        self.assertEqual(timeout.status_code, 503)
+        self.assertGreaterEqual(full.retry_after_s, 1)
+        stats = ctl.stats()["workloads"]["validation"]
+        self.assertEqual((stats["active"], stats["queued"], stats["rejected"]), (1, 0, 2))
+
+    def test_released_slot_goes_to_highest_priority_waiter(self):
+        async def scenario():
+            ctl = _controller()
+            order = []
+
+            async def job(name):
+                async with ctl.slot(name):
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+
+            await ctl.acquire("validation")
+            tasks = [asyncio.ensure_future(job("validation"))]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.ensure_future(job("evaluation")))
+            await asyncio.sleep(0)
+            ctl.release("validation")
+            await asyncio.gather(*tasks)
+            return ctl, order
+
+        ctl, order = asyncio.run(scenario())
+        # La evaluación llegó después pero tiene prioridad sobre la validación en cola
+        self.assertEqual(order, ["evaluation", "validation"])
+        self.assertEqual(ctl.stats()["workloads"]["validation"]["active"], 0)
+
+    def test_waiter_without_class_slot_does_not_block_other_classes(self):
+        async def scenario():
+            ctl = _controller(capacity=2)
+            await ctl.acquire("evaluation")
+            waiter = asyncio.ensure_future(ctl.acquire("evaluation"))
+            await asyncio.sleep(0)
+            # La evaluación en cola (prioridad 10) no tiene cupo en su clase; la validación sí
+            await asyncio.wait_for(ctl.acquire("validation"), timeout=0.5)
+            stats = ctl.stats()["workloads"]
+            ctl.release("evaluation")
+            await waiter
+            return stats, ctl.stats()["workloads"]
+
+        during, after = asyncio.run(scenario())
+        self.assertEqual((during["validation"]["active"], during["evaluation"]["queued"]), (1, 1))
+        self.assertEqual((after["evaluation"]["active"], after["evaluation"]["queued"]), (1, 0))
+
+    def test_cancelled_waiter_does_not_leak_a_slot(self):
+        async def scenario():
+            ctl = _controller()
+            await ctl.acquire("evaluation")
+            waiter = asyncio.ensure_future(ctl.acquire("validation"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            ctl.release("evaluation")
+            async with ctl.slot("validation"):
+                pass
+            return ctl.stats()["workloads"]
+
+        workloads = asyncio.run(scenario())
+        self.assertEqual(workloads["validation"], {**workloads["validation"], "active": 0, "queued": 0, "admitted": 1})
+        self.assertEqual(workloads["evaluation"]["active"], 0)
+
+
+class TestHeavyTaskPool(unittest.TestCase):
+    def test_runs_in_lower_priority_worker_process(self):
+        pool = HeavyTaskPool(max_workers=1, nice=5)
+
+        async def scenario():
+            pid = await pool.run(os.getpid)
+            niceness = await pool.run(os.nice, 0)
+            return pid, niceness
+
+        try:
+            pid, niceness = asyncio.run(scenario())
+        finally:
+            pool.shutdown(wait=True)
+        self.assertNotEqual(pid, os.getpid())
+        self.assertGreaterEqual(niceness, min(19, os.nice(0) + 5))
+        self.assertEqual(pool.stats()["completed"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
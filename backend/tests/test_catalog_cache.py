@@ -0,0 +1,48 @@
+import json
+import os
+import sys
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.core.repository import DataRepository, MOCK_PRODUCTS, MOCK_SELLERS
+from localdb_fixtures import TempDBTestCase
+
+
+class TestCatalogCache(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repo = DataRepository()
+
+    def test_snapshot_matches_db_and_is_reused(self):
+        self.assertEqual(self.repo.get_sellers("maiz"), localdb.fetch_sellers("maiz"))
+        self.assertEqual(self.repo.get_sellers(), localdb.fetch_sellers())
+        self.assertEqual(self.repo.get_products(), localdb.fetch_products())
+        self.assertEqual(self.repo.get_product_by_id("cafe")["name"], "Café")
+        self.assertEqual(self.repo.get_sellers("banano"), [])
+
+        snap = self.repo.catalog.snapshot()
+        self.assertIs(self.repo.catalog.snapshot(), snap)
+        self.assertIs(self.repo.get_sellers_json("maiz"), self.repo.get_sellers_json("maiz"))
+        self.assertEqual(self.repo.catalog.stats()["rebuilds"], 1)
+
+        body = json.loads(self.repo.get_products_json())
+        self.assertEqual([p["id"] for p in body["products"]], [p["id"] for p in localdb.fetch_products()])
+        body = json.loads(self.repo.get_sellers_json("cacao"))
+        self.assertEqual({s["id"] for s in body["sellers"]}, {s["id"] for s in MOCK_SELLERS if "cacao" in s["products"]})
+
+    def test_writes_invalidate_snapshot(self):
+        before = self.repo.catalog.snapshot()
+        seller = dict(MOCK_SELLERS[0], id="seller99", products=["cafe"])
+        localdb.insert_sellers([seller])
+
+        self.assertIsNot(self.repo.catalog.snapshot(), before)
+        self.assertIn("seller99", [s["id"] for s in self.repo.get_sellers("cafe")])
+        self.assertEqual(json.loads(self.repo.get_sellers_json("cafe"))["sellers"][-1]["id"], "seller99")
+        self.assertEqual(len(self.repo.get_products()), len(MOCK_PRODUCTS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.core.config import settings
+from localdb_fixtures import TempDBTestCase
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+@unittest.skipUnless(HAS_PYARROW, "pyarrow no está instalado")
+class TestDatasetExport(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.tmp_dir, "exports")
+        self.seed_products()
+        rows = []
+        for month in range(1, 4):
+            for day in range(1, 11):
+                rows.append((f"2025-{month:02d}-{day:02d}T08:00:00", "maiz", 10.0 + day))
+                rows.append((f"2025-{month:02d}-{day:02d}T09:30:00", "maiz", 1.0))
+                rows.append((f"2025-{month:02d}-{day:02d}T10:00:00", "cafe", 2.0))
+        localdb.insert_orders(rows)
+
+    def test_orders_snapshot_roundtrip(self):
+        from app.services.export.datasets import column_arrays, export_orders, latest_snapshot, load_daily_demand, load_table, open_dataset
+
+        for fmt in ("parquet", "arrow"):
+            manifest = export_orders(root=self.root, fmt=fmt)
+            self.assertEqual(manifest["rows"], 90)
+            self.assertEqual(latest_snapshot("orders", root=self.root)["snapshot_id"], manifest["snapshot_id"])
+
+            # Misma serie diaria que los agregados de SQLite
+            self.assertEqual(load_daily_demand("maiz", "2025-02-05", root=self.root), localdb.fetch_daily_demand("maiz", "2025-02-05"))
+
+            dataset = open_dataset("orders", root=self.root)
+            self.assertEqual(len(list(dataset.get_fragments())), 6)  # 2 productos x 3 meses
+            table = load_table("orders", columns=["weight_kg"], filters=[("product_id", "==", "cafe"), ("month", "==", "2025-03")], root=self.root)
+            self.assertEqual(table.num_rows, 10)
+            weights = column_arrays(table, ["weight_kg"])["weight_kg"]
+            self.assertEqual(float(weights.sum()), 20.0)
+
+    def test_simulation_events_include_archived(self):
+        from datetime import datetime
+        from app.services.export.datasets import export_simulation_events, load_frame
+
+        payload = {"simulation_id": "s1", "impact_metrics": {"distance_added": 100.0, "new_duration": 5.0}}
+        rows = [localdb.simulation_event_row("rain", payload) for _ in range(3)]
+        localdb.insert_simulation_events([("2025-01-05T08:00:00",) + rows[0][1:]] + rows[1:])
+        localdb.compact_simulation_events(older_than_days=30, now=datetime(2025, 6, 1))
+
+        manifest = export_simulation_events(root=self.root)
+        self.assertEqual(manifest["rows"], 3)
+        df = load_frame("simulation_events", root=self.root)
+        self.assertEqual(int(df["archived"].sum()), 1)
+        self.assertEqual(set(df["simulation_id"]), {"s1"})
+        self.assertEqual(float(df["distance_added_m"].sum()), 300.0)
+
+    def test_snapshot_retention(self):
+        from app.services.export.datasets import export_orders
+
+        manifests = [export_orders(root=self.root) for _ in range(4)]
+        dataset_dir = os.path.join(self.root, "orders")
+        snapshots = sorted(d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d)))
+        self.assertEqual(len(snapshots), settings.EXPORT_KEEP_SNAPSHOTS)
+        self.assertEqual(snapshots[-1], manifests[-1]["snapshot_id"])
+
+    def test_impact_training_from_snapshot(self):
+        from app.ml.impact_predictor import IMPACT_DATASET_NAME, ImpactPredictor, export_impact_training_set
+
+        export_impact_training_set(n_samples=2000, root=self.root)
+        predictor = ImpactPredictor(model_path=os.path.join(self.tmp_dir, "impact.pkl"), use_surrogate=False)
+        result = predictor.train_mock(n_estimators=50, max_depth=3, dataset=IMPACT_DATASET_NAME, dataset_root=self.root)
+        self.assertEqual(result["n_samples"], 2000)
+        self.assertTrue(predictor.model_loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import sqlite3
+import threading
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from localdb_fixtures import TempDBTestCase
+
+
+class TestConnectionPool(TempDBTestCase):
+    def test_each_thread_gets_its_own_reader(self):
+        main_conn = localdb.get_db()
+        self.assertIs(localdb.get_db(), main_conn)
+
+        seen = []
+        t = threading.Thread(target=lambda: seen.append(localdb.get_db()))
+        t.start()
+        t.join()
+        self.assertIsNot(seen[0], main_conn)
+        self.assertEqual(localdb.pool_stats()["readers_open"], 2)
+        self.assertEqual(main_conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_concurrent_writes_are_serialized(self):
+        def worker(n):
+            for i in range(25):
+                localdb.insert_job(f"job-{n}-{i}", "eta_train_mock", {"i": i})
+                localdb.update_job(f"job-{n}-{i}", status="running")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(localdb.fetch_jobs(limit=1000, status="running")), 200)
+        stats = localdb.pool_stats()
+        self.assertGreaterEqual(stats["writes"], 400)
+        self.assertEqual(stats["write_errors"], 0)
+        self.assertIsNotNone(stats["write_wait_ms"]["p95"])
+
+    def test_failed_write_rolls_back(self):
+        def _tx(conn):
+            conn.execute("INSERT INTO jobs (id, kind, status, params_json, created_at) VALUES ('x', 'k', 'queued', '{}', 'now')")
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            localdb.run_write(_tx)
+        self.assertIsNone(localdb.fetch_job("x"))
+        self.assertEqual(localdb.pool_stats()["write_errors"], 1)
+
+        # El escritor sigue operativo tras el error
+        localdb.insert_job("y", "k", {})
+        self.assertEqual(localdb.fetch_job("y")["status"], "queued")
+
+    def test_closed_pool_rejects_writes(self):
+        pool = localdb.get_pool()
+        localdb.close_db()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            pool.write(lambda conn: None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from localdb_fixtures import TempDBTestCase
+
+
+class TestDemandRollups(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed_products()
+
+    def _rollup_rows(self):
+        conn = localdb.get_db()
+        return {
+            table: [tuple(r) for r in conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()]
+            for table in ("daily_demand", "weekly_demand", "monthly_demand")
+        }
+
+    def test_incremental_maintenance(self):
+        # 2025-03-30 es domingo, 2025-03-31 lunes: dos semanas y dos meses distintos
+        localdb.insert_orders([
+            ("2025-03-30T08:00:00", "maiz", 10.0),
+            ("2025-03-30T18:00:00", "maiz", 5.0),
+            ("2025-03-31T08:00:00", "maiz", 2.5),
+        ])
+        localdb.insert_orders([("2025-04-01T09:00:00", "maiz", 1.5), ("2025-04-01T10:00:00", "cafe", 4.0)])
+
+        self.assertEqual(
+            localdb.fetch_demand_rollup("maiz", "2025-03-01T00:00:00", granularity="day"),
+            [
+                {"period": "2025-03-30", "total_kg": 15.0, "n_orders": 2},
+                {"period": "2025-03-31", "total_kg": 2.5, "n_orders": 1},
+                {"period": "2025-04-01", "total_kg": 1.5, "n_orders": 1},
+            ],
+        )
+        weekly = localdb.fetch_demand_rollup("maiz", "2025-03-24T00:00:00", granularity="week")
+        self.assertEqual([(w["period"], w["total_kg"]) for w in weekly], [("2025-03-24", 15.0), ("2025-03-31", 4.0)])
+        monthly = localdb.fetch_demand_rollup("maiz", "2025-03-15T00:00:00", granularity="month")
+        self.assertEqual([(m["period"], m["n_orders"]) for m in monthly], [("2025-03", 3), ("2025-04", 1)])
+
+        self.assertEqual(localdb.fetch_daily_demand("cafe", "2025-04-01T12:00:00"), [("2025-04-01", 4.0)])
+
+    def test_rebuild_matches_incremental(self):
+        localdb.insert_orders([
+            ("2025-01-05T08:00:00", "maiz", 3.0),
+            ("2025-01-06T08:00:00", "maiz", 4.0),
+            ("2025-02-01T08:00:00", "cafe", 1.25),
+        ])
+        incremental = self._rollup_rows()
+        counts = localdb.rebuild_demand_rollups()
+        self.assertEqual(counts["daily_demand"], 3)
+        self.assertEqual(self._rollup_rows(), incremental)
+
+    def test_existing_orders_are_migrated(self):
+        conn = localdb.get_db()
+        conn.execute("INSERT INTO orders (created_at, product_id, weight_kg) VALUES ('2025-01-05T08:00:00', 'maiz', 3.0)")
+        conn.commit()
+        localdb.close_db()
+
+        self.assertEqual(localdb.fetch_daily_demand("maiz", "2025-01-01T00:00:00"), [("2025-01-05", 3.0)])
+
+    def test_invalid_granularity(self):
+        with self.assertRaises(ValueError):
+            localdb.fetch_demand_rollup("maiz", "2025-01-01", granularity="hour")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.core.event_sink import EventSink
+from localdb_fixtures import TempDBTestCase
+
+
+def _row(i):
+    return ("2025-03-01T08:00:00", "traffic", f'{{"i": {i}}}')
+
+
+class TestEventSink(unittest.TestCase):
+    def test_group_commit_in_batches(self):
+        batches = []
+        sink = EventSink(batches.append, batch_size=50, flush_interval_s=0.05).start()
+        for i in range(200):
+            self.assertTrue(sink.emit(_row(i)))
+        self.assertTrue(sink.flush(timeout_s=5))
+        sink.stop()
+
+        self.assertEqual(sum(len(b) for b in batches), 200)
+        self.assertLessEqual(len(batches), 10)
+        self.assertTrue(all(len(b) <= 50 for b in batches))
+        stats = sink.stats()
+        self.assertEqual((stats["queued"], stats["written"], stats["dropped"]), (200, 200, 0))
+        self.assertFalse(stats["running"])
+
+    def test_drop_policy_when_queue_is_full(self):
+        release = threading.Event()
+        written = []
+
+        def slow_write(batch):
+            release.wait(5)
+            written.extend(batch)
+
+        sink = EventSink(slow_write, max_queue=5, batch_size=1, flush_interval_s=0.01).start()
+        results = [sink.emit(_row(i)) for i in range(50)]
+        self.assertIn(False, results)
+        self.assertGreater(sink.stats()["dropped"], 0)
+        release.set()
+        sink.stop()
+        stats = sink.stats()
+        self.assertEqual(stats["queued"] + stats["dropped"], 50)
+        self.assertEqual(len(written), stats["queued"])
+
+    def test_stop_flushes_pending_events(self):
+        written = []
+        sink = EventSink(written.extend, batch_size=1000, flush_interval_s=30.0).start()
+        for i in range(10):
+            sink.emit(_row(i))
+        sink.stop()
+        self.assertEqual(len(written), 10)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            EventSink(lambda rows: None, policy="retry")
+
+
+class TestEventSinkPersistence(TempDBTestCase):
+    def test_events_reach_sqlite(self):
+        sink = EventSink(localdb.insert_simulation_events, batch_size=100, flush_interval_s=0.05).start()
+        for i in range(250):
+            sink.emit(localdb.simulation_event_row("traffic", {"simulation_id": "s1", "i": i}))
+        sink.stop()
+        n = localdb.get_db().execute("SELECT COUNT(1) FROM simulation_events").fetchone()[0]
+        self.assertEqual(n, 250)
+
+
+if __name__ == "__main__":
+    unittest.main()
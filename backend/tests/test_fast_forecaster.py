@@ -0,0 +1,58 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.demand_forecasting.data_generator import generate_synthetic_demand
+from app.ml.demand_forecasting.fast_forecaster import MODEL_VERSION, FourierForecaster
+
+
+class TestFourierForecaster(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.df = generate_synthetic_demand("Arroz", days=400)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_forecast_schema_and_accuracy(self):
+        train, test = self.df.iloc[:-14], self.df.iloc[-14:]
+        forecaster = FourierForecaster("Arroz", models_dir=self.tmp_dir)
+        forecaster.train(train)
+
+        forecast = forecaster.predict(days=14)
+        self.assertEqual(len(forecast), 14)
+        self.assertEqual(set(forecast[0].keys()), {"date", "forecast", "lower_bound", "upper_bound"})
+        self.assertEqual(forecast[0]["date"], test["ds"].iloc[0].strftime("%Y-%m-%d"))
+        for row in forecast:
+            self.assertLessEqual(row["lower_bound"], row["forecast"])
+            self.assertLessEqual(row["forecast"], row["upper_bound"])
+
+        y_true = test["y"].to_numpy(dtype=float)
+        y_pred = np.array([row["forecast"] for row in forecast])
+        smape = np.mean(2.0 * np.abs(y_true - y_pred) / (np.abs(y_true) + np.abs(y_pred))) * 100.0
+        self.assertLess(smape, 10.0)
+
+    def test_save_and_load(self):
+        forecaster = FourierForecaster("Arroz", models_dir=self.tmp_dir)
+        forecaster.train(self.df)
+        forecaster.save()
+
+        reloaded = FourierForecaster("Arroz", models_dir=self.tmp_dir)
+        self.assertTrue(reloaded.load())
+        self.assertEqual(reloaded.model_version, MODEL_VERSION)
+        self.assertEqual(reloaded.predict(days=7), forecaster.predict(days=7))
+
+    def test_predict_without_model(self):
+        with self.assertRaises(ValueError):
+            FourierForecaster("Arroz", models_dir=self.tmp_dir).predict(days=7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import unittest
+from datetime import datetime
+from enum import Enum
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.responses import FastJSONResponse, dumps_bytes, fast_json, with_model_defaults
+from app.schemas import SimulationResponse
+
+
+class _State(Enum):
+    RAIN = "Lluvia"
+
+
+def _simulate_payload():
+    route = {
+        "seller_id": "s1",
+        "seller_name": "Vendedor",
+        "seller_rating": 4.5,
+        "seller_trips": 12,
+        "route_geometry": [[-1.05, -80.45], [-1.051, -80.452]],
+        "duration_seconds": np.float64(900.0),
+        "distance_meters": 8200.0,
+        "distance_km": 8.2,
+        "duration_min": 15.0,
+        "freshness_score": np.float64(91.25),
+        "time_adjustments": ["+3 min por Tráfico"],
+        "simulation_state": {"state": "Normal"},
+        "route_changed": False,
+    }
+    metrics = {k: 1.0 for k in SimulationResponse.model_fields["metrics"].annotation.model_fields}
+    return {"session_id": None, "recommended_route": route, "all_routes": [route], "metrics": metrics, "timestamp": 1.0}
+
+
+class TestDumps(unittest.TestCase):
+    def test_numpy_and_extra_types(self):
+        payload = {
+            "arr": np.arange(3),
+            "f": np.float32(1.5),
+            "i": np.int64(7),
+            "b": np.bool_(True),
+            "state": _State.RAIN,
+            "at": datetime(2024, 1, 2, 3, 4, 5),
+            "pair": (1, 2),
+            "nan": float("nan"),
+            "text": "Maíz",
+        }
+        out = json.loads(dumps_bytes(payload))
+        self.assertEqual(out["arr"], [0, 1, 2])
+        self.assertEqual((out["f"], out["i"], out["b"]), (1.5, 7, True))
+        self.assertEqual(out["state"], "Lluvia")
+        self.assertTrue(out["at"].startswith("2024-01-02T03:04:05"))
+        self.assertEqual(out["pair"], [1, 2])
+        self.assertIsNone(out["nan"])
+        self.assertEqual(out["text"], "Maíz")
+
+    def test_matches_response_model_output(self):
+        payload = _simulate_payload()
+        payload["debug"] = "dropped"
+        fast = json.loads(dumps_bytes(with_model_defaults(payload, SimulationResponse)))
+        model = SimulationResponse.model_validate(payload).model_dump(mode="json")
+        # Opcionales no asignados (stop_time_min, route_valid, ...) como null; claves ajenas fuera
+        self.assertEqual(fast, model)
+        self.assertIsNone(fast["all_routes"][0]["stop_time_min"])
+
+
+class TestFastJSONResponse(unittest.TestCase):
+    def setUp(self):
+        self._enabled = settings.FAST_JSON_RESPONSES
+
+    def tearDown(self):
+        settings.FAST_JSON_RESPONSES = self._enabled
+
+    def _client(self):
+        app = FastAPI()
+
+        @app.get("/sim", response_model=SimulationResponse)
+        def sim():
+            return fast_json(_simulate_payload(), model=SimulationResponse)
+
+        @app.get("/raw", response_model=SimulationResponse)
+        def raw():
+            payload = _simulate_payload()
+            payload["debug"] = "kept"  # el response_model lo descartaría
+            return fast_json(payload)
+
+        return TestClient(app)
+
+    def test_bypasses_response_model_when_enabled(self):
+        settings.FAST_JSON_RESPONSES = True
+        r = self._client().get("/raw")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers["content-type"], "application/json")
+        self.assertEqual(r.json()["debug"], "kept")
+        self.assertEqual(r.json()["all_routes"][0]["freshness_score"], 91.25)
+
+    def test_fast_path_keys_match_json_response(self):
+        client = self._client()
+        settings.FAST_JSON_RESPONSES = False
+        slow = client.get("/sim").json()
+        settings.FAST_JSON_RESPONSES = True
+        fast = client.get("/sim").json()
+        self.assertEqual(set(fast), set(slow))
+        self.assertEqual(set(fast["all_routes"][0]), set(slow["all_routes"][0]))
+        self.assertEqual(set(fast["recommended_route"]), set(slow["recommended_route"]))
+        self.assertEqual(fast, slow)
+
+    def test_disabled_falls_back_to_pydantic(self):
+        settings.FAST_JSON_RESPONSES = False
+        self.assertIsInstance(fast_json({"a": 1}), dict)
+        r = self._client().get("/sim")
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn("debug", r.json())
+        self.assertIsInstance(FastJSONResponse({"a": 1}).body, bytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
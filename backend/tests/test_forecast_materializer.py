@@ -0,0 +1,149 @@
+import json
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.ml.demand_forecasting.forecaster import DemandForecaster, train_demand_artifact
+from app.ml.demand_forecasting.materializer import ForecastMaterializer
+from app.services.ingestion.orders import OrderIngestor
+from app.services.jobs.runner import JobKind, JobRunner
+from localdb_fixtures import TempDBTestCase
+
+
+class TestForecastMaterializer(TempDBTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.models_dir = tempfile.mkdtemp()
+        days = pd.date_range("2025-01-01", periods=120, freq="D")
+        y = 100.0 + 10.0 * np.sin(np.arange(120) * 2.0 * np.pi / 7.0)
+        forecaster = DemandForecaster("maiz", models_dir=cls.models_dir)
+        forecaster.train(pd.DataFrame({"ds": days, "y": y}))
+        forecaster.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.models_dir, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.materializer = ForecastMaterializer(["maiz", "cafe"], max_horizon_days=30, models_dir=self.models_dir)
+
+    def tearDown(self):
+        self.materializer.stop()
+        super().tearDown()
+
+    def test_refresh_and_slice(self):
+        summary = self.materializer.refresh_all()
+        self.assertEqual([r["product"] for r in summary["refreshed"]], ["maiz"])
+        self.assertEqual(summary["skipped"], ["cafe"])
+
+        served = self.materializer.get_forecast("maiz", 7)
+        forecaster = DemandForecaster("maiz", models_dir=self.models_dir)
+        forecaster.load()
+        live = forecaster.predict(days=7)
+
+        self.assertEqual([r["date"] for r in served], [r["date"] for r in live])
+        self.assertEqual([r["forecast"] for r in served], [r["forecast"] for r in live])
+        self.assertEqual(served[0]["date"], "2025-05-01")
+
+        # Beyond the materialized horizon or without a model the caller falls back
+        self.assertIsNone(self.materializer.get_forecast("maiz", 31))
+        self.assertIsNone(self.materializer.get_forecast("cafe", 7))
+
+    def test_stale_model_is_rematerialized(self):
+        self.materializer.refresh_product("maiz")
+        version = localdb.fetch_demand_forecast_run("maiz")["model_version"]
+
+        model_path = DemandForecaster("maiz", models_dir=self.models_dir).model_path
+        st = os.stat(model_path)
+        os.utime(model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        self.assertIsNone(self.materializer.get_forecast("maiz", 7))
+        deadline = time.time() + 30
+        while time.time() < deadline and self.materializer.get_forecast("maiz", 7) is None:
+            time.sleep(0.1)
+        self.assertNotEqual(localdb.fetch_demand_forecast_run("maiz")["model_version"], version)
+        self.assertEqual(len(self.materializer.get_forecast("maiz", 7)), 7)
+
+    def test_new_orders_schedule_retraining(self):
+        calls = []
+
+        def retrain(product):
+            calls.append(product)
+            if len(calls) == 1:
+                raise RuntimeError("Job queue is full")
+            return f"job-{len(calls)}"
+
+        self.materializer.retrain = retrain
+        self.materializer.refresh_interval_s = 0
+        self.seed_products()
+        localdb.insert_orders([("2025-05-01T00:00:00", "maiz", 5.0)])
+        # Primera revisión: solo fija las marcas de partida
+        self.assertIsNone(self.materializer.check_for_updates())
+        self.assertEqual(self.materializer.status()["product_watermarks"], {"maiz": 1})
+
+        localdb.insert_orders([("2025-05-02T00:00:00", "cafe", 3.0)])
+        summary = self.materializer.check_for_updates()
+        self.assertEqual((summary["reason"], summary["retraining"]), ("new_orders", {}))
+        self.assertEqual(list(summary["failed"]), ["cafe"])
+        self.assertEqual(summary["product_watermarks"], {"cafe": 2})
+
+        # Sin pedidos nuevos se reintenta lo que quedó pendiente; `maiz` no avanzó
+        summary = self.materializer.check_for_updates()
+        self.assertEqual(summary["retraining"], {"cafe": "job-2"})
+        self.assertEqual(self.materializer.status()["retrain_backlog"], [])
+        self.assertIsNone(self.materializer.check_for_updates())
+        self.assertEqual(calls, ["cafe", "cafe"])
+
+    def test_ingested_orders_change_served_forecast(self):
+        models_dir = os.path.join(self.tmp_dir, "models")
+        runner = JobRunner(max_workers=1, max_pending=4)
+        runner.register(JobKind(
+            name="demand_train",
+            fn=train_demand_artifact,
+            artifact_path=lambda params: DemandForecaster(params["product"], models_dir=models_dir).model_path,
+            prepare=lambda params: {"product": params["product"], "daily": localdb.fetch_daily_demand(params["product"], "2025-01-01")},
+            on_complete=lambda params, result: materializer.refresh_product(params["product"]),
+        ))
+        runner.start()
+        self.addCleanup(runner.shutdown, wait=True)
+        materializer = ForecastMaterializer(
+            ["maiz"], max_horizon_days=14, refresh_interval_s=0, models_dir=models_dir,
+            retrain=lambda product: runner.submit("demand_train", {"product": product}, dedupe=True)["id"],
+        )
+
+        self.seed_products()
+        days = pd.date_range("2025-01-01", "2025-03-31", freq="D")
+        localdb.insert_orders([(d.strftime("%Y-%m-%dT08:00:00"), "maiz", 100.0) for d in days])
+        self.assertEqual(runner.wait(materializer.retrain("maiz"), timeout=120)["status"], "succeeded")
+        before = materializer.get_forecast("maiz", 7)
+        self.assertEqual(before[0]["date"], "2025-04-01")
+        self.assertIsNone(materializer.check_for_updates())
+
+        # Un mes de pedidos nuevos, con el cuádruple de demanda
+        ingestor = OrderIngestor(fmt="ndjson")
+        ingestor.feed(
+            json.dumps({"created_at": d.strftime("%Y-%m-%dT08:00:00"), "product_id": "maiz", "weight_kg": 400.0})
+            for d in pd.date_range("2025-04-01", "2025-04-30", freq="D")
+        )
+        self.assertEqual(ingestor.close()["accepted"], 30)
+
+        summary = materializer.check_for_updates()
+        self.assertEqual(list(summary["retraining"]), ["maiz"])
+        self.assertEqual(runner.wait(summary["retraining"]["maiz"], timeout=120)["status"], "succeeded")
+        after = materializer.get_forecast("maiz", 7)
+        self.assertEqual(after[0]["date"], "2025-05-01")
+        self.assertGreater(np.mean([r["forecast"] for r in after]), np.mean([r["forecast"] for r in before]) + 100.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import joblib
+from sklearn.multioutput import MultiOutputRegressor
+from xgboost import XGBRegressor
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.impact_predictor import ImpactPredictor, MODEL_VERSION, model_multi_strategy
+
+
+class TestImpactPredictorTraining(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.model_path = os.path.join(self.tmp_dir, "impact_xgboost_v1.pkl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_native_multi_output_booster(self):
+        predictor = ImpactPredictor(model_path=self.model_path)
+        result = predictor.train_mock(n_samples=2000, n_estimators=50, max_depth=3)
+
+        self.assertEqual(result["params"]["multi_strategy"], "multi_output_tree")
+        self.assertIsInstance(predictor.model, XGBRegressor)
+        self.assertEqual(model_multi_strategy(predictor.model), "multi_output_tree")
+
+        # Payload layout unchanged: same keys and version as the legacy wrapper
+        payload = joblib.load(self.model_path)
+        self.assertEqual(set(payload.keys()), {"model", "feature_columns", "target_names", "version"})
+        self.assertEqual(payload["version"], MODEL_VERSION)
+
+        reloaded = ImpactPredictor(model_path=self.model_path)
+        self.assertTrue(reloaded.model_loaded)
+        pred = reloaded.predict(distance_km=5.0, scenario="Lluvia", base_duration_min=12.0)
+        self.assertIsNotNone(pred)
+        self.assertEqual(set(pred.to_dict().keys()), set(reloaded.target_names))
+        self.assertGreaterEqual(pred.satisfaction_score, 1.0)
+        self.assertLessEqual(pred.satisfaction_score, 5.0)
+
+    def test_legacy_wrapper_still_available(self):
+        predictor = ImpactPredictor(model_path=self.model_path)
+        predictor.train_mock(n_samples=2000, n_estimators=50, max_depth=3, multi_strategy="wrapper")
+        self.assertIsInstance(predictor.model, MultiOutputRegressor)
+        self.assertEqual(model_multi_strategy(predictor.model), "wrapper")
+
+    def test_surrogate_grid_matches_full_model(self):
+        ImpactPredictor(model_path=self.model_path).train_mock(n_samples=2000, n_estimators=50, max_depth=3)
+        full = ImpactPredictor(model_path=self.model_path, use_surrogate=False)
+        fast = ImpactPredictor(model_path=self.model_path, use_surrogate=True)
+
+        self.assertIsNone(full.surrogate)
+        self.assertIsNotNone(fast.surrogate)
+        bounds = fast.surrogate.error_bounds
+        self.assertEqual(set(bounds.keys()), set(fast.target_names))
+
+        # Inside the grid: interpolated values stay within the reported max error
+        a = fast.predict(distance_km=8.0, scenario="Tráfico", base_duration_min=18.0).to_dict()
+        b = full.predict(distance_km=8.0, scenario="Tráfico", base_duration_min=18.0).to_dict()
+        for name in fast.target_names:
+            self.assertLessEqual(abs(a[name] - b[name]), bounds[name]["max_abs"] + 1e-3)
+
+        # Outside the grid: exact fallback to the full model
+        far_fast = fast.predict(distance_km=120.0, scenario="Normal", base_duration_min=200.0)
+        far_full = full.predict(distance_km=120.0, scenario="Normal", base_duration_min=200.0)
+        self.assertEqual(far_fast, far_full)
+
+        batch = fast.predict_batch([8.0, 120.0], ["Tráfico", "Normal"], [18.0, 200.0])
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(batch[1], far_full)
+
+    def test_invalid_strategy(self):
+        predictor = ImpactPredictor(model_path=self.model_path)
+        with self.assertRaises(ValueError):
+            predictor.train_mock(n_samples=2000, multi_strategy="bogus")
+
+
+if __name__ == "__main__":
+    unittest.main()
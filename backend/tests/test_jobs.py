@@ -0,0 +1,187 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import Future
+
+from app.core import localdb
+from app.exceptions import JobQueueFullError
+from app.ml.eta_predictor import train_eta_mock
+from app.services.jobs.runner import JobKind, JobRunner
+from localdb_fixtures import TempDBTestCase
+
+
+def _slow_job(artifact_path, started_path, marker_path, delay):
+    with open(started_path, "w") as f:
+        f.write("started")
+    time.sleep(delay)
+    with open(marker_path, "w") as f:
+        f.write("done")
+    return {"finished": True}
+
+
+class _InlineExecutor:
+    """Ejecuta en el acto: el future ya está terminado cuando el runner registra su callback."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class TestJobRunner(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.completed = []
+        self.dest = os.path.join(self.tmp_dir, "models", "eta.pkl")
+        self.runner = JobRunner(max_workers=1, max_pending=1)
+        self.runner.register(JobKind(
+            name="eta_train_mock",
+            fn=train_eta_mock,
+            artifact_path=lambda params: self.dest,
+            on_complete=lambda params, result: self.completed.append(result),
+        ))
+        self.runner.start()
+
+    def tearDown(self):
+        self.runner.shutdown(wait=True)
+        super().tearDown()
+
+    def test_job_lifecycle_and_artifact_swap(self):
+        job = self.runner.submit("eta_train_mock", {"n_samples": 1000, "n_estimators": 20, "max_depth": 2})
+        self.assertIn(job["status"], ("queued", "running"))
+
+        done = self.runner.wait(job["id"], timeout=120)
+        self.assertEqual(done["status"], "succeeded", done.get("error"))
+        self.assertTrue(done["result"]["trained"])
+        self.assertIsNotNone(done["finished_at"])
+
+        # Artifact swapped into place, temporary file removed, hook called once
+        self.assertTrue(os.path.exists(self.dest))
+        self.assertEqual([f for f in os.listdir(os.path.dirname(self.dest)) if f.endswith(".tmp")], [])
+        self.assertEqual(len(self.completed), 1)
+
+        # State is persisted in SQLite
+        self.assertEqual(localdb.fetch_job(job["id"])["status"], "succeeded")
+
+    def test_cancel_queued_job_and_queue_limit(self):
+        params = {"n_samples": 1000, "n_estimators": 20, "max_depth": 2}
+        first = self.runner.submit("eta_train_mock", params)
+        second = self.runner.submit("eta_train_mock", {**params, "max_depth": 3})
+        self.assertEqual(second["status"], "queued")
+
+        with self.assertRaises(JobQueueFullError):
+            self.runner.submit("eta_train_mock", {**params, "max_depth": 4})
+
+        cancelled = self.runner.cancel(second["id"])
+        self.assertEqual(cancelled["status"], "cancelled")
+
+        self.assertEqual(self.runner.wait(first["id"], timeout=120)["status"], "succeeded")
+        self.assertEqual(len(self.completed), 1)
+
+    def test_cancel_running_job_terminates_worker(self):
+        started = os.path.join(self.tmp_dir, "started")
+        marker = os.path.join(self.tmp_dir, "finished")
+        self.runner.register(JobKind(name="slow", fn=_slow_job, on_complete=lambda params, result: self.completed.append(result)))
+        job = self.runner.submit("slow", {"started_path": started, "marker_path": marker, "delay": 3.0})
+
+        deadline = time.monotonic() + 60
+        while not os.path.exists(started) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(os.path.exists(started))
+
+        self.runner.cancel(job["id"])
+        done = self.runner.wait(job["id"], timeout=10)
+        self.assertEqual(done["status"], "cancelled")
+
+        # El proceso fue terminado: no llega a escribir su resultado
+        time.sleep(3.5)
+        self.assertFalse(os.path.exists(marker))
+        self.assertEqual(self.completed, [])
+
+    def test_dedupe_and_unknown_kind(self):
+        params = {"n_samples": 1000, "n_estimators": 20, "max_depth": 2}
+        a = self.runner.submit("eta_train_mock", params, dedupe=True)
+        b = self.runner.submit("eta_train_mock", params, dedupe=True)
+        self.assertEqual(a["id"], b["id"])
+        self.runner.wait(a["id"], timeout=120)
+
+        with self.assertRaises(ValueError):
+            self.runner.submit("does_not_exist", {})
+
+    def test_in_process_kind_runs_in_server_thread_beside_pool_jobs(self):
+        pid = os.getpid()
+        self.runner.register(JobKind(
+            name="maintenance",
+            fn=lambda artifact_path, cancel_event: {"pid": os.getpid(), "thread": threading.current_thread().name},
+            in_process=True,
+        ))
+        training = self.runner.submit("eta_train_mock", {"n_samples": 1000, "n_estimators": 20, "max_depth": 2})
+        # No espera al worker del pool ocupado por el entrenamiento
+        maintenance = self.runner.wait(self.runner.submit("maintenance")["id"], timeout=10)
+        self.assertEqual(maintenance["status"], "succeeded", maintenance.get("error"))
+        self.assertEqual(maintenance["result"]["pid"], pid)
+        self.assertTrue(maintenance["result"]["thread"].startswith("jobs-in-process"))
+        self.assertEqual(self.runner.wait(training["id"], timeout=120)["status"], "succeeded")
+
+    def test_jobs_finished_at_dispatch_do_not_break_queue(self):
+        gate = threading.Event()
+        self.runner.register(JobKind(name="gate", fn=lambda artifact_path, cancel_event: {"opened": gate.wait(10)}, in_process=True))
+        self.runner.register(JobKind(name="fast", fn=lambda artifact_path, cancel_event, n: {"n": n}, in_process=True))
+        self.runner.max_pending = 4
+        first = self.runner.submit("gate")
+        queued = [self.runner.submit("fast", {"n": n}) for n in range(3)]
+        self.assertTrue(all(job["status"] == "queued" for job in queued))
+
+        # Los siguientes terminan antes de `add_done_callback`: `_on_done` reentra en el despacho
+        self.runner._thread_executor = _InlineExecutor()
+        # Un error en el despacho quedaría solo en el log del callback de `concurrent.futures`
+        with self.assertNoLogs("concurrent.futures", level="ERROR"):
+            gate.set()
+            self.assertEqual(self.runner.wait(first["id"], timeout=10)["status"], "succeeded")
+            time.sleep(0.2)
+        for n, job in enumerate(queued):
+            done = self.runner.wait(job["id"], timeout=10)
+            self.assertEqual(done["status"], "succeeded", done.get("error"))
+            self.assertEqual(done["result"], {"n": n})
+        self.assertEqual(self.runner.stats()["queued"], 0)
+
+    def test_interrupted_jobs_marked_failed_on_start(self):
+        localdb.insert_job("stale", "eta_train_mock", {}, status="running")
+        JobRunner().start()
+        job = localdb.fetch_job("stale")
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("restart", job["error"])
+
+
+class TestMissingDemandModel(unittest.TestCase):
+    def test_evaluate_without_model_returns_job_without_waiting(self):
+        from fastapi.testclient import TestClient
+
+        import app.main as main
+
+        daily = [{"date": f"2025-01-{d:02d}", "demand": 10.0} for d in range(1, 32)]
+        queued = {"id": "job-1", "kind": "demand_train", "status": "queued"}
+        with patch.object(main.DemandForecaster, "load", return_value=False), \
+                patch.object(main, "fetch_daily_demand", return_value=daily), \
+                patch.object(main, "_submit_job", return_value=queued) as submit, \
+                patch.object(main, "get_job_runner") as runner:
+            r = TestClient(main.app).get("/api/models/demand/evaluate_fast", params={"product": "arroz"})
+        self.assertEqual(r.status_code, 202)
+        self.assertEqual(r.json()["job"], queued)
+        submit.assert_called_once_with("demand_train", {"product": "arroz", "lookback_days": 365}, dedupe=True)
+        runner.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.services.ingestion.orders import OrderIngestor, ingest_file
+from localdb_fixtures import TempDBTestCase
+
+
+class TestOrderIngestion(TempDBTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed_products()
+
+    def test_ndjson_validation_and_rollups(self):
+        lines = [
+            json.dumps({"created_at": "2025-03-01T08:00:00", "product_id": "maiz", "weight_kg": 10}),
+            json.dumps({"created_at": "2025-03-01T09:30:00-05:00", "product_id": " MAIZ ", "weight_kg": "2.5"}),
+            json.dumps({"created_at": "2025-03-02", "product_id": "cafe", "weight_kg": 1.0}),
+            json.dumps({"created_at": "2025-03-02", "product_id": "banano", "weight_kg": 1.0}),
+            json.dumps({"created_at": "2025-03-02", "product_id": "cafe", "weight_kg": -3}),
+            json.dumps({"created_at": "ayer", "product_id": "cafe", "weight_kg": 1.0}),
+            "{not json",
+        ]
+        ingestor = OrderIngestor(fmt="ndjson", chunk_size=4)
+        ingestor.feed(lines)
+        summary = ingestor.close()
+
+        self.assertEqual(summary["accepted"], 3)
+        self.assertEqual(summary["rejected"], 4)
+        self.assertEqual(sorted(e["line"] for e in summary["errors"]), [4, 5, 6, 7])
+
+        # Timestamps normalizados a UTC sin zona, como los generados por la semilla
+        conn = localdb.get_db()
+        created = [r[0] for r in conn.execute("SELECT created_at FROM orders WHERE product_id = 'maiz' ORDER BY created_at")]
+        self.assertEqual(created, ["2025-03-01T08:00:00", "2025-03-01T14:30:00"])
+        self.assertEqual(localdb.fetch_daily_demand("maiz", "2025-03-01"), [("2025-03-01", 12.5)])
+        self.assertEqual(localdb.fetch_daily_demand("cafe", "2025-03-01"), [("2025-03-02", 1.0)])
+
+    def test_csv_file(self):
+        path = os.path.join(self.tmp_dir, "orders.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("product_id,created_at,weight_kg\r\n")
+            f.write("maiz,2025-03-01T08:00:00,4.0\r\n")
+            f.write("cafe,2025-03-01T08:00:00,abc\r\n")
+            f.write("cafe,2025-03-03T10:00:00,1.5\r\n")
+        summary = ingest_file(path)
+        self.assertEqual((summary["format"], summary["accepted"], summary["rejected"]), ("csv", 2, 1))
+        self.assertEqual(summary["errors"][0]["line"], 3)
+        self.assertEqual(localdb.fetch_demand_rollup("cafe", "2025-03-01", granularity="month")[0]["n_orders"], 1)
+
+    def test_streamed_bytes_split_mid_record(self):
+        body = (
+            json.dumps({"created_at": "2025-03-01T08:00:00", "product_id": "maiz", "weight_kg": 1.0}, ensure_ascii=False)
+            + "\n"
+            + json.dumps({"created_at": "2025-03-01T09:00:00", "product_id": "maiz", "weight_kg": 2.0, "nota": "años"}, ensure_ascii=False)
+        ).encode("utf-8")
+        ingestor = OrderIngestor(fmt="ndjson")
+        for i in range(0, len(body), 7):
+            ingestor.feed_bytes(body[i:i + 7])
+        summary = ingestor.close()
+        self.assertEqual(summary["accepted"], 2)
+        self.assertEqual(summary["rejected"], 0)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            OrderIngestor(fmt="xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
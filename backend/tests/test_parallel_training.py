@@ -0,0 +1,78 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.ml.demand_forecasting.forecaster import DemandForecaster
+from app.ml.demand_forecasting.parallel_training import SUMMARY_FILENAME, load_training_summary, train_all_products
+from localdb_fixtures import TempDBTestCase
+
+
+def _series(n_days, base):
+    days = pd.date_range("2025-01-01", periods=n_days, freq="D").strftime("%Y-%m-%d")
+    values = base + 5.0 * np.sin(np.arange(n_days) * 2.0 * np.pi / 7.0)
+    return list(zip(days, values.tolist()))
+
+
+class TestParallelDemandTraining(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.models_dir = os.path.join(self.tmp_dir, "models")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_trains_products_in_parallel_and_writes_summary(self):
+        daily = {"maiz": _series(90, 100.0), "cafe": _series(90, 60.0), "yuca": _series(10, 80.0)}
+        summary = train_all_products(daily, products=["maiz", "cafe", "yuca"], models_dir=self.models_dir, max_workers=2)
+
+        statuses = {item["product"]: item["status"] for item in summary["products"]}
+        self.assertEqual(statuses, {"maiz": "succeeded", "cafe": "succeeded", "yuca": "skipped"})
+        self.assertEqual(summary["workers"], 2)
+        self.assertEqual(summary["succeeded"], 2)
+
+        for product in ("maiz", "cafe"):
+            item = next(i for i in summary["products"] if i["product"] == product)
+            self.assertIn("smape_pct", item["metrics"])
+            self.assertGreater(item["fit_time_s"], 0.0)
+            self.assertTrue(DemandForecaster(product, models_dir=self.models_dir).load())
+
+        # Atomic saves leave no temporary files behind
+        self.assertEqual([f for f in os.listdir(self.models_dir) if f.endswith(".tmp")], [])
+        self.assertTrue(os.path.exists(os.path.join(self.models_dir, SUMMARY_FILENAME)))
+        self.assertEqual(load_training_summary(self.models_dir)["succeeded"], 2)
+
+    def test_per_product_timeout(self):
+        summary = train_all_products({"maiz": _series(90, 100.0)}, models_dir=self.models_dir, timeout_s=0.5)
+        self.assertEqual(summary["products"][0]["status"], "timeout")
+        self.assertFalse(os.path.exists(DemandForecaster("maiz", models_dir=self.models_dir).model_path))
+
+
+class TestFetchDailyDemandAll(TempDBTestCase):
+    def test_single_pass_matches_per_product_query(self):
+        self.seed_products()
+        localdb.insert_orders([
+            ("2025-01-01T08:00:00", "maiz", 10.0),
+            ("2025-01-01T12:00:00", "maiz", 5.0),
+            ("2025-01-02T08:00:00", "maiz", 7.0),
+            ("2025-01-02T09:00:00", "cafe", 3.0),
+        ])
+
+        since = "2025-01-01T00:00:00"
+        daily = localdb.fetch_daily_demand_all(since, product_ids=["maiz", "cafe", "yuca"])
+        self.assertEqual(daily["maiz"], localdb.fetch_daily_demand("maiz", since))
+        self.assertEqual(daily["maiz"], [("2025-01-01", 15.0), ("2025-01-02", 7.0)])
+        self.assertEqual(daily["cafe"], [("2025-01-02", 3.0)])
+        self.assertEqual(daily["yuca"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
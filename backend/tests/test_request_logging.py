@@ -0,0 +1,101 @@
+import io
+import json
+import logging
+import os
+import queue
+import sys
+import unittest
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import middleware as middleware_mod
+from app.core.config import settings
+from app.core.logger import JsonFormatter, _BatchingQueueListener, _DroppingQueueHandler
+from app.core.middleware import RequestMiddleware
+
+
+def _queued_logger(name, stream, maxsize=100):
+    q = queue.SimpleQueue()
+    handler = _DroppingQueueHandler(q, maxsize)
+    out = logging.StreamHandler(stream)
+    out.setFormatter(JsonFormatter())
+    listener = _BatchingQueueListener(q, out, flush_interval_s=0.01)
+    log = logging.getLogger(name)
+    log.handlers = [handler]
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log, handler, listener
+
+
+class TestQueuedLogging(unittest.TestCase):
+    def test_records_are_written_by_listener(self):
+        stream = io.StringIO()
+        log, _, listener = _queued_logger("tests.queued", stream)
+        listener.start()
+        log.info("hola %s", "mundo", extra={"request_id": "r1", "stages": [{"stage": "a"}]})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.error("falló", exc_info=True)
+        listener.stop()
+
+        lines = [json.loads(l) for l in stream.getvalue().splitlines()]
+        self.assertEqual(lines[0]["message"], "hola mundo")
+        self.assertEqual(lines[0]["request_id"], "r1")
+        self.assertEqual(lines[0]["stages"], [{"stage": "a"}])
+        self.assertIn("ValueError: boom", lines[1]["exception"])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        stream = io.StringIO()
+        log, handler, listener = _queued_logger("tests.dropping", stream, maxsize=5)
+        for i in range(20):
+            log.info("r%d", i)
+        self.assertEqual(handler.dropped, 15)
+        listener.start()
+        listener.stop()
+        self.assertEqual(len(stream.getvalue().splitlines()), 5)
+
+
+class TestRequestMiddleware(unittest.TestCase):
+    def setUp(self):
+        self._rate = settings.LOG_SUCCESS_SAMPLE_RATE
+        app = FastAPI()
+        app.add_middleware(RequestMiddleware)
+
+        @app.get("/items/{item_id}")
+        def item(item_id: str, request: Request):
+            return {"item": item_id, "request_id": request.state.request_id}
+
+        @app.get("/boom")
+        def boom():
+            raise RuntimeError("boom")
+
+        self.client = TestClient(app, raise_server_exceptions=False)
+
+    def tearDown(self):
+        settings.LOG_SUCCESS_SAMPLE_RATE = self._rate
+
+    def test_headers_and_request_state(self):
+        r = self.client.get("/items/7")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["request_id"], r.headers["X-Request-ID"])
+        self.assertGreaterEqual(float(r.headers["X-Process-Time"]), 0.0)
+
+    def test_success_logs_are_sampled_errors_are_not(self):
+        settings.LOG_SUCCESS_SAMPLE_RATE = 0.0
+        with self.assertLogs(middleware_mod.logger, level="INFO") as cm:
+            self.client.get("/items/1")
+            self.client.get("/missing")
+            self.client.get("/boom")
+        messages = [r.getMessage() for r in cm.records]
+        completed = [r for r in cm.records if r.getMessage() == "Request completed"]
+        self.assertEqual([r.status_code for r in completed], [404])
+        self.assertTrue(any(m.startswith("Request failed: boom") for m in messages))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas import RouteResult, SimulationRequest
+from app.services.routing.geometry import (
+    decode_polyline,
+    encode_polyline,
+    format_geometries,
+    format_geometry,
+    simplify,
+    zoom_tolerance_m,
+)
+
+M_PER_DEG = 111_195.08
+
+
+def _max_deviation_m(original: np.ndarray, simplified: np.ndarray) -> float:
+    """Distancia máxima (m) de los puntos originales a la polilínea simplificada (fuerza bruta)."""
+    coslat = np.cos(np.radians(original[:, 0].mean()))
+    to_xy = lambda p: np.column_stack([p[:, 1] * coslat, p[:, 0]]) * M_PER_DEG
+    pts, line = to_xy(original), to_xy(simplified)
+    a, b = line[:-1], line[1:]
+    ab = b - a
+    ap = pts[:, None, :] - a[None, :, :]
+    t = np.clip((ap * ab).sum(-1) / np.maximum((ab * ab).sum(-1), 1e-12), 0.0, 1.0)
+    d = np.linalg.norm(ap - t[..., None] * ab, axis=-1)
+    return float(d.min(axis=1).max())
+
+
+class TestPolyline(unittest.TestCase):
+    def test_reference_encoding_and_round_trip(self):
+        coords = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+        encoded = encode_polyline(coords)
+        self.assertEqual(encoded, "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        self.assertEqual(decode_polyline(encoded), coords)
+
+        rng = np.random.default_rng(1)
+        walk = np.cumsum(rng.normal(0.0, 1e-3, (500, 2)), axis=0) + [-1.05, -80.45]
+        decoded = np.array(decode_polyline(encode_polyline(walk)))
+        self.assertLessEqual(float(np.abs(decoded - walk).max()), 5e-6 + 1e-12)
+
+
+class TestSimplify(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.walk = np.cumsum(rng.normal(0.0, 1e-4, (2000, 2)), axis=0) + [-1.05, -80.45]
+
+    def test_within_tolerance_and_keeps_endpoints(self):
+        for tol in (2.0, 10.0, 50.0):
+            out = simplify(self.walk, tol)
+            self.assertLess(len(out), len(self.walk))
+            np.testing.assert_array_equal(out[0], self.walk[0])
+            np.testing.assert_array_equal(out[-1], self.walk[-1])
+            self.assertLessEqual(_max_deviation_m(self.walk, out), tol + 1e-6)
+
+    def test_collinear_points_collapse(self):
+        line = np.column_stack([np.linspace(-1.0, -1.01, 200), np.linspace(-80.4, -80.41, 200)])
+        self.assertEqual(len(simplify(line, 0.5)), 2)
+
+    def test_batch_matches_single_route(self):
+        a, b = self.walk[:300].tolist(), self.walk[300:900].tolist()
+        batch = format_geometries([a, [], b], "polyline", 5.0)
+        self.assertEqual(batch, [format_geometry(a, "polyline", 5.0), "", format_geometry(b, "polyline", 5.0)])
+        self.assertEqual(batch[2], encode_polyline(simplify(b, 5.0)))
+
+        coords = format_geometries([a, b], "coords", 5.0)
+        self.assertEqual(coords[1], simplify(b, 5.0).tolist())
+        # Sin tolerancia y en "coords" la geometría se devuelve tal cual
+        self.assertIs(format_geometry(a), a)
+
+    def test_zoom_tolerance_halves_per_level(self):
+        self.assertAlmostEqual(zoom_tolerance_m(15) * 2.0, zoom_tolerance_m(14))
+        self.assertLess(zoom_tolerance_m(15, lat=60.0), zoom_tolerance_m(15, lat=0.0))
+
+
+class TestGeometrySchemas(unittest.TestCase):
+    def test_request_defaults_and_polyline_route(self):
+        req = SimulationRequest(user_lat=-1.05, user_lng=-80.45, product_id="maiz")
+        self.assertEqual(req.geometry_format, "coords")
+        self.assertIsNone(req.simplify_tolerance_m)
+        with self.assertRaises(Exception):
+            SimulationRequest(user_lat=-1.05, user_lng=-80.45, product_id="maiz", geometry_format="geojson")
+
+        base = {"seller_id": "s1", "seller_name": "S", "duration_seconds": 1.0, "distance_meters": 1.0, "distance_km": 0.001, "duration_min": 0.1}
+        self.assertEqual(RouteResult(**base, route_geometry="_p~iF~ps|U").route_geometry, "_p~iF~ps|U")
+        self.assertEqual(RouteResult(**base, route_geometry=[[1.0, 2.0]]).route_geometry, [[1.0, 2.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
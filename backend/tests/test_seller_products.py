@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import sqlite3
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.core.config import settings
+from localdb_fixtures import TempDBTestCase
+
+
+def _seller(i, products):
+    return {
+        "id": f"s{i}",
+        "name": f"Vendedor {i}",
+        "products": products,
+        "coordinates": {"lat": -1.0 - i * 1e-4, "lng": -80.0},
+        "rating": 4.5,
+        "trips_count": i,
+        "type": "Productor",
+    }
+
+
+class TestSellerProducts(TempDBTestCase):
+    def test_filtered_query_uses_index(self):
+        products = ["maiz", "cacao", "arroz", "cafe"]
+        sellers = [_seller(i, [products[i % 4], products[(i + 1) % 4]]) for i in range(20000)]
+        self.assertEqual(localdb.insert_sellers(sellers), 20000)
+
+        maiz = localdb.fetch_sellers("maiz")
+        self.assertEqual(len(maiz), 10000)
+        self.assertTrue(all("maiz" in s["products"] for s in maiz))
+        # Mismo orden que el recorrido completo de la tabla
+        self.assertEqual([s["id"] for s in maiz], [s["id"] for s in localdb.fetch_sellers() if "maiz" in s["products"]])
+        self.assertEqual(maiz[0]["products"], ["maiz", "cacao"])
+        self.assertEqual(localdb.fetch_sellers("banano"), [])
+
+        plan = " ".join(
+            str(r[3])
+            for r in localdb.get_db().execute(
+                "EXPLAIN QUERY PLAN SELECT s.id FROM seller_products sp JOIN sellers s ON s.id = sp.seller_id WHERE sp.product_id = ?",
+                ("maiz",),
+            )
+        )
+        self.assertIn("idx_seller_products_product", plan)
+
+    def test_update_replaces_links(self):
+        localdb.insert_sellers([_seller(1, ["maiz", "cafe"])])
+        localdb.insert_sellers([_seller(1, ["cafe"])])
+        self.assertEqual(localdb.fetch_sellers("maiz"), [])
+        self.assertEqual([s["id"] for s in localdb.fetch_sellers("cafe")], ["s1"])
+
+    def test_migration_from_products_json(self):
+        localdb.close_db()
+        # Base anterior: solo la columna products_json, sin tabla seller_products
+        conn = sqlite3.connect(settings.LOCAL_DB_FILENAME)
+        conn.execute(
+            "CREATE TABLE sellers (id TEXT PRIMARY KEY, name TEXT NOT NULL, products_json TEXT NOT NULL, lat REAL NOT NULL, "
+            "lng REAL NOT NULL, rating REAL NOT NULL, trips_count INTEGER NOT NULL, seller_type TEXT NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO sellers VALUES (?, ?, ?, -1.0, -80.0, 4.0, 1, 'Productor')",
+            [("a", "A", json.dumps(["maiz", "cafe"])), ("b", "B", json.dumps(["cafe"])), ("c", "C", "no-json")],
+        )
+        conn.commit()
+        conn.close()
+
+        self.assertEqual([s["id"] for s in localdb.fetch_sellers("cafe")], ["a", "b"])
+        self.assertEqual([s["id"] for s in localdb.fetch_sellers("maiz")], ["a"])
+        self.assertEqual([s["id"] for s in localdb.fetch_sellers_near("cafe", -1.0, -80.0, radius_km=1.0)], ["a", "b"])
+
+    def test_sellers_near_uses_rtree(self):
+        # Malla de 100x100 vendedores separados ~1.1 km alrededor de (-1.0, -80.0)
+        sellers = []
+        for i in range(100):
+            for j in range(100):
+                s = _seller(i * 100 + j, ["maiz"] if (i + j) % 2 == 0 else ["cafe"])
+                s["coordinates"] = {"lat": -1.5 + i * 0.01, "lng": -80.5 + j * 0.01}
+                sellers.append(s)
+        localdb.insert_sellers(sellers)
+
+        near = localdb.fetch_sellers_near("maiz", -1.0, -80.0, limit=5)
+        self.assertEqual(len(near), 5)
+        self.assertEqual(near[0]["id"], "s5050")
+        self.assertEqual(near[0]["distance_km"], 0.0)
+        self.assertTrue(all("maiz" in s["products"] for s in near))
+        distances = [s["distance_km"] for s in near]
+        self.assertEqual(distances, sorted(distances))
+        brute = sorted(
+            localdb.haversine_km(-1.0, -80.0, s["coordinates"]["lat"], s["coordinates"]["lng"])
+            for s in localdb.fetch_sellers("maiz")
+        )[:5]
+        self.assertEqual(distances, [round(d, 4) for d in brute])
+
+        within = localdb.fetch_sellers_near(None, -1.0, -80.0, radius_km=1.2)
+        self.assertEqual(len(within), 5)  # el punto y sus 4 vecinos
+        self.assertTrue(all(s["distance_km"] <= 1.2 for s in within))
+
+        # Mover un vendedor actualiza el índice espacial
+        moved = dict(sellers[0], coordinates={"lat": -1.0001, "lng": -80.0001})
+        localdb.insert_sellers([moved])
+        self.assertEqual(localdb.fetch_sellers_near("maiz", -1.0001, -80.0001, limit=1)[0]["id"], "s0")
+
+        plan = " ".join(
+            str(r[3])
+            for r in localdb.get_db().execute(
+                "EXPLAIN QUERY PLAN SELECT s.id FROM seller_locations loc JOIN sellers s ON s.seller_key = loc.id "
+                "WHERE loc.min_lat <= 0 AND loc.max_lat >= -2 AND loc.min_lng <= -79 AND loc.max_lng >= -81"
+            )
+        )
+        self.assertIn("VIRTUAL TABLE INDEX", plan)
+        self.assertIn("idx_sellers_seller_key", plan)
+
+    def test_seller_key_survives_update_and_vacuum(self):
+        localdb.insert_sellers([_seller(1, ["maiz"]), _seller(2, ["maiz"])])
+        localdb.insert_sellers([dict(_seller(1, ["maiz"]), name="Renombrado")])
+        localdb.run_write(lambda c: c.execute("VACUUM"))
+        keys = dict(localdb.get_db().execute("SELECT id, seller_key FROM sellers").fetchall())
+        self.assertEqual(keys, {"s1": 1, "s2": 2})
+        self.assertEqual(localdb.fetch_sellers_near("maiz", -1.0002, -80.0, limit=1)[0]["id"], "s2")
+
+    def test_migration_rebuilds_index_out_of_sync_with_sellers(self):
+        localdb.close_db()
+        # Base anterior a seller_key: el R*Tree apuntaba a rowids que luego se renumeraron
+        conn = sqlite3.connect(settings.LOCAL_DB_FILENAME)
+        conn.execute(
+            "CREATE TABLE sellers (id TEXT PRIMARY KEY, name TEXT NOT NULL, products_json TEXT NOT NULL, lat REAL NOT NULL, "
+            "lng REAL NOT NULL, rating REAL NOT NULL, trips_count INTEGER NOT NULL, seller_type TEXT NOT NULL)"
+        )
+        conn.execute("CREATE VIRTUAL TABLE seller_locations USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+        conn.executemany(
+            "INSERT INTO sellers VALUES (?, ?, '[\"maiz\"]', ?, -80.0, 4.0, 1, 'Productor')",
+            [("a", "A", -1.0), ("b", "B", -2.0)],
+        )
+        conn.executemany("INSERT INTO seller_locations VALUES (?, ?, ?, -80.0, -80.0)", [(1, -2.0, -2.0), (2, -1.0, -1.0)])
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(localdb.fetch_sellers_near("maiz", -1.0, -80.0, limit=1)[0]["id"], "a")
+        self.assertEqual(localdb.fetch_sellers_near("maiz", -2.0, -80.0, limit=1)[0]["id"], "b")
+        localdb.insert_sellers([_seller(3, ["maiz"])])
+        self.assertEqual(localdb.get_db().execute("SELECT seller_key FROM sellers WHERE id = 's3'").fetchone()[0], 3)
+
+    def test_sellers_near_expands_until_limit(self):
+        localdb.insert_sellers([_seller(1, ["maiz"])])
+        far = dict(_seller(2, ["maiz"]), coordinates={"lat": 40.0, "lng": -3.7})
+        localdb.insert_sellers([far])
+        found = localdb.fetch_sellers_near("maiz", -1.0, -80.0, limit=5)
+        self.assertEqual([s["id"] for s in found], ["s1", "s2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.routing.geometry import decode_path, path_length_m
+from app.services.simulation.engine import SimulationState
+from app.services.simulation.fields import ALL_STAGES, GEOMETRY, IMPACT, MONTE_CARLO, stages_for_fields
+from simulation_fakes import SimulateAppTestCase
+
+
+class TestSimulateFields(SimulateAppTestCase):
+    state = SimulationState.TRAFFIC
+
+    def test_stages_for_fields(self):
+        self.assertEqual(stages_for_fields(None), ALL_STAGES)
+        self.assertEqual(stages_for_fields(["distance_km", "seller_name"]), frozenset())
+        self.assertEqual(stages_for_fields(["duration_min", "route_geometry"]), {IMPACT, GEOMETRY})
+        self.assertEqual(stages_for_fields(["metrics"]), ALL_STAGES - {GEOMETRY})
+        self.assertIn(MONTE_CARLO, stages_for_fields(["net_profit"]))
+
+    def test_path_length_matches_decode_path(self):
+        path = self.main.path_finder.run_dijkstra(0, 99)["path"]
+        self.assertEqual(path_length_m(self.main.graph, path), decode_path(self.main.graph, path)[1])
+
+    def test_lean_fields_skip_stages_and_match_full_response(self):
+        full = self.client.post("/api/routes/simulate", json=self.body).json()
+        with patch("app.main.FactorSimulator.simulate_factors") as mc, \
+                patch("app.main.decode_path") as decode, \
+                patch("app.services.simulation.batch.AdminKPICalculator.calculate_admin_metrics") as admin:
+            r = self.client.post("/api/routes/simulate", json={**self.body, "fields": "duration_min, distance_km"})
+        self.assertEqual(r.status_code, 200)
+        mc.assert_not_called()
+        decode.assert_not_called()
+        admin.assert_not_called()
+
+        lean = r.json()
+        self.assertNotIn("metrics", lean)
+        self.assertEqual(set(lean["all_routes"][0]), {"seller_id", "distance_km", "duration_min"})
+        self.assertEqual(lean["recommended_route"], lean["all_routes"][0])
+        expected = [{k: x[k] for k in ("seller_id", "distance_km", "duration_min")} for x in full["all_routes"]]
+        self.assertEqual(lean["all_routes"], expected)
+
+    def test_without_impact_routes_sorted_by_base_duration(self):
+        r = self.client.post("/api/routes/simulate", json={**self.body, "fields": ["duration_min_base", "transport_cost"]}).json()
+        bases = [x["duration_min_base"] for x in r["all_routes"]]
+        self.assertEqual(bases, sorted(bases))
+        self.assertTrue(all("transport_cost" in x and "route_geometry" not in x for x in r["all_routes"]))
+
+    def test_metrics_only_and_stream(self):
+        r = self.client.post("/api/routes/simulate", json={**self.body, "fields": ["metrics"]}).json()
+        self.assertEqual(set(r["metrics"]), {"revenue", "profit", "distance_total", "duration_total", "platform_profit", "prediction_accuracy", "avg_time_reduction", "revenue_growth"})
+        self.assertEqual(set(r["all_routes"][0]), {"seller_id"})
+
+        lines = self.client.post("/api/routes/simulate/stream?format=ndjson", json={**self.body, "fields": "distance_km"}).text.splitlines()
+        events = [json.loads(line) for line in lines]
+        self.assertTrue(all(set(e["data"]) == {"seller_id", "distance_km"} for e in events[:-1]))
+        self.assertNotIn("metrics", events[-1]["data"])
+
+    def test_unknown_field_rejected(self):
+        r = self.client.post("/api/routes/simulate", json={**self.body, "fields": ["eta"]})
+        self.assertEqual(r.status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.responses import sse_event
+from app.schemas import RouteResult
+from simulation_fakes import FakeRepository, SimulateAppTestCase
+
+
+class TestSimulateStream(SimulateAppTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.body = {**cls.body, "geometry_format": "polyline"}
+
+    def setUp(self):
+        self._window = settings.SIMULATION_STREAM_CONCURRENCY
+
+    def tearDown(self):
+        settings.SIMULATION_STREAM_CONCURRENCY = self._window
+
+    def test_sse_routes_then_summary(self):
+        r = self.client.post("/api/routes/simulate/stream", json=self.body)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.headers["content-type"].startswith("text/event-stream"))
+        events = []
+        for block in filter(None, r.text.split("\n\n")):
+            event_line, data_line = block.split("\n")
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+
+        kinds = [e for e, _ in events]
+        self.assertEqual(kinds, ["route"] * (len(events) - 1) + ["summary"])
+        routes = [d for e, d in events if e == "route"]
+        summary = events[-1][1]
+        self.assertEqual(summary["route_count"], len(routes))
+        self.assertNotIn("all_routes", summary)
+        best = min(routes, key=lambda x: x["duration_seconds"])
+        self.assertEqual(summary["recommended_route"]["seller_id"], best["seller_id"])
+        self.assertIsInstance(routes[0]["route_geometry"], str)
+        # Mismas claves que RouteResult, con los opcionales sin valor como null
+        self.assertEqual(set(routes[0]), set(RouteResult.model_fields))
+        self.assertIsNone(routes[0]["stop_time_min"])
+        self.assertEqual(summary["metrics"]["duration_total"], round(best["duration_min"], 2))
+
+    def test_ndjson_window_of_one_keeps_seller_order(self):
+        settings.SIMULATION_STREAM_CONCURRENCY = 1
+        r = self.client.post("/api/routes/simulate/stream?format=ndjson", json=self.body)
+        lines = [json.loads(line) for line in r.text.splitlines()]
+        self.assertEqual(lines[-1]["event"], "summary")
+        nearest = FakeRepository().get_sellers_near("maiz", self.body["user_lat"], self.body["user_lng"], limit=settings.SIMULATION_MAX_SELLERS)
+        self.assertEqual([l["data"]["seller_id"] for l in lines[:-1]], [s["id"] for s in nearest])
+
+        simulate = self.client.post("/api/routes/simulate", json=self.body).json()
+        self.assertEqual(set(simulate["all_routes"][0]), set(RouteResult.model_fields))
+        self.assertIn("route_valid", simulate["recommended_route"])
+        self.assertEqual(
+            sorted(l["data"]["distance_km"] for l in lines[:-1]),
+            sorted(x["distance_km"] for x in simulate["all_routes"]),
+        )
+
+    def test_invalid_format(self):
+        self.assertEqual(self.client.post("/api/routes/simulate/stream?format=xml", json=self.body).status_code, 400)
+
+    def test_sse_event_encoding(self):
+        self.assertEqual(sse_event("route", {"a": "ñ"}), 'event: route\ndata: {"a":"ñ"}\n\n'.encode("utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import random
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.localdb import haversine_km
+from app.schemas import RouteResult
+from app.services.routing.algorithms import PathFinder
+from app.services.routing.geometry import decode_path
+from app.services.simulation.batch import BatchSimulator, nearest_sellers
+from app.services.simulation.engine import FactorSimulator, KPICalculator, SimulationState, _triangular
+from simulation_fakes import FakeRepository, FixedChain, grid_graph
+
+
+class TestRouteMany(unittest.TestCase):
+    def test_matches_single_queries_in_both_directions(self):
+        G = grid_graph(12, spacing_deg=0.004, length_m=440.0, seed=0)
+        pf = PathFinder(G)
+        rng = random.Random(1)
+        nodes = list(G.nodes)
+        users, sellers = rng.sample(nodes, 30), rng.sample(nodes, 3)
+        # Más usuarios que vendedores: árboles desde los vendedores sobre el grafo invertido;
+        # al revés, árboles desde cada origen
+        for pairs in ([(u, s) for u in users for s in sellers], [(s, u) for u in users[:2] for s in sellers]):
+            routes = pf.route_many(pairs)
+            for s, t in pairs:
+                single = pf.run_dijkstra(s, t)
+                if s == t or not single["path"]:
+                    self.assertNotIn((s, t), routes)
+                    continue
+                got = routes[(s, t)]
+                self.assertAlmostEqual(got["cost"], single["cost"], places=6)
+                self.assertEqual((got["path"][0], got["path"][-1]), (s, t))
+                self.assertAlmostEqual(decode_path(G, got["path"])[1], decode_path(G, single["path"])[1], places=6)
+
+
+class TestNearestSellers(unittest.TestCase):
+    def test_matches_brute_force_with_radius(self):
+        rng = np.random.default_rng(2)
+        users = rng.uniform([-1.1, -80.5], [-1.0, -80.4], (40, 2))
+        sellers = rng.uniform([-1.1, -80.5], [-1.0, -80.4], (15, 2))
+        idx, dist = nearest_sellers(users[:, 0], users[:, 1], sellers[:, 0], sellers[:, 1], k=4, radius_km=6.0)
+        for row, (lat, lng) in enumerate(users):
+            ranked = sorted((haversine_km(lat, lng, s[0], s[1]), j) for j, s in enumerate(sellers))
+            expected = [j for d, j in ranked if d <= 6.0][:4]
+            self.assertEqual([j for j in idx[row].tolist() if j >= 0], expected)
+            self.assertTrue(np.all(np.diff(dist[row][np.isfinite(dist[row])]) >= 0))
+
+
+class TestVectorizedFactors(unittest.TestCase):
+    def test_triangular_matches_stdlib_formula(self):
+        for params in ((0.95, 1.0, 0.99), (0.95, 1.0, 1.05), (1.5, 2.0, 3.0)):
+            r1, r2 = random.Random(5), random.Random(5)
+            expected = [r1.triangular(*params) for _ in range(200)]
+            u = np.array([r2.random() for _ in range(200)])
+            np.testing.assert_allclose(_triangular(u, *params), expected, rtol=1e-12)
+
+    def test_batch_factors_and_kpis(self):
+        states = [SimulationState.NORMAL, SimulationState.TRAFFIC, SimulationState.RAIN, SimulationState.STRIKE] * 25
+        factors = FactorSimulator.simulate_factors_batch(states, [12.0] * 100, [7.0] * 100, rng=np.random.default_rng(0))
+        self.assertEqual([f["state"] for f in factors], states)
+        for f in factors:
+            self.assertGreater(f["simulated_duration"], 0.0)
+            self.assertTrue(95.0 <= f["initial_freshness"] <= 100.0)
+        # Tráfico consume más combustible que el escenario normal, igual que en simulate_factors
+        fuel = {s: np.mean([f["fuel_factor"] for f in factors if f["state"] == s]) for s in set(states)}
+        self.assertGreater(fuel[SimulationState.TRAFFIC], fuel[SimulationState.NORMAL])
+
+        metrics = [{"duration_min": 12.0, "distance_km": 7.0 + i * 0.1} for i in range(len(factors))]
+        self.assertEqual(
+            KPICalculator.calculate_kpis_batch(factors, metrics),
+            [KPICalculator.calculate_kpis(f, m) for f, m in zip(factors, metrics)],
+        )
+
+
+class TestBatchSimulator(unittest.TestCase):
+    def setUp(self):
+        self.G = grid_graph(12, spacing_deg=0.004, length_m=440.0, seed=0)
+        self.pf = PathFinder(self.G)
+        sellers = [
+            {"id": f"s{k}", "name": f"Vendedor {k}", "products": ["maiz"] if k % 2 else ["maiz", "cacao"],
+             "coordinates": {"lat": -1.085 + k * 0.005, "lng": -80.485 + k * 0.004}}
+            for k in range(6)
+        ]
+        self.sim = BatchSimulator(self.G, self.pf, FakeRepository(sellers), max_sellers=3, chunk_size=4)
+        rng = random.Random(4)
+        self.items = [
+            SimpleNamespace(
+                user_lat=-1.09 + rng.random() * 0.04, user_lng=-80.49 + rng.random() * 0.04,
+                product_id=rng.choice(["maiz", "cacao", "yuca"]), weight=25.0, id=f"o{i}",
+            )
+            for i in range(15)
+        ]
+
+    def test_one_result_per_item_with_simulate_shape(self):
+        chunks = list(self.sim.run_chunks(self.items, FixedChain(), geometry_format="polyline"))
+        self.assertTrue(all(len(c) <= 4 for c in chunks))
+        results = [r for c in chunks for r in c]
+        self.assertEqual(sorted(r["index"] for r in results), list(range(len(self.items))))
+        for r in results:
+            item = self.items[r["index"]]
+            self.assertEqual(r["id"], item.id)
+            self.assertNotIn("error", r)
+            if item.product_id == "yuca":  # sin vendedores
+                self.assertIsNone(r["recommended_route"])
+                continue
+            self.assertTrue(1 <= len(r["all_routes"]) <= 3)
+            self.assertEqual(r["recommended_route"], r["all_routes"][0])
+            self.assertEqual(set(r["all_routes"][0]), set(RouteResult.model_fields))
+            self.assertIsInstance(r["all_routes"][0]["route_geometry"], str)
+            durations = [x["duration_seconds"] for x in r["all_routes"]]
+            self.assertEqual(durations, sorted(durations))
+
+    def test_routes_match_single_pipeline_distances(self):
+        results = {r["index"]: r for r in self.sim.run(self.items, FixedChain())}
+        user_nodes = self.sim.snap([it.user_lng for it in self.items], [it.user_lat for it in self.items])
+        for i, item in enumerate(self.items):
+            for route in results[i]["all_routes"]:
+                seller = next(s for s in self.sim.repository.sellers if s["id"] == route["seller_id"])
+                seller_node = self.sim.snap([seller["coordinates"]["lng"]], [seller["coordinates"]["lat"]])[0]
+                single = self.pf.run_dijkstra(user_nodes[i].item(), seller_node.item())
+                _, dist_m = decode_path(self.G, single["path"])
+                self.assertAlmostEqual(route["distance_km"], round(dist_m / 1000, 2), places=6)
+                self.assertEqual(len(route["route_geometry"]), len(decode_path(self.G, single["path"])[0]))
+
+
+class TestBatchEndpointAdmission(unittest.TestCase):
+    def test_slot_released_when_client_disconnects_before_body(self):
+        import app.main as main
+        from app.schemas import SimulationBatchRequest
+
+        request = SimulationBatchRequest(items=[{"user_lat": -1.07, "user_lng": -80.47, "product_id": "maiz"}])
+        started = []
+
+        def run_chunks(*args, **kwargs):
+            started.append(True)
+            yield [{"index": 0}]
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            await asyncio.sleep(0.05)  # el cliente se va antes de recibir el primer bloque
+
+        async def call():
+            response = await main.simulate_routes_batch(request)
+            self.assertEqual(main.batch_admission.stats()["workloads"]["simulate_batch"]["active"], 1)
+            # ASGI 2.3 (uvicorn): Starlette escucha la desconexión en paralelo al streaming
+            await response({"type": "http", "asgi": {"spec_version": "2.3"}}, receive, send)
+
+        with patch.object(main, "graph", object()), patch.object(main, "batch_simulator", SimpleNamespace(run_chunks=run_chunks)):
+            asyncio.run(call())
+        self.assertEqual(started, [])
+        self.assertEqual(main.batch_admission.stats()["workloads"]["simulate_batch"]["active"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
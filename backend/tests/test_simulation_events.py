@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+import sqlite3
+import threading
+import unittest
+from datetime import datetime
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import localdb
+from app.core.config import settings
+from localdb_fixtures import TempDBTestCase
+
+
+def _event(created_at, event_type, simulation_id, distance, duration, progress=0.5):
+    payload = {
+        "simulation_id": simulation_id,
+        "event_type": event_type,
+        "trigger_progress": progress,
+        "impact_metrics": {"distance_added": distance, "new_duration": duration},
+    }
+    row = localdb.simulation_event_row(event_type, payload)
+    return (created_at,) + row[1:]
+
+
+class TestSimulationEvents(TempDBTestCase):
+    def test_typed_columns_and_rollups(self):
+        localdb.insert_simulation_events([
+            _event("2025-01-10T08:00:00", "rain", "sim1", 1000.0, 20.0),
+            _event("2025-01-10T09:00:00", "rain", "sim2", 3000.0, 30.0),
+            _event("2025-01-11T09:00:00", "traffic", "sim1", 500.0, 12.0, progress=0.8),
+        ])
+        localdb.log_simulation_event("protest", {"simulation_id": "sim1"})
+
+        stats = localdb.fetch_simulation_event_stats()
+        self.assertEqual(stats["by_event_type"]["rain"]["n_events"], 2)
+        self.assertEqual(stats["by_event_type"]["rain"]["avg_distance_added_m"], 2000.0)
+        self.assertEqual(stats["by_event_type"]["rain"]["avg_new_duration_min"], 25.0)
+        self.assertEqual(stats["by_event_type"]["protest"]["n_with_impact"], 0)
+        self.assertIsNone(stats["by_event_type"]["protest"]["avg_distance_added_m"])
+        only_rain = localdb.fetch_simulation_event_stats(since_iso="2025-01-10", until_iso="2025-01-10", event_type="rain")
+        self.assertEqual([d["day"] for d in only_rain["daily"]], ["2025-01-10"])
+
+        sim1 = localdb.fetch_simulation_stats("sim1")["by_event_type"]
+        self.assertEqual(sorted(sim1), ["protest", "rain", "traffic"])
+        self.assertEqual(sim1["traffic"]["max_trigger_progress"], 0.8)
+
+        plan = " ".join(str(r[3]) for r in localdb.get_db().execute(
+            "EXPLAIN QUERY PLAN SELECT event_type FROM simulation_events WHERE simulation_id = ?", ("sim1",)
+        ))
+        self.assertIn("idx_simulation_events_simulation", plan)
+
+    def test_compaction_archives_old_rows(self):
+        localdb.insert_simulation_events(
+            [_event(f"2025-01-{d:02d}T08:00:00", "rain", "old", 100.0, 10.0) for d in range(1, 31)]
+            + [_event("2025-02-03T08:00:00", "traffic", "old", 50.0, 5.0)]
+            + [_event("2025-06-01T08:00:00", "rain", "new", 100.0, 10.0)]
+        )
+        result = localdb.compact_simulation_events(older_than_days=30, batch_size=7, now=datetime(2025, 6, 15))
+        self.assertEqual(result["archived"], 31)
+        self.assertEqual(result["partitions"], ["2025-01", "2025-02"])
+        self.assertLess(result["compressed_bytes"], result["raw_bytes"])
+
+        conn = localdb.get_db()
+        self.assertEqual(conn.execute("SELECT COUNT(1) FROM simulation_events").fetchone()[0], 1)
+        archived = localdb.fetch_archived_simulation_events("2025-01")
+        self.assertEqual(len(archived), 30)
+        self.assertEqual(json.loads(archived[0]["payload_json"])["simulation_id"], "old")
+        self.assertEqual({p["partition"]: p["n_events"] for p in localdb.fetch_simulation_event_archives()}, {"2025-01": 30, "2025-02": 1})
+
+        # El agregado diario conserva los eventos archivados
+        self.assertEqual(localdb.fetch_simulation_event_stats()["by_event_type"]["rain"]["n_events"], 31)
+        self.assertEqual(localdb.compact_simulation_events(older_than_days=30, now=datetime(2025, 6, 15))["archived"], 0)
+
+    def test_migration_from_payload_only_table(self):
+        localdb.close_db()
+        conn = sqlite3.connect(settings.LOCAL_DB_FILENAME)
+        conn.execute(
+            "CREATE TABLE simulation_events (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT NOT NULL, "
+            "event_type TEXT NOT NULL, payload_json TEXT NOT NULL)"
+        )
+        payload = {"simulation_id": "legacy", "trigger_progress": 0.4, "impact_metrics": {"distance_added": 800.0, "new_duration": 9.5}}
+        conn.executemany(
+            "INSERT INTO simulation_events (created_at, event_type, payload_json) VALUES (?, ?, ?)",
+            [("2025-01-10T08:00:00", "rain", json.dumps(payload)), ("2025-01-10T08:05:00", "rain", "not json")],
+        )
+        conn.commit()
+        conn.close()
+
+        row = localdb.get_db().execute("SELECT simulation_id, trigger_progress, distance_added_m, new_duration_min FROM simulation_events WHERE id = 1").fetchone()
+        self.assertEqual(tuple(row), ("legacy", 0.4, 800.0, 9.5))
+        rain = localdb.fetch_simulation_event_stats()["by_event_type"]["rain"]
+        self.assertEqual((rain["n_events"], rain["n_with_impact"], rain["avg_distance_added_m"]), (2, 1, 800.0))
+
+    def test_compaction_job_adapter(self):
+        localdb.insert_simulation_events([_event("2020-01-01T00:00:00", "rain", "x", 1.0, 1.0)])
+        cancel_event = threading.Event()
+        cancel_event.set()
+        # Cancelado antes del primer lote: no archiva nada
+        self.assertEqual(localdb.compact_simulation_events_job(None, older_than_days=30, cancel_event=cancel_event)["archived"], 0)
+        result = localdb.compact_simulation_events_job(None, older_than_days=30, cancel_event=threading.Event())
+        self.assertEqual(result["archived"], 1)
+        self.assertEqual(localdb.fetch_simulation_event_archives()[0]["partition"], "2020-01")
+
+if __name__ == "__main__":
+    unittest.main()
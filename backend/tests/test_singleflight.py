@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.singleflight import SingleFlight
+
+
+def _run_concurrently(flight, key, fn, n=8):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_duplicates_share_one_computation(self):
+        flight = SingleFlight("tests.shared")
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {"value": 42}
+
+        threads, results, errors = _run_concurrently(flight, ("node", "tomate", 10.0), compute)
+        # Todas las peticiones deben estar esperando antes de liberar al leader
+        deadline = time.time() + 5
+        while flight.stats()["coalesced"] < 7 and time.time() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(r is results[0] for r in results))
+        stats = flight.stats()
+        self.assertEqual((stats["leader"], stats["coalesced"], stats["in_flight"]), (1, 7, 0))
+
+        # Sin TTL, la siguiente petición vuelve a calcular
+        flight.do(("node", "tomate", 10.0), compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_leader_error_propagates_to_waiters(self):
+        flight = SingleFlight("tests.error")
+        release = threading.Event()
+
+        def compute():
+            release.wait(5)
+            raise ValueError("boom")
+
+        threads, results, errors = _run_concurrently(flight, "k", compute, n=4)
+        deadline = time.time() + 5
+        while flight.stats()["coalesced"] < 3 and time.time() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 4)
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+        self.assertEqual(flight.stats()["cached_results"], 0)
+
+    def test_ttl_reuses_result_and_disabled_passes_through(self):
+        flight = SingleFlight("tests.ttl", ttl_s=0.05)
+        calls = []
+        fn = lambda: calls.append(1) or len(calls)
+        self.assertEqual(flight.do("k", fn), 1)
+        self.assertEqual(flight.do("k", fn), 1)
+        self.assertEqual(flight.do("other", fn), 2)
+        time.sleep(0.06)
+        self.assertEqual(flight.do("k", fn), 3)
+        self.assertEqual(flight.stats()["cached"], 1)
+
+        disabled = SingleFlight("tests.disabled", ttl_s=10.0, enabled=False)
+        self.assertEqual([disabled.do("k", fn) for _ in range(2)], [4, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.middleware import RequestMiddleware
+from app.core.tracing import current_trace, end_trace, span, start_trace, traced
+
+
+class TestSpans(unittest.TestCase):
+    def test_nested_spans_are_aggregated_by_path(self):
+        trace, token = start_trace("req-1")
+        try:
+            with span("simulate"):
+                for _ in range(3):
+                    with span("dijkstra"):
+                        pass
+                with span("kpis"):
+                    with span("impact_inference"):
+                        pass
+        finally:
+            end_trace(token)
+
+        stages = {s["stage"]: s for s in trace.breakdown()}
+        self.assertEqual(list(stages), ["simulate/dijkstra", "simulate/kpis/impact_inference", "simulate/kpis", "simulate"])
+        self.assertEqual(stages["simulate/dijkstra"]["count"], 3)
+        self.assertGreaterEqual(stages["simulate"]["total_ms"], stages["simulate/kpis"]["total_ms"])
+        header = trace.server_timing(0.01)
+        self.assertIn('simulate.dijkstra;dur=', header)
+        self.assertIn(';desc="x3"', header)
+        self.assertTrue(header.endswith("total;dur=10.000"))
+        self.assertIsNone(current_trace())
+
+    def test_spans_without_trace_are_noops(self):
+        @traced("stage")
+        def work(x):
+            return x * 2
+
+        with span("outside") as s:
+            self.assertEqual(work(2), 4)
+        self.assertIs(s, span("other"))
+
+
+class TestTracingMiddleware(unittest.TestCase):
+    def setUp(self):
+        self._rate = settings.TRACE_SAMPLE_RATE
+        app = FastAPI()
+        app.add_middleware(RequestMiddleware)
+
+        @app.get("/work")
+        @traced("handler")
+        def work():
+            with span("stage_a"):
+                pass
+            with span("stage_b"):
+                pass
+            return {"ok": True}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        settings.TRACE_SAMPLE_RATE = self._rate
+
+    def test_sampled_request_gets_server_timing(self):
+        settings.TRACE_SAMPLE_RATE = 1.0
+        r = self.client.get("/work")
+        self.assertEqual(r.status_code, 200)
+        timing = r.headers["Server-Timing"]
+        for stage in ("handler.stage_a", "handler.stage_b", "handler;", "response;", "total;"):
+            self.assertIn(stage, timing)
+
+    def test_unsampled_request_can_be_forced(self):
+        settings.TRACE_SAMPLE_RATE = 0.0
+        self.assertNotIn("Server-Timing", self.client.get("/work").headers)
+        self.assertIn("handler.stage_a", self.client.get("/work", headers={"X-Trace": "1"}).headers["Server-Timing"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,9 +9,12 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 backend_root = os.path.dirname(current_dir)
 sys.path.append(backend_root)
 
-from simulation_engine import FactorSimulator, KPICalculator, SimulationState
+from app.services.simulation.engine import FactorSimulator, KPICalculator, SimulationState
+from app.services.export.datasets import export_frame, latest_snapshot, load_frame
 
-def harvest_data(n_samples=2000):
+DATASET_NAME = "simulation_dataset"
+
+def harvest_data(n_samples=2000, export=True):
     """
     Genera datos sintéticos ejecutando la lógica REAL del sistema
     miles de veces. Esto crea un 'gemelo digital' de datos
@@ -73,14 +76,28 @@ def harvest_data(n_samples=2000):
         
         data.append(row)
         
-    df = pd.read_csv('simulation_dataset.csv') if os.path.exists('simulation_dataset.csv') else pd.DataFrame(data)
-    if not os.path.exists('simulation_dataset.csv'):
-        df.to_csv('simulation_dataset.csv', index=False)
-        print(f"✅ Dataset generado: {len(df)} registros.")
-    else:
-        print("ℹ️ Dataset existente encontrado. Usando datos previos.")
-        
-    return pd.DataFrame(data)
+    df = pd.DataFrame(data)
+    if export:
+        try:
+            # Snapshot columnar particionado por estado: el laboratorio lo relee sin reparsear CSV
+            manifest = export_frame(DATASET_NAME, df, partition_cols=("state",), source={"n_samples": n_samples})
+            print(f"✅ Dataset exportado: {manifest['rows']} registros (snapshot {manifest['snapshot_id']}).")
+        except RuntimeError as e:
+            df.to_csv('simulation_dataset.csv', index=False)
+            print(f"ℹ️ {e}. Dataset guardado en simulation_dataset.csv.")
+
+    return df
+
+def load_harvested(n_samples=2000):
+    """Último dataset cosechado (Parquet/Arrow); si no hay snapshot, se cosecha uno nuevo."""
+    try:
+        if latest_snapshot(DATASET_NAME) is not None:
+            df = load_frame(DATASET_NAME)
+            print(f"ℹ️ Dataset existente encontrado: {len(df)} registros.")
+            return df
+    except RuntimeError:
+        pass
+    return harvest_data(n_samples)
 
 if __name__ == "__main__":
     harvest_data()
@@ -4,13 +4,13 @@ from sklearn.model_selection import train_test_split
 from explainerdashboard import RegressionExplainer, ExplainerDashboard
 import joblib
 import os
-from data_harvester import harvest_data
+from data_harvester import load_harvested
 
 def run_lab(port=8050):
     print("🧪 Iniciando Laboratorio de Explicabilidad...")
     
     # 1. Obtener Datos
-    df = harvest_data(3000)
+    df = load_harvested(3000)
     
     # 2. Preparar Modelo Surrogate
     # Queremos explicar la 'Satisfacción Final' basándonos en las condiciones iniciales